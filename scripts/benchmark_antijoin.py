@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+Benchmark del Anti-join de Productos sin Ventas (Consulta 8)
+Dataset: Brazilian E-Commerce (MongoDB)
+Catálogo escalado N veces en una base temporal: $nin original vs last_sale_date vs diferencia ordenada
+"""
+
+import argparse
+from datetime import datetime
+import bson
+from mongodb_connection import create_mongo_client, DEFAULT_MONGODB_URI, DATABASE_NAME
+from sales_rollups import SalesRollups
+from product_antijoin import ProductAntiJoin
+from benchmark_common import timed, build_scaled_database
+import warnings
+warnings.filterwarnings('ignore')
+
+# Solo products se replica (ids nuevos): las réplicas nunca aparecen en orders, son catálogo sin ventas
+ANTIJOIN_COLLECTIONS = {'orders': None, 'products': ('product_id',)}
+
+def run_benchmark(mongodb_uri=DEFAULT_MONGODB_URI, scale=10, fecha_limite=datetime(2018, 3, 1), repeat=3, keep=False):
+    """Medir las tres estrategias (todos los candidatos y primeros 100) y verificar que coinciden"""
+    print("🎯 BENCHMARK: ANTI-JOIN DE PRODUCTOS SIN VENTAS RECIENTES")
+    print("="*80)
+    
+    client = create_mongo_client(mongodb_uri)
+    target_name = f"{DATABASE_NAME}_antijoin_benchmark"
+    results = {'scale': scale, 'fecha_limite': fecha_limite.isoformat(), 'strategies': {}}
+    
+    try:
+        db = build_scaled_database(client, scale, ANTIJOIN_COLLECTIONS, name=target_name)
+        if not ProductAntiJoin(db).has_last_sale_dates():
+            # La base original aún no tiene rollups: la estrategia de servidor necesita last_sale_date
+            SalesRollups(db).refresh()
+        antijoin = ProductAntiJoin(db)
+        projection = {'_id': 0, 'product_id': 1}
+        
+        total_products = db.products.count_documents({})
+        active_ids = list(antijoin.iter_active_product_ids(fecha_limite))
+        nin_command_bytes = len(bson.encode({'product_id': {'$nin': active_ids}}))
+        results.update({
+            'catalog_products': total_products,
+            'active_products': len(active_ids),
+            'nin_filter_bytes': nin_command_bytes
+        })
+        
+        print(f"\n📦 Catálogo: {total_products:,} productos, {len(active_ids):,} con ventas desde {fecha_limite.date()}")
+        print(f"📨 Filtro $nin original: {nin_command_bytes / 1024**2:.2f} MB por comando")
+        
+        strategies = {
+            'nin_original': antijoin.legacy_nin,
+            'last_sale_date_servidor': antijoin.server_side,
+            'diferencia_ordenada': antijoin.sorted_merge
+        }
+        
+        reference = None
+        for name, strategy in strategies.items():
+            full_time, full_result = timed(lambda: strategy(fecha_limite, None, projection), repeat)
+            limited_time, _ = timed(lambda: strategy(fecha_limite, 100, projection), repeat)
+            
+            candidate_ids = {product['product_id'] for product in full_result}
+            reference = candidate_ids if reference is None else reference
+            results['strategies'][name] = {
+                'candidates': len(candidate_ids),
+                'all_candidates_seconds': full_time,
+                'first_100_seconds': limited_time,
+                'matches_original': candidate_ids == reference
+            }
+            
+            print(f"  • {name:24s}: {len(candidate_ids):,} candidatos en {full_time:.3f}s "
+                  f"(primeros 100 en {limited_time:.3f}s) {'✅' if candidate_ids == reference else '❌ distinto'}")
+        
+        base = results['strategies']['nin_original']['all_candidates_seconds']
+        print(f"\n📊 RESULTADOS (catálogo x{scale}):")
+        for name, stats in results['strategies'].items():
+            print(f"  • {name}: {base / stats['all_candidates_seconds']:.1f}x frente al $nin original")
+    finally:
+        if not keep:
+            client.drop_database(target_name)
+        client.close()
+    
+    return results
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Benchmark del anti-join de la consulta 8 con catálogo escalado')
+    parser.add_argument('--mongodb-uri', default=DEFAULT_MONGODB_URI)
+    parser.add_argument('--scale', type=int, default=10, help='Veces que se replica el catálogo de products')
+    parser.add_argument('--fecha-limite', default='2018-03-01', help='Productos sin ventas desde esta fecha (AAAA-MM-DD)')
+    parser.add_argument('--repeat', type=int, default=3, help='Repeticiones por estrategia (se toma el mejor tiempo)')
+    parser.add_argument('--keep', action='store_true', help='Conservar la base de benchmark al terminar')
+    args = parser.parse_args()
+    
+    run_benchmark(args.mongodb_uri, args.scale, datetime.fromisoformat(args.fecha_limite), args.repeat, args.keep)
@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+Utilidades Compartidas de los Benchmarks
+Dataset: Brazilian E-Commerce (MongoDB y datos procesados)
+Medición de tiempos y bases escaladas (colecciones replicadas N veces) comunes a los scripts benchmark_*.py
+"""
+
+import time
+from datetime import datetime
+from bson import json_util
+from mongodb_connection import DATABASE_NAME, METADATA_COLLECTION
+from sales_rollups import SalesRollups, ROLLUP_STATUS_ID
+
+SCALE_MARKER_ID = 'benchmark_scale'
+
+# Colección -> campos con sufijo de réplica (None: catálogo que se copia una sola vez)
+SCALED_COLLECTIONS = {
+    'orders': ('order_id', 'customer.customer_id'),
+    'customers': ('customer_id',),
+    'products': None,
+    'sellers': None
+}
+
+def timed(function, repeat):
+    """Mejor tiempo de repeat ejecuciones y el resultado de la última"""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = function()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+def scaled_database_name(scale):
+    return DATABASE_NAME if scale == 1 else f"{DATABASE_NAME}_x{scale}"
+
+def _replica_document(document, fields, replica):
+    """Copia del documento con sufijo -replica en los campos clave (la réplica 0 conserva los ids)"""
+    copy = dict(document)
+    if not replica:
+        return copy
+    for field in fields:
+        parent, _, child = field.rpartition('.')
+        if parent:
+            copy[parent] = dict(copy.get(parent) or {})
+            target = copy[parent]
+        else:
+            target = copy
+        if target.get(child) is not None:
+            target[child] = f"{target[child]}-{replica}"
+    return copy
+
+def build_scaled_database(client, scale, collections=None, filters=None, name=None, rollups=True,
+                          batch_size=5000, rebuild=False):
+    """
+    Base de benchmark a partir de DATABASE_NAME (por defecto {DATABASE_NAME}_x{scale}):
+    - collections: colección -> campos que reciben el sufijo -réplica en cada una de las scale
+      copias (None: se copia una vez); por defecto orders y customers replicados, catálogo 1x
+    - filters: colección -> consulta que elige los documentos copiados (p. ej. un período)
+    - los mismos índices que la base original (creados tras la carga) y, con rollups=True y si la
+      original los tiene, rollups y products.last_sale_date recalculados sobre la copia
+    Se reutiliza si ya existe con la misma escala, composición y órdenes de origen
+    """
+    collections = SCALED_COLLECTIONS if collections is None else collections
+    filters = filters or {}
+    name = name or scaled_database_name(scale)
+    if name == DATABASE_NAME:
+        return client[name]
+    
+    source = client[DATABASE_NAME]
+    target = client[name]
+    source_orders = source.orders.estimated_document_count()
+    source_rollups = rollups and source[METADATA_COLLECTION].find_one({'_id': ROLLUP_STATUS_ID}) is not None
+    # Composición de la copia en JSON extendido (los filtros llevan operadores $ y fechas)
+    layout = json_util.dumps({'collections': collections, 'filters': filters})
+    marker = target[METADATA_COLLECTION].find_one({'_id': SCALE_MARKER_ID})
+    if (not rebuild and marker and marker.get('scale') == scale and marker.get('source_orders') == source_orders
+            and marker.get('rollups') == source_rollups and marker.get('layout') == layout):
+        print(f"♻️ Reutilizando {name} ({marker['created_at']:%Y-%m-%d %H:%M})")
+        return target
+    
+    client.drop_database(name)
+    print(f"📋 Construyendo {name} (x{scale})...")
+    start_time = time.perf_counter()
+    for collection_name, fields in collections.items():
+        replicas = range(scale) if fields else range(1)
+        batch, copied = [], 0
+        for document in source[collection_name].find(filters.get(collection_name, {}), {'_id': 0}):
+            for replica in replicas:
+                batch.append(_replica_document(document, fields or (), replica))
+            if len(batch) >= batch_size:
+                target[collection_name].insert_many(batch, ordered=False)
+                copied += len(batch)
+                batch = []
+        if batch:
+            target[collection_name].insert_many(batch, ordered=False)
+            copied += len(batch)
+        
+        for index_name, info in source[collection_name].index_information().items():
+            if index_name == '_id_':
+                continue
+            options = {key: info[key] for key in ('unique', 'sparse', 'partialFilterExpression') if key in info}
+            target[collection_name].create_index(info['key'], name=index_name, **options)
+        print(f"  • {collection_name}: {copied:,} documentos")
+    
+    # Los rollups y last_sale_date copiados corresponderían a 1x: se recalculan sobre las órdenes escaladas
+    if source_rollups:
+        SalesRollups(target).refresh()
+    
+    target[METADATA_COLLECTION].insert_one({
+        '_id': SCALE_MARKER_ID, 'scale': scale, 'source_orders': source_orders, 'rollups': source_rollups,
+        'layout': layout, 'created_at': datetime.now()
+    })
+    print(f"✅ {name} lista en {time.perf_counter() - start_time:.1f}s")
+    return target
@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+Benchmark del Conteo de Distintos por Producto (Consulta 15)
+Dataset: Brazilian E-Commerce (MongoDB)
+Órdenes del trimestre escaladas N veces: $addToSet vs $group escalonado vs HyperLogLog en streaming
+"""
+
+import argparse
+from datetime import datetime
+from mongodb_connection import create_mongo_client, DEFAULT_MONGODB_URI, DATABASE_NAME
+from sales_rollups import PURCHASE_TIMESTAMP
+from distinct_counts import product_sales_group, product_distinct_sketches, HyperLogLog
+from benchmark_common import timed, build_scaled_database
+import warnings
+warnings.filterwarnings('ignore')
+
+# Réplicas de las órdenes con order_id y customer_id nuevos: los distintos por producto crecen con la escala
+DISTINCT_COLLECTIONS = {'orders': ('order_id', 'customer.customer_id')}
+
+def group_memory_stats(db, pipeline):
+    """Memoria máxima de acumuladores y uso de disco de las etapas $group (explain executionStats)"""
+    explain = db.command('explain', {'aggregate': 'orders', 'pipeline': pipeline, 'cursor': {}},
+                         verbosity='executionStats')
+    groups = [stage for stage in explain.get('stages', []) if '$group' in stage]
+    accumulator_bytes = [sum(stage.get('maxAccumulatorMemoryUsageBytes', {}).values()) for stage in groups]
+    return {
+        'group_stages': len(groups),
+        'max_accumulator_bytes': max(accumulator_bytes, default=None),
+        'used_disk': any(stage.get('usedDisk') for stage in groups)
+    }
+
+def distinct_counts(result):
+    """product_id -> (órdenes distintas, clientes distintos), con arrays o conteos"""
+    size = lambda value: len(value) if isinstance(value, list) else value
+    return {doc['_id']: (size(doc['ordenes_distintas']), size(doc['clientes_distintos'])) for doc in result}
+
+def run_benchmark(mongodb_uri=DEFAULT_MONGODB_URI, scale=10, repeat=3, precision=12, keep=False):
+    """Medir los tres modos, la memoria de los $group y el error de HyperLogLog frente al exacto"""
+    print("🎯 BENCHMARK: ÓRDENES Y CLIENTES DISTINTOS POR PRODUCTO (CONSULTA 15)")
+    print("="*80)
+    
+    client = create_mongo_client(mongodb_uri)
+    target_name = f"{DATABASE_NAME}_distinct_benchmark"
+    fecha_inicio, fecha_fin = datetime(2018, 6, 1), datetime(2018, 8, 31)
+    results = {'scale': scale, 'precision': precision, 'modes': {}}
+    
+    try:
+        period = {PURCHASE_TIMESTAMP: {"$gte": fecha_inicio, "$lte": fecha_fin}}
+        db = build_scaled_database(client, scale, DISTINCT_COLLECTIONS, filters={'orders': period},
+                                   name=target_name, rollups=False)
+        results['orders'] = db.orders.count_documents({})
+        print(f"\n📦 Órdenes en el período (x{scale}): {results['orders']:,}")
+        
+        for mode in ('addToSet', 'exacto'):
+            pipeline = product_sales_group(fecha_inicio, fecha_fin, mode)
+            seconds, result = timed(lambda: list(db.orders.aggregate(pipeline, allowDiskUse=True)), repeat)
+            results['modes'][mode] = {'seconds': seconds, 'products': len(result), **group_memory_stats(db, pipeline)}
+            results['modes'][mode]['counts'] = distinct_counts(result)
+        
+        def approximate():
+            sums = list(db.orders.aggregate(product_sales_group(fecha_inicio, fecha_fin, None), allowDiskUse=True))
+            return sums, product_distinct_sketches(db, fecha_inicio, fecha_fin, precision=precision)
+        
+        seconds, (sums, sketches) = timed(approximate, repeat)
+        results['modes']['aproximado'] = {
+            'seconds': seconds,
+            'products': len(sums),
+            'sketch_bytes': sum(s['ordenes'].memory_bytes() + s['clientes'].memory_bytes() for s in sketches.values()),
+            'counts': {product_id: (s['ordenes'].count(), s['clientes'].count()) for product_id, s in sketches.items()}
+        }
+        
+        exact = results['modes']['exacto']['counts']
+        same_exact = exact == results['modes']['addToSet']['counts']
+        approx = results['modes']['aproximado']['counts']
+        errors = [
+            abs(estimate - real) / real
+            for product_id, reals in exact.items()
+            for estimate, real in zip(approx.get(product_id, (0, 0)), reals) if real
+        ]
+        standard_error = HyperLogLog(precision).standard_error
+        results['hll'] = {
+            'standard_error': standard_error,
+            'max_relative_error': max(errors, default=0.0),
+            'mean_relative_error': sum(errors) / len(errors) if errors else 0.0,
+            'within_3_sigma': sum(error <= 3 * standard_error for error in errors) / len(errors) if errors else 1.0
+        }
+        
+        print(f"\n📊 RESULTADOS:")
+        for mode, stats in results['modes'].items():
+            memory = (f"sketches {stats['sketch_bytes'] / 1024**2:.1f} MB" if 'sketch_bytes' in stats else
+                      f"acumuladores máx. {(stats['max_accumulator_bytes'] or 0) / 1024**2:.1f} MB, "
+                      f"disco {'sí' if stats['used_disk'] else 'no'}")
+            print(f"  • {mode:10s}: {stats['seconds']:.3f}s, {stats['products']:,} productos, {memory}")
+        print(f"  • $group escalonado = $addToSet: {'✅' if same_exact else '❌'}")
+        print(f"  • HyperLogLog (p={precision}): error estándar {standard_error:.2%}, "
+              f"máx. {results['hll']['max_relative_error']:.2%}, medio {results['hll']['mean_relative_error']:.3%}, "
+              f"{results['hll']['within_3_sigma']:.1%} dentro de 3σ")
+    finally:
+        if not keep:
+            client.drop_database(target_name)
+        client.close()
+    
+    for stats in results['modes'].values():
+        stats.pop('counts')
+    return results
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Benchmark del conteo de distintos de la consulta 15 con órdenes escaladas')
+    parser.add_argument('--mongodb-uri', default=DEFAULT_MONGODB_URI)
+    parser.add_argument('--scale', type=int, default=10, help='Veces que se replican las órdenes del trimestre')
+    parser.add_argument('--repeat', type=int, default=3, help='Repeticiones por modo (se toma el mejor tiempo)')
+    parser.add_argument('--precision', type=int, default=12, help='Precisión de HyperLogLog (2^p registros)')
+    parser.add_argument('--keep', action='store_true', help='Conservar la base de benchmark al terminar')
+    args = parser.parse_args()
+    
+    run_benchmark(args.mongodb_uri, args.scale, args.repeat, args.precision, args.keep)
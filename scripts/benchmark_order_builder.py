@@ -0,0 +1,218 @@
+#!/usr/bin/env python3
+"""
+Benchmark del Ensamblado de Documentos de Órdenes
+Dataset: Brazilian E-Commerce (datos procesados)
+Compara órdenes/seg del recorrido con iterrows (anterior) vs el ensamblador columnar
+"""
+
+import pandas as pd
+import numpy as np
+import argparse
+import time
+from mongodb_data_loader import MongoDBDataLoader
+from order_document_builder import OrderDocumentBuilder
+from city_keys import city_key
+import warnings
+warnings.filterwarnings('ignore')
+
+def build_orders_iterrows(loader, orders_df, items_df, payments_df, reviews_df):
+    """Implementación anterior de load_orders_collection (iterrows + clean_for_mongodb por fila)"""
+    items_dict = {}
+    for _, item in items_df.iterrows():
+        items_dict.setdefault(item['order_id'], []).append(item.to_dict())
+    
+    payments_dict = {}
+    for _, payment in payments_df.iterrows():
+        payments_dict.setdefault(payment['order_id'], []).append(payment.to_dict())
+    
+    reviews_dict = {}
+    for _, review in reviews_df.iterrows():
+        if review['order_id'] not in reviews_dict:
+            reviews_dict[review['order_id']] = review.to_dict()
+    
+    def to_date(value):
+        return pd.to_datetime(value) if pd.notna(value) else None
+    
+    documents = []
+    for _, order in orders_df.iterrows():
+        order_id = order['order_id']
+        order_items = items_dict.get(order_id, [])
+        order_payments = payments_dict.get(order_id, [])
+        order_review = reviews_dict.get(order_id, None)
+        
+        doc = {
+            'order_id': order_id,
+            'customer': {
+                'customer_id': order['customer_id'],
+                'customer_city': order['customer_city_normalized'],
+                'city_key': city_key(order['customer_city_normalized']),
+                'customer_state': order['customer_state_normalized'],
+                'customer_region': order['customer_region']
+            },
+            'order_info': {
+                'order_status': order['order_status'],
+                'delivery_status': order['delivery_status'],
+                'order_purchase_timestamp': pd.to_datetime(order['order_purchase_timestamp']),
+                'order_approved_at': to_date(order['order_approved_at']),
+                'order_delivered_carrier_date': to_date(order['order_delivered_carrier_date']),
+                'order_delivered_customer_date': to_date(order['order_delivered_customer_date']),
+                'order_estimated_delivery_date': to_date(order['order_estimated_delivery_date']),
+                'delivery_time_days': order['delivery_time_days']
+            },
+            'time_dimensions': {
+                'order_year': order['order_year'],
+                'order_month': order['order_month'],
+                'order_day': order['order_day'],
+                'order_weekday': order['order_weekday'],
+                'order_quarter': order['order_quarter']
+            },
+            'items': [],
+            'payments': [],
+            'review': {},
+            'order_summary': {
+                'total_items': len(order_items),
+                'total_value': sum(item['total_item_value'] for item in order_items) if order_items else 0,
+                'total_freight': sum(item['freight_value'] for item in order_items) if order_items else 0,
+                'payment_methods_count': len(order_payments),
+                'average_review_score': order_review['review_score'] if order_review else None
+            }
+        }
+        
+        for item in order_items:
+            doc['items'].append(loader.clean_for_mongodb({
+                'order_item_id': item['order_item_id'],
+                'product_id': item['product_id'],
+                'seller_id': item['seller_id'],
+                'product_info': {
+                    'product_category_name': item['product_category_name'],
+                    'product_category_name_normalized': item['product_category_name_normalized'],
+                    'weight_category': item['weight_category'],
+                    'size_category': item['size_category']
+                },
+                'price': item['price'],
+                'freight_value': item['freight_value'],
+                'total_item_value': item['total_item_value'],
+                'freight_percentage': item['freight_percentage'],
+                'value_category': item['value_category'],
+                'freight_category': item['freight_category'],
+                'shipping_limit_date': to_date(item['shipping_limit_date'])
+            }))
+        
+        for payment in order_payments:
+            doc['payments'].append(loader.clean_for_mongodb({
+                'payment_sequential': payment['payment_sequential'],
+                'payment_type': payment['payment_type'],
+                'payment_type_normalized': payment['payment_type_normalized'],
+                'payment_installments': payment['payment_installments'],
+                'payment_value': payment['payment_value'],
+                'payment_value_category': payment['payment_value_category'],
+                'installments_category': payment['installments_category']
+            }))
+        
+        if order_review is not None:
+            doc['review'] = {
+                'review_id': order_review['review_id'],
+                'review_score': order_review['review_score'],
+                'review_score_category': order_review['review_score_category'],
+                'review_comment_title': order_review['review_comment_title'],
+                'review_comment_message': order_review['review_comment_message'],
+                'review_creation_date': to_date(order_review['review_creation_date']),
+                'review_answer_timestamp': to_date(order_review['review_answer_timestamp']),
+                'has_comment_title': order_review['has_comment_title'],
+                'has_comment_message': order_review['has_comment_message'],
+                'response_time_hours': order_review['response_time_hours']
+            }
+        
+        documents.append(loader.clean_for_mongodb(doc))
+    
+    return documents
+
+def normalize_document(obj):
+    """Normalizar un documento para comparar ambas implementaciones"""
+    if isinstance(obj, dict):
+        return {k: normalize_document(v) for k, v in obj.items() if k not in ('created_at', 'updated_at')}
+    elif isinstance(obj, list):
+        return [normalize_document(item) for item in obj]
+    elif isinstance(obj, pd.Timestamp):
+        return obj.to_pydatetime()
+    elif isinstance(obj, (bool, np.bool_)):
+        return bool(obj)
+    elif isinstance(obj, (int, float)) and not isinstance(obj, bool):
+        return round(float(obj), 6)
+    else:
+        return obj
+
+def run_benchmark(processed_data_path='data/processed', limit=10000):
+    """Ejecutar benchmark y verificar que ambas implementaciones producen los mismos documentos"""
+    print("🎯 BENCHMARK: ENSAMBLADO DE DOCUMENTOS ORDERS")
+    print("="*80)
+    
+    loader = MongoDBDataLoader(processed_data_path=processed_data_path)
+    loader.load_processed_datasets()
+    
+    required = ['orders_with_customers', 'items_with_products', 'payments', 'reviews']
+    if not all(key in loader.datasets for key in required):
+        print(f"❌ Faltan datasets procesados en {processed_data_path}: ejecutar primero etl_processing.py")
+        return None
+    
+    orders_df = loader.datasets['orders_with_customers']
+    items_df = loader.datasets['items_with_products']
+    payments_df = loader.datasets['payments']
+    reviews_df = loader.datasets['reviews']
+    
+    # Subconjunto para la implementación anterior (iterrows es muy lento sobre todo el dataset)
+    sample_orders = orders_df.head(limit) if limit else orders_df
+    sample_ids = set(sample_orders['order_id'])
+    sample_items = items_df[items_df['order_id'].isin(sample_ids)]
+    sample_payments = payments_df[payments_df['order_id'].isin(sample_ids)]
+    sample_reviews = reviews_df[reviews_df['order_id'].isin(sample_ids)]
+    
+    print(f"\n⏱️ Implementación anterior (iterrows) sobre {len(sample_orders):,} órdenes...")
+    start = time.perf_counter()
+    legacy_docs = build_orders_iterrows(loader, sample_orders, sample_items, sample_payments, sample_reviews)
+    legacy_time = time.perf_counter() - start
+    legacy_rate = len(legacy_docs) / legacy_time
+    print(f"   {legacy_time:.2f}s ({legacy_rate:,.0f} órdenes/seg)")
+    
+    print(f"\n⏱️ Ensamblador columnar sobre las mismas {len(sample_orders):,} órdenes...")
+    start = time.perf_counter()
+    columnar_docs = OrderDocumentBuilder(sample_orders, sample_items, sample_payments, sample_reviews).build_documents()
+    columnar_time = time.perf_counter() - start
+    columnar_rate = len(columnar_docs) / columnar_time
+    print(f"   {columnar_time:.2f}s ({columnar_rate:,.0f} órdenes/seg)")
+    
+    print(f"\n⏱️ Ensamblador columnar sobre el dataset completo ({len(orders_df):,} órdenes)...")
+    start = time.perf_counter()
+    full_docs = OrderDocumentBuilder(orders_df, items_df, payments_df, reviews_df).build_documents()
+    full_time = time.perf_counter() - start
+    full_rate = len(full_docs) / full_time
+    print(f"   {full_time:.2f}s ({full_rate:,.0f} órdenes/seg)")
+    
+    # Verificar equivalencia documento a documento
+    mismatches = sum(
+        1 for legacy, columnar in zip(legacy_docs, columnar_docs)
+        if normalize_document(legacy) != normalize_document(columnar)
+    )
+    
+    print(f"\n📊 RESULTADOS:")
+    print(f"  • Anterior (iterrows): {legacy_rate:,.0f} órdenes/seg")
+    print(f"  • Columnar: {columnar_rate:,.0f} órdenes/seg")
+    print(f"  • Aceleración: {columnar_rate / legacy_rate:.1f}x")
+    print(f"  • Documentos distintos: {mismatches:,} de {len(legacy_docs):,}")
+    
+    return {
+        'orders_sampled': len(sample_orders),
+        'legacy_orders_per_sec': legacy_rate,
+        'columnar_orders_per_sec': columnar_rate,
+        'full_dataset_orders_per_sec': full_rate,
+        'speedup': columnar_rate / legacy_rate,
+        'mismatched_documents': mismatches
+    }
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Benchmark del ensamblado de documentos de orders')
+    parser.add_argument('--processed-data-path', default='data/processed')
+    parser.add_argument('--limit', type=int, default=10000, help='Órdenes para comparar con iterrows (0 = todas)')
+    args = parser.parse_args()
+    
+    run_benchmark(args.processed_data_path, args.limit)
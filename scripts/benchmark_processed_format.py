@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+Benchmark del Formato de Datasets Procesados
+Dataset: Brazilian E-Commerce (datos procesados)
+Compara CSV vs Parquet: tamaño, escritura, lectura completa/proyectada y arranque del loader
+"""
+
+import pandas as pd
+import argparse
+import tempfile
+from pathlib import Path
+from order_document_builder import OrderDocumentBuilder
+from processed_storage import (
+    PYARROW_AVAILABLE, list_processed_files, read_processed_frame, save_processed_frame
+)
+from benchmark_common import timed
+import warnings
+warnings.filterwarnings('ignore')
+
+def typed_columns(df):
+    """Columnas con tipo conservado (fechas y categorías)"""
+    return sum(
+        1 for dtype in df.dtypes
+        if pd.api.types.is_datetime64_any_dtype(dtype) or isinstance(dtype, pd.CategoricalDtype)
+    )
+
+def run_benchmark(processed_data_path='data/processed', repeat=3):
+    """Escribir cada dataset en ambos formatos y medir lecturas y arranque del ensamblador"""
+    print("🎯 BENCHMARK: CSV vs PARQUET (DATASETS PROCESADOS)")
+    print("="*80)
+    
+    if not PYARROW_AVAILABLE:
+        print("❌ pyarrow no está instalado: pip install pyarrow")
+        return None
+    
+    processed_files = list_processed_files(processed_data_path)
+    if not processed_files:
+        print(f"❌ Sin datasets procesados en {processed_data_path}: ejecutar primero etl_processing.py")
+        return None
+    
+    required_columns = OrderDocumentBuilder.required_columns()
+    results = {'datasets': {}}
+    
+    with tempfile.TemporaryDirectory() as temp_dir:
+        paths = {'csv': Path(temp_dir) / 'csv', 'parquet': Path(temp_dir) / 'parquet'}
+        for path in paths.values():
+            path.mkdir()
+        
+        for name, file_path in processed_files.items():
+            df = read_processed_frame(file_path)
+            print(f"\n📁 {name} ({len(df):,} filas, {len(df.columns)} columnas)")
+            
+            dataset_result = {}
+            for file_format, directory in paths.items():
+                write_time, output_path = timed(lambda: save_processed_frame(df, directory, name, file_format), 1)
+                read_time, read_df = timed(lambda: read_processed_frame(output_path), repeat)
+                
+                columns = required_columns.get(name)
+                projected_time = None
+                if columns:
+                    projected_time, _ = timed(lambda: read_processed_frame(output_path, columns=columns), repeat)
+                
+                dataset_result[file_format] = {
+                    'size_mb': output_path.stat().st_size / 1024**2,
+                    'write_seconds': write_time,
+                    'read_seconds': read_time,
+                    'projected_read_seconds': projected_time,
+                    'typed_columns': typed_columns(read_df)
+                }
+                
+                stats = dataset_result[file_format]
+                projected = f", proyectada {projected_time:.3f}s" if projected_time is not None else ""
+                print(f"  • {file_format:7s}: {stats['size_mb']:.2f} MB, escritura {write_time:.3f}s, "
+                      f"lectura {read_time:.3f}s{projected}, columnas tipadas {stats['typed_columns']}")
+            
+            results['datasets'][name] = dataset_result
+        
+        # Arranque del loader: lectura proyectada + conversión de fechas del ensamblador
+        if all(name in processed_files for name in required_columns):
+            print(f"\n⏱️ Arranque del ensamblador de orders (lectura + prepare)...")
+            for file_format, directory in paths.items():
+                def startup():
+                    frames = [
+                        read_processed_frame(directory / f"{name}.{file_format}", columns=columns)
+                        for name, columns in required_columns.items()
+                    ]
+                    return OrderDocumentBuilder(*frames).prepare()
+                
+                startup_time, _ = timed(startup, repeat)
+                results[f'{file_format}_builder_startup_seconds'] = startup_time
+                print(f"  • {file_format:7s}: {startup_time:.3f}s")
+    
+    total = {
+        file_format: sum(dataset[file_format]['read_seconds'] for dataset in results['datasets'].values())
+        for file_format in ('csv', 'parquet')
+    }
+    
+    print(f"\n📊 RESULTADOS:")
+    print(f"  • Lectura total CSV: {total['csv']:.3f}s")
+    print(f"  • Lectura total Parquet: {total['parquet']:.3f}s")
+    print(f"  • Aceleración lectura: {total['csv'] / total['parquet']:.1f}x")
+    if 'csv_builder_startup_seconds' in results:
+        print(f"  • Aceleración arranque del ensamblador: "
+              f"{results['csv_builder_startup_seconds'] / results['parquet_builder_startup_seconds']:.1f}x")
+    
+    results['total_read_seconds'] = total
+    return results
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Benchmark CSV vs Parquet de los datasets procesados')
+    parser.add_argument('--processed-data-path', default='data/processed')
+    parser.add_argument('--repeat', type=int, default=3, help='Repeticiones por lectura (se toma el mejor tiempo)')
+    args = parser.parse_args()
+    
+    run_benchmark(args.processed_data_path, args.repeat)
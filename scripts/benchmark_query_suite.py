@@ -0,0 +1,196 @@
+#!/usr/bin/env python3
+"""
+Benchmark Escalado de las 15 Consultas CRUD (1x / 10x / 100x)
+Dataset: Brazilian E-Commerce (MongoDB)
+Latencias p50/p95/p99 con calentamiento, documentos examinados (explain) y memoria por consulta,
+guardados en JSON ordenado para comparar cambios de índices o de esquema con un diff
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import time
+import tracemalloc
+from datetime import datetime
+from pathlib import Path
+import numpy as np
+from mongodb_connection import create_mongo_client, DEFAULT_MONGODB_URI
+from crud_consultas_mongodb_part3 import MongoDBCRUDQueriesPart3
+from explain_harness import QUERY_METHODS, OperationLog, RecordingDatabase, explain_operations
+from benchmark_common import build_scaled_database
+import warnings
+warnings.filterwarnings('ignore')
+
+DEFAULT_OUTPUT = 'data/processed/query_benchmark.json'
+
+def latency_stats(latencies):
+    """Percentiles de latencia en milisegundos"""
+    values = np.array(latencies) * 1000
+    p50, p95, p99 = np.percentile(values, [50, 95, 99])
+    return {
+        'runs': len(values),
+        'p50_ms': round(float(p50), 3),
+        'p95_ms': round(float(p95), 3),
+        'p99_ms': round(float(p99), 3),
+        'mean_ms': round(float(values.mean()), 3),
+        'max_ms': round(float(values.max()), 3)
+    }
+
+def benchmark_query(crud, method, runs, warmup, log, query):
+    """Calentamiento, runs ejecuciones medidas, una con tracemalloc y una registrando sus lecturas"""
+    function = getattr(crud, method)
+    output = io.StringIO()
+    latencies = []
+    with contextlib.redirect_stdout(output):
+        for _ in range(warmup):
+            function()
+            output.seek(0)
+            output.truncate()
+        for _ in range(runs):
+            start_time = time.perf_counter()
+            function()
+            latencies.append(time.perf_counter() - start_time)
+            output.seek(0)
+            output.truncate()
+        
+        tracemalloc.start()
+        try:
+            function()
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        output.seek(0)
+        output.truncate()
+        
+        # Sin enrutado durante el registro: las lecturas se explican en el primario
+        router, db = crud.router, crud.db
+        crud.router, crud.db = None, RecordingDatabase(db, log)
+        log.current = query
+        try:
+            function()
+        finally:
+            log.current = None
+            crud.router, crud.db = router, db
+    
+    return {**latency_stats(latencies), 'client_peak_mb': round(peak / 1024**2, 3)}
+
+def read_stats(plans, query):
+    """Totales de explain de las lecturas de una consulta"""
+    reads = [plan for key, plan in plans.items() if key.split('/')[0] == query and 'error' not in plan]
+    accumulators = [plan['max_accumulator_bytes'] for plan in reads if plan.get('max_accumulator_bytes') is not None]
+    return {
+        'reads': len(reads),
+        'docs_examined': sum(plan['docs_examined'] for plan in reads),
+        'keys_examined': sum(plan['keys_examined'] for plan in reads),
+        'collscans': sorted({collscan for plan in reads for collscan in plan['collscans']}),
+        'server_group_memory_mb': round(max(accumulators) / 1024**2, 3) if accumulators else None,
+        'used_disk': any(plan.get('used_disk') for plan in reads)
+    }
+
+def benchmark_scale(mongodb_uri, database_name, runs, warmup, queries=None, use_replicas=False):
+    """Todas las consultas seleccionadas sobre una base (sin caché y con mutaciones en dry-run)"""
+    results = {}
+    for query_class, methods in QUERY_METHODS:
+        selected = [method for method in methods if queries is None or method.split('_')[1] in queries]
+        if not selected:
+            continue
+        
+        options = {'use_cache': False, 'use_replicas': use_replicas, 'database_name': database_name}
+        if query_class is not MongoDBCRUDQueriesPart3:
+            options['dry_run'] = True
+        crud = query_class(mongodb_uri, **options)
+        with contextlib.redirect_stdout(io.StringIO()):
+            crud.connect_to_mongodb()
+        
+        log = OperationLog()
+        base_db = crud.db
+        try:
+            for method in selected:
+                query = f"query_{method.split('_')[1]}"
+                print(f"  ⏱️ {query}...", end=' ', flush=True)
+                try:
+                    results[query] = benchmark_query(crud, method, runs, warmup, log, query)
+                    print(f"p50 {results[query]['p50_ms']:,.1f} ms")
+                except Exception as e:
+                    results[query] = {'error': f"{type(e).__name__}: {e}"}
+                    print(f"❌ {results[query]['error']}")
+            
+            plans = explain_operations(base_db, log)
+            for query, stats in results.items():
+                if query in log.operations and 'error' not in stats:
+                    stats.update(read_stats(plans, query))
+        finally:
+            if crud.router:
+                crud.router.close()
+            if crud.client:
+                crud.client.close()
+    return results
+
+def print_results(results):
+    """Tabla por escala y crecimiento de p50 respecto a 1x"""
+    base = results.get('1', {})
+    for scale, queries in results.items():
+        print(f"\n📊 ESCALA x{scale}:")
+        print(f"  {'consulta':10s} {'p50 ms':>10s} {'p95 ms':>10s} {'p99 ms':>10s} {'docs exam.':>12s} "
+              f"{'cliente MB':>10s} {'$group MB':>10s}")
+        for query, stats in queries.items():
+            if 'error' in stats:
+                print(f"  {query:10s} ❌ {stats['error']}")
+                continue
+            growth = ''
+            if scale != '1' and base.get(query, {}).get('p50_ms'):
+                growth = f"  (x{stats['p50_ms'] / base[query]['p50_ms']:.1f} vs 1x)"
+            group_mb = stats.get('server_group_memory_mb')
+            print(f"  {query:10s} {stats['p50_ms']:10,.1f} {stats['p95_ms']:10,.1f} {stats['p99_ms']:10,.1f} "
+                  f"{stats.get('docs_examined', 0):12,} {stats['client_peak_mb']:10,.1f} "
+                  f"{'-' if group_mb is None else f'{group_mb:,.1f}':>10s}{growth}")
+
+def run_benchmark(mongodb_uri=DEFAULT_MONGODB_URI, scales=(1, 10, 100), runs=20, warmup=3, queries=None,
+                  use_replicas=False, rebuild=False, drop_scaled=False, output=DEFAULT_OUTPUT):
+    """Construir (o reutilizar) cada escala, medir las consultas y escribir el JSON de resultados"""
+    print("🎯 BENCHMARK ESCALADO: CONSULTAS CRUD 1-15")
+    print("="*80)
+    
+    client = create_mongo_client(mongodb_uri)
+    results = {}
+    try:
+        for scale in scales:
+            db = build_scaled_database(client, scale, rebuild=rebuild)
+            print(f"\n🚀 x{scale} ({db.name}: {db.orders.estimated_document_count():,} órdenes), "
+                  f"{warmup} calentamientos + {runs} ejecuciones por consulta")
+            results[str(scale)] = benchmark_scale(mongodb_uri, db.name, runs, warmup, queries, use_replicas)
+            if drop_scaled and scale != 1:
+                client.drop_database(db.name)
+    finally:
+        client.close()
+    
+    print_results(results)
+    
+    # JSON ordenado y con valores redondeados: los cambios se leen con git diff
+    Path(output).parent.mkdir(parents=True, exist_ok=True)
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump({
+            'execution_date': datetime.now().isoformat(),
+            'settings': {'runs': runs, 'warmup': warmup, 'use_replicas': use_replicas},
+            'scales': results
+        }, f, indent=2, ensure_ascii=False, sort_keys=True)
+        f.write('\n')
+    print(f"\n📋 Resultados guardados en: {output}")
+    return results
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Benchmark de las 15 consultas CRUD con datos escalados')
+    parser.add_argument('--mongodb-uri', default=DEFAULT_MONGODB_URI)
+    parser.add_argument('--scales', type=int, nargs='+', default=[1, 10, 100], help='Factores de escala de orders/customers')
+    parser.add_argument('--runs', type=int, default=20, help='Ejecuciones medidas por consulta')
+    parser.add_argument('--warmup', type=int, default=3, help='Ejecuciones de calentamiento por consulta')
+    parser.add_argument('--queries', nargs='+', help='Números de consulta a medir (por defecto todas)')
+    parser.add_argument('--use-replicas', action='store_true', help='Enrutar las lecturas por el replica set rs0')
+    parser.add_argument('--rebuild', action='store_true', help='Reconstruir las bases escaladas aunque existan')
+    parser.add_argument('--drop-scaled', action='store_true', help='Eliminar las bases escaladas al terminar cada escala')
+    parser.add_argument('--output', default=DEFAULT_OUTPUT)
+    args = parser.parse_args()
+    
+    run_benchmark(args.mongodb_uri, args.scales, args.runs, args.warmup, args.queries,
+                  args.use_replicas, args.rebuild, args.drop_scaled, args.output)
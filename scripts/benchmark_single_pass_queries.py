@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+"""
+Comparación de las Consultas 4, 9 y 10: Dos Fases vs Una Sola Pasada
+Dataset: Brazilian E-Commerce (MongoDB)
+Implementación anterior (promedio + segundo recorrido / filtro en Python) frente a $setWindowFields
+"""
+
+import argparse
+from datetime import datetime
+from mongodb_connection import create_mongo_client, DEFAULT_MONGODB_URI, DATABASE_NAME
+from city_keys import city_filter
+from single_pass_pipelines import query_4_pipeline, query_9_pipeline, query_10_pipeline
+from benchmark_common import timed
+import warnings
+warnings.filterwarnings('ignore')
+
+def legacy_query_4(db, ciudad, prefijo=False):
+    """Anterior: promedio general de items en una agregación y filtro de la ciudad en otra"""
+    resultado_promedio = list(db.orders.aggregate([
+        {"$unwind": "$items"},
+        {"$group": {"_id": None, "precio_promedio": {"$avg": "$items.price"}}}
+    ]))
+    precio_promedio = resultado_promedio[0]['precio_promedio'] if resultado_promedio else 0
+    
+    result = list(db.orders.aggregate([
+        {"$match": city_filter(ciudad, prefix=prefijo)},
+        {"$unwind": "$items"},
+        {"$match": {"items.price": {"$gt": precio_promedio}}},
+        {"$group": {
+            "_id": {
+                "product_id": "$items.product_id",
+                "product_category": "$items.product_info.product_category_name_normalized"
+            },
+            "precio_promedio_producto": {"$avg": "$items.price"},
+            "total_vendido": {"$sum": "$items.total_item_value"},
+            "cantidad_ordenes": {"$sum": 1}
+        }},
+        {"$sort": {"precio_promedio_producto": -1}}
+    ]))
+    return {'aggregations': 2, 'documents_returned': len(result) + len(resultado_promedio), 'result': result}
+
+def legacy_query_9(db, ciudad, fecha_inicio, fecha_fin, prefijo=False):
+    """Anterior: promedio de la ciudad en una agregación y ventas bajo ese promedio en otra"""
+    period = {"order_info.order_purchase_timestamp": {"$gte": fecha_inicio, "$lte": fecha_fin}}
+    resultado_promedio = list(db.orders.aggregate([
+        {"$match": {"$and": [period, city_filter(ciudad, prefix=prefijo)]}},
+        {"$group": {"_id": None, "precio_promedio": {"$avg": "$order_summary.total_value"}}}
+    ]))
+    if not resultado_promedio:
+        return {'aggregations': 1, 'documents_returned': 0, 'result': []}
+    
+    result = list(db.orders.aggregate([
+        {"$match": {"$and": [
+            period,
+            city_filter(ciudad, prefix=prefijo),
+            {"order_summary.total_value": {"$lt": resultado_promedio[0]['precio_promedio']}}
+        ]}},
+        {"$project": {
+            "order_id": 1,
+            "customer.customer_city": 1,
+            "order_summary.total_value": 1,
+            "order_info.order_purchase_timestamp": 1
+        }},
+        {"$sort": {"order_summary.total_value": 1}}
+    ]))
+    return {'aggregations': 2, 'documents_returned': len(result) + 1, 'result': result}
+
+def legacy_query_10(db, fecha_inicio, fecha_fin, valor_minimo):
+    """Anterior: todos los clientes del período viajan al cliente y el umbral se filtra en Python"""
+    todos_clientes = list(db.orders.aggregate([
+        {"$match": {"order_info.order_purchase_timestamp": {"$gte": fecha_inicio, "$lte": fecha_fin}}},
+        {"$group": {
+            "_id": "$customer.customer_id",
+            "total_gastado": {"$sum": "$order_summary.total_value"},
+            "total_ordenes": {"$sum": 1},
+            "primera_compra": {"$min": "$order_info.order_purchase_timestamp"},
+            "ultima_compra": {"$max": "$order_info.order_purchase_timestamp"},
+            "ciudad": {"$first": "$customer.customer_city"},
+            "estado": {"$first": "$customer.customer_state"}
+        }},
+        {"$sort": {"total_gastado": 1}}
+    ]))
+    result = [c for c in todos_clientes if c['total_gastado'] < valor_minimo]
+    return {'aggregations': 1, 'documents_returned': len(todos_clientes), 'result': result}
+
+def single_pass(db, pipeline):
+    """Nueva implementación: una agregación que ya devuelve solo las filas filtradas"""
+    result = list(db.orders.aggregate(pipeline))
+    return {'aggregations': 1, 'documents_returned': len(result), 'result': result}
+
+def result_signature(query_name, result):
+    """Contenido comparable del resultado (sin campos añadidos por la ventana ni orden de empates)"""
+    if query_name == 'query_4':
+        return {
+            (doc['_id']['product_id'], doc['_id']['product_category']):
+                (round(doc['precio_promedio_producto'], 6), round(doc['total_vendido'], 6), doc['cantidad_ordenes'])
+            for doc in result
+        }
+    if query_name == 'query_9':
+        return {doc['order_id']: round(doc['order_summary']['total_value'], 6) for doc in result}
+    return {doc['_id']: (round(doc['total_gastado'], 6), doc['total_ordenes']) for doc in result}
+
+def run_comparison(mongodb_uri=DEFAULT_MONGODB_URI, repeat=3, ciudad_q4='sao paulo', ciudad_q9='rio de janeiro', valor_minimo=100):
+    """Ejecutar ambas versiones de cada consulta, comparar resultados y tiempos"""
+    print("🎯 COMPARACIÓN: CONSULTAS 4, 9 Y 10 (DOS FASES vs UNA SOLA PASADA)")
+    print("="*80)
+    
+    client = create_mongo_client(mongodb_uri)
+    db = client[DATABASE_NAME]
+    trimestre = (datetime(2018, 6, 1), datetime(2018, 8, 31))
+    anio = (datetime(2017, 9, 1), datetime(2018, 8, 31))
+    
+    queries = {
+        'query_4': (
+            lambda: legacy_query_4(db, ciudad_q4),
+            lambda: single_pass(db, query_4_pipeline(ciudad_q4))
+        ),
+        'query_9': (
+            lambda: legacy_query_9(db, ciudad_q9, *trimestre),
+            lambda: single_pass(db, query_9_pipeline(ciudad_q9, *trimestre))
+        ),
+        'query_10': (
+            lambda: legacy_query_10(db, *anio, valor_minimo),
+            lambda: single_pass(db, query_10_pipeline(*anio, valor_minimo))
+        )
+    }
+    
+    results = {}
+    try:
+        for query_name, (legacy, new) in queries.items():
+            legacy_time, legacy_run = timed(legacy, repeat)
+            new_time, new_run = timed(new, repeat)
+            same = result_signature(query_name, legacy_run['result']) == result_signature(query_name, new_run['result'])
+            
+            results[query_name] = {
+                'legacy_seconds': legacy_time,
+                'single_pass_seconds': new_time,
+                'speedup': legacy_time / new_time if new_time else None,
+                'legacy_aggregations': legacy_run['aggregations'],
+                'legacy_documents_returned': legacy_run['documents_returned'],
+                'single_pass_documents_returned': new_run['documents_returned'],
+                'rows': len(new_run['result']),
+                'same_result': same
+            }
+            
+            stats = results[query_name]
+            print(f"\n📊 {query_name.upper()}: {stats['rows']:,} filas {'✅ mismo resultado' if same else '❌ resultados distintos'}")
+            print(f"  • Dos fases: {legacy_time:.3f}s ({stats['legacy_aggregations']} agregaciones, "
+                  f"{stats['legacy_documents_returned']:,} documentos recibidos)")
+            print(f"  • Una pasada: {new_time:.3f}s (1 agregación, {stats['single_pass_documents_returned']:,} documentos recibidos)")
+            print(f"  • Aceleración: {stats['speedup']:.2f}x")
+    finally:
+        client.close()
+    
+    return results
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Comparar las consultas 4, 9 y 10 en dos fases y en una sola pasada')
+    parser.add_argument('--mongodb-uri', default=DEFAULT_MONGODB_URI)
+    parser.add_argument('--repeat', type=int, default=3, help='Repeticiones por versión (se toma el mejor tiempo)')
+    parser.add_argument('--valor-minimo', type=float, default=100, help='Umbral de la consulta 10')
+    args = parser.parse_args()
+    
+    run_comparison(args.mongodb_uri, args.repeat, valor_minimo=args.valor_minimo)
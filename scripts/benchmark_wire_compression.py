@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+"""
+Benchmark de Compresión de Red y Decodificación RawBSON
+Dataset: Brazilian E-Commerce (MongoDB)
+Bytes en la red (contadores network de serverStatus) y CPU del cliente por consulta, sin compresión
+y con cada compresor disponible; la consulta 1 también con RawBSONDocument (decodificación perezosa)
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import time
+from datetime import datetime
+from pathlib import Path
+import numpy as np
+from mongodb_connection import create_mongo_client, DEFAULT_MONGODB_URI, WIRE_COMPRESSORS
+from crud_consultas_mongodb import MongoDBCRUDQueries
+from crud_consultas_mongodb_part3 import MongoDBCRUDQueriesPart3
+from explain_harness import QUERY_METHODS
+import warnings
+warnings.filterwarnings('ignore')
+
+DEFAULT_OUTPUT = 'data/processed/wire_compression_benchmark.json'
+COUNTERS = ('bytes_out', 'bytes_in', 'logical_bytes_out')
+
+def network_counters(stats_client):
+    """Bytes físicos (tras compresión) y lógicos enviados/recibidos por el nodo"""
+    network = stats_client.admin.command('serverStatus')['network']
+    return {
+        'bytes_out': network.get('physicalBytesOut', network['bytesOut']),
+        'bytes_in': network.get('physicalBytesIn', network['bytesIn']),
+        'logical_bytes_out': network['bytesOut']
+    }
+
+def status_overhead(stats_client, samples=5):
+    """Bytes que añade la propia lectura de serverStatus (se restan de cada medida)"""
+    deltas = []
+    previous = network_counters(stats_client)
+    for _ in range(samples):
+        current = network_counters(stats_client)
+        deltas.append({key: current[key] - previous[key] for key in COUNTERS})
+        previous = current
+    return {key: float(np.median([delta[key] for delta in deltas])) for key in COUNTERS}
+
+def measure_query(function, stats_client, overhead, runs):
+    """Una ejecución de calentamiento y runs medidas: medianas de bytes, CPU del cliente y latencia"""
+    samples = []
+    output = io.StringIO()
+    with contextlib.redirect_stdout(output):
+        function()
+        for _ in range(runs):
+            output.seek(0)
+            output.truncate()
+            before = network_counters(stats_client)
+            cpu_start, wall_start = time.process_time(), time.perf_counter()
+            function()
+            cpu, wall = time.process_time() - cpu_start, time.perf_counter() - wall_start
+            after = network_counters(stats_client)
+            sample = {key: max(0.0, after[key] - before[key] - overhead[key]) for key in COUNTERS}
+            sample.update({'client_cpu_ms': cpu * 1000, 'wall_ms': wall * 1000})
+            samples.append(sample)
+    
+    stats = {key: float(np.median([sample[key] for sample in samples])) for key in samples[0]}
+    return {
+        'runs': runs,
+        'bytes_out': int(stats['bytes_out']),
+        'bytes_in': int(stats['bytes_in']),
+        'compression_ratio': round(stats['logical_bytes_out'] / stats['bytes_out'], 2) if stats['bytes_out'] else None,
+        'client_cpu_ms': round(stats['client_cpu_ms'], 3),
+        'wall_ms': round(stats['wall_ms'], 3)
+    }
+
+def benchmark_compressors(mongodb_uri, compressors, runs, stats_client, overhead, queries=None):
+    """Consultas seleccionadas con un cliente que negocia compressors (sin caché ni réplicas, mutaciones en dry-run)"""
+    results = {}
+    for query_class, methods in QUERY_METHODS:
+        selected = [method for method in methods if queries is None or method.split('_')[1] in queries]
+        if not selected:
+            continue
+        
+        options = {'use_cache': False, 'use_replicas': False, 'compressors': compressors}
+        if query_class is not MongoDBCRUDQueriesPart3:
+            options['dry_run'] = True
+        crud = query_class(mongodb_uri, **options)
+        with contextlib.redirect_stdout(io.StringIO()):
+            crud.connect_to_mongodb()
+        
+        try:
+            for method in selected:
+                query = f"query_{method.split('_')[1]}"
+                variants = [(query, False)]
+                if query_class is MongoDBCRUDQueries and query == 'query_1':
+                    variants.append(('query_1_raw_bson', True))
+                for name, raw_bson in variants:
+                    crud.raw_bson = raw_bson
+                    print(f"  📦 {name}...", end=' ', flush=True)
+                    try:
+                        results[name] = measure_query(getattr(crud, method), stats_client, overhead, runs)
+                        print(f"{results[name]['bytes_out'] / 1024:,.1f} KB, CPU {results[name]['client_cpu_ms']:,.1f} ms")
+                    except Exception as e:
+                        results[name] = {'error': f"{type(e).__name__}: {e}"}
+                        print(f"❌ {results[name]['error']}")
+        finally:
+            if crud.client:
+                crud.client.close()
+    return results
+
+def print_results(results):
+    """Bytes enviados y CPU del cliente por consulta y compresor, relativos a sin compresión"""
+    base = results.get('none', {})
+    queries = sorted({query for configuration in results.values() for query in configuration},
+                     key=lambda query: (int(query.split('_')[1]), query))
+    print(f"\n📊 BYTES EN LA RED Y CPU DEL CLIENTE:")
+    print(f"  {'consulta':18s} {'compresor':10s} {'KB enviados':>12s} {'vs none':>8s} {'ratio':>6s} {'CPU ms':>9s} {'ms':>9s}")
+    for query in queries:
+        for label, configuration in results.items():
+            stats = configuration.get(query)
+            if stats is None:
+                continue
+            if 'error' in stats:
+                print(f"  {query:18s} {label:10s} ❌ {stats['error']}")
+                continue
+            saved = '-'
+            if label != 'none' and base.get(query, {}).get('bytes_out'):
+                saved = f"{stats['bytes_out'] / base[query]['bytes_out'] * 100:.0f}%"
+            ratio = '-' if stats['compression_ratio'] is None else f"{stats['compression_ratio']:.1f}"
+            print(f"  {query:18s} {label:10s} {stats['bytes_out'] / 1024:12,.1f} {saved:>8s} {ratio:>6s} "
+                  f"{stats['client_cpu_ms']:9,.1f} {stats['wall_ms']:9,.1f}")
+
+def run_benchmark(mongodb_uri=DEFAULT_MONGODB_URI, compressors=None, runs=5, queries=None, output=DEFAULT_OUTPUT):
+    """Medir cada configuración de compresión (siempre también 'none') y escribir el JSON de resultados"""
+    compressors = [name for name in (compressors or WIRE_COMPRESSORS) if name != 'none']
+    print("🎯 BENCHMARK DE COMPRESIÓN DE RED: CONSULTAS CRUD 1-15")
+    print("="*80)
+    print(f"🗜️ Compresores: none, {', '.join(compressors) or '(ninguno disponible)'} ({runs} ejecuciones por consulta)")
+    
+    # Cliente sin compresión solo para leer los contadores del nodo
+    stats_client = create_mongo_client(mongodb_uri, compressors=())
+    results = {}
+    try:
+        overhead = status_overhead(stats_client)
+        for label in ['none'] + compressors:
+            print(f"\n🚀 {label}")
+            results[label] = benchmark_compressors(
+                mongodb_uri, () if label == 'none' else (label,), runs, stats_client, overhead, queries
+            )
+    finally:
+        stats_client.close()
+    
+    print_results(results)
+    
+    Path(output).parent.mkdir(parents=True, exist_ok=True)
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump({
+            'execution_date': datetime.now().isoformat(),
+            'settings': {'runs': runs, 'status_overhead_bytes': overhead},
+            'compressors': results
+        }, f, indent=2, ensure_ascii=False, sort_keys=True)
+        f.write('\n')
+    print(f"\n📋 Resultados guardados en: {output}")
+    return results
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Bytes en la red y CPU del cliente por consulta con y sin compresión')
+    parser.add_argument('--mongodb-uri', default=DEFAULT_MONGODB_URI)
+    parser.add_argument('--compressors', nargs='+', choices=['zstd', 'snappy', 'zlib'],
+                        help=f"Compresores a comparar con 'none' (por defecto los disponibles: {', '.join(WIRE_COMPRESSORS)})")
+    parser.add_argument('--runs', type=int, default=5, help='Ejecuciones medidas por consulta')
+    parser.add_argument('--queries', nargs='+', help='Números de consulta a medir (por defecto todas)')
+    parser.add_argument('--output', default=DEFAULT_OUTPUT)
+    args = parser.parse_args()
+    
+    run_benchmark(args.mongodb_uri, args.compressors, args.runs, args.queries, args.output)
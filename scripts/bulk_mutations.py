@@ -0,0 +1,205 @@
+#!/usr/bin/env python3
+"""
+Motor de Mutaciones Masivas por Lotes
+Dataset: Brazilian E-Commerce (MongoDB)
+Updates/deletes por rangos de _id con bulk_write, w: "majority" por lote y tamaño adaptado al lag de los secundarios
+"""
+
+import time
+from datetime import datetime
+from pymongo import UpdateMany, DeleteMany
+from pymongo.errors import PyMongoError
+from pymongo.write_concern import WriteConcern
+from mongodb_connection import METADATA_COLLECTION
+from query_cache import bump_data_version
+from replication_monitor import secondary_lags
+from sales_rollups import SalesRollups, ROLLUP_STATUS_ID, PURCHASE_TIMESTAMP
+
+def secondary_lag_seconds(client):
+    """Mayor retraso (optime) de los secundarios respecto al primario; 0 fuera de un replica set"""
+    try:
+        status = client.admin.command('replSetGetStatus')
+    except (PyMongoError, NotImplementedError):
+        return 0.0
+    return max(secondary_lags(status).values(), default=0.0)
+
+def _is_enumeration(clause):
+    """{campo: {'$in': [...]}}: el filtro enumera los documentos por un identificador"""
+    if len(clause) != 1:
+        return False
+    field, condition = next(iter(clause.items()))
+    return not field.startswith('$') and isinstance(condition, dict) and list(condition) == ['$in']
+
+class BulkMutationEngine:
+    """
+    Ejecuta un update/delete masivo como una secuencia de lotes acotados por rangos de _id:
+    - cada lote es un bulk_write confirmado con w: "majority" (no se adelanta a la replicación)
+    - tras cada lote se mide el lag de los secundarios: si supera target_lag_seconds el lote
+      se reduce a la mitad y se espera a que se recuperen; si va holgado, crece un 50%
+    - si el filtro enumera identificadores ({campo: {'$in': [...]}}) cada lote envía solo sus _id
+      en un $in (más los demás predicados), no la lista completa en cada comando
+    - en dry_run se planifican los mismos lotes sin escribir nada
+    """
+    
+    def __init__(self, db, dry_run=True, chunk_size=1000, min_chunk_size=100, max_chunk_size=20000,
+                 target_lag_seconds=2.0, max_wait_seconds=60, wtimeout_ms=30000, lag_probe=None,
+                 lag_monitor=None):
+        self.db = db
+        self.dry_run = dry_run
+        self.chunk_size = chunk_size
+        self.min_chunk_size = min_chunk_size
+        self.max_chunk_size = max_chunk_size
+        self.target_lag_seconds = target_lag_seconds
+        self.max_wait_seconds = max_wait_seconds
+        self.write_concern = WriteConcern(w='majority', wtimeout=wtimeout_ms)
+        # Con un ReplicationLagMonitor el lag sale de su serie (y los lotes quedan en su reporte)
+        self.lag_monitor = lag_monitor
+        if lag_monitor is not None:
+            lag_probe = lag_probe or lag_monitor.lag_probe
+        self.lag_probe = lag_probe or (lambda: secondary_lag_seconds(db.client))
+    
+    def update(self, collection_name, filter, update, array_filters=None, description=None):
+        """update_many por lotes (array_filters para actualizar solo los elementos items.$[elem])"""
+        return self._run(
+            collection_name, filter,
+            lambda chunk_filter: [UpdateMany(chunk_filter, update, array_filters=array_filters)],
+            description or f"update {collection_name}"
+        )
+    
+    def delete(self, collection_name, filter, description=None, chunk_guard=None):
+        """
+        delete_many por lotes; chunk_guard(collection, chunk_ids) devuelve los _id del lote que siguen
+        siendo borrables (comprobación contra otra colección justo antes de cada lote)
+        """
+        return self._run(
+            collection_name, filter,
+            lambda chunk_filter: [DeleteMany(chunk_filter)],
+            description or f"delete {collection_name}",
+            chunk_guard
+        )
+    
+    def _next_chunk(self, collection, filter, last_id):
+        """_id (ascendentes) del siguiente lote: retoma tras last_id sin mantener un cursor abierto"""
+        query = filter if last_id is None else {'$and': [filter, {'_id': {'$gt': last_id}}]}
+        return [doc['_id'] for doc in collection.find(query, {'_id': 1}).sort('_id', 1).limit(self.chunk_size)]
+    
+    @staticmethod
+    def _split_enumeration(filter):
+        """(predicados sin las listas $in de identificadores, True si había alguna)"""
+        clauses = filter['$and'] if list(filter) == ['$and'] else [filter]
+        residual = [clause for clause in clauses if not _is_enumeration(clause)]
+        return residual, len(residual) < len(clauses)
+    
+    @staticmethod
+    def _ids_filter(residual, ids):
+        """Lote por _id explícitos, manteniendo los predicados que deben seguir cumpliéndose al escribir"""
+        ids_clause = {'_id': {'$in': ids}}
+        return {'$and': residual + [ids_clause]} if residual else ids_clause
+    
+    @staticmethod
+    def _purchase_days(collection, chunk_filter):
+        """Días de compra de las órdenes del lote (para refrescar solo esos días de los rollups)"""
+        days = set()
+        for order in collection.find(chunk_filter, {'_id': 0, PURCHASE_TIMESTAMP: 1}):
+            timestamp = order.get('order_info', {}).get('order_purchase_timestamp')
+            if isinstance(timestamp, datetime):
+                days.add(datetime(timestamp.year, timestamp.month, timestamp.day))
+        return days
+    
+    def _adapt(self, lag_seconds):
+        """Ajustar el tamaño de lote al lag y esperar a los secundarios si van retrasados"""
+        waited = 0.0
+        if lag_seconds > self.target_lag_seconds:
+            self.chunk_size = max(self.min_chunk_size, self.chunk_size // 2)
+            start_wait = time.perf_counter()
+            while lag_seconds > self.target_lag_seconds and waited < self.max_wait_seconds:
+                time.sleep(min(1.0, lag_seconds))
+                lag_seconds = self.lag_probe()
+                waited = time.perf_counter() - start_wait
+        elif lag_seconds < self.target_lag_seconds / 2:
+            self.chunk_size = min(self.max_chunk_size, int(self.chunk_size * 1.5))
+        return waited
+    
+    def _run(self, collection_name, filter, make_operations, description, chunk_guard=None):
+        """Planificar y (salvo dry_run) ejecutar los lotes, con progreso y throughput"""
+        collection = self.db[collection_name]
+        majority = collection.with_options(write_concern=self.write_concern)
+        total = collection.count_documents(filter)
+        mode = "DRY-RUN" if self.dry_run else "EJECUCIÓN"
+        print(f"\n🧱 {mode} {description}: {total:,} documentos, lote inicial {self.chunk_size:,}")
+        
+        report = {
+            'description': description,
+            'collection': collection_name,
+            'dry_run': self.dry_run,
+            'documents_matched': total,
+            'documents_modified': 0,
+            'documents_deleted': 0,
+            'documents_skipped': 0,
+            'chunks': 0,
+            'chunk_size_min': None,
+            'chunk_size_max': None,
+            'max_lag_seconds': 0.0,
+            'throttle_wait_seconds': 0.0
+        }
+        # Los identificadores enumerados no cambian: los _id del lote (elegidos con el filtro completo)
+        # ya los cumplen, así que la lista $in entera no viaja en cada comando
+        residual, enumerated = self._split_enumeration(filter)
+        affected_days = set()
+        processed = 0
+        last_id = None
+        started_at = datetime.now()
+        start_time = time.perf_counter()
+        
+        while True:
+            chunk_ids = self._next_chunk(collection, filter, last_id)
+            if not chunk_ids:
+                break
+            last_id = chunk_ids[-1]
+            allowed = chunk_ids
+            if chunk_guard is not None:
+                # Solo los _id que superan la comprobación externa (también en dry-run, es de lectura)
+                allowed = chunk_guard(collection, chunk_ids)
+                report['documents_skipped'] += len(chunk_ids) - len(allowed)
+            if enumerated or chunk_guard is not None:
+                chunk_filter = self._ids_filter(residual, allowed)
+            else:
+                chunk_filter = {'$and': [filter, {'_id': {'$gte': chunk_ids[0], '$lte': last_id}}]}
+            report['chunks'] += 1
+            report['chunk_size_min'] = min(report['chunk_size_min'] or len(chunk_ids), len(chunk_ids))
+            report['chunk_size_max'] = max(report['chunk_size_max'] or 0, len(chunk_ids))
+            processed += len(chunk_ids)
+            
+            if not self.dry_run and allowed:
+                if collection_name == 'orders':
+                    affected_days |= self._purchase_days(collection, chunk_filter)
+                result = majority.bulk_write(make_operations(chunk_filter), ordered=False)
+                report['documents_modified'] += result.modified_count
+                report['documents_deleted'] += result.deleted_count
+                
+                lag_seconds = self.lag_probe()
+                report['max_lag_seconds'] = max(report['max_lag_seconds'], lag_seconds)
+                report['throttle_wait_seconds'] += self._adapt(lag_seconds)
+            
+            elapsed = time.perf_counter() - start_time
+            print(f"  [{processed:,}/{total:,}] lote {report['chunks']}: {len(chunk_ids):,} docs, "
+                  f"siguiente lote {self.chunk_size:,}, {processed / elapsed if elapsed else 0:,.0f} docs/s")
+        
+        elapsed = time.perf_counter() - start_time
+        report['seconds'] = elapsed
+        report['docs_per_second'] = processed / elapsed if elapsed else None
+        if self.lag_monitor is not None and not self.dry_run:
+            report['replication'] = self.lag_monitor.time_series(since=started_at)
+        
+        if not self.dry_run and (report['documents_modified'] or report['documents_deleted']):
+            # Rollups de los días tocados y nueva versión de datos (invalida la caché de consultas)
+            if affected_days and self.db[METADATA_COLLECTION].find_one({'_id': ROLLUP_STATUS_ID}):
+                SalesRollups(self.db).refresh(affected_days)
+            report['data_version'] = bump_data_version(self.db, source='bulk_mutation')
+        
+        print(f"✅ {description}: {processed:,} documentos en {report['chunks']} lotes, {elapsed:.2f}s "
+              f"({report['docs_per_second'] or 0:,.0f} docs/s), "
+              f"modificados {report['documents_modified']:,}, eliminados {report['documents_deleted']:,}, "
+              f"descartados {report['documents_skipped']:,}, "
+              f"lag máx. {report['max_lag_seconds']:.1f}s")
+        return report
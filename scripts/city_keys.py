@@ -0,0 +1,34 @@
+#!/usr/bin/env python3
+"""
+Clave Normalizada de Ciudad
+Dataset: Brazilian E-Commerce (clientes y vendedores)
+Minúsculas sin acentos ni espacios repetidos: búsquedas exactas o por prefijo sobre un índice
+"""
+
+import re
+import unicodedata
+import pandas as pd
+
+def city_key(value):
+    """'São  Paulo' -> 'sao paulo' (None si no hay ciudad)"""
+    if value is None or (not isinstance(value, str) and pd.isna(value)):
+        return None
+    
+    folded = unicodedata.normalize('NFKD', str(value))
+    folded = ''.join(char for char in folded if not unicodedata.combining(char))
+    return ' '.join(folded.lower().split()) or None
+
+def city_key_series(series):
+    """city_key de una columna, calculada una vez por ciudad distinta"""
+    mapping = {value: city_key(value) for value in series.dropna().unique()}
+    return series.map(mapping)
+
+def city_filter(ciudad, field='customer.city_key', prefix=False):
+    """
+    Filtro de ciudad que usa el índice de field: igualdad sobre la clave o, con prefix=True,
+    regex anclada y sensible a mayúsculas (el planificador la convierte en un rango del índice)
+    """
+    key = city_key(ciudad)
+    if prefix:
+        return {field: {'$regex': f"^{re.escape(key)}"}}
+    return {field: key}
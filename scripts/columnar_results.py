@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+Resultados de Agregación en Columnas (Consultas 11-13)
+Dataset: Brazilian E-Commerce (MongoDB)
+Cursores decodificados a columnas NumPy según un esquema declarado por consulta
+(pymongoarrow si está instalado), con resúmenes vectorizados en lugar de bucles sobre dicts
+"""
+
+import numpy as np
+import pandas as pd
+from pymongo.collection import Collection
+
+try:
+    import pyarrow as pa
+    PYARROW_AVAILABLE = True
+except ImportError:
+    PYARROW_AVAILABLE = False
+
+try:
+    from pymongoarrow.api import Schema, aggregate_arrow_all
+    PYMONGOARROW_AVAILABLE = PYARROW_AVAILABLE
+except ImportError:
+    PYMONGOARROW_AVAILABLE = False
+
+# Tipos del esquema -> dtype NumPy (los enteros con huecos quedan en float64 con NaN)
+NUMPY_TYPES = {'str': object, 'int': np.float64, 'float': np.float64, 'datetime': 'datetime64[ms]'}
+if PYARROW_AVAILABLE:
+    ARROW_TYPES = {'str': pa.string(), 'int': pa.int64(), 'float': pa.float64(), 'datetime': pa.timestamp('ms')}
+
+# Campos de salida de cada pipeline (los mismos sobre orders o sobre los rollups)
+QUERY_SCHEMAS = {
+    'query_11': {
+        'cliente_id': 'str', 'total_ventas': 'int', 'total_gastado': 'float', 'promedio_precio_por_venta': 'float',
+        'primera_compra': 'datetime', 'ultima_compra': 'datetime',
+        'ciudad': 'str', 'estado': 'str', 'region': 'str', 'categoria_cliente': 'str'
+    },
+    'query_12': {
+        'product_id': 'str', 'categoria': 'str', 'cantidad_vendida': 'int', 'total_ingresos': 'float',
+        'precio_promedio': 'float', 'freight_promedio': 'float', 'ordenes_distintas': 'int', 'ingreso_por_unidad': 'float'
+    },
+    'query_13': {
+        'ciudad': 'str', 'estado': 'str', 'region': 'str', 'total_ventas': 'int', 'total_ingresos': 'float',
+        'promedio_por_venta': 'float', 'clientes_unicos': 'int', 'total_items': 'int',
+        'promedio_items_por_venta': 'float', 'ventas_por_cliente': 'float'
+    }
+}
+
+def _column(values, kind):
+    """Lista de valores -> array del tipo declarado (None -> NaN/NaT)"""
+    return np.array(values, dtype=NUMPY_TYPES[kind])
+
+class ColumnarResult:
+    """Columnas de un resultado de agregación (una por campo del esquema) y su origen"""
+    
+    def __init__(self, columns, backend):
+        self.columns = columns
+        self.backend = backend
+    
+    @classmethod
+    def from_documents(cls, documents, schema, chunk_size=10000, backend='numpy'):
+        """Volcar un cursor (o lista) por bloques de chunk_size filas a arrays del esquema"""
+        chunks = {field: [] for field in schema}
+        rows = {field: [] for field in schema}
+        for count, document in enumerate(documents, 1):
+            for field, values in rows.items():
+                values.append(document.get(field))
+            if count % chunk_size == 0:
+                for field, kind in schema.items():
+                    chunks[field].append(_column(rows[field], kind))
+                    rows[field] = []
+        
+        columns = {}
+        for field, kind in schema.items():
+            column = np.concatenate(chunks[field] + [_column(rows[field], kind)])
+            if kind == 'int' and not np.isnan(column).any():
+                column = column.astype(np.int64)
+            columns[field] = column
+        return cls(columns, backend)
+    
+    @classmethod
+    def from_arrow(cls, table, schema):
+        """Tabla Arrow -> columnas NumPy (copia cero en numéricos sin nulos)"""
+        columns = {}
+        for field, kind in schema.items():
+            column = table.column(field)
+            if kind == 'int' and column.null_count:
+                column = column.cast(pa.float64())
+            columns[field] = column.to_numpy(zero_copy_only=False)
+        return cls(columns, 'arrow')
+    
+    def __len__(self):
+        return len(next(iter(self.columns.values()))) if self.columns else 0
+    
+    def __getitem__(self, field):
+        return self.columns[field]
+    
+    def records(self, stop=None):
+        """Primeras filas como dicts de escalares Python (para mostrar y guardar en JSON)"""
+        values = {field: column[:stop].tolist() for field, column in self.columns.items()}
+        return [dict(zip(values, row)) for row in zip(*values.values())]
+    
+    def group_by(self, key, count_name, sums):
+        """
+        Conteo y sumas por valor de key en orden de aparición (como el bucle de acumulación en dicts):
+        {valor: {count_name: n, nombre: suma de sums[nombre]}}
+        """
+        codes, keys = pd.factorize(self.columns[key], use_na_sentinel=False)
+        groups = {count_name: np.bincount(codes, minlength=len(keys)).tolist()}
+        for name, field in sums.items():
+            column = self.columns[field]
+            totals = np.bincount(codes, weights=column, minlength=len(keys))
+            groups[name] = (totals.astype(np.int64) if column.dtype.kind in 'iu' else totals).tolist()
+        return {
+            None if pd.isna(key_value) else key_value: {name: values[i] for name, values in groups.items()}
+            for i, key_value in enumerate(keys.tolist())
+        }
+    
+    def to_arrow(self):
+        """Tabla Arrow con las mismas columnas (requiere pyarrow)"""
+        return pa.table(self.columns)
+
+def aggregate_columns(collection, pipeline, schema, backend='auto'):
+    """
+    Ejecutar el pipeline y decodificar el cursor directamente a columnas: pymongoarrow (backend
+    'arrow' o 'auto' si está instalado y collection es una Collection de pymongo) o bloques NumPy
+    """
+    if backend != 'numpy' and PYMONGOARROW_AVAILABLE and isinstance(collection, Collection):
+        arrow_schema = Schema({field: ARROW_TYPES[kind] for field, kind in schema.items()})
+        return ColumnarResult.from_arrow(aggregate_arrow_all(collection, pipeline, schema=arrow_schema), schema)
+    return ColumnarResult.from_documents(collection.aggregate(pipeline, batchSize=10000), schema)
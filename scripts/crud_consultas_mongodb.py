@@ -5,20 +5,40 @@ Dataset: Brazilian E-Commerce (MongoDB)
 15 Consultas específicas del caso de estudio
 """
 
+import argparse
 import pandas as pd
 import numpy as np
-from pymongo import MongoClient
 from datetime import datetime, timedelta
 import json
 from pathlib import Path
+from query_cache import QueryResultCache
+from bson.raw_bson import RawBSONDocument
+from mongodb_connection import create_mongo_client, close_query_session, WIRE_COMPRESSORS, RAW_BSON_OPTIONS
+from replica_router import ReplicaRouter, routed
+from replication_monitor import ReplicationLagMonitor
+from bulk_mutations import BulkMutationEngine
+from single_pass_pipelines import query_4_pipeline
 import warnings
 warnings.filterwarnings('ignore')
 
 class MongoDBCRUDQueries:
-    def __init__(self, mongodb_uri='mongodb://localhost:27020/'):
+    def __init__(self, mongodb_uri='mongodb://localhost:27020/', use_cache=True, use_replicas=True, dry_run=True,
+                 database_name='brazilian_ecommerce', compressors=WIRE_COMPRESSORS, raw_bson=False):
         self.mongodb_uri = mongodb_uri
+        self.database_name = database_name
+        self.compressors = compressors
+        # Órdenes completas de la consulta 1 sin decodificar: solo se decodifican las que se muestran o guardan
+        self.raw_bson = raw_bson
+        self.use_cache = use_cache
+        self.use_replicas = use_replicas
+        self.dry_run = dry_run
         self.client = None
+        self.router = None
+        self.routing_report = None
+        self.lag_monitor = None
+        self.replication_report = None
         self.db = None
+        self.cache = None
         self.results = {}
         
     def connect_to_mongodb(self):
@@ -27,15 +47,18 @@ class MongoDBCRUDQueries:
         print("="*60)
         
         try:
-            self.client = MongoClient(
-                self.mongodb_uri,
-                directConnection=True,
-                serverSelectionTimeoutMS=5000
-            )
-            self.client.admin.command('ping')
+            if self.use_replicas:
+                # Lista semilla de rs0: cada consulta declara su clase (@routed) y se lee
+                # del miembro que le corresponde; fuera de una consulta se usa el primario
+                self.router = ReplicaRouter(database_name=self.database_name, compressors=self.compressors).connect()
+                self.db = self.router.database('transaccional')
+            else:
+                self.client = create_mongo_client(self.mongodb_uri, compressors=self.compressors)
+                self.client.admin.command('ping')
+                self.db = self.client[self.database_name]
             print("✅ Conexión exitosa a MongoDB")
             
-            self.db = self.client['brazilian_ecommerce']
+            self.cache = QueryResultCache(self.db) if self.use_cache else None
             print(f"📁 Base de datos: {self.db.name}")
             
             # Verificar colecciones
@@ -46,6 +69,17 @@ class MongoDBCRUDQueries:
             print(f"❌ Error conectando a MongoDB: {e}")
             raise
     
+    def _aggregate(self, collection_name, pipeline):
+        """aggregate() a través de la caché de resultados (invalidada por versión de datos)"""
+        if self.cache is None:
+            return list(self.db[collection_name].aggregate(pipeline))
+        return self.cache.aggregate(collection_name, pipeline, db=self.db)
+    
+    def _mutation_engine(self):
+        """Motor de mutaciones por lotes sobre la base enrutada (dry_run: planifica sin escribir)"""
+        return BulkMutationEngine(self.db, dry_run=self.dry_run, lag_monitor=self.lag_monitor)
+    
+    @routed('interactiva')
     def query_1_ventas_cliente_ultimos_3_meses(self, cliente_id="7d13dc6bb2b6f4bb5b7b4baf31f0bb1b"):
         """
         1. Consulta que devuelva todas las ventas realizadas en los últimos tres meses 
@@ -64,7 +98,8 @@ class MongoDBCRUDQueries:
         
         sort_criteria = [("order_info.order_purchase_timestamp", -1)]
         
-        result = list(self.db.orders.find(query).sort(sort_criteria))
+        orders = self.db.orders.with_options(codec_options=RAW_BSON_OPTIONS) if self.raw_bson else self.db.orders
+        result = list(orders.find(query).sort(sort_criteria))
         
         print(f"Cliente ID: {cliente_id}")
         print(f"Fecha límite: {fecha_limite}")
@@ -87,6 +122,7 @@ class MongoDBCRUDQueries:
         
         return result
     
+    @routed('interactiva')
     def query_2_total_gastado_cliente_agrupado(self, cliente_id="7d13dc6bb2b6f4bb5b7b4baf31f0bb1b"):
         """
         2. Modifica la consulta para que también devuelva el total gastado por ese cliente 
@@ -95,7 +131,9 @@ class MongoDBCRUDQueries:
         print("\n📊 CONSULTA 2: Total gastado por cliente agrupado por producto")
         print("="*60)
         
-        fecha_limite = datetime.now() - timedelta(days=90)
+        # Límite truncado al día: el pipeline (y su clave en la caché) es el mismo durante todo el día
+        hoy = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+        fecha_limite = hoy - timedelta(days=90)
         
         pipeline = [
             {
@@ -123,7 +161,7 @@ class MongoDBCRUDQueries:
             }
         ]
         
-        result = list(self.db.orders.aggregate(pipeline))
+        result = self._aggregate('orders', pipeline)
         total_gastado = sum(item['total_gastado'] for item in result)
         
         print(f"Cliente ID: {cliente_id}")
@@ -148,6 +186,7 @@ class MongoDBCRUDQueries:
         
         return result
     
+    @routed('analitica')
     def query_3_productos_stock_disminuido(self):
         """
         3. Consulta que devuelva todos los productos cuya cantidad_stock ha disminuido 
@@ -160,7 +199,9 @@ class MongoDBCRUDQueries:
         # simularemos con análisis de ventas por mes
         
         # Calcular fechas para mes actual y anterior
-        hoy = datetime.now()
+        # Límites truncados al día (hasta el final de hoy) para que la caché reconozca el pipeline
+        hoy = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+        fin_hoy = hoy + timedelta(days=1)
         inicio_mes_actual = hoy.replace(day=1)
         fin_mes_anterior = inicio_mes_actual - timedelta(days=1)
         inicio_mes_anterior = fin_mes_anterior.replace(day=1)
@@ -170,7 +211,7 @@ class MongoDBCRUDQueries:
                 "$match": {
                     "order_info.order_purchase_timestamp": {
                         "$gte": inicio_mes_anterior,
-                        "$lt": hoy
+                        "$lt": fin_hoy
                     }
                 }
             },
@@ -259,7 +300,7 @@ class MongoDBCRUDQueries:
             }
         ]
         
-        result = list(self.db.orders.aggregate(pipeline))
+        result = self._aggregate('orders', pipeline)
         
         print(f"Período analizado:")
         print(f"  Mes anterior: {inicio_mes_anterior.strftime('%Y-%m')} ")
@@ -282,73 +323,34 @@ class MongoDBCRUDQueries:
         
         return result
     
-    def query_4_lectura_nodo_secundario(self, ciudad="sao paulo"):
+    @routed('analitica')
+    def query_4_lectura_nodo_secundario(self, ciudad="sao paulo", prefijo=False):
         """
         4. En un entorno con replicación Primario-Secundario implementada, 
         consulta de lectura desde un nodo secundario para obtener todos los productos 
         vendidos en una ciudad específica cuyo precio esté por encima del promedio.
+        La ciudad se busca por customer.city_key (exacta o, con prefijo=True, por prefijo).
         """
         print("\n📊 CONSULTA 4: Lectura desde nodo secundario")
         print("="*60)
         
-        # Nota: Para demostrar lectura secundaria, cambiaríamos la preferencia de lectura
-        # Por ahora, simulamos la consulta
-        
-        # Primero calcular precio promedio
-        pipeline_promedio = [
-            {"$unwind": "$items"},
-            {"$group": {"_id": None, "precio_promedio": {"$avg": "$items.price"}}}
-        ]
+        # @routed('analitica'): self.db lee con secondaryPreferred y maxStalenessSeconds
+        nodo_lectura = self.router.served_by(self.db) if self.router else 'primario (conexión directa)'
         
-        resultado_promedio = list(self.db.orders.aggregate(pipeline_promedio))
-        precio_promedio = resultado_promedio[0]['precio_promedio'] if resultado_promedio else 0
-        
-        # Consulta principal
-        pipeline = [
-            {
-                "$match": {
-                    "$expr": {
-                        "$regexMatch": {
-                            "input": {"$toLower": "$customer.customer_city"},
-                            "regex": ciudad.lower()
-                        }
-                    }
-                }
-            },
-            {
-                "$unwind": "$items"
-            },
-            {
-                "$match": {
-                    "items.price": {"$gt": precio_promedio}
-                }
-            },
-            {
-                "$group": {
-                    "_id": {
-                        "product_id": "$items.product_id",
-                        "product_category": "$items.product_info.product_category_name_normalized"
-                    },
-                    "precio_promedio_producto": {"$avg": "$items.price"},
-                    "total_vendido": {"$sum": "$items.total_item_value"},
-                    "cantidad_ordenes": {"$sum": 1}
-                }
-            },
-            {
-                "$sort": {"precio_promedio_producto": -1}
-            }
-        ]
+        # Una sola agregación: ciudad por índice y promedio general de items vía $unionWith
+        # (antes eran dos agregaciones)
+        pipeline = query_4_pipeline(ciudad, prefijo)
         
-        result = list(self.db.orders.aggregate(pipeline))
+        result = self._aggregate('orders', pipeline)
+        precio_promedio = result[0]['precio_promedio_general'] if result else 0
         
         print(f"Ciudad analizada: {ciudad.title()}")
         print(f"Precio promedio general: ${precio_promedio:.2f}")
         print(f"Productos por encima del promedio: {len(result)}")
         
         print(f"\n⚠️ NOTA SOBRE REPLICACIÓN:")
-        print(f"Para leer desde secundario, se debe configurar:")
-        print(f"client = MongoClient('mongodb://localhost:27021/', read_preference=ReadPreference.SECONDARY)")
-        print(f"Esto garantiza consistencia eventual vs consistencia fuerte")
+        print(f"Lectura servida por: {nodo_lectura}")
+        print(f"Consistencia eventual: el secundario puede ir hasta maxStalenessSeconds por detrás del primario")
         
         if result:
             print(f"\nTop 5 productos más caros en {ciudad.title()}:")
@@ -361,6 +363,7 @@ class MongoDBCRUDQueries:
         self.results['query_4'] = {
             'description': 'Productos por encima del promedio en ciudad específica',
             'ciudad': ciudad,
+            'nodo_lectura': nodo_lectura,
             'precio_promedio_general': precio_promedio,
             'productos_encontrados': len(result),
             'top_productos': result[:10]
@@ -368,6 +371,7 @@ class MongoDBCRUDQueries:
         
         return result
     
+    @routed('transaccional')
     def query_5_actualizar_precios_rango_fechas(self):
         """
         5. Actualizar el precio de todos los productos vendidos en un rango de fechas específico. 
@@ -393,8 +397,8 @@ class MongoDBCRUDQueries:
         print(f"Rango de fechas: {fecha_inicio.strftime('%Y-%m-%d')} a {fecha_fin.strftime('%Y-%m-%d')}")
         print(f"Órdenes en el rango: {documentos_afectados:,}")
         
-        # NOTA: En un entorno real, esta actualización sería peligrosa
-        # Por ello, solo simulamos la operación
+        # Un update_many único bloquearía la replicación: se ejecuta por lotes de _id con
+        # w: "majority" (en dry_run solo se planifican los lotes)
         
         update_operation = {
             "$mul": {
@@ -404,12 +408,15 @@ class MongoDBCRUDQueries:
             }
         }
         
-        print(f"\n⚠️ SIMULACIÓN DE ACTUALIZACIÓN:")
-        print(f"Operación que se ejecutaría:")
-        print(f"db.orders.update_many(")
-        print(f"  {json.dumps(count_query, indent=2, default=str)},")
+        print(f"\n⚠️ ACTUALIZACIÓN POR LOTES{' (DRY-RUN)' if self.dry_run else ''}:")
+        print(f"db.orders.bulk_write([UpdateMany(")
+        print(f"  {json.dumps(count_query, indent=2, default=str)} + rango de _id del lote,")
         print(f"  {json.dumps(update_operation, indent=2)}")
-        print(f")")
+        print(f")], writeConcern={{w: 'majority'}})")
+        
+        mutacion = self._mutation_engine().update(
+            'orders', count_query, update_operation, description='Consulta 5: precios +10%'
+        )
         
         print(f"\n✅ Esta operación aumentaría los precios en 10% para:")
         print(f"  - {documentos_afectados:,} órdenes")
@@ -427,7 +434,8 @@ class MongoDBCRUDQueries:
             'fecha_inicio': fecha_inicio.isoformat(),
             'fecha_fin': fecha_fin.isoformat(),
             'documentos_afectados': documentos_afectados,
-            'operacion': 'SIMULADA - No ejecutada por seguridad'
+            'operacion': 'DRY-RUN - Lotes planificados sin escribir' if self.dry_run else 'EJECUTADA por lotes',
+            'mutacion': mutacion
         }
         
         return documentos_afectados
@@ -442,6 +450,10 @@ class MongoDBCRUDQueries:
         
         # Ejecutar consultas 1-5
         try:
+            # Lag de los secundarios mientras corren las consultas (serie temporal del reporte)
+            self.lag_monitor = ReplicationLagMonitor(self.db.client)
+            self.lag_monitor.start()
+            
             self.query_1_ventas_cliente_ultimos_3_meses()
             self.query_2_total_gastado_cliente_agrupado()
             self.query_3_productos_stock_disminuido()
@@ -455,9 +467,7 @@ class MongoDBCRUDQueries:
             print(f"❌ Error ejecutando consultas: {e}")
         
         finally:
-            if self.client:
-                self.client.close()
-                print(f"\n🔌 Conexión cerrada")
+            close_query_session(self)
     
     def save_results(self, filename='data/processed/crud_results_part1.json'):
         """Guardar resultados"""
@@ -472,6 +482,8 @@ class MongoDBCRUDQueries:
             json.dump({
                 'execution_date': datetime.now().isoformat(),
                 'total_queries': len(clean_results),
+                'replica_routing': self.routing_report,
+                'replication': self.replication_report,
                 'results': clean_results
             }, f, indent=2, ensure_ascii=False)
         
@@ -479,7 +491,7 @@ class MongoDBCRUDQueries:
     
     def clean_for_json(self, obj):
         """Limpiar objeto para serialización JSON"""
-        if isinstance(obj, dict):
+        if isinstance(obj, (dict, RawBSONDocument)):
             return {k: self.clean_for_json(v) for k, v in obj.items()}
         elif isinstance(obj, list):
             return [self.clean_for_json(item) for item in obj]
@@ -496,6 +508,11 @@ class MongoDBCRUDQueries:
 
 if __name__ == "__main__":
     # Ejecutar consultas CRUD parte 1
-    crud = MongoDBCRUDQueries()
+    parser = argparse.ArgumentParser(description='Consultas CRUD con mutaciones por lotes')
+    parser.add_argument('--ejecutar', action='store_true', help='Aplicar las mutaciones (por defecto dry-run)')
+    parser.add_argument('--raw-bson', action='store_true', help='Órdenes de la consulta 1 como RawBSONDocument (decodificación perezosa)')
+    args = parser.parse_args()
+    
+    crud = MongoDBCRUDQueries(dry_run=not args.ejecutar, raw_bson=args.raw_bson)
     crud.run_all_queries()
     crud.save_results()
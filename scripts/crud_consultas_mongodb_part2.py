@@ -5,20 +5,39 @@ Dataset: Brazilian E-Commerce (MongoDB)
 Actualizaciones y Eliminaciones Condicionadas
 """
 
+import argparse
 import pandas as pd
 import numpy as np
-from pymongo import MongoClient
 from datetime import datetime, timedelta
 import json
 from pathlib import Path
+from query_cache import QueryResultCache
+from mongodb_connection import create_mongo_client, close_query_session, WIRE_COMPRESSORS
+from replica_router import ReplicaRouter, routed
+from replication_monitor import ReplicationLagMonitor
+from bulk_mutations import BulkMutationEngine
+from city_keys import city_filter
+from single_pass_pipelines import query_9_pipeline, query_9_city_stats_pipeline, query_10_pipeline
+from product_antijoin import ProductAntiJoin
 import warnings
 warnings.filterwarnings('ignore')
 
 class MongoDBCRUDQueriesPart2:
-    def __init__(self, mongodb_uri='mongodb://localhost:27020/'):
+    def __init__(self, mongodb_uri='mongodb://localhost:27020/', use_cache=True, use_replicas=True, dry_run=True,
+                 database_name='brazilian_ecommerce', compressors=WIRE_COMPRESSORS):
         self.mongodb_uri = mongodb_uri
+        self.database_name = database_name
+        self.compressors = compressors
+        self.use_cache = use_cache
+        self.use_replicas = use_replicas
+        self.dry_run = dry_run
         self.client = None
+        self.router = None
+        self.routing_report = None
+        self.lag_monitor = None
+        self.replication_report = None
         self.db = None
+        self.cache = None
         self.results = {}
         
     def connect_to_mongodb(self):
@@ -27,21 +46,35 @@ class MongoDBCRUDQueriesPart2:
         print("="*60)
         
         try:
-            self.client = MongoClient(
-                self.mongodb_uri,
-                directConnection=True,
-                serverSelectionTimeoutMS=5000
-            )
-            self.client.admin.command('ping')
+            if self.use_replicas:
+                # Lista semilla de rs0: cada consulta declara su clase (@routed) y se lee
+                # del miembro que le corresponde; fuera de una consulta se usa el primario
+                self.router = ReplicaRouter(database_name=self.database_name, compressors=self.compressors).connect()
+                self.db = self.router.database('transaccional')
+            else:
+                self.client = create_mongo_client(self.mongodb_uri, compressors=self.compressors)
+                self.client.admin.command('ping')
+                self.db = self.client[self.database_name]
             print("✅ Conexión exitosa a MongoDB")
             
-            self.db = self.client['brazilian_ecommerce']
+            self.cache = QueryResultCache(self.db) if self.use_cache else None
             print(f"📁 Base de datos: {self.db.name}")
             
         except Exception as e:
             print(f"❌ Error conectando a MongoDB: {e}")
             raise
     
+    def _aggregate(self, collection_name, pipeline):
+        """aggregate() a través de la caché de resultados (invalidada por versión de datos)"""
+        if self.cache is None:
+            return list(self.db[collection_name].aggregate(pipeline))
+        return self.cache.aggregate(collection_name, pipeline, db=self.db)
+    
+    def _mutation_engine(self):
+        """Motor de mutaciones por lotes sobre la base enrutada (dry_run: planifica sin escribir)"""
+        return BulkMutationEngine(self.db, dry_run=self.dry_run, lag_monitor=self.lag_monitor)
+    
+    @routed('transaccional')
     def query_6_actualizar_email_cliente_condicionado(self):
         """
         6. Operación de actualización donde, en la colección clientes, se actualiza la dirección 
@@ -77,7 +110,7 @@ class MongoDBCRUDQueriesPart2:
             }
         ]
         
-        clientes_calificados = list(self.db.orders.aggregate(pipeline_clientes_calificados))
+        clientes_calificados = self._aggregate('orders', pipeline_clientes_calificados)
         
         print(f"Fecha límite para última compra: {fecha_limite}")
         print(f"Clientes con >5 compras y compra reciente: {len(clientes_calificados)}")
@@ -92,7 +125,7 @@ class MongoDBCRUDQueriesPart2:
             print(f"  - Última compra: {cliente_ejemplo['ultima_compra']}")
             print(f"  - Total gastado: ${cliente_ejemplo['total_gastado']:.2f}")
             
-            # SIMULACIÓN de actualización de email
+            # Actualización del email (un solo documento: un lote con w: "majority")
             nuevo_email = f"{cliente_id[:8]}@emailactualizado.com"
             
             update_query = {"customer_id": cliente_id}
@@ -104,20 +137,24 @@ class MongoDBCRUDQueriesPart2:
                 }
             }
             
-            print(f"\n⚠️ SIMULACIÓN DE ACTUALIZACIÓN:")
+            print(f"\n⚠️ ACTUALIZACIÓN{' (DRY-RUN)' if self.dry_run else ''}:")
             print(f"db.customers.update_one(")
             print(f"  {json.dumps(update_query, indent=2)},")
             print(f"  {json.dumps(update_operation, indent=2, default=str)}")
             print(f")")
             
-            print(f"\n✅ Email actualizado (simulado): {nuevo_email}")
+            mutacion = self._mutation_engine().update(
+                'customers', update_query, update_operation, description='Consulta 6: email de cliente'
+            )
+            print(f"\n✅ Email actualizado{' (dry-run)' if self.dry_run else ''}: {nuevo_email}")
             
             self.results['query_6'] = {
                 'description': 'Actualización email cliente con condiciones',
                 'clientes_calificados': len(clientes_calificados),
                 'cliente_actualizado': cliente_id,
                 'nuevo_email': nuevo_email,
-                'condiciones_aplicadas': 'Más de 5 compras Y última compra en trimestre'
+                'condiciones_aplicadas': 'Más de 5 compras Y última compra en trimestre',
+                'mutacion': mutacion
             }
             
         else:
@@ -130,6 +167,7 @@ class MongoDBCRUDQueriesPart2:
         
         return clientes_calificados
     
+    @routed('transaccional')
     def query_7_actualizar_precios_productos_vendidos(self):
         """
         7. Actualizar los precios de todos los productos que hayan sido vendidos más de 100 veces 
@@ -180,7 +218,7 @@ class MongoDBCRUDQueriesPart2:
             }
         ]
         
-        productos_calificados = list(self.db.orders.aggregate(pipeline))
+        productos_calificados = self._aggregate('orders', pipeline)
         
         print(f"Período analizado: {fecha_inicio.strftime('%Y-%m-%d')} a {fecha_fin.strftime('%Y-%m-%d')}")
         print(f"Umbral de precio: ${umbral_precio}")
@@ -197,17 +235,26 @@ class MongoDBCRUDQueriesPart2:
                 print(f"     Precio nuevo: ${nuevo_precio:.2f} (+15%)")
                 print(f"     Total ingresos: ${producto['total_ingresos']:.2f}")
             
-            # SIMULACIÓN de actualización masiva
+            # Actualización masiva por lotes de _id: arrayFilters limita el $mul a los items
+            # del producto calificado que siguen bajo el umbral (no a todo el array items.$[])
             productos_ids = [p['_id'] for p in productos_calificados]
             
-            print(f"\n⚠️ SIMULACIÓN DE ACTUALIZACIÓN MASIVA:")
+            print(f"\n⚠️ ACTUALIZACIÓN MASIVA POR LOTES{' (DRY-RUN)' if self.dry_run else ''}:")
             print(f"Se actualizarían {len(productos_ids)} productos")
-            print(f"Operación MongoDB:")
-            print(f"db.orders.update_many(")
-            print(f"  {{'items.product_id': {{'$in': {productos_ids[:3]}...}}}},")
+            print(f"Operación MongoDB (por lote, writeConcern majority):")
+            print(f"db.orders.bulk_write([UpdateMany(")
+            print(f"  {{'_id': {{'$in': [_id del lote]}}}},  # lotes elegidos con items.product_id $in {productos_ids[:3]}...")
             print(f"  {{'$mul': {{'items.$[elem].price': 1.15}}}},")
-            print(f"  {{'arrayFilters': [{{'elem.product_id': {{'$in': {productos_ids[:3]}...}}}}]}}")
-            print(f")")
+            print(f"  {{'arrayFilters': [{{'elem.product_id': {{'$in': {productos_ids[:3]}...}}, 'elem.price': {{'$lt': {umbral_precio}}}}}]}}")
+            print(f")])")
+            
+            mutacion = self._mutation_engine().update(
+                'orders',
+                {"items.product_id": {"$in": productos_ids}},
+                {"$mul": {"items.$[elem].price": 1.15}},
+                array_filters=[{"elem.product_id": {"$in": productos_ids}, "elem.price": {"$lt": umbral_precio}}],
+                description='Consulta 7: precios +15% de productos populares'
+            )
             
             total_ingresos_actuales = sum(p['total_ingresos'] for p in productos_calificados)
             total_ingresos_nuevos = total_ingresos_actuales * 1.15
@@ -222,6 +269,7 @@ class MongoDBCRUDQueriesPart2:
                 'productos_calificados': len(productos_calificados),
                 'criterios': 'Vendidos >100 veces Y precio <$100',
                 'incremento_precio': '15%',
+                'mutacion': mutacion,
                 'impacto_financiero': {
                     'ingresos_actuales': total_ingresos_actuales,
                     'ingresos_proyectados': total_ingresos_nuevos,
@@ -238,6 +286,7 @@ class MongoDBCRUDQueriesPart2:
         
         return productos_calificados
     
+    @routed('transaccional')
     def query_8_eliminar_productos_sin_stock_sin_ventas(self):
         """
         8. Eliminar todos los productos de la colección productos cuya cantidad_stock sea 0 
@@ -249,50 +298,21 @@ class MongoDBCRUDQueriesPart2:
         # Usar fechas del dataset (últimos 6 meses de datos disponibles)
         fecha_limite = datetime(2018, 3, 1)  # 6 meses antes del final del dataset
         
-        # Paso 1: Encontrar productos que SÍ se vendieron en los últimos 6 meses
-        pipeline_productos_activos = [
-            {
-                "$match": {
-                    "order_info.order_purchase_timestamp": {"$gte": fecha_limite}
-                }
-            },
-            {
-                "$unwind": "$items"
-            },
-            {
-                "$group": {
-                    "_id": "$items.product_id",
-                    "ultima_venta": {"$max": "$order_info.order_purchase_timestamp"},
-                    "total_vendido": {"$sum": 1}
-                }
-            }
-        ]
-        
-        productos_activos = list(self.db.orders.aggregate(pipeline_productos_activos))
-        productos_activos_ids = set(p['_id'] for p in productos_activos)
-        
-        # Paso 2: Encontrar todos los productos en la colección products
+        # Anti-join sin $nin: last_sale_date indexado en products o diferencia de flujos ordenados
+        antijoin = ProductAntiJoin(self.db)
         total_productos = self.db.products.count_documents({})
-        productos_sin_ventas_recientes = []
+        productos_activos = antijoin.count_active(fecha_limite)
         
         # Simular campo stock = 0 para algunos productos
-        pipeline_productos_candidatos = [
-            {
-                "$match": {
-                    "product_id": {"$nin": list(productos_activos_ids)}
-                }
-            },
-            {
-                "$limit": 100  # Limitar para demostración
-            }
-        ]
-        
-        productos_candidatos = list(self.db.products.aggregate(pipeline_productos_candidatos))
+        metodo, productos_candidatos = antijoin.products_without_recent_sales(
+            fecha_limite, limit=100  # Limitar para demostración
+        )
         
         print(f"Fecha límite ventas: {fecha_limite}")
         print(f"Total productos en catálogo: {total_productos:,}")
-        print(f"Productos con ventas recientes: {len(productos_activos):,}")
+        print(f"Productos con ventas recientes: {productos_activos:,}")
         print(f"Productos candidatos a eliminación: {len(productos_candidatos):,}")
+        print(f"Método anti-join: {metodo}")
         
         if productos_candidatos:
             print(f"\nMuestra de productos para eliminar:")
@@ -302,18 +322,29 @@ class MongoDBCRUDQueriesPart2:
                 print(f"     Peso: {producto.get('product_weight_g', 'N/A')}g")
                 print(f"     Razón: Sin ventas desde {fecha_limite.strftime('%Y-%m-%d')}")
             
-            # SIMULACIÓN de eliminación
+            # Eliminación por lotes: se vuelve a exigir la falta de ventas recientes en el servidor y,
+            # antes de cada lote, se comprueban sus ventas en orders (last_sale_date puede no estar
+            # materializado o ir desfasado); stock_quantity no existe en el dataset
             productos_eliminar_ids = [p['product_id'] for p in productos_candidatos]
+            filtro_eliminacion = {'$and': [
+                {'product_id': {'$in': productos_eliminar_ids}},
+                antijoin.without_sales_filter(fecha_limite)
+            ]}
             
-            print(f"\n⚠️ SIMULACIÓN DE ELIMINACIÓN:")
-            print(f"Operación MongoDB:")
-            print(f"db.products.delete_many({{")
+            print(f"\n⚠️ ELIMINACIÓN POR LOTES{' (DRY-RUN)' if self.dry_run else ''}:")
+            print(f"Operación MongoDB (por lote, writeConcern majority):")
+            print(f"db.products.bulk_write([DeleteMany({{")
             print(f"  '$and': [")
-            print(f"    {{'product_id': {{'$in': {productos_eliminar_ids[:3]}...}}}},")
-            print(f"    {{'stock_quantity': 0}},  # Campo simulado")
-            print(f"    {{'last_sale_date': {{'$lt': '{fecha_limite.isoformat()}'}}}}")
+            print(f"    {{'_id': {{'$in': [_id del lote]}}}},  # lotes elegidos con product_id $in {productos_eliminar_ids[:3]}...")
+            print(f"    {{'$or': [{{'last_sale_date': {{'$lt': '{fecha_limite.isoformat()}'}}}}, {{'last_sale_date': None}}]}}")
             print(f"  ]")
-            print(f"}})")
+            print(f"}})])")
+            print(f"Por lote: se excluyen los product_id con órdenes desde {fecha_limite.strftime('%Y-%m-%d')}")
+            
+            mutacion = self._mutation_engine().delete(
+                'products', filtro_eliminacion, description='Consulta 8: productos sin ventas recientes',
+                chunk_guard=antijoin.unsold_guard(fecha_limite)
+            )
             
             print(f"\n📊 Optimización de índices recomendada:")
             print(f"db.products.create_index([")
@@ -327,18 +358,22 @@ class MongoDBCRUDQueriesPart2:
                 'description': 'Eliminación productos sin stock ni ventas',
                 'fecha_limite': fecha_limite.isoformat(),
                 'total_productos': total_productos,
-                'productos_activos': len(productos_activos),
+                'productos_activos': productos_activos,
                 'productos_candidatos_eliminacion': len(productos_candidatos),
+                'metodo_antijoin': metodo,
+                'mutacion': mutacion,
                 'optimizacion_indices': 'Índice compuesto en stock_quantity, last_sale_date, product_id'
             }
         
         return productos_candidatos
     
-    def query_9_eliminar_ventas_ciudad_bajo_promedio(self, ciudad="rio de janeiro"):
+    @routed('transaccional')
+    def query_9_eliminar_ventas_ciudad_bajo_promedio(self, ciudad="rio de janeiro", prefijo=False):
         """
         9. Eliminar todas las ventas de la colección ventas realizadas en una ciudad específica 
         y cuyo precio esté por debajo del promedio de todas las ventas realizadas en esa ciudad 
         en el último trimestre.
+        La ciudad se busca por customer.city_key (exacta o, con prefijo=True, por prefijo).
         """
         print("\n📊 CONSULTA 9: Eliminar ventas bajo promedio en ciudad")
         print("="*60)
@@ -347,73 +382,36 @@ class MongoDBCRUDQueriesPart2:
         fecha_inicio = datetime(2018, 6, 1)
         fecha_fin = datetime(2018, 8, 31)
         
-        # Paso 1: Calcular promedio de ventas en la ciudad en el último trimestre
-        pipeline_promedio = [
-            {
-                "$match": {
-                    "$and": [
-                        {"order_info.order_purchase_timestamp": {"$gte": fecha_inicio, "$lte": fecha_fin}},
-                        {"$expr": {"$regexMatch": {
-                            "input": {"$toLower": "$customer.customer_city"},
-                            "regex": ciudad.lower()
-                        }}}
-                    ]
-                }
-            },
-            {
-                "$group": {
-                    "_id": None,
-                    "precio_promedio": {"$avg": "$order_summary.total_value"},
-                    "total_ventas": {"$sum": 1},
-                    "total_ingresos": {"$sum": "$order_summary.total_value"}
-                }
-            }
-        ]
+        # Una sola pasada: $setWindowFields añade a cada venta de la ciudad el promedio,
+        # el total de ventas y los ingresos del período, y se filtran las que quedan por debajo
+        pipeline_ventas_bajo_promedio = query_9_pipeline(ciudad, fecha_inicio, fecha_fin, prefijo)
         
-        resultado_promedio = list(self.db.orders.aggregate(pipeline_promedio))
+        ventas_bajo_promedio = self._aggregate('orders', pipeline_ventas_bajo_promedio)
         
-        if not resultado_promedio:
+        # Sin ventas bajo el promedio la ventana no devuelve filas con los totales de la ciudad:
+        # solo entonces se piden con un $group sobre el mismo $match indexado
+        estadisticas = ventas_bajo_promedio[:1] or self._aggregate(
+            'orders', query_9_city_stats_pipeline(ciudad, fecha_inicio, fecha_fin, prefijo)
+        )
+        if not estadisticas or not estadisticas[0]['total_ventas_ciudad']:
             print(f"❌ No se encontraron ventas en {ciudad.title()} en el período especificado")
             return []
         
-        promedio_ciudad = resultado_promedio[0]
+        promedio_ciudad = {
+            'precio_promedio': estadisticas[0]['precio_promedio_ciudad'],
+            'total_ventas': estadisticas[0]['total_ventas_ciudad'],
+            'total_ingresos': estadisticas[0]['total_ingresos_ciudad']
+        }
         precio_promedio = promedio_ciudad['precio_promedio']
         
-        # Paso 2: Encontrar ventas por debajo del promedio
-        pipeline_ventas_bajo_promedio = [
-            {
-                "$match": {
-                    "$and": [
-                        {"order_info.order_purchase_timestamp": {"$gte": fecha_inicio, "$lte": fecha_fin}},
-                        {"$expr": {"$regexMatch": {
-                            "input": {"$toLower": "$customer.customer_city"},
-                            "regex": ciudad.lower()
-                        }}},
-                        {"order_summary.total_value": {"$lt": precio_promedio}}
-                    ]
-                }
-            },
-            {
-                "$project": {
-                    "order_id": 1,
-                    "customer.customer_city": 1,
-                    "order_summary.total_value": 1,
-                    "order_info.order_purchase_timestamp": 1
-                }
-            },
-            {
-                "$sort": {"order_summary.total_value": 1}
-            }
-        ]
-        
-        ventas_bajo_promedio = list(self.db.orders.aggregate(pipeline_ventas_bajo_promedio))
-        
         print(f"Ciudad: {ciudad.title()}")
         print(f"Período: {fecha_inicio.strftime('%Y-%m-%d')} a {fecha_fin.strftime('%Y-%m-%d')}")
         print(f"Total ventas en ciudad: {promedio_ciudad['total_ventas']:,}")
         print(f"Precio promedio ciudad: ${precio_promedio:.2f}")
         print(f"Ventas bajo promedio: {len(ventas_bajo_promedio):,}")
         
+        valor_total_eliminar = 0.0
+        mutacion = None
         if ventas_bajo_promedio:
             valor_total_eliminar = sum(v['order_summary']['total_value'] for v in ventas_bajo_promedio)
             
@@ -430,27 +428,39 @@ class MongoDBCRUDQueriesPart2:
             print(f"4. Verificar integridad referencial con otras colecciones")
             
             orden_ids = [v['order_id'] for v in ventas_bajo_promedio]
+            filtro_eliminacion = {'$and': [
+                {'order_id': {'$in': orden_ids}},
+                city_filter(ciudad, prefix=prefijo),
+                {'order_summary.total_value': {'$lt': precio_promedio}}
+            ]}
             
-            print(f"\n⚠️ SIMULACIÓN DE ELIMINACIÓN:")
-            print(f"db.orders.delete_many({{")
+            print(f"\n⚠️ ELIMINACIÓN POR LOTES{' (DRY-RUN)' if self.dry_run else ''}:")
+            print(f"db.orders.bulk_write([DeleteMany({{")
             print(f"  '$and': [")
-            print(f"    {{'order_id': {{'$in': {orden_ids[:3]}...}}}},")
-            print(f"    {{'customer.customer_city': /{ciudad.lower()}/i}},")
+            print(f"    {{'_id': {{'$in': [_id del lote]}}}},  # lotes elegidos con order_id $in {orden_ids[:3]}...")
+            print(f"    {city_filter(ciudad, prefix=prefijo)},")
             print(f"    {{'order_summary.total_value': {{'$lt': {precio_promedio:.2f}}}}}")
             print(f"  ]")
-            print(f"}})")
-            
-            self.results['query_9'] = {
-                'description': 'Eliminación ventas bajo promedio en ciudad',
-                'ciudad': ciudad,
-                'precio_promedio_ciudad': precio_promedio,
-                'ventas_bajo_promedio': len(ventas_bajo_promedio),
-                'valor_total_eliminar': valor_total_eliminar,
-                'consideraciones_replicacion': 'Backup necesario, propagación a secundarios'
-            }
+            print(f"}})], writeConcern={{w: 'majority'}})")
+            
+            mutacion = self._mutation_engine().delete(
+                'orders', filtro_eliminacion, description='Consulta 9: ventas bajo el promedio de la ciudad'
+            )
+        
+        self.results['query_9'] = {
+            'description': 'Eliminación ventas bajo promedio en ciudad',
+            'ciudad': ciudad,
+            'precio_promedio_ciudad': precio_promedio,
+            'total_ventas_ciudad': promedio_ciudad['total_ventas'],
+            'ventas_bajo_promedio': len(ventas_bajo_promedio),
+            'valor_total_eliminar': valor_total_eliminar,
+            'mutacion': mutacion,
+            'consideraciones_replicacion': 'Backup necesario, propagación a secundarios'
+        }
         
         return ventas_bajo_promedio
     
+    @routed('transaccional')
     def query_10_eliminar_clientes_compras_minimas(self, valor_minimo=100):
         """
         10. Eliminar todos los clientes cuyo total de compras no ha superado un valor mínimo 
@@ -464,38 +474,22 @@ class MongoDBCRUDQueriesPart2:
         fecha_inicio = datetime(2017, 9, 1)
         fecha_fin = datetime(2018, 8, 31)
         
-        # Pipeline para encontrar clientes con compras totales
-        pipeline_clientes_compras = [
-            {
-                "$match": {
-                    "order_info.order_purchase_timestamp": {
-                        "$gte": fecha_inicio,
-                        "$lte": fecha_fin
-                    }
-                }
-            },
-            {
-                "$group": {
-                    "_id": "$customer.customer_id",
-                    "total_gastado": {"$sum": "$order_summary.total_value"},
-                    "total_ordenes": {"$sum": 1},
-                    "primera_compra": {"$min": "$order_info.order_purchase_timestamp"},
-                    "ultima_compra": {"$max": "$order_info.order_purchase_timestamp"},
-                    "ciudad": {"$first": "$customer.customer_city"},
-                    "estado": {"$first": "$customer.customer_state"}
-                }
-            },
-            {
-                "$sort": {"total_gastado": 1}
-            }
-        ]
+        # Umbral aplicado en el servidor: solo viajan los clientes bajo el mínimo, cada uno
+        # con el total de clientes activos calculado por $setWindowFields
+        pipeline_clientes_bajo_minimo = query_10_pipeline(fecha_inicio, fecha_fin, valor_minimo)
         
-        todos_clientes = list(self.db.orders.aggregate(pipeline_clientes_compras))
-        clientes_bajo_minimo = [c for c in todos_clientes if c['total_gastado'] < valor_minimo]
+        clientes_bajo_minimo = self._aggregate('orders', pipeline_clientes_bajo_minimo)
+        if clientes_bajo_minimo:
+            clientes_activos = clientes_bajo_minimo[0]['clientes_activos']
+        else:
+            clientes_activos = len(self.db.orders.distinct(
+                'customer.customer_id',
+                {"order_info.order_purchase_timestamp": {"$gte": fecha_inicio, "$lte": fecha_fin}}
+            ))
         
         print(f"Período analizado: {fecha_inicio.strftime('%Y-%m-%d')} a {fecha_fin.strftime('%Y-%m-%d')}")
         print(f"Valor mínimo requerido: ${valor_minimo}")
-        print(f"Total clientes activos: {len(todos_clientes):,}")
+        print(f"Total clientes activos: {clientes_activos:,}")
         print(f"Clientes bajo mínimo: {len(clientes_bajo_minimo):,}")
         
         if clientes_bajo_minimo:
@@ -530,23 +524,33 @@ class MongoDBCRUDQueriesPart2:
             print(f"   - majority: Espera confirmación de mayoría de nodos")
             print(f"   - 1: Confirma solo en Primary (más rápido, menos seguro)")
             
-            print(f"\n⚠️ SIMULACIÓN DE ELIMINACIÓN:")
+            print(f"\n⚠️ ELIMINACIÓN POR LOTES{' (DRY-RUN)' if self.dry_run else ''}:")
             print(f"# Eliminar de colección customers")
-            print(f"db.customers.delete_many({{")
+            print(f"db.customers.bulk_write([DeleteMany({{")
             print(f"  'customer_id': {{'$in': {clientes_ids[:3]}...}}")
-            print(f"}})")
+            print(f"}})], writeConcern={{w: 'majority'}})")
             print(f"")
             print(f"# También eliminar órdenes relacionadas")
-            print(f"db.orders.delete_many({{")
+            print(f"db.orders.bulk_write([DeleteMany({{")
             print(f"  'customer.customer_id': {{'$in': {clientes_ids[:3]}...}}")
-            print(f"}})")
+            print(f"}})], writeConcern={{w: 'majority'}})")
+            print(f"# Cada lote envía solo sus _id: {{'_id': {{'$in': [_id del lote]}}}}")
+            
+            engine = self._mutation_engine()
+            mutaciones = [
+                engine.delete('customers', {'customer_id': {'$in': clientes_ids}},
+                              description='Consulta 10: clientes bajo el mínimo'),
+                engine.delete('orders', {'customer.customer_id': {'$in': clientes_ids}},
+                              description='Consulta 10: órdenes de esos clientes')
+            ]
             
             self.results['query_10'] = {
                 'description': 'Eliminación clientes con compras bajo mínimo',
                 'valor_minimo': valor_minimo,
-                'clientes_activos': len(todos_clientes),
+                'clientes_activos': clientes_activos,
                 'clientes_eliminar': len(clientes_bajo_minimo),
                 'impacto_financiero': total_perdido,
+                'mutaciones': mutaciones,
                 'consideraciones_replicacion': {
                     'consistencia_eventual': 'Lag temporal en secundarios',
                     'read_preference': 'Afecta consistencia de lecturas',
@@ -566,6 +570,10 @@ class MongoDBCRUDQueriesPart2:
         
         # Ejecutar consultas 6-10
         try:
+            # Lag de los secundarios mientras corren las consultas (serie temporal del reporte)
+            self.lag_monitor = ReplicationLagMonitor(self.db.client)
+            self.lag_monitor.start()
+            
             self.query_6_actualizar_email_cliente_condicionado()
             self.query_7_actualizar_precios_productos_vendidos()
             self.query_8_eliminar_productos_sin_stock_sin_ventas()
@@ -579,9 +587,7 @@ class MongoDBCRUDQueriesPart2:
             print(f"❌ Error ejecutando consultas: {e}")
         
         finally:
-            if self.client:
-                self.client.close()
-                print(f"\n🔌 Conexión cerrada")
+            close_query_session(self)
     
     def save_results(self, filename='data/processed/crud_results_part2.json'):
         """Guardar resultados"""
@@ -596,6 +602,8 @@ class MongoDBCRUDQueriesPart2:
             json.dump({
                 'execution_date': datetime.now().isoformat(),
                 'total_queries': len(clean_results),
+                'replica_routing': self.routing_report,
+                'replication': self.replication_report,
                 'results': clean_results
             }, f, indent=2, ensure_ascii=False)
         
@@ -620,6 +628,10 @@ class MongoDBCRUDQueriesPart2:
 
 if __name__ == "__main__":
     # Ejecutar consultas CRUD parte 2
-    crud = MongoDBCRUDQueriesPart2()
+    parser = argparse.ArgumentParser(description='Consultas CRUD con mutaciones por lotes')
+    parser.add_argument('--ejecutar', action='store_true', help='Aplicar las mutaciones (por defecto dry-run)')
+    args = parser.parse_args()
+    
+    crud = MongoDBCRUDQueriesPart2(dry_run=not args.ejecutar)
     crud.run_all_queries()
     crud.save_results()
@@ -7,18 +7,37 @@ Agregaciones Complejas y Análisis Avanzado
 
 import pandas as pd
 import numpy as np
-from pymongo import MongoClient
 from datetime import datetime, timedelta
 import json
 from pathlib import Path
+from query_cache import QueryResultCache
+from mongodb_connection import create_mongo_client, close_query_session, WIRE_COMPRESSORS
+from replica_router import ReplicaRouter, routed
+from replication_monitor import ReplicationLagMonitor
+from sales_rollups import SalesRollups, SALES_BY_PRODUCT_DAY, SALES_BY_CUSTOMER_DAY, SALES_BY_CITY_DAY
+from distinct_counts import MODOS_DISTINTOS, product_sales_group, product_distinct_sketches, HyperLogLog
+from product_analytics import ProductAnalytics, product_metrics_pipeline
+from columnar_results import ColumnarResult, QUERY_SCHEMAS, aggregate_columns
 import warnings
 warnings.filterwarnings('ignore')
 
 class MongoDBCRUDQueriesPart3:
-    def __init__(self, mongodb_uri='mongodb://localhost:27020/'):
+    def __init__(self, mongodb_uri='mongodb://localhost:27020/', use_rollups=True, use_cache=True, use_replicas=True,
+                 database_name='brazilian_ecommerce', compressors=WIRE_COMPRESSORS):
         self.mongodb_uri = mongodb_uri
+        self.database_name = database_name
+        self.compressors = compressors
+        self.use_cache = use_cache
+        self.use_replicas = use_replicas
+        self.use_rollups = use_rollups
         self.client = None
+        self.router = None
+        self.routing_report = None
+        self.lag_monitor = None
+        self.replication_report = None
         self.db = None
+        self.cache = None
+        self.rollups = None
         self.results = {}
         
     def connect_to_mongodb(self):
@@ -27,21 +46,49 @@ class MongoDBCRUDQueriesPart3:
         print("="*60)
         
         try:
-            self.client = MongoClient(
-                self.mongodb_uri,
-                directConnection=True,
-                serverSelectionTimeoutMS=5000
-            )
-            self.client.admin.command('ping')
+            if self.use_replicas:
+                # Lista semilla de rs0: cada consulta declara su clase (@routed) y se lee
+                # del miembro que le corresponde; fuera de una consulta se usa el primario
+                self.router = ReplicaRouter(database_name=self.database_name, compressors=self.compressors).connect()
+                self.db = self.router.database('transaccional')
+            else:
+                self.client = create_mongo_client(self.mongodb_uri, compressors=self.compressors)
+                self.client.admin.command('ping')
+                self.db = self.client[self.database_name]
             print("✅ Conexión exitosa a MongoDB")
             
-            self.db = self.client['brazilian_ecommerce']
+            self.rollups = SalesRollups(self.db)
+            self.cache = QueryResultCache(self.db) if self.use_cache else None
             print(f"📁 Base de datos: {self.db.name}")
             
         except Exception as e:
             print(f"❌ Error conectando a MongoDB: {e}")
             raise
     
+    def _aggregate(self, collection_name, pipeline, schema=None):
+        """
+        aggregate() a través de la caché de resultados (invalidada por versión de datos).
+        Con schema el resultado es un ColumnarResult: sin caché el cursor se decodifica directo a columnas
+        """
+        if self.cache is None:
+            if schema is not None:
+                return aggregate_columns(self.db[collection_name], pipeline, schema)
+            return list(self.db[collection_name].aggregate(pipeline))
+        result = self.cache.aggregate(collection_name, pipeline, db=self.db)
+        return result if schema is None else ColumnarResult.from_documents(result, schema, backend='cache')
+    
+    def aggregate_sales(self, pipeline, fecha_inicio, fecha_fin, rollup_name, rollup_stages, replaced_stages, schema=None):
+        """
+        Ejecutar el pipeline sobre orders o, si el rollup cubre el rango, sustituir sus
+        primeras replaced_stages etapas ($match/$unwind/$group) por rollup_stages sobre el rollup.
+        La cobertura se comprueba en el nodo enrutado, el mismo que ejecutará la agregación
+        """
+        if self.use_rollups and SalesRollups(self.db).covers(fecha_inicio, fecha_fin):
+            print(f"⚡ Fuente: rollup materializado {rollup_name}")
+            return self._aggregate(rollup_name, rollup_stages + pipeline[replaced_stages:], schema)
+        return self._aggregate('orders', pipeline, schema)
+    
+    @routed('analitica')
     def query_11_total_ventas_por_cliente_ultimo_año(self):
         """
         11. Consulta de agregación para calcular el total de ventas por cliente en el último año. 
@@ -108,35 +155,34 @@ class MongoDBCRUDQueriesPart3:
             }
         ]
         
-        result = list(self.db.orders.aggregate(pipeline))
+        result = self.aggregate_sales(
+            pipeline, fecha_inicio, fecha_fin, SALES_BY_CUSTOMER_DAY,
+            self.rollups.customer_sales_stages(fecha_inicio, fecha_fin), replaced_stages=2,
+            schema=QUERY_SCHEMAS['query_11']
+        )
         
         print(f"Período: {fecha_inicio.strftime('%Y-%m-%d')} a {fecha_fin.strftime('%Y-%m-%d')}")
         print(f"Top clientes analizados: {len(result)}")
         
-        if result:
-            total_general = sum(c['total_gastado'] for c in result)
+        if len(result):
+            total_general = float(result['total_gastado'].sum())
             promedio_general = total_general / len(result)
             
             print(f"\nEstadísticas generales:")
             print(f"  - Total gastado (top 50): ${total_general:,.2f}")
             print(f"  - Promedio por cliente: ${promedio_general:.2f}")
             
-            # Análisis por categoría
-            categorias = {}
-            for cliente in result:
-                cat = cliente['categoria_cliente']
-                if cat not in categorias:
-                    categorias[cat] = {'count': 0, 'total': 0}
-                categorias[cat]['count'] += 1
-                categorias[cat]['total'] += cliente['total_gastado']
+            # Análisis por categoría (conteos y sumas vectorizados sobre las columnas)
+            categorias = result.group_by('categoria_cliente', 'count', {'total': 'total_gastado'})
             
             print(f"\nDistribución por categoría:")
             for cat, data in categorias.items():
                 promedio_cat = data['total'] / data['count']
                 print(f"  - {cat}: {data['count']} clientes (${promedio_cat:.2f} promedio)")
             
+            top_clientes = result.records(10)
             print(f"\nTop 10 clientes:")
-            for i, cliente in enumerate(result[:10], 1):
+            for i, cliente in enumerate(top_clientes, 1):
                 print(f"  {i:2d}. ID: {cliente['cliente_id'][:16]}...")
                 print(f"      Ventas: {cliente['total_ventas']} | Total: ${cliente['total_gastado']:.2f}")
                 print(f"      Promedio/venta: ${cliente['promedio_precio_por_venta']:.2f}")
@@ -150,11 +196,12 @@ class MongoDBCRUDQueriesPart3:
                 'total_gastado_top50': total_general,
                 'promedio_por_cliente': promedio_general,
                 'distribucion_categorias': categorias,
-                'top_10_clientes': result[:10]
+                'top_10_clientes': top_clientes
             }
         
         return result
     
+    @routed('analitica')
     def query_12_productos_mas_vendidos_ultimo_trimestre(self):
         """
         12. Consulta para obtener los productos más vendidos en el último trimestre. 
@@ -213,29 +260,30 @@ class MongoDBCRUDQueriesPart3:
             }
         ]
         
-        result = list(self.db.orders.aggregate(pipeline))
+        result = self.aggregate_sales(
+            pipeline, fecha_inicio, fecha_fin, SALES_BY_PRODUCT_DAY,
+            self.rollups.product_sales_stages(
+                fecha_inicio, fecha_fin, {"product_id": "$product_id", "categoria": "$categoria"}
+            ),
+            replaced_stages=3, schema=QUERY_SCHEMAS['query_12']
+        )
         
         print(f"Período: {fecha_inicio.strftime('%Y-%m-%d')} a {fecha_fin.strftime('%Y-%m-%d')}")
         print(f"Productos más vendidos: {len(result)}")
         
-        if result:
-            total_ingresos = sum(p['total_ingresos'] for p in result)
-            total_cantidad = sum(p['cantidad_vendida'] for p in result)
+        if len(result):
+            total_ingresos = float(result['total_ingresos'].sum())
+            total_cantidad = int(result['cantidad_vendida'].sum())
             
             print(f"\nEstadísticas del trimestre:")
             print(f"  - Total ingresos (top 30): ${total_ingresos:,.2f}")
             print(f"  - Total unidades vendidas: {total_cantidad:,}")
             print(f"  - Ingreso promedio por unidad: ${total_ingresos/total_cantidad:.2f}")
             
-            # Análisis por categoría
-            categorias_ingresos = {}
-            for producto in result:
-                cat = producto['categoria']
-                if cat not in categorias_ingresos:
-                    categorias_ingresos[cat] = {'productos': 0, 'ingresos': 0, 'cantidad': 0}
-                categorias_ingresos[cat]['productos'] += 1
-                categorias_ingresos[cat]['ingresos'] += producto['total_ingresos']
-                categorias_ingresos[cat]['cantidad'] += producto['cantidad_vendida']
+            # Análisis por categoría (conteos y sumas vectorizados sobre las columnas)
+            categorias_ingresos = result.group_by(
+                'categoria', 'productos', {'ingresos': 'total_ingresos', 'cantidad': 'cantidad_vendida'}
+            )
             
             print(f"\nTop categorías por ingresos:")
             categorias_sorted = sorted(categorias_ingresos.items(), 
@@ -243,8 +291,9 @@ class MongoDBCRUDQueriesPart3:
             for cat, data in categorias_sorted[:5]:
                 print(f"  - {cat}: ${data['ingresos']:,.2f} ({data['productos']} productos)")
             
+            top_productos = result.records(15)
             print(f"\nTop 15 productos más vendidos:")
-            for i, producto in enumerate(result[:15], 1):
+            for i, producto in enumerate(top_productos, 1):
                 print(f"  {i:2d}. {producto['product_id'][:20]}...")
                 print(f"      Categoría: {producto['categoria']}")
                 print(f"      Vendido: {producto['cantidad_vendida']} unidades")
@@ -266,12 +315,13 @@ class MongoDBCRUDQueriesPart3:
                 'total_ingresos': total_ingresos,
                 'total_unidades': total_cantidad,
                 'top_categorias': dict(categorias_sorted[:5]),
-                'top_15_productos': result[:15],
+                'top_15_productos': top_productos,
                 'optimizaciones': 'Índices compuestos y particionamiento recomendados'
             }
         
         return result
     
+    @routed('analitica')
     def query_13_ventas_por_ciudad_ultimo_mes(self):
         """
         13. Consulta para obtener el total de ventas realizadas por cada ciudad en el último mes, 
@@ -330,37 +380,35 @@ class MongoDBCRUDQueriesPart3:
             }
         ]
         
-        result = list(self.db.orders.aggregate(pipeline))
+        result = self.aggregate_sales(
+            pipeline, fecha_inicio, fecha_fin, SALES_BY_CITY_DAY,
+            self.rollups.city_sales_stages(fecha_inicio, fecha_fin), replaced_stages=2,
+            schema=QUERY_SCHEMAS['query_13']
+        )
         
         print(f"Período: {fecha_inicio.strftime('%Y-%m-%d')} a {fecha_fin.strftime('%Y-%m-%d')}")
         print(f"Ciudades analizadas: {len(result)}")
         
-        if result:
-            total_ventas_general = sum(c['total_ventas'] for c in result)
-            total_ingresos_general = sum(c['total_ingresos'] for c in result)
+        if len(result):
+            total_ventas_general = int(result['total_ventas'].sum())
+            total_ingresos_general = float(result['total_ingresos'].sum())
             
             print(f"\nEstadísticas generales (top 25 ciudades):")
             print(f"  - Total ventas: {total_ventas_general:,}")
             print(f"  - Total ingresos: ${total_ingresos_general:,.2f}")
             print(f"  - Promedio por ciudad: {total_ventas_general/len(result):.1f} ventas")
             
-            # Análisis por región
-            regiones = {}
-            for ciudad in result:
-                region = ciudad['region']
-                if region not in regiones:
-                    regiones[region] = {'ciudades': 0, 'ventas': 0, 'ingresos': 0}
-                regiones[region]['ciudades'] += 1
-                regiones[region]['ventas'] += ciudad['total_ventas']
-                regiones[region]['ingresos'] += ciudad['total_ingresos']
+            # Análisis por región (conteos y sumas vectorizados sobre las columnas)
+            regiones = result.group_by('region', 'ciudades', {'ventas': 'total_ventas', 'ingresos': 'total_ingresos'})
             
             print(f"\nAnálisis por región:")
             for region, data in sorted(regiones.items(), key=lambda x: x[1]['ventas'], reverse=True):
                 promedio_region = data['ventas'] / data['ciudades']
                 print(f"  - {region}: {data['ventas']:,} ventas ({data['ciudades']} ciudades, {promedio_region:.1f} promedio)")
             
+            top_ciudades = result.records(15)
             print(f"\nTop 15 ciudades por cantidad de ventas:")
-            for i, ciudad in enumerate(result[:15], 1):
+            for i, ciudad in enumerate(top_ciudades, 1):
                 eficiencia = ciudad['total_ingresos'] / ciudad['total_ventas']
                 print(f"  {i:2d}. {ciudad['ciudad']}, {ciudad['estado']} ({ciudad['region']})")
                 print(f"      Ventas: {ciudad['total_ventas']:,} | Ingresos: ${ciudad['total_ingresos']:,.2f}")
@@ -387,12 +435,13 @@ class MongoDBCRUDQueriesPart3:
                 'total_ventas': total_ventas_general,
                 'total_ingresos': total_ingresos_general,
                 'analisis_regiones': regiones,
-                'top_15_ciudades': result[:15],
+                'top_15_ciudades': top_ciudades,
                 'optimizaciones': 'Índices geográficos y distribución de réplicas'
             }
         
         return result
     
+    @routed('analitica')
     def query_14_correlacion_precio_stock(self):
         """
         14. Calcular la correlación entre el precio de los productos y su cantidad_stock 
@@ -402,186 +451,54 @@ class MongoDBCRUDQueriesPart3:
         print("\n📊 CONSULTA 14: Correlación precio-stock y análisis tendencias")
         print("="*60)
         
-        # Como no tenemos stock real, simularemos con datos de ventas
-        pipeline_productos_ventas = [
-            {
-                "$unwind": "$items"
-            },
-            {
-                "$group": {
-                    "_id": "$items.product_id",
-                    "categoria": {"$first": "$items.product_info.product_category_name_normalized"},
-                    "precio_promedio": {"$avg": "$items.price"},
-                    "total_vendido": {"$sum": 1},
-                    "total_ingresos": {"$sum": "$items.total_item_value"},
-                    "meses_activo": {"$addToSet": {
-                        "$dateToString": {
-                            "format": "%Y-%m",
-                            "date": "$order_info.order_purchase_timestamp"
-                        }
-                    }},
-                    "primer_venta": {"$min": "$order_info.order_purchase_timestamp"},
-                    "ultima_venta": {"$max": "$order_info.order_purchase_timestamp"}
-                }
-            },
-            {
-                "$lookup": {
-                    "from": "products",
-                    "localField": "_id",
-                    "foreignField": "product_id",
-                    "as": "product_info"
-                }
-            },
-            {
-                "$unwind": {
-                    "path": "$product_info",
-                    "preserveNullAndEmptyArrays": True
-                }
-            },
-            {
-                "$project": {
-                    "product_id": "$_id",
-                    "categoria": 1,
-                    "precio_promedio": {"$round": ["$precio_promedio", 2]},
-                    "total_vendido": 1,
-                    "total_ingresos": {"$round": ["$total_ingresos", 2]},
-                    "meses_activo": {"$size": "$meses_activo"},
-                    "primer_venta": 1,
-                    "ultima_venta": 1,
-                    "peso_g": "$product_info.product_weight_g",
-                    "largo_cm": "$product_info.product_length_cm",
-                    "alto_cm": "$product_info.product_height_cm",
-                    "ancho_cm": "$product_info.product_width_cm",
-                    # Simular stock basado en popularidad (inversamente proporcional)
-                    "stock_simulado": {
-                        "$cond": [
-                            {"$gt": ["$total_vendido", 100]},
-                            {"$subtract": [200, "$total_vendido"]},
-                            {"$add": [50, {"$multiply": [{"$subtract": [100, "$total_vendido"]}, 2]}]}
-                        ]
-                    },
-                    "rotacion_mensual": {
-                        "$round": [
-                            {"$divide": [
-                                "$total_vendido", 
-                                {"$cond": [
-                                    {"$eq": [{"$size": "$meses_activo"}, 0]},
-                                    1,
-                                    {"$size": "$meses_activo"}
-                                ]}
-                            ]}, 2
-                        ]
-                    }
-                }
-            },
-            {
-                "$match": {
-                    "stock_simulado": {"$gt": 0}
-                }
-            },
-            {
-                "$sort": {"total_vendido": -1}
-            },
-            {
-                "$limit": 500
+        # Como no tenemos stock real, simularemos con datos de ventas (todo el catálogo vendido)
+        # El cursor se vuelca por bloques a arrays NumPy sin pasar por la caché de listas
+        cursor = self.db.orders.aggregate(product_metrics_pipeline(), allowDiskUse=True, batchSize=10000)
+        analytics = ProductAnalytics.from_cursor(cursor)
+        
+        print(f"Productos analizados: {len(analytics):,}")
+        
+        result = analytics.summary()
+        if len(analytics):
+            pearson = result['pearson']['matrix']
+            spearman = result['spearman']['matrix']
+            correlaciones = {
+                'precio_stock': pearson['precio_promedio']['stock_simulado'],
+                'precio_ventas': pearson['precio_promedio']['total_vendido'],
+                'stock_ventas': pearson['stock_simulado']['total_vendido']
             }
-        ]
-        
-        result = list(self.db.orders.aggregate(pipeline_productos_ventas))
-        
-        print(f"Productos analizados: {len(result)}")
-        
-        if result:
-            # Calcular correlaciones
-            precios = [p['precio_promedio'] for p in result if p['precio_promedio']]
-            stocks = [p['stock_simulado'] for p in result if p['stock_simulado']]
-            ventas = [p['total_vendido'] for p in result]
-            rotaciones = [p['rotacion_mensual'] for p in result]
-            
-            # Correlación simple (no usamos scipy para mantener dependencias mínimas)
-            def correlacion_simple(x, y):
-                n = len(x)
-                if n == 0:
-                    return 0
-                
-                sum_x = sum(x)
-                sum_y = sum(y)
-                sum_xy = sum(x[i] * y[i] for i in range(n))
-                sum_x2 = sum(x[i] ** 2 for i in range(n))
-                sum_y2 = sum(y[i] ** 2 for i in range(n))
-                
-                numerador = n * sum_xy - sum_x * sum_y
-                denominador = ((n * sum_x2 - sum_x ** 2) * (n * sum_y2 - sum_y ** 2)) ** 0.5
-                
-                return numerador / denominador if denominador != 0 else 0
-            
-            corr_precio_stock = correlacion_simple(precios, stocks)
-            corr_precio_ventas = correlacion_simple(precios, ventas)
-            corr_stock_ventas = correlacion_simple(stocks, ventas)
-            
-            print(f"\n📈 ANÁLISIS DE CORRELACIONES:")
-            print(f"  - Precio vs Stock simulado: {corr_precio_stock:.3f}")
-            print(f"  - Precio vs Total vendido: {corr_precio_ventas:.3f}")
-            print(f"  - Stock vs Total vendido: {corr_stock_ventas:.3f}")
-            
-            # Análisis por rangos de precio
-            rangos_precio = {
-                'Bajo (< $50)': [],
-                'Medio ($50-$150)': [],
-                'Alto (> $150)': []
+            correlaciones_rango = {
+                'precio_stock': spearman['precio_promedio']['stock_simulado'],
+                'precio_ventas': spearman['precio_promedio']['total_vendido'],
+                'stock_ventas': spearman['stock_simulado']['total_vendido']
             }
             
-            for producto in result:
-                precio = producto['precio_promedio']
-                if precio < 50:
-                    rangos_precio['Bajo (< $50)'].append(producto)
-                elif precio <= 150:
-                    rangos_precio['Medio ($50-$150)'].append(producto)
-                else:
-                    rangos_precio['Alto (> $150)'].append(producto)
+            print(f"\n📈 ANÁLISIS DE CORRELACIONES ({result['pearson']['n']['precio_promedio']['stock_simulado']:,} productos con precio y stock):")
+            print(f"  - Precio vs Stock simulado: {correlaciones['precio_stock']:.3f} "
+                  f"(Spearman {correlaciones_rango['precio_stock']:.3f})")
+            print(f"  - Precio vs Total vendido: {correlaciones['precio_ventas']:.3f} "
+                  f"(Spearman {correlaciones_rango['precio_ventas']:.3f})")
+            print(f"  - Stock vs Total vendido: {correlaciones['stock_ventas']:.3f} "
+                  f"(Spearman {correlaciones_rango['stock_ventas']:.3f})")
+            print(f"  - Precio vs Peso: {pearson['precio_promedio']['peso_g']:.3f} | "
+                  f"Precio vs Volumen: {pearson['precio_promedio']['volumen_cm3']:.3f}")
             
             print(f"\n💰 ANÁLISIS POR RANGO DE PRECIO:")
-            for rango, productos in rangos_precio.items():
-                if productos:
-                    promedio_stock = sum(p['stock_simulado'] for p in productos) / len(productos)
-                    promedio_rotacion = sum(p['rotacion_mensual'] for p in productos) / len(productos)
-                    print(f"  - {rango}: {len(productos)} productos")
-                    print(f"    Stock promedio: {promedio_stock:.1f}")
-                    print(f"    Rotación mensual: {promedio_rotacion:.2f}")
-            
-            # Análisis de tendencias por categoría
-            categorias_analisis = {}
-            for producto in result[:100]:  # Top 100
-                cat = producto['categoria']
-                if cat not in categorias_analisis:
-                    categorias_analisis[cat] = {
-                        'productos': 0, 'precio_promedio': 0, 'rotacion_promedio': 0,
-                        'stock_promedio': 0, 'ingresos_totales': 0
-                    }
-                
-                categorias_analisis[cat]['productos'] += 1
-                categorias_analisis[cat]['precio_promedio'] += producto['precio_promedio']
-                categorias_analisis[cat]['rotacion_promedio'] += producto['rotacion_mensual']
-                categorias_analisis[cat]['stock_promedio'] += producto['stock_simulado']
-                categorias_analisis[cat]['ingresos_totales'] += producto['total_ingresos']
-            
-            # Calcular promedios
-            for cat, data in categorias_analisis.items():
-                count = data['productos']
-                data['precio_promedio'] = round(data['precio_promedio'] / count, 2)
-                data['rotacion_promedio'] = round(data['rotacion_promedio'] / count, 2)
-                data['stock_promedio'] = round(data['stock_promedio'] / count, 1)
-            
-            print(f"\n🏷️ TENDENCIAS POR CATEGORÍA (Top productos):")
-            cat_sorted = sorted(categorias_analisis.items(), 
-                              key=lambda x: x[1]['ingresos_totales'], reverse=True)
-            
-            for cat, data in cat_sorted[:8]:
+            for rango, data in result['rangos_precio'].items():
+                if data['productos']:
+                    print(f"  - {rango}: {data['productos']:,} productos")
+                    print(f"    Stock promedio: {data['stock_promedio']:.1f}")
+                    print(f"    Rotación mensual: {data['rotacion_promedio']:.2f}")
+            
+            print(f"\n🏷️ TENDENCIAS POR CATEGORÍA (catálogo completo):")
+            for cat, data in result['categorias'].items():
                 print(f"  - {cat}:")
-                print(f"    Productos: {data['productos']} | Precio: ${data['precio_promedio']}")
+                print(f"    Productos: {data['productos']:,} | Precio: ${data['precio_promedio']}")
                 print(f"    Rotación: {data['rotacion_promedio']}/mes | Stock: {data['stock_promedio']}")
                 print(f"    Ingresos: ${data['ingresos_totales']:,.2f}")
             
+            print(f"\n⏱️ Cómputo NumPy: {result['tiempo_numpy_segundos'] * 1000:.1f} ms")
+            
             print(f"\n🔍 INSIGHTS ADICIONALES:")
             print(f"1. Productos de alto precio tienden a tener mayor stock (menor rotación)")
             print(f"2. Correlación negativa precio-ventas sugiere sensibilidad al precio")
@@ -590,24 +507,26 @@ class MongoDBCRUDQueriesPart3:
             
             self.results['query_14'] = {
                 'description': 'Correlación precio-stock y análisis tendencias',
-                'productos_analizados': len(result),
-                'correlaciones': {
-                    'precio_stock': corr_precio_stock,
-                    'precio_ventas': corr_precio_ventas,
-                    'stock_ventas': corr_stock_ventas
-                },
-                'analisis_rangos_precio': {k: len(v) for k, v in rangos_precio.items()},
-                'tendencias_categorias': dict(cat_sorted[:8]),
+                'productos_analizados': result['productos_analizados'],
+                'correlaciones': correlaciones,
+                'correlaciones_spearman': correlaciones_rango,
+                'matriz_correlacion': pearson,
+                'analisis_rangos_precio': {k: v['productos'] for k, v in result['rangos_precio'].items()},
+                'tendencias_categorias': result['categorias'],
+                'tiempo_numpy_segundos': result['tiempo_numpy_segundos'],
                 'insights': 'Productos caros = mayor stock, sensibilidad al precio confirmada'
             }
         
         return result
     
-    def query_15_top_productos_mayor_ventas_optimizado(self):
+    @routed('analitica')
+    def query_15_top_productos_mayor_ventas_optimizado(self, modo_distintos='exacto'):
         """
         15. Los 5 productos con mayor cantidad de ventas en el último trimestre, 
         excluyendo los productos con menos de 10 unidades en stock. Optimización 
         con índices adecuados para grandes volúmenes.
+        Órdenes/clientes distintos: 'exacto' ($group escalonado), 'aproximado' (HyperLogLog)
+        o 'addToSet' (arrays por producto, implementación original).
         """
         print("\n📊 CONSULTA 15: Top 5 productos optimizado con índices")
         print("="*60)
@@ -616,31 +535,25 @@ class MongoDBCRUDQueriesPart3:
         fecha_inicio = datetime(2018, 6, 1)
         fecha_fin = datetime(2018, 8, 31)
         
+        if modo_distintos not in MODOS_DISTINTOS:
+            raise ValueError(f"modo_distintos debe ser uno de {MODOS_DISTINTOS}")
+        
+        # Los arrays $addToSet por producto crecen con los datos hasta el límite de memoria
+        # de la agregación: el modo exacto deduplica con $group escalonado y el aproximado
+        # solo suma en el servidor y estima los distintos con HyperLogLog
+        aproximado = modo_distintos == 'aproximado'
+        etapas_ventas = product_sales_group(fecha_inicio, fecha_fin, None if aproximado else modo_distintos)
+        if modo_distintos == 'addToSet':
+            ordenes_distintas = {"$size": "$ordenes_distintas"}
+            clientes_distintos = {"$size": "$clientes_distintos"}
+            etapas_rollup = self.rollups.product_sales_stages(fecha_inicio, fecha_fin, "$product_id")
+        else:
+            ordenes_distintas = "$ordenes_distintas"
+            clientes_distintos = "$clientes_distintos"
+            etapas_rollup = self.rollups.product_distinct_stages(fecha_inicio, fecha_fin, count_distinct=not aproximado)
+        
         # Pipeline optimizado con índices apropiados
-        pipeline = [
-            {
-                "$match": {
-                    "order_info.order_purchase_timestamp": {
-                        "$gte": fecha_inicio,
-                        "$lte": fecha_fin
-                    }
-                }
-            },
-            {
-                "$unwind": "$items"
-            },
-            {
-                "$group": {
-                    "_id": "$items.product_id",
-                    "nombre_producto": {"$first": "$items.product_info.product_category_name_normalized"},
-                    "cantidad_vendida": {"$sum": 1},
-                    "total_ingresos": {"$sum": "$items.total_item_value"},
-                    "precio_promedio": {"$avg": "$items.price"},
-                    "ordenes_distintas": {"$addToSet": "$order_id"},
-                    "clientes_distintos": {"$addToSet": "$customer.customer_id"},
-                    "freight_promedio": {"$avg": "$items.freight_value"}
-                }
-            },
+        pipeline = etapas_ventas + [
             {
                 "$lookup": {
                     "from": "products",
@@ -662,8 +575,8 @@ class MongoDBCRUDQueriesPart3:
                     "cantidad_vendida": 1,
                     "total_ingresos": {"$round": ["$total_ingresos", 2]},
                     "precio_promedio": {"$round": ["$precio_promedio", 2]},
-                    "ordenes_distintas": {"$size": "$ordenes_distintas"},
-                    "clientes_distintos": {"$size": "$clientes_distintos"},
+                    "ordenes_distintas": ordenes_distintas,
+                    "clientes_distintos": clientes_distintos,
                     "freight_promedio": {"$round": ["$freight_promedio", 2]},
                     "peso_g": "$product_details.product_weight_g",
                     "dimensiones": {
@@ -683,7 +596,7 @@ class MongoDBCRUDQueriesPart3:
                         }
                     },
                     "ingreso_por_unidad": {"$round": [{"$divide": ["$total_ingresos", "$cantidad_vendida"]}, 2]},
-                    "penetracion_mercado": {"$round": [{"$divide": [{"$size": "$clientes_distintos"}, {"$size": "$ordenes_distintas"}]}, 3]}
+                    "penetracion_mercado": {"$round": [{"$divide": [clientes_distintos, ordenes_distintas]}, 3]}
                 }
             },
             {
@@ -699,10 +612,33 @@ class MongoDBCRUDQueriesPart3:
             }
         ]
         
-        result = list(self.db.orders.aggregate(pipeline))
+        result = self.aggregate_sales(
+            pipeline, fecha_inicio, fecha_fin, SALES_BY_PRODUCT_DAY,
+            etapas_rollup + [{"$set": {"nombre_producto": "$categoria"}}],
+            replaced_stages=len(etapas_ventas)
+        )
+        
+        error_estandar = None
+        if aproximado and result:
+            # Sketches solo de los productos del resultado, sobre un cursor en streaming
+            sketches = product_distinct_sketches(
+                self.db, fecha_inicio, fecha_fin, [producto['product_id'] for producto in result]
+            )
+            for producto in result:
+                sketch = sketches.get(producto['product_id'])
+                producto['ordenes_distintas'] = sketch['ordenes'].count() if sketch else 0
+                producto['clientes_distintos'] = sketch['clientes'].count() if sketch else 0
+                producto['penetracion_mercado'] = round(
+                    producto['clientes_distintos'] / producto['ordenes_distintas'], 3
+                ) if producto['ordenes_distintas'] else 0
+            error_estandar = HyperLogLog().standard_error
         
         print(f"Período: {fecha_inicio.strftime('%Y-%m-%d')} a {fecha_fin.strftime('%Y-%m-%d')}")
         print(f"Criterio: Stock simulado ≥ 10 unidades")
+        print(f"Conteo de distintos: {modo_distintos}" + (
+            f" (HyperLogLog, error estándar {error_estandar:.1%}, ±{2 * error_estandar:.1%} al 95%; "
+            f"exacto mientras el sketch es disperso)" if error_estandar else ""
+        ))
         print(f"Top productos encontrados: {len(result)}")
         
         if result:
@@ -768,6 +704,8 @@ class MongoDBCRUDQueriesPart3:
                 'description': 'Top 5 productos mayor ventas optimizado',
                 'periodo': f"{fecha_inicio.isoformat()} a {fecha_fin.isoformat()}",
                 'criterio_stock': 'Stock ≥ 10 unidades',
+                'modo_distintos': modo_distintos,
+                'error_estandar_distintos': error_estandar,
                 'total_ventas_top5': total_ventas,
                 'total_ingresos_top5': total_ingresos,
                 'top_5_productos': result,
@@ -790,6 +728,10 @@ class MongoDBCRUDQueriesPart3:
         
         # Ejecutar consultas 11-15
         try:
+            # Lag de los secundarios mientras corren las consultas (serie temporal del reporte)
+            self.lag_monitor = ReplicationLagMonitor(self.db.client)
+            self.lag_monitor.start()
+            
             self.query_11_total_ventas_por_cliente_ultimo_año()
             self.query_12_productos_mas_vendidos_ultimo_trimestre()
             self.query_13_ventas_por_ciudad_ultimo_mes()
@@ -804,9 +746,7 @@ class MongoDBCRUDQueriesPart3:
             print(f"❌ Error ejecutando consultas: {e}")
         
         finally:
-            if self.client:
-                self.client.close()
-                print(f"\n🔌 Conexión cerrada")
+            close_query_session(self)
     
     def save_results(self, filename='data/processed/crud_results_part3.json'):
         """Guardar resultados"""
@@ -821,6 +761,8 @@ class MongoDBCRUDQueriesPart3:
             json.dump({
                 'execution_date': datetime.now().isoformat(),
                 'total_queries': len(clean_results),
+                'replica_routing': self.routing_report,
+                'replication': self.replication_report,
                 'results': clean_results
             }, f, indent=2, ensure_ascii=False)
         
@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+"""
+Conteo de Distintos con Memoria Acotada (Consulta 15)
+Dataset: Brazilian E-Commerce (MongoDB)
+Órdenes y clientes distintos por producto sin arrays $addToSet: $group escalonado exacto o HyperLogLog
+"""
+
+import hashlib
+import math
+from sales_rollups import PURCHASE_TIMESTAMP, _is_number, _is_string, _average
+
+MODOS_DISTINTOS = ('exacto', 'aproximado', 'addToSet')
+
+def product_sales_group(fecha_inicio, fecha_fin, distinct='addToSet'):
+    """
+    Etapas iniciales de la consulta 15 sobre orders (ventas por producto en el período):
+    - 'addToSet': implementación original, arrays de order_id y customer_id por producto
+    - 'exacto': deduplicación previa con $group (producto, orden) y (producto, cliente);
+      cada grupo guarda una fila por par, nunca un array, y puede volcar a disco
+    - None: solo sumas y promedios (los distintos se estiman aparte con HyperLogLog)
+    """
+    head = [
+        {"$match": {PURCHASE_TIMESTAMP: {"$gte": fecha_inicio, "$lte": fecha_fin}}},
+        {"$unwind": "$items"}
+    ]
+    if distinct == 'addToSet':
+        return head + [{"$group": {
+            "_id": "$items.product_id",
+            "nombre_producto": {"$first": "$items.product_info.product_category_name_normalized"},
+            "cantidad_vendida": {"$sum": 1},
+            "total_ingresos": {"$sum": "$items.total_item_value"},
+            "precio_promedio": {"$avg": "$items.price"},
+            "ordenes_distintas": {"$addToSet": "$order_id"},
+            "clientes_distintos": {"$addToSet": "$customer.customer_id"},
+            "freight_promedio": {"$avg": "$items.freight_value"}
+        }}]
+    
+    item_metrics = {
+        "nombre_producto": {"$first": "$items.product_info.product_category_name_normalized"},
+        "cantidad_vendida": {"$sum": 1},
+        "total_ingresos": {"$sum": "$items.total_item_value"},
+        "precio_suma": {"$sum": "$items.price"},
+        "precio_conteo": {"$sum": _is_number("$items.price")},
+        "freight_suma": {"$sum": "$items.freight_value"},
+        "freight_conteo": {"$sum": _is_number("$items.freight_value")}
+    }
+    rolled_metrics = {
+        name: ({"$first": f"${name}"} if name == "nombre_producto" else {"$sum": f"${name}"})
+        for name in item_metrics
+    }
+    averages = {"$set": {
+        "precio_promedio": _average("$precio_suma", "$precio_conteo"),
+        "freight_promedio": _average("$freight_suma", "$freight_conteo")
+    }}
+    
+    if distinct is None:
+        return head + [{"$group": {"_id": "$items.product_id", **item_metrics}}, averages]
+    
+    return head + [
+        # (producto, orden): una fila por orden; el cliente de la orden viaja con ella
+        {"$group": {
+            "_id": {"product_id": "$items.product_id", "order_id": "$order_id"},
+            "customer_id": {"$first": "$customer.customer_id"},
+            **item_metrics
+        }},
+        # (producto, cliente): cuántas órdenes distintas aporta cada cliente
+        {"$group": {
+            "_id": {"product_id": "$_id.product_id", "customer_id": "$customer_id"},
+            "ordenes": {"$sum": _is_string("$_id.order_id")},
+            **rolled_metrics
+        }},
+        {"$group": {
+            "_id": "$_id.product_id",
+            "ordenes_distintas": {"$sum": "$ordenes"},
+            "clientes_distintos": {"$sum": _is_string("$_id.customer_id")},
+            **rolled_metrics
+        }},
+        averages
+    ]
+
+class HyperLogLog:
+    """
+    Sketch HyperLogLog de 2^precision registros (1 byte cada uno) con hash de 64 bits.
+    Error estándar 1.04/sqrt(m); mientras hay pocos valores guarda los hashes (conteo exacto)
+    y pasa a registros al superar sparse_limit, de modo que la memoria nunca supera ~m bytes
+    """
+    
+    def __init__(self, precision=12, sparse_limit=None):
+        self.precision = precision
+        self.m = 1 << precision
+        self.alpha = 0.7213 / (1 + 1.079 / self.m)
+        self.sparse_limit = sparse_limit if sparse_limit is not None else self.m // 8
+        self.sparse = set()
+        self.registers = None
+    
+    @staticmethod
+    def hash_value(value):
+        """Hash de 64 bits estable entre procesos (hash() de Python se aleatoriza)"""
+        return int.from_bytes(hashlib.blake2b(str(value).encode('utf-8'), digest_size=8).digest(), 'big')
+    
+    @property
+    def standard_error(self):
+        return 1.04 / math.sqrt(self.m)
+    
+    def _add_hash(self, hashed):
+        index = hashed >> (64 - self.precision)
+        remainder = hashed & ((1 << (64 - self.precision)) - 1)
+        rank = (64 - self.precision) - remainder.bit_length() + 1
+        if rank > self.registers[index]:
+            self.registers[index] = rank
+    
+    def _densify(self):
+        self.registers = bytearray(self.m)
+        for hashed in self.sparse:
+            self._add_hash(hashed)
+        self.sparse = None
+    
+    def add(self, value):
+        if value is None:
+            return
+        hashed = self.hash_value(value)
+        if self.registers is None:
+            self.sparse.add(hashed)
+            if len(self.sparse) > self.sparse_limit:
+                self._densify()
+        else:
+            self._add_hash(hashed)
+    
+    def count(self):
+        """Cardinalidad estimada (exacta en modo disperso, corrección de rango bajo con registros vacíos)"""
+        if self.registers is None:
+            return len(self.sparse)
+        
+        estimate = self.alpha * self.m * self.m / sum(2.0 ** -register for register in self.registers)
+        zeros = self.registers.count(0)
+        if estimate <= 2.5 * self.m and zeros:
+            estimate = self.m * math.log(self.m / zeros)
+        return round(estimate)
+    
+    def memory_bytes(self):
+        """Memoria del estado: 8 bytes por hash en modo disperso, m bytes con registros"""
+        return len(self.sparse) * 8 if self.registers is None else self.m
+
+def product_distinct_sketches(db, fecha_inicio, fecha_fin, product_ids=None, precision=12, batch_size=10000):
+    """
+    Sketches de órdenes y clientes distintos por producto sobre un cursor en streaming
+    (una tupla producto/orden/cliente por item; el servidor no acumula nada por grupo)
+    """
+    period = {PURCHASE_TIMESTAMP: {"$gte": fecha_inicio, "$lte": fecha_fin}}
+    if product_ids is not None:
+        period["items.product_id"] = {"$in": list(product_ids)}
+    
+    pipeline = [
+        {"$match": period},
+        {"$project": {"_id": 0, "order_id": 1, "customer_id": "$customer.customer_id", "items.product_id": 1}},
+        {"$unwind": "$items"}
+    ]
+    if product_ids is not None:
+        pipeline.append({"$match": {"items.product_id": {"$in": list(product_ids)}}})
+    
+    sketches = {}
+    for row in db.orders.aggregate(pipeline, batchSize=batch_size):
+        product_id = row['items'].get('product_id')
+        if product_id not in sketches:
+            sketches[product_id] = {'ordenes': HyperLogLog(precision), 'clientes': HyperLogLog(precision)}
+        sketches[product_id]['ordenes'].add(row.get('order_id'))
+        sketches[product_id]['clientes'].add(row.get('customer_id'))
+    return sketches
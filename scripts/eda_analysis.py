@@ -9,6 +9,7 @@ import numpy as np
 from pathlib import Path
 import json
 from datetime import datetime
+from olist_schema import read_olist_csv
 import warnings
 warnings.filterwarnings('ignore')
 
@@ -30,8 +31,8 @@ class EDAAnalyzer:
             print(f"📥 Cargando {filename}...")
             
             try:
-                # Leer con manejo de errores
-                df = pd.read_csv(file_path, low_memory=False)
+                # Leer con el esquema del registro (tipos, categorías y fechas)
+                df = read_olist_csv(file_path)
                 self.datasets[filename] = df
                 print(f"✅ {filename}: {len(df):,} filas, {len(df.columns)} columnas")
                 
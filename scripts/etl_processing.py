@@ -8,13 +8,62 @@ import pandas as pd
 import numpy as np
 from pathlib import Path
 import json
+import argparse
+import io
+import os
+import time
+import resource
+from contextlib import redirect_stdout
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
 from datetime import datetime, timedelta
+from processed_storage import save_processed_frame, PROCESSED_FORMAT
+from city_keys import city_key_series
+from olist_schema import read_olist_csv, iter_olist_csv, restore_categories, find_olist_files, DEFAULT_CHUNK_SIZE
 import warnings
 warnings.filterwarnings('ignore')
 
 class ETLProcessor:
-    def __init__(self, raw_data_path='data/raw', processed_data_path='data/processed'):
+    WATERMARK_FILE = 'etl_watermark.json'
+    # Columna de watermark -> (dataset original, dataset procesado) que la contienen
+    WATERMARK_COLUMNS = {
+        'order_purchase_timestamp': ('olist_orders_dataset.csv', 'orders'),
+        'review_answer_timestamp': ('olist_order_reviews_dataset.csv', 'reviews')
+    }
+    # Etapas del ETL: método, entradas (CSV originales o datasets procesados) y salidas.
+    # Las etapas sin dependencias pendientes se ejecutan en paralelo en un pool de procesos;
+    # los merges (local) corren en el proceso principal, donde ya están sus entradas
+    ETL_STAGES = {
+        'geolocation': {'method': 'clean_geolocation_data', 'inputs': ['olist_geolocation_dataset.csv'], 'outputs': ['geolocation']},
+        'orders': {'method': 'clean_orders_data', 'inputs': ['olist_orders_dataset.csv'], 'outputs': ['orders']},
+        'products': {'method': 'clean_products_data', 'inputs': ['olist_products_dataset.csv'], 'outputs': ['products']},
+        'customers': {'method': 'clean_customers_data', 'inputs': ['olist_customers_dataset.csv'], 'outputs': ['customers']},
+        'sellers': {'method': 'clean_sellers_data', 'inputs': ['olist_sellers_dataset.csv'], 'outputs': ['sellers']},
+        'order_items': {'method': 'clean_order_items_data', 'inputs': ['olist_order_items_dataset.csv'], 'outputs': ['order_items']},
+        'payments': {'method': 'clean_payments_data', 'inputs': ['olist_order_payments_dataset.csv'], 'outputs': ['payments']},
+        'reviews': {'method': 'clean_reviews_data', 'inputs': ['olist_order_reviews_dataset.csv'], 'outputs': ['reviews']},
+        'orders_with_customers': {'method': 'merge_orders_with_customers', 'inputs': ['orders', 'customers'],
+                                  'outputs': ['orders_with_customers'], 'local': True},
+        'items_with_products': {'method': 'merge_items_with_products', 'inputs': ['order_items', 'products'],
+                                'outputs': ['items_with_products'], 'local': True}
+    }
+    
+    # Archivos que no se cargan completos en memoria (~1M filas mayormente duplicadas)
+    STREAMED_FILES = {'olist_geolocation_dataset.csv'}
+    ORDER_KEYED_DATASETS = [
+        'olist_orders_dataset.csv',
+        'olist_order_items_dataset.csv',
+        'olist_order_payments_dataset.csv',
+        'olist_order_reviews_dataset.csv'
+    ]
+    
+    def __init__(self, raw_data_path='data/raw', processed_data_path='data/processed',
+                 chunk_size=DEFAULT_CHUNK_SIZE, processes=None, compact=True):
         self.raw_data_path = Path(raw_data_path)
+        self.chunk_size = chunk_size
+        self.compact = compact
+        # None: un proceso por núcleo; 0: etapas en serie en el proceso principal
+        self.processes = os.cpu_count() if processes is None else processes
+        self.raw_files = {}
         self.processed_data_path = Path(processed_data_path)
         self.processed_data_path.mkdir(parents=True, exist_ok=True)
         self.datasets = {}
@@ -27,19 +76,24 @@ class ETLProcessor:
         }
         
     def load_raw_datasets(self):
-        """Cargar datasets originales"""
+        """Cargar datasets originales con su esquema (tipos, categorías y fechas)"""
         print("📥 CARGANDO DATASETS ORIGINALES...")
         print("="*60)
         
-        csv_files = list(self.raw_data_path.glob('*.csv'))
-        
-        for file_path in csv_files:
-            filename = file_path.name
+        # CSV originales o <nombre>.parquet (salida de synthetic_olist.py --format parquet)
+        for filename, file_path in find_olist_files(self.raw_data_path).items():
+            # Los archivos grandes no se cargan completos: se procesan por bloques en su limpieza
+            if filename in self.STREAMED_FILES:
+                self.raw_files[filename] = file_path
+                print(f"📄 {filename}: se procesará por bloques de {self.chunk_size:,} filas")
+                continue
+            
             print(f"📥 Cargando {filename}...")
             
             try:
-                df = pd.read_csv(file_path, low_memory=False)
+                df = read_olist_csv(file_path)
                 self.datasets[filename] = df
+                self.raw_files[filename] = file_path
                 print(f"✅ {filename}: {len(df):,} filas")
                 
             except Exception as e:
@@ -49,42 +103,55 @@ class ETLProcessor:
         self.etl_report['processing_steps'].append("Carga de datasets originales completada")
     
     def clean_geolocation_data(self):
-        """Limpieza del dataset de geolocalización - eliminar duplicados"""
+        """Limpieza del dataset de geolocalización - eliminar duplicados (por bloques)"""
         print("\n🧹 LIMPIEZA DE DATOS DE GEOLOCALIZACIÓN")
         print("="*60)
         
-        if 'olist_geolocation_dataset.csv' in self.datasets:
-            df = self.datasets['olist_geolocation_dataset.csv'].copy()
-            
-            print(f"📊 Antes de limpieza: {len(df):,} filas")
-            
-            # Eliminar duplicados
-            df_clean = df.drop_duplicates()
-            
-            print(f"📊 Después de limpieza: {len(df_clean):,} filas")
-            print(f"🗑️ Duplicados eliminados: {len(df) - len(df_clean):,}")
+        filename = 'olist_geolocation_dataset.csv'
+        if filename in self.datasets:
+            chunks = [self.datasets[filename]]
+        elif filename in self.raw_files:
+            chunks = iter_olist_csv(self.raw_files[filename], self.chunk_size)
+        else:
+            return
+        
+        # Deduplicación entre bloques por hash de fila; cada fila única se valida una vez
+        seen_hashes = np.array([], dtype=np.uint64)
+        clean_chunks = []
+        original_rows = unique_rows = invalid_rows = 0
+        
+        for chunk in chunks:
+            original_rows += len(chunk)
+            chunk = chunk.drop_duplicates()
+            
+            row_hashes = pd.util.hash_pandas_object(chunk, index=False).to_numpy()
+            is_new = ~np.isin(row_hashes, seen_hashes)
+            chunk = chunk[is_new]
+            seen_hashes = np.concatenate([seen_hashes, row_hashes[is_new]])
+            unique_rows += len(chunk)
             
             # Validar códigos postales brasileños (deben ser 5 dígitos)
-            invalid_zipcodes = df_clean[
-                (df_clean['geolocation_zip_code_prefix'] < 10000) | 
-                (df_clean['geolocation_zip_code_prefix'] > 99999)
-            ]
-            
-            if len(invalid_zipcodes) > 0:
-                print(f"⚠️ Códigos postales inválidos encontrados: {len(invalid_zipcodes)}")
-                df_clean = df_clean[
-                    (df_clean['geolocation_zip_code_prefix'] >= 10000) & 
-                    (df_clean['geolocation_zip_code_prefix'] <= 99999)
-                ]
-                print(f"📊 Después de validación: {len(df_clean):,} filas")
-            
-            self.processed_datasets['geolocation'] = df_clean
-            self.etl_report['data_quality_improvements']['geolocation'] = {
-                'original_rows': len(df),
-                'final_rows': len(df_clean),
-                'duplicates_removed': len(df) - len(df_clean),
-                'invalid_zipcodes_removed': len(invalid_zipcodes) if len(invalid_zipcodes) > 0 else 0
-            }
+            valid = (chunk['geolocation_zip_code_prefix'] >= 10000) & (chunk['geolocation_zip_code_prefix'] <= 99999)
+            invalid_rows += int((~valid).sum())
+            clean_chunks.append(chunk[valid])
+        
+        df_clean = restore_categories(pd.concat(clean_chunks, ignore_index=True), filename)
+        
+        print(f"📊 Antes de limpieza: {original_rows:,} filas")
+        print(f"📊 Después de limpieza: {unique_rows:,} filas")
+        print(f"🗑️ Duplicados eliminados: {original_rows - unique_rows:,}")
+        
+        if invalid_rows > 0:
+            print(f"⚠️ Códigos postales inválidos encontrados: {invalid_rows}")
+            print(f"📊 Después de validación: {len(df_clean):,} filas")
+        
+        self.processed_datasets['geolocation'] = df_clean
+        self.etl_report['data_quality_improvements']['geolocation'] = {
+            'original_rows': original_rows,
+            'final_rows': len(df_clean),
+            'duplicates_removed': original_rows - len(df_clean),
+            'invalid_zipcodes_removed': invalid_rows
+        }
     
     def clean_orders_data(self):
         """Limpieza y transformación del dataset de órdenes"""
@@ -219,6 +286,8 @@ class ETLProcessor:
             # Normalizar nombres de ciudades y estados
             df['customer_city_normalized'] = df['customer_city'].str.title()
             df['customer_state_normalized'] = df['customer_state'].str.upper()
+            # Clave indexable sin acentos para búsquedas exactas o por prefijo
+            df['customer_city_key'] = city_key_series(df['customer_city'])
             
             # Crear región geográfica
             region_mapping = {
@@ -241,7 +310,7 @@ class ETLProcessor:
                 'original_rows': len(self.datasets['olist_customers_dataset.csv']),
                 'final_rows': len(df),
                 'invalid_zipcodes_removed': len(invalid_zipcodes) if len(invalid_zipcodes) > 0 else 0,
-                'new_dimensions_added': 3
+                'new_dimensions_added': 4
             }
     
     def clean_sellers_data(self):
@@ -270,6 +339,8 @@ class ETLProcessor:
             # Normalizar nombres de ciudades y estados
             df['seller_city_normalized'] = df['seller_city'].str.title()
             df['seller_state_normalized'] = df['seller_state'].str.upper()
+            # Clave indexable sin acentos para búsquedas exactas o por prefijo
+            df['seller_city_key'] = city_key_series(df['seller_city'])
             
             # Crear región geográfica (usar el mismo mapping que customers)
             region_mapping = {
@@ -292,7 +363,7 @@ class ETLProcessor:
                 'original_rows': len(self.datasets['olist_sellers_dataset.csv']),
                 'final_rows': len(df),
                 'invalid_zipcodes_removed': len(invalid_zipcodes) if len(invalid_zipcodes) > 0 else 0,
-                'new_dimensions_added': 3
+                'new_dimensions_added': 4
             }
     
     def clean_order_items_data(self):
@@ -434,27 +505,24 @@ class ETLProcessor:
                 'new_dimensions_added': 4
             }
     
-    def create_aggregated_datasets(self):
-        """Crear datasets agregados para análisis"""
-        print("\n📊 CREANDO DATASETS AGREGADOS")
-        print("="*60)
-        
-        # Agregar datos de clientes a órdenes
+    def merge_orders_with_customers(self):
+        """Agregar datos de clientes a órdenes"""
         if 'orders' in self.processed_datasets and 'customers' in self.processed_datasets:
             orders_df = self.processed_datasets['orders']
             customers_df = self.processed_datasets['customers']
             
             # Merge orders con customers
             orders_with_customers = orders_df.merge(
-                customers_df[['customer_id', 'customer_city_normalized', 'customer_state_normalized', 'customer_region']],
+                customers_df[['customer_id', 'customer_city_normalized', 'customer_city_key', 'customer_state_normalized', 'customer_region']],
                 on='customer_id',
                 how='left'
             )
             
             self.processed_datasets['orders_with_customers'] = orders_with_customers
             print(f"✅ Orders con datos de clientes: {len(orders_with_customers):,} filas")
-        
-        # Agregar datos de productos a items
+    
+    def merge_items_with_products(self):
+        """Agregar datos de productos a items"""
         if 'order_items' in self.processed_datasets and 'products' in self.processed_datasets:
             items_df = self.processed_datasets['order_items']
             products_df = self.processed_datasets['products']
@@ -469,15 +537,206 @@ class ETLProcessor:
             self.processed_datasets['items_with_products'] = items_with_products
             print(f"✅ Items con datos de productos: {len(items_with_products):,} filas")
     
-    def save_processed_datasets(self):
-        """Guardar datasets procesados"""
+    @staticmethod
+    def compact_frame(df):
+        """
+        Reducir la memoria de un dataset procesado sin cambiar sus valores:
+        texto repetido (incluidos IDs en tablas hijas) -> category, enteros -> int8/16/32,
+        flotantes -> float32 solo si todos sus valores se representan exactamente
+        """
+        df = df.copy()
+        converted = {}
+        
+        for column in df.columns:
+            series = df[column]
+            dtype = series.dtype
+            
+            if (isinstance(dtype, pd.CategoricalDtype) or pd.api.types.is_bool_dtype(dtype)
+                    or pd.api.types.is_datetime64_any_dtype(dtype)):
+                continue
+            
+            if pd.api.types.is_integer_dtype(dtype):
+                compacted = pd.to_numeric(series, downcast='integer')
+            elif pd.api.types.is_float_dtype(dtype):
+                as_float32 = series.astype('float32')
+                # Montos como 12.34 no son exactos en float32: se mantienen en float64
+                lossless = np.array_equal(as_float32.to_numpy(dtype='float64'), series.to_numpy(dtype='float64'), equal_nan=True)
+                compacted = as_float32 if lossless else series
+            elif pd.api.types.is_object_dtype(dtype) or pd.api.types.is_string_dtype(dtype):
+                # Codificación por diccionario solo si ocupa menos que el texto repetido
+                as_category = series.astype('category')
+                smaller = as_category.memory_usage(deep=True) < series.memory_usage(deep=True)
+                compacted = as_category if smaller else series
+            else:
+                continue
+            
+            if compacted.dtype != dtype:
+                df[column] = compacted
+                converted[column] = f"{dtype} -> {compacted.dtype}"
+        
+        return df, converted
+    
+    def compact_outputs(self, names):
+        """Aplicar compact_frame a los datasets indicados y medir la memoria antes/después"""
+        report = {}
+        for name in names:
+            if name not in self.processed_datasets:
+                continue
+            
+            df = self.processed_datasets[name]
+            before_mb = df.memory_usage(deep=True).sum() / 1024**2
+            df, converted = self.compact_frame(df)
+            after_mb = df.memory_usage(deep=True).sum() / 1024**2
+            
+            self.processed_datasets[name] = df
+            report[name] = {
+                'before_mb': before_mb,
+                'after_mb': after_mb,
+                'reduction_percentage': (1 - after_mb / before_mb) * 100 if before_mb else 0,
+                'columns_converted': converted
+            }
+            print(f"🗜️ {name}: {before_mb:.2f} MB -> {after_mb:.2f} MB ({len(converted)} columnas compactadas)")
+        
+        return report
+    
+    def discover_raw_files(self):
+        """Registrar los archivos originales (CSV o Parquet) sin cargarlos (cada etapa lee el suyo)"""
+        for filename, file_path in find_olist_files(self.raw_data_path).items():
+            self.raw_files.setdefault(filename, file_path)
+    
+    def stage_inputs(self, stage_name):
+        """Entradas de una etapa: DataFrame si ya está en memoria, ruta del CSV original si no"""
+        inputs = {}
+        for name in self.ETL_STAGES[stage_name]['inputs']:
+            if name in self.datasets:
+                inputs[name] = self.datasets[name]
+            elif name in self.processed_datasets:
+                inputs[name] = self.processed_datasets[name]
+            elif name in self.raw_files:
+                inputs[name] = self.raw_files[name]
+        return inputs
+    
+    def execute_stage(self, stage_name, inputs):
+        """Ejecutar una etapa midiendo tiempo y memoria; devuelve sus salidas y su log"""
+        stage = self.ETL_STAGES[stage_name]
+        log = io.StringIO()
+        
+        # ru_maxrss es el pico de toda la vida del proceso (en KB en Linux): la etapa se mide
+        # por cuánto lo eleva, no por su valor absoluto (en serie o en un worker ya usado)
+        peak_rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        start_time = time.perf_counter()
+        with redirect_stdout(log):
+            for name, value in inputs.items():
+                if isinstance(value, Path):
+                    self.raw_files[name] = value
+                    if name not in self.STREAMED_FILES:
+                        self.datasets[name] = read_olist_csv(value)
+                elif name.endswith('.csv'):
+                    self.datasets[name] = value
+                else:
+                    self.processed_datasets[name] = value
+            
+            getattr(self, stage['method'])()
+            compaction = self.compact_outputs(stage['outputs']) if self.compact else {}
+        wall_time = time.perf_counter() - start_time
+        peak_rss_after = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        
+        outputs = {name: self.processed_datasets[name] for name in stage['outputs'] if name in self.processed_datasets}
+        return {
+            'outputs': outputs,
+            'quality': {
+                name: self.etl_report['data_quality_improvements'][name]
+                for name in stage['outputs'] if name in self.etl_report['data_quality_improvements']
+            },
+            'compaction': compaction,
+            'log': log.getvalue(),
+            'wall_seconds': wall_time,
+            'output_memory_mb': sum(df.memory_usage(deep=True).sum() for df in outputs.values()) / 1024**2,
+            'peak_rss_growth_mb': (peak_rss_after - peak_rss_before) / 1024,
+            'process_lifetime_peak_rss_mb': peak_rss_after / 1024,
+            'pid': os.getpid()
+        }
+    
+    def run_stages(self, stage_names=None):
+        """Ejecutar las etapas en orden de dependencias, en paralelo cuando sus entradas están listas"""
+        stage_names = list(stage_names or self.ETL_STAGES)
+        producers = {output: name for name in stage_names for output in self.ETL_STAGES[name]['outputs']}
+        dependencies = {
+            name: {producers[i] for i in self.ETL_STAGES[name]['inputs'] if i in producers}
+            for name in stage_names
+        }
+        
+        # Con un solo proceso disponible el pool solo añade serialización: se ejecuta en serie
+        workers = min(self.processes, len(stage_names))
+        workers = workers if workers > 1 else 0
+        print(f"\n⚙️ EJECUTANDO {len(stage_names)} ETAPAS ({workers} procesos)" if workers
+              else f"\n⚙️ EJECUTANDO {len(stage_names)} ETAPAS (en serie)")
+        print("="*60)
+        
+        pending = list(stage_names)
+        completed = set()
+        running = {}
+        executor = ProcessPoolExecutor(max_workers=workers) if workers else None
+        
+        try:
+            while pending or running:
+                for stage_name in [name for name in pending if dependencies[name] <= completed]:
+                    pending.remove(stage_name)
+                    args = (stage_name, self.stage_inputs(stage_name), self.raw_data_path,
+                            self.processed_data_path, self.chunk_size, self.compact)
+                    
+                    if executor is None or self.ETL_STAGES[stage_name].get('local'):
+                        self.record_stage(stage_name, run_etl_stage(*args))
+                        completed.add(stage_name)
+                    else:
+                        running[executor.submit(run_etl_stage, *args)] = stage_name
+                
+                if running:
+                    finished, _ = wait(running, return_when=FIRST_COMPLETED)
+                    for future in finished:
+                        stage_name = running.pop(future)
+                        self.record_stage(stage_name, future.result())
+                        completed.add(stage_name)
+                elif pending and not any(dependencies[name] <= completed for name in pending):
+                    raise RuntimeError(f"Etapas con dependencias sin resolver: {pending}")
+        finally:
+            if executor is not None:
+                executor.shutdown()
+    
+    def record_stage(self, stage_name, result):
+        """Incorporar las salidas de una etapa terminada y registrar tiempo y memoria"""
+        print(result['log'], end='')
+        self.processed_datasets.update(result['outputs'])
+        self.etl_report['data_quality_improvements'].update(result['quality'])
+        self.etl_report.setdefault('memory_compaction', {}).update(result['compaction'])
+        
+        self.etl_report.setdefault('stage_metrics', {})[stage_name] = {
+            'wall_seconds': result['wall_seconds'],
+            'output_memory_mb': result['output_memory_mb'],
+            'peak_rss_growth_mb': result['peak_rss_growth_mb'],
+            'process_lifetime_peak_rss_mb': result['process_lifetime_peak_rss_mb'],
+            'pid': result['pid']
+        }
+        
+        step = (f"Etapa {stage_name}: {result['wall_seconds']:.2f}s, salida {result['output_memory_mb']:.1f} MB, "
+                f"pico RSS +{result['peak_rss_growth_mb']:.0f} MB "
+                f"(pico del proceso {result['pid']} desde su inicio: {result['process_lifetime_peak_rss_mb']:.0f} MB)")
+        self.etl_report['processing_steps'].append(step)
+        print(f"⏱️ {step}")
+    
+    def save_processed_datasets(self, output_dir=None):
+        """Guardar datasets procesados (en output_dir para las ejecuciones incrementales)"""
         print("\n💾 GUARDANDO DATASETS PROCESADOS")
         print("="*60)
         
+        output_dir = Path(output_dir) if output_dir else self.processed_data_path
+        output_dir.mkdir(parents=True, exist_ok=True)
+        print(f"📦 Formato: {PROCESSED_FORMAT}")
+        self.etl_report['processed_format'] = PROCESSED_FORMAT
+        
         for name, df in self.processed_datasets.items():
-            output_path = self.processed_data_path / f"{name}.csv"
-            df.to_csv(output_path, index=False)
-            print(f"💾 {name}.csv: {len(df):,} filas guardadas")
+            output_path = save_processed_frame(df, output_dir, name)
+            print(f"💾 {output_path.name}: {len(df):,} filas guardadas")
         
         # Guardar reporte ETL
         self.etl_report['end_time'] = datetime.now().isoformat()
@@ -503,7 +762,7 @@ class ETLProcessor:
         
         clean_report = clean_for_json(self.etl_report)
         
-        report_path = self.processed_data_path / 'etl_report.json'
+        report_path = output_dir / 'etl_report.json'
         with open(report_path, 'w', encoding='utf-8') as f:
             json.dump(clean_report, f, indent=2, ensure_ascii=False)
         
@@ -530,8 +789,19 @@ class ETLProcessor:
         print(f"📊 Total filas: {total_rows:,}")
         print(f"📊 Memoria total: {total_memory:.2f} MB")
         
+        compaction = self.etl_report.get('memory_compaction', {})
+        if compaction:
+            before_total = sum(report['before_mb'] for report in compaction.values())
+            after_total = sum(report['after_mb'] for report in compaction.values())
+            print(f"🗜️ Memoria antes/después de compactar: {before_total:.2f} MB -> {after_total:.2f} MB")
+        
         for name, stat in stats.items():
-            print(f"  • {name}: {stat['rows']:,} filas, {stat['columns']} columnas, {stat['memory_mb']:.2f} MB")
+            if name in compaction:
+                stat['memory_before_compaction_mb'] = compaction[name]['before_mb']
+                print(f"  • {name}: {stat['rows']:,} filas, {stat['columns']} columnas, "
+                      f"{compaction[name]['before_mb']:.2f} MB -> {stat['memory_mb']:.2f} MB")
+            else:
+                print(f"  • {name}: {stat['rows']:,} filas, {stat['columns']} columnas, {stat['memory_mb']:.2f} MB")
         
         self.etl_report['final_statistics'] = {
             'total_datasets': len(self.processed_datasets),
@@ -540,32 +810,133 @@ class ETLProcessor:
             'dataset_details': stats
         }
     
+    def compute_watermark(self):
+        """Máximo de cada columna de watermark (datasets originales cargados o procesados)"""
+        watermark = {}
+        for column, (filename, processed_name) in self.WATERMARK_COLUMNS.items():
+            # En el ETL por etapas los originales solo se leen dentro de cada etapa
+            df = self.datasets.get(filename)
+            if df is None:
+                df = self.processed_datasets.get(processed_name)
+            if df is not None:
+                max_value = pd.to_datetime(df[column], errors='coerce').max()
+                watermark[column] = max_value.isoformat() if pd.notna(max_value) else None
+        return watermark
+    
+    def load_watermark(self):
+        """Leer el watermark de la última ejecución (None si nunca se ejecutó el ETL)"""
+        watermark_path = self.processed_data_path / self.WATERMARK_FILE
+        if not watermark_path.exists():
+            return None
+        
+        with open(watermark_path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    
+    def save_watermark(self, watermark):
+        """Persistir el watermark tras guardar los datasets procesados"""
+        watermark_path = self.processed_data_path / self.WATERMARK_FILE
+        with open(watermark_path, 'w', encoding='utf-8') as f:
+            json.dump({**watermark, 'updated_at': datetime.now().isoformat()}, f, indent=2)
+        
+        print(f"🔖 Watermark guardado: {watermark}")
+    
+    def select_incremental_rows(self, watermark):
+        """Reducir los datasets originales a las órdenes nuevas o con reviews respondidas tras el watermark"""
+        print("\n🔎 SELECCIONANDO FILAS NUEVAS O MODIFICADAS")
+        print("="*60)
+        
+        affected_ids = pd.Index([])
+        for column, (filename, _) in self.WATERMARK_COLUMNS.items():
+            if filename not in self.datasets:
+                continue
+            
+            df = self.datasets[filename]
+            values = pd.to_datetime(df[column], errors='coerce')
+            mask = values.notna()
+            if watermark.get(column):
+                mask &= values > pd.Timestamp(watermark[column])
+            
+            changed_ids = pd.Index(df.loc[mask, 'order_id'].unique())
+            print(f"📌 {column} > {watermark.get(column)}: {len(changed_ids):,} órdenes")
+            affected_ids = affected_ids.union(changed_ids)
+        
+        # Datasets por order_id: solo las filas de las órdenes afectadas
+        for filename in self.ORDER_KEYED_DATASETS:
+            if filename in self.datasets:
+                df = self.datasets[filename]
+                self.datasets[filename] = df[df['order_id'].isin(affected_ids)]
+        
+        # Dimensiones referenciadas por las órdenes afectadas
+        orders_df = self.datasets.get('olist_orders_dataset.csv')
+        items_df = self.datasets.get('olist_order_items_dataset.csv')
+        references = {
+            'olist_customers_dataset.csv': ('customer_id', orders_df),
+            'olist_products_dataset.csv': ('product_id', items_df),
+            'olist_sellers_dataset.csv': ('seller_id', items_df)
+        }
+        for filename, (key, source_df) in references.items():
+            if filename in self.datasets and source_df is not None:
+                df = self.datasets[filename]
+                self.datasets[filename] = df[df[key].isin(source_df[key])]
+        
+        # La geolocalización no forma parte de los documentos cargados
+        self.datasets.pop('olist_geolocation_dataset.csv', None)
+        
+        for filename, df in self.datasets.items():
+            print(f"  • {filename}: {len(df):,} filas a transformar")
+        
+        self.etl_report['processing_steps'].append(f"Selección incremental: {len(affected_ids):,} órdenes afectadas")
+        return affected_ids
+    
+    def run_incremental_etl(self):
+        """
+        Ejecutar ETL incremental: solo las órdenes posteriores al watermark
+        (order_purchase_timestamp / review_answer_timestamp) se transforman y se
+        escriben en data/processed/delta/ para MongoDBDataLoader.run_incremental_load
+        """
+        print("🎯 PROCESO ETL INCREMENTAL - DATASET BRAZILIAN E-COMMERCE")
+        print("="*80)
+        
+        watermark = self.load_watermark()
+        if watermark is None:
+            print("ℹ️ Sin watermark previo: se ejecuta el ETL completo")
+            self.run_full_etl()
+            return
+        
+        self.load_raw_datasets()
+        new_watermark = self.compute_watermark()
+        
+        affected_ids = self.select_incremental_rows(watermark)
+        if len(affected_ids) == 0:
+            print("\n✅ Sin órdenes nuevas ni modificadas desde el último watermark")
+            return
+        
+        # Mismas etapas que el ETL completo (salvo geolocalización), sobre el subconjunto
+        self.run_stages([name for name in self.ETL_STAGES if name != 'geolocation'])
+        self.generate_final_statistics()
+        self.save_processed_datasets(self.processed_data_path / 'delta')
+        self.save_watermark(new_watermark)
+        
+        print("\n✅ PROCESO ETL INCREMENTAL COMPLETADO")
+        print("📝 Próximo paso: MongoDBDataLoader.run_incremental_load()")
+    
     def run_full_etl(self):
         """Ejecutar proceso ETL completo"""
         print("🎯 PROCESO ETL COMPLETO - DATASET BRAZILIAN E-COMMERCE")
         print("="*80)
         
-        # Cargar datos originales
-        self.load_raw_datasets()
-        
-        # Limpiar y transformar cada dataset
-        self.clean_geolocation_data()
-        self.clean_orders_data()
-        self.clean_products_data()
-        self.clean_customers_data()
-        self.clean_sellers_data()
-        self.clean_order_items_data()
-        self.clean_payments_data()
-        self.clean_reviews_data()
+        # Localizar datos originales (cada etapa carga los suyos)
+        self.discover_raw_files()
         
-        # Crear datasets agregados
-        self.create_aggregated_datasets()
+        # Limpiar y transformar cada dataset y crear los agregados (DAG de etapas)
+        self.run_stages()
         
         # Generar estadísticas finales
         self.generate_final_statistics()
         
         # Guardar datasets procesados
         self.save_processed_datasets()
+        self.save_watermark(self.compute_watermark())
         
         print("\n✅ PROCESO ETL COMPLETADO")
         print("📝 Próximos pasos:")
@@ -574,6 +945,21 @@ class ETLProcessor:
         print("   3. Proceder con carga a MongoDB")
         print("   4. Implementar consultas CRUD")
 
+def run_etl_stage(stage_name, inputs, raw_data_path, processed_data_path, chunk_size, compact=True):
+    """Ejecutar una etapa del ETL en un procesador aislado (en un proceso del pool o local)"""
+    processor = ETLProcessor(raw_data_path, processed_data_path, chunk_size=chunk_size, processes=0, compact=compact)
+    return processor.execute_stage(stage_name, inputs)
+
 if __name__ == "__main__":
-    processor = ETLProcessor()
-    processor.run_full_etl()
+    parser = argparse.ArgumentParser(description='Proceso ETL del dataset Brazilian E-Commerce')
+    parser.add_argument('--incremental', action='store_true', help='Procesar solo las órdenes posteriores al watermark')
+    parser.add_argument('--processes', type=int, default=None, help='Procesos para las etapas (0 = en serie)')
+    parser.add_argument('--raw-data-path', default='data/raw', help='CSV originales (o generados por synthetic_olist.py)')
+    parser.add_argument('--processed-data-path', default='data/processed')
+    args = parser.parse_args()
+    
+    processor = ETLProcessor(args.raw_data_path, args.processed_data_path, processes=args.processes)
+    if args.incremental:
+        processor.run_incremental_etl()
+    else:
+        processor.run_full_etl()
@@ -0,0 +1,404 @@
+#!/usr/bin/env python3
+"""
+Arnés de Planes de Ejecución de las 15 Consultas
+Dataset: Brazilian E-Commerce (MongoDB)
+Cada lectura de las consultas pasa por explain("executionStats") y se compara con una línea base JSON:
+falla si una consulta pasa a COLLSCAN o empeora su relación documentos examinados/devueltos
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+from pymongo.collection import Collection
+from mongodb_connection import DEFAULT_MONGODB_URI
+from crud_consultas_mongodb import MongoDBCRUDQueries
+from crud_consultas_mongodb_part2 import MongoDBCRUDQueriesPart2
+from crud_consultas_mongodb_part3 import MongoDBCRUDQueriesPart3
+import warnings
+warnings.filterwarnings('ignore')
+
+DEFAULT_BASELINE = 'data/processed/explain_baseline.json'
+
+# Clase de consultas -> métodos en el orden del caso de estudio
+QUERY_METHODS = (
+    (MongoDBCRUDQueries, (
+        'query_1_ventas_cliente_ultimos_3_meses',
+        'query_2_total_gastado_cliente_agrupado',
+        'query_3_productos_stock_disminuido',
+        'query_4_lectura_nodo_secundario',
+        'query_5_actualizar_precios_rango_fechas'
+    )),
+    (MongoDBCRUDQueriesPart2, (
+        'query_6_actualizar_email_cliente_condicionado',
+        'query_7_actualizar_precios_productos_vendidos',
+        'query_8_eliminar_productos_sin_stock_sin_ventas',
+        'query_9_eliminar_ventas_ciudad_bajo_promedio',
+        'query_10_eliminar_clientes_compras_minimas'
+    )),
+    (MongoDBCRUDQueriesPart3, (
+        'query_11_total_ventas_por_cliente_ultimo_año',
+        'query_12_productos_mas_vendidos_ultimo_trimestre',
+        'query_13_ventas_por_ciudad_ultimo_mes',
+        'query_14_correlacion_precio_stock',
+        'query_15_top_productos_mayor_ventas_optimizado'
+    ))
+)
+
+def query_shape(value):
+    """Forma de un filtro/pipeline: claves y operadores con los valores sustituidos por su tipo"""
+    if isinstance(value, dict):
+        return {key: query_shape(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [query_shape(item) for item in value]
+    if isinstance(value, str) and value.startswith('$'):
+        return value
+    return type(value).__name__
+
+class OperationLog:
+    """Lecturas emitidas por cada consulta, una por forma distinta (los lotes por _id comparten forma)"""
+    
+    def __init__(self):
+        self.current = None
+        self.operations = {}
+        self.shapes = set()
+    
+    def record(self, kind, collection_name, command):
+        shape = json.dumps([self.current, kind, collection_name, query_shape(command)], sort_keys=True, default=str)
+        if self.current is None or shape in self.shapes:
+            return None
+        self.shapes.add(shape)
+        operation = {'kind': kind, 'collection': collection_name, 'command': command}
+        self.operations.setdefault(self.current, []).append(operation)
+        return operation
+
+class _RecordingCursor:
+    """Cursor de find() que anota sort/limit/skip en la operación registrada"""
+    
+    def __init__(self, cursor, operation):
+        self._cursor = cursor
+        self._operation = operation
+    
+    def _chain(self, option, value):
+        if self._operation is not None:
+            self._operation['command'][option] = value
+        return self
+    
+    def sort(self, key_or_list, direction=None):
+        self._cursor = self._cursor.sort(key_or_list, direction)
+        keys = [(key_or_list, direction or 1)] if isinstance(key_or_list, str) else key_or_list
+        return self._chain('sort', dict(keys))
+    
+    def limit(self, limit):
+        self._cursor = self._cursor.limit(limit)
+        return self._chain('limit', limit)
+    
+    def skip(self, skip):
+        self._cursor = self._cursor.skip(skip)
+        return self._chain('skip', skip)
+    
+    def __iter__(self):
+        return iter(self._cursor)
+    
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+class RecordingCollection:
+    """Colección que registra las lecturas (aggregate, find, count_documents, distinct) antes de ejecutarlas"""
+    
+    def __init__(self, collection, log):
+        self._collection = collection
+        self._log = log
+    
+    def aggregate(self, pipeline, *args, **kwargs):
+        self._log.record('aggregate', self._collection.name, {'pipeline': list(pipeline)})
+        return self._collection.aggregate(pipeline, *args, **kwargs)
+    
+    def find(self, filter=None, projection=None, *args, **kwargs):
+        command = {'filter': filter or {}}
+        if projection is not None:
+            command['projection'] = projection
+        operation = self._log.record('find', self._collection.name, command)
+        return _RecordingCursor(self._collection.find(filter, projection, *args, **kwargs), operation)
+    
+    def find_one(self, filter=None, *args, **kwargs):
+        self._log.record('find', self._collection.name, {'filter': filter or {}, 'limit': 1})
+        return self._collection.find_one(filter, *args, **kwargs)
+    
+    def count_documents(self, filter, *args, **kwargs):
+        # Mismo pipeline que envía el driver para count_documents
+        self._log.record('aggregate', self._collection.name, {'pipeline': [
+            {'$match': filter}, {'$group': {'_id': 1, 'n': {'$sum': 1}}}
+        ]})
+        return self._collection.count_documents(filter, *args, **kwargs)
+    
+    def distinct(self, key, filter=None, *args, **kwargs):
+        self._log.record('distinct', self._collection.name, {'key': key, 'query': filter or {}})
+        return self._collection.distinct(key, filter, *args, **kwargs)
+    
+    def with_options(self, *args, **kwargs):
+        return RecordingCollection(self._collection.with_options(*args, **kwargs), self._log)
+    
+    def __getattr__(self, name):
+        return getattr(self._collection, name)
+
+class RecordingDatabase:
+    """Base de datos que entrega colecciones con registro; el resto de atributos pasa tal cual"""
+    
+    def __init__(self, db, log):
+        self._db = db
+        self._log = log
+    
+    def __getitem__(self, name):
+        return RecordingCollection(self._db[name], self._log)
+    
+    def get_collection(self, name, *args, **kwargs):
+        return RecordingCollection(self._db.get_collection(name, *args, **kwargs), self._log)
+    
+    def __getattr__(self, name):
+        attribute = getattr(self._db, name)
+        return RecordingCollection(attribute, self._log) if isinstance(attribute, Collection) else attribute
+
+def record_query_operations(mongodb_uri=DEFAULT_MONGODB_URI, queries=None, verbose=False):
+    """
+    Ejecutar las consultas (sin caché, sin réplicas y con mutaciones en dry-run) registrando sus lecturas.
+    Devuelve el log y los errores por consulta
+    """
+    log = OperationLog()
+    errors = {}
+    for query_class, methods in QUERY_METHODS:
+        selected = [method for method in methods if queries is None or method.split('_')[1] in queries]
+        if not selected:
+            continue
+        
+        options = {'use_cache': False, 'use_replicas': False}
+        if query_class is not MongoDBCRUDQueriesPart3:
+            options['dry_run'] = True
+        crud = query_class(mongodb_uri, **options)
+        output = io.StringIO()
+        with contextlib.redirect_stdout(sys.stdout if verbose else output):
+            crud.connect_to_mongodb()
+        crud.db = RecordingDatabase(crud.db, log)
+        try:
+            for method in selected:
+                log.current = f"query_{method.split('_')[1]}"
+                try:
+                    with contextlib.redirect_stdout(sys.stdout if verbose else output):
+                        getattr(crud, method)()
+                except Exception as e:
+                    errors[log.current] = f"{type(e).__name__}: {e}"
+                    print(f"⚠️ {log.current}: {errors[log.current]}")
+        finally:
+            log.current = None
+            crud.client.close()
+    return log, errors
+
+def explain_command(operation):
+    """Comando explain de la operación registrada"""
+    command = operation['command']
+    if operation['kind'] == 'aggregate':
+        return {'aggregate': operation['collection'], 'pipeline': command['pipeline'], 'cursor': {}, 'allowDiskUse': True}
+    if operation['kind'] == 'distinct':
+        return {'distinct': operation['collection'], **command}
+    return {'find': operation['collection'], **command}
+
+def _plan_stages(plan):
+    """Recorrer el árbol del plan ganador (también los planes SBE con queryPlan)"""
+    if not isinstance(plan, dict):
+        return
+    plan = plan.get('queryPlan', plan)
+    yield plan
+    for child in ('inputStage', 'outerStage', 'innerStage'):
+        yield from _plan_stages(plan.get(child))
+    for child in plan.get('inputStages', []):
+        yield from _plan_stages(child)
+
+def plan_summary(explain, collection_name):
+    """Plan ganador, índices, COLLSCANs, documentos/claves examinados, devueltos y tiempo de un explain"""
+    stages = explain.get('stages')
+    cursor = stages[0].get('$cursor', {}) if stages else explain
+    planner = cursor.get('queryPlanner', {})
+    execution = cursor.get('executionStats', {})
+    plan = list(_plan_stages(planner.get('winningPlan', {})))
+    
+    collscans = [collection_name] if any(stage.get('stage') == 'COLLSCAN' for stage in plan) else []
+    indexes = sorted({stage['indexName'] for stage in plan if stage.get('indexName')})
+    docs_examined = execution.get('totalDocsExamined', 0)
+    keys_examined = execution.get('totalKeysExamined', 0)
+    
+    for stage in plan:
+        # $lookup empujado al motor SBE: solo IndexedLoopJoin usa índice en la colección foránea
+        if stage.get('stage') == 'EQ_LOOKUP' and stage.get('strategy') != 'IndexedLoopJoin':
+            collscans.append(f"{stage.get('foreignCollection')} ($lookup {stage.get('strategy')})")
+        if stage.get('stage') == 'EQ_LOOKUP' and stage.get('indexName'):
+            indexes.append(stage['indexName'])
+    for stage in stages or []:
+        if '$lookup' in stage:
+            lookup = stage['$lookup']
+            if stage.get('collectionScans'):
+                collscans.append(f"{lookup.get('from')} ($lookup)")
+            indexes.extend(index.get('index', str(index)) if isinstance(index, dict) else index
+                           for index in stage.get('indexesUsed', []))
+            docs_examined += stage.get('totalDocsExamined', 0)
+            keys_examined += stage.get('totalKeysExamined', 0)
+    
+    if stages:
+        returned = stages[-1].get('nReturned', execution.get('nReturned', 0))
+        time_ms = max([execution.get('executionTimeMillis', 0)] +
+                      [stage.get('executionTimeMillisEstimate', 0) for stage in stages])
+    else:
+        returned = execution.get('nReturned', 0)
+        time_ms = execution.get('executionTimeMillis', 0)
+    
+    group_stages = [stage for stage in stages or [] if '$group' in stage]
+    root = plan[0] if plan else {}
+    return {
+        'winning_plan': ' <- '.join(stage.get('stage', '?') for stage in plan) or None,
+        'plan_root': root.get('stage'),
+        'indexes': sorted(set(indexes)),
+        'collscans': collscans,
+        'docs_examined': docs_examined,
+        'keys_examined': keys_examined,
+        'returned': returned,
+        'examined_per_returned': round(max(docs_examined, keys_examined) / max(returned, 1), 3),
+        'execution_time_ms': time_ms,
+        'max_accumulator_bytes': max((sum(stage.get('maxAccumulatorMemoryUsageBytes', {}).values())
+                                      for stage in group_stages), default=None),
+        'used_disk': any(stage.get('usedDisk', False) for stage in stages or [])
+    }
+
+def explain_operations(db, log):
+    """explain("executionStats") de cada lectura registrada, con clave query_N/tipo:colección#orden"""
+    plans = {}
+    for query, operations in log.operations.items():
+        for position, operation in enumerate(operations, 1):
+            key = f"{query}/{operation['kind']}:{operation['collection']}#{position}"
+            last_stage = (operation['command'].get('pipeline') or [{}])[-1]
+            # $out/$merge solo admiten explain en modo queryPlanner
+            verbosity = 'queryPlanner' if ('$out' in last_stage or '$merge' in last_stage) else 'executionStats'
+            start_time = time.perf_counter()
+            try:
+                explain = db.command('explain', explain_command(operation), verbosity=verbosity)
+            except Exception as e:
+                plans[key] = {'error': f"{type(e).__name__}: {e}"}
+                continue
+            plans[key] = plan_summary(explain, operation['collection'])
+            plans[key]['explain_seconds'] = time.perf_counter() - start_time
+            plans[key]['shape'] = query_shape(operation['command'])
+    return plans
+
+def compare_with_baseline(baseline, plans, ratio_tolerance=1.5, min_docs_examined=1000):
+    """
+    Regresiones frente a la línea base: COLLSCAN nuevos y relación examinados/devueltos
+    que crece más de ratio_tolerance (ignorando lecturas de menos de min_docs_examined documentos)
+    """
+    regressions, notes = [], []
+    for key, plan in plans.items():
+        base = baseline.get(key)
+        if base is None:
+            notes.append(f"{key}: sin línea base")
+            continue
+        if 'error' in plan:
+            regressions.append(f"{key}: explain falló ({plan['error']})")
+            continue
+        if 'error' in base:
+            continue
+        if base.get('shape') != plan.get('shape'):
+            notes.append(f"{key}: la forma de la consulta cambió, actualice la línea base")
+        
+        new_collscans = sorted(set(plan['collscans']) - set(base['collscans']))
+        if new_collscans:
+            regressions.append(f"{key}: COLLSCAN nuevo en {', '.join(new_collscans)} "
+                               f"(antes {base['plan_root']} {base['indexes']})")
+        
+        examined = max(plan['docs_examined'], plan['keys_examined'])
+        if (examined >= min_docs_examined and
+                plan['examined_per_returned'] > base['examined_per_returned'] * ratio_tolerance):
+            regressions.append(f"{key}: examinados/devueltos {base['examined_per_returned']:,.1f} -> "
+                               f"{plan['examined_per_returned']:,.1f} ({examined:,} examinados)")
+    for key in sorted(set(baseline) - set(plans)):
+        notes.append(f"{key}: ya no se ejecuta")
+    return regressions, notes
+
+def print_plans(plans):
+    """Tabla resumida de planes por lectura"""
+    print(f"\n📋 PLANES DE EJECUCIÓN ({len(plans)} lecturas):")
+    for key, plan in plans.items():
+        if 'error' in plan:
+            print(f"  ❌ {key}: {plan['error']}")
+            continue
+        marker = '⚠️' if plan['collscans'] else '✅'
+        indexes = ', '.join(plan['indexes']) or 'sin índice'
+        print(f"  {marker} {key}: {plan['plan_root']} [{indexes}] docs {plan['docs_examined']:,}, "
+              f"claves {plan['keys_examined']:,}, devueltos {plan['returned']:,} "
+              f"(ratio {plan['examined_per_returned']:,.1f}), {plan['execution_time_ms']} ms")
+        if plan['collscans']:
+            print(f"      COLLSCAN: {', '.join(plan['collscans'])}")
+
+def run_harness(mongodb_uri=DEFAULT_MONGODB_URI, baseline_path=DEFAULT_BASELINE, update_baseline=False,
+                queries=None, ratio_tolerance=1.5, min_docs_examined=1000, verbose=False):
+    """Registrar, explicar y comparar; devuelve True si no hay regresiones"""
+    print("🎯 ARNÉS DE PLANES DE EJECUCIÓN: CONSULTAS 1-15")
+    print("="*80)
+    
+    log, errors = record_query_operations(mongodb_uri, queries, verbose)
+    crud = MongoDBCRUDQueries(mongodb_uri, use_cache=False, use_replicas=False)
+    with contextlib.redirect_stdout(io.StringIO()):
+        crud.connect_to_mongodb()
+    try:
+        plans = explain_operations(crud.db, log)
+    finally:
+        crud.client.close()
+    print_plans(plans)
+    
+    baseline_file = Path(baseline_path)
+    if update_baseline or not baseline_file.exists():
+        baseline_file.parent.mkdir(parents=True, exist_ok=True)
+        with open(baseline_file, 'w', encoding='utf-8') as f:
+            json.dump({
+                'execution_date': datetime.now().isoformat(),
+                'query_errors': errors,
+                'plans': plans
+            }, f, indent=2, ensure_ascii=False, default=str)
+        print(f"\n📋 Línea base guardada en: {baseline_file}")
+        return True
+    
+    with open(baseline_file, encoding='utf-8') as f:
+        baseline = json.load(f)
+    baseline_plans = baseline['plans']
+    if queries is not None:
+        baseline_plans = {key: plan for key, plan in baseline_plans.items()
+                          if key.split('/')[0].split('_')[1] in queries}
+    # Las formas se comparan tras pasar por JSON (tuplas -> listas)
+    plans = json.loads(json.dumps(plans, default=str))
+    regressions, notes = compare_with_baseline(baseline_plans, plans, ratio_tolerance, min_docs_examined)
+    
+    print(f"\n🔍 COMPARACIÓN CON LÍNEA BASE ({baseline['execution_date']}):")
+    for note in notes:
+        print(f"  ℹ️ {note}")
+    for regression in regressions:
+        print(f"  ❌ {regression}")
+    if not regressions:
+        print(f"  ✅ Sin regresiones en {len(plans)} lecturas")
+    return not regressions
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='explain("executionStats") de las 15 consultas contra una línea base')
+    parser.add_argument('--mongodb-uri', default=DEFAULT_MONGODB_URI)
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE, help='JSON con los planes de referencia')
+    parser.add_argument('--update-baseline', action='store_true', help='Sobrescribir la línea base con esta ejecución')
+    parser.add_argument('--queries', nargs='+', help='Números de consulta a revisar (por defecto todas)')
+    parser.add_argument('--ratio-tolerance', type=float, default=1.5,
+                        help='Factor máximo de crecimiento de examinados/devueltos')
+    parser.add_argument('--min-docs-examined', type=int, default=1000,
+                        help='No evaluar el ratio en lecturas que examinan menos documentos')
+    parser.add_argument('--verbose', action='store_true', help='Mostrar la salida de las consultas')
+    args = parser.parse_args()
+    
+    ok = run_harness(args.mongodb_uri, args.baseline, args.update_baseline, args.queries,
+                     args.ratio_tolerance, args.min_docs_examined, args.verbose)
+    sys.exit(0 if ok else 1)
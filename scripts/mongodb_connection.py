@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+Configuración Compartida de Clientes MongoDB
+Dataset: Brazilian E-Commerce (MongoDB)
+Punto único para crear clientes con un pool de conexiones dimensionado y compresión de red
+"""
+
+from bson.codec_options import CodecOptions
+from bson.raw_bson import RawBSONDocument
+from pymongo import MongoClient
+
+# Compresores de red opcionales: el driver solo negocia zstd/snappy si su librería está instalada
+try:
+    import zstandard  # noqa: F401
+    ZSTD_AVAILABLE = True
+except ImportError:
+    ZSTD_AVAILABLE = False
+try:
+    import snappy  # noqa: F401
+    SNAPPY_AVAILABLE = True
+except ImportError:
+    SNAPPY_AVAILABLE = False
+
+DEFAULT_MONGODB_URI = 'mongodb://localhost:27020/'
+DATABASE_NAME = 'brazilian_ecommerce'
+# Replica set de docker/docker-compose.yml: primario y dos secundarios publicados en el host
+REPLICA_SET_NAME = 'rs0'
+REPLICA_SET_SEEDS = ['localhost:27020', 'localhost:27021', 'localhost:27022']
+# Documentos de control (estado de rollups, versión de datos) fuera de las colecciones de negocio
+METADATA_COLLECTION = '_metadata'
+# Orden de preferencia ofrecido al servidor (mongod 6.0 acepta snappy, zstd y zlib por defecto)
+WIRE_COMPRESSORS = tuple(
+    name for name, available in (('zstd', ZSTD_AVAILABLE), ('snappy', SNAPPY_AVAILABLE), ('zlib', True)) if available
+)
+# Resultados sin decodificar: cada documento se decodifica al acceder a él (o se vuelca tal cual a JSON)
+RAW_BSON_OPTIONS = CodecOptions(document_class=RawBSONDocument)
+
+def create_mongo_client(mongodb_uri=DEFAULT_MONGODB_URI, max_pool_size=100, compressors=WIRE_COMPRESSORS, **options):
+    """
+    Crear un cliente MongoDB compartible entre hilos.
+    MongoClient es thread-safe: un solo cliente con maxPoolSize suficiente
+    sirve a todos los hilos de carga sin abrir conexiones por hilo.
+    compressors: compresores de red a negociar (vacío: sin compresión; la URI tiene prioridad)
+    """
+    # Con una lista semilla de replica set el driver descubre la topología;
+    # con un único host se conecta directamente al nodo (primario en el puerto 27020)
+    direct_connection = 'replicaSet=' not in mongodb_uri
+    
+    client_options = {
+        'directConnection': direct_connection,
+        'serverSelectionTimeoutMS': 5000,
+        'maxPoolSize': max_pool_size
+    }
+    if compressors and 'compressors=' not in mongodb_uri:
+        client_options['compressors'] = list(compressors)
+    client_options.update(options)
+    
+    return MongoClient(mongodb_uri, **client_options)
+
+def close_query_session(queries):
+    """
+    Cierre común de las clases de consultas CRUD (partes 1-3): detener el monitor de replicación,
+    resumir replicación, caché y enrutado, y cerrar las conexiones. Tolera un arranque a medias
+    (monitor, router o cliente que no llegaron a crearse)
+    """
+    if queries.lag_monitor is not None:
+        queries.lag_monitor.stop()
+        queries.lag_monitor.print_summary()
+        queries.replication_report = queries.lag_monitor.report()
+    if queries.cache:
+        queries.cache.print_stats()
+    if queries.router:
+        queries.router.print_member_stats()
+        queries.routing_report = queries.router.report()
+        queries.router.close()
+        print(f"\n🔌 Conexiones al replica set cerradas")
+    if queries.client:
+        queries.client.close()
+        print(f"\n🔌 Conexión cerrada")
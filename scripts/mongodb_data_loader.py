@@ -8,18 +8,65 @@ Transforma CSV a documentos JSON y los carga a MongoDB
 import pandas as pd
 import numpy as np
 import json
+import argparse
 from pathlib import Path
 from datetime import datetime
 import warnings
-from pymongo import MongoClient
-from pymongo.errors import BulkWriteError, DuplicateKeyError
+from pymongo import IndexModel, UpdateOne, ASCENDING
+from pymongo.errors import BulkWriteError, DuplicateKeyError, WTimeoutError
+from pymongo.read_concern import ReadConcern
+from pymongo.write_concern import WriteConcern
 import time
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from order_document_builder import OrderDocumentBuilder
+from mongodb_connection import create_mongo_client, DATABASE_NAME, METADATA_COLLECTION
+from mongodb_structure_design import MongoDBStructureDesigner
+from processed_storage import list_processed_files, read_processed_frame
+from city_keys import city_key_series
+from sales_rollups import SalesRollups, ROLLUP_STATUS_ID
+from query_cache import bump_data_version
+from replication_monitor import ReplicationLagMonitor
 warnings.filterwarnings('ignore')
 
+# Perfiles de escritura: write concern de cada lote y si la carga se cierra con una barrera majority
+WRITE_PROFILES = {
+    'fast': {'write_concern': WriteConcern(w=1, j=False), 'barrier': True},
+    'safe': {'write_concern': WriteConcern(w='majority', wtimeout=60000), 'barrier': False}
+}
+# Una escritura majority + journal confirma también todo lo anterior en el oplog
+BARRIER_WRITE_CONCERN = WriteConcern(w='majority', j=True, wtimeout=600000)
+LOAD_BARRIER_ID = 'load_barrier'
+
 class MongoDBDataLoader:
-    def __init__(self, processed_data_path='data/processed', mongodb_uri='mongodb://localhost:27020/'):
+    COLLECTIONS = ['products', 'customers', 'sellers', 'orders']
+    
+    def __init__(self, processed_data_path='data/processed', mongodb_uri='mongodb://localhost:27020/',
+                 streaming=True, batch_size=5000, insert_workers=4, max_pending_batches=8,
+                 parallel_load=True, build_processes=0, max_pool_size=None, database_name=DATABASE_NAME,
+                 max_replication_lag_seconds=None, lag_sample_seconds=5.0, write_profile='safe',
+                 max_replication_wait_seconds=600):
         self.processed_data_path = Path(processed_data_path)
         self.mongodb_uri = mongodb_uri
+        self.database_name = database_name
+        self.streaming = streaming
+        self.batch_size = batch_size
+        self.insert_workers = insert_workers
+        self.max_pending_batches = max_pending_batches
+        self.parallel_load = parallel_load
+        self.build_processes = build_processes
+        if write_profile not in WRITE_PROFILES:
+            raise ValueError(f"Perfil de escritura desconocido: {write_profile} (opciones: {', '.join(WRITE_PROFILES)})")
+        self.write_profile = write_profile
+        # Con un umbral, el productor de orders se detiene mientras algún secundario lo supere
+        self.max_replication_lag_seconds = max_replication_lag_seconds
+        self.lag_sample_seconds = lag_sample_seconds
+        # Pausa máxima seguida por lag: superada, la carga se detiene en lugar de esperar indefinidamente
+        self.max_replication_wait_seconds = max_replication_wait_seconds
+        self.lag_monitor = None
+        # Pool compartido: una conexión por colección cargada en paralelo + hilos de inserción de orders
+        self.max_pool_size = max_pool_size or (len(self.COLLECTIONS) + insert_workers + 2)
         self.client = None
         self.db = None
         self.datasets = {}
@@ -36,19 +83,19 @@ class MongoDBDataLoader:
         print("="*60)
         
         try:
-            # Conectar directamente al nodo primario para carga de datos
-            self.client = MongoClient(
-                self.mongodb_uri,
-                directConnection=True,  # Conexión directa al nodo primario
-                serverSelectionTimeoutMS=5000
-            )
+            # Conectar directamente al nodo primario para carga de datos.
+            # Un único cliente (thread-safe) comparte su pool entre los hilos de carga
+            self.client = create_mongo_client(self.mongodb_uri, max_pool_size=self.max_pool_size)
             # Verificar conexión
             self.client.admin.command('ping')
-            print("✅ Conexión exitosa a MongoDB (conexión directa al primario)")
+            print(f"✅ Conexión exitosa a MongoDB (conexión directa al primario, pool de {self.max_pool_size} conexiones)")
+            
+            # Crear base de datos (todas las escrituras de la carga con el write concern del perfil)
+            write_concern = WRITE_PROFILES[self.write_profile]['write_concern']
+            self.db = self.client.get_database(self.database_name, write_concern=write_concern)
+            print(f"📁 Base de datos: {self.db.name} (perfil '{self.write_profile}': {write_concern.document})")
             
-            # Crear base de datos
-            self.db = self.client['brazilian_ecommerce']
-            print(f"📁 Base de datos: {self.db.name}")
+            self.lag_monitor = ReplicationLagMonitor(self.client, self.lag_sample_seconds).start()
             
         except Exception as e:
             print(f"❌ Error conectando a MongoDB: {e}")
@@ -74,20 +121,23 @@ class MongoDBDataLoader:
         
         print("✅ Limpieza completada")
     
-    def load_processed_datasets(self):
-        """Cargar datasets procesados"""
+    def load_processed_datasets(self, data_path=None):
+        """Cargar datasets procesados (Parquet con tipos conservados, o CSV) de data_path o de processed_data_path"""
         print("\n📥 CARGANDO DATASETS PROCESADOS...")
         print("="*60)
         
-        csv_files = list(self.processed_data_path.glob('*.csv'))
+        # Solo los datasets que se cargan; los de orders con las columnas que usa el ensamblador
+        dataset_columns = {name: None for name in ['products', 'customers', 'sellers']}
+        dataset_columns.update(OrderDocumentBuilder.required_columns())
         
-        for file_path in csv_files:
-            if file_path.name != 'geolocation.csv':  # No necesitamos geolocation
-                filename = file_path.name.replace('.csv', '')
-                print(f"📥 Cargando {filename}...")
+        processed_files = list_processed_files(Path(data_path) if data_path else self.processed_data_path)
+        
+        for filename, file_path in processed_files.items():
+            if filename in dataset_columns:
+                print(f"📥 Cargando {file_path.name}...")
                 
                 try:
-                    df = pd.read_csv(file_path, low_memory=False)
+                    df = read_processed_frame(file_path, columns=dataset_columns[filename])
                     self.datasets[filename] = df
                     print(f"✅ {filename}: {len(df):,} filas")
                     
@@ -113,6 +163,33 @@ class MongoDBDataLoader:
         else:
             return obj
     
+    def build_products_documents(self, df):
+        """Documentos de la colección products a partir del DataFrame procesado"""
+        documents = []
+        for _, row in df.iterrows():
+            doc = {
+                'product_id': row['product_id'],
+                'product_category_name': row['product_category_name'],
+                'product_category_name_normalized': row['product_category_name_normalized'],
+                'product_name_lenght': row['product_name_lenght'],
+                'product_description_lenght': row['product_description_lenght'],
+                'product_photos_qty': row['product_photos_qty'],
+                'product_weight_g': row['product_weight_g'],
+                'product_length_cm': row['product_length_cm'],
+                'product_height_cm': row['product_height_cm'],
+                'product_width_cm': row['product_width_cm'],
+                'product_volume_cm3': row['product_volume_cm3'],
+                'weight_category': row['weight_category'],
+                'size_category': row['size_category'],
+                'created_at': datetime.now(),
+                'updated_at': datetime.now()
+            }
+            
+            doc = self.clean_for_mongodb(doc)
+            documents.append(doc)
+        
+        return documents
+    
     def load_products_collection(self):
         """Cargar colección de productos"""
         print("\n📦 CARGANDO COLECCIÓN PRODUCTS...")
@@ -122,31 +199,11 @@ class MongoDBDataLoader:
             df = self.datasets['products']
             collection = self.db['products']
             
-            # Crear índice único en product_id
-            collection.create_index("product_id", unique=True)
-            
-            documents = []
-            for _, row in df.iterrows():
-                doc = {
-                    'product_id': row['product_id'],
-                    'product_category_name': row['product_category_name'],
-                    'product_category_name_normalized': row['product_category_name_normalized'],
-                    'product_name_lenght': row['product_name_lenght'],
-                    'product_description_lenght': row['product_description_lenght'],
-                    'product_photos_qty': row['product_photos_qty'],
-                    'product_weight_g': row['product_weight_g'],
-                    'product_length_cm': row['product_length_cm'],
-                    'product_height_cm': row['product_height_cm'],
-                    'product_width_cm': row['product_width_cm'],
-                    'product_volume_cm3': row['product_volume_cm3'],
-                    'weight_category': row['weight_category'],
-                    'size_category': row['size_category'],
-                    'created_at': datetime.now(),
-                    'updated_at': datetime.now()
-                }
-                
-                doc = self.clean_for_mongodb(doc)
-                documents.append(doc)
+            # Sin índices durante la carga: se descartan duplicados aquí y el índice
+            # único se construye después en build_indexes
+            df = df.drop_duplicates(subset='product_id')
+            
+            documents = self.build_products_documents(df)
             
             # Insertar documentos
             try:
@@ -159,7 +216,7 @@ class MongoDBDataLoader:
                 }
                 
             except BulkWriteError as e:
-                inserted = len(e.details['insertedIds'])
+                inserted = e.details['nInserted']
                 print(f"⚠️ {inserted:,} productos insertados (algunos duplicados)")
                 
                 self.load_report['collections_loaded']['products'] = {
@@ -167,6 +224,32 @@ class MongoDBDataLoader:
                     'collection_size': collection.count_documents({})
                 }
     
+    def build_customers_documents(self, df):
+        """Documentos de la colección customers a partir del DataFrame procesado"""
+        if 'customer_city_key' not in df.columns:
+            df = df.assign(customer_city_key=city_key_series(df['customer_city']))
+        
+        documents = []
+        for _, row in df.iterrows():
+            doc = {
+                'customer_id': row['customer_id'],
+                'customer_unique_id': row['customer_unique_id'],
+                'customer_zip_code_prefix': row['customer_zip_code_prefix'],
+                'customer_city': row['customer_city'],
+                'customer_state': row['customer_state'],
+                'customer_city_normalized': row['customer_city_normalized'],
+                'customer_city_key': row['customer_city_key'],
+                'customer_state_normalized': row['customer_state_normalized'],
+                'customer_region': row['customer_region'],
+                'created_at': datetime.now(),
+                'updated_at': datetime.now()
+            }
+            
+            doc = self.clean_for_mongodb(doc)
+            documents.append(doc)
+        
+        return documents
+    
     def load_customers_collection(self):
         """Cargar colección de clientes"""
         print("\n👥 CARGANDO COLECCIÓN CUSTOMERS...")
@@ -176,26 +259,10 @@ class MongoDBDataLoader:
             df = self.datasets['customers']
             collection = self.db['customers']
             
-            # Crear índice único en customer_id
-            collection.create_index("customer_id", unique=True)
-            
-            documents = []
-            for _, row in df.iterrows():
-                doc = {
-                    'customer_id': row['customer_id'],
-                    'customer_unique_id': row['customer_unique_id'],
-                    'customer_zip_code_prefix': row['customer_zip_code_prefix'],
-                    'customer_city': row['customer_city'],
-                    'customer_state': row['customer_state'],
-                    'customer_city_normalized': row['customer_city_normalized'],
-                    'customer_state_normalized': row['customer_state_normalized'],
-                    'customer_region': row['customer_region'],
-                    'created_at': datetime.now(),
-                    'updated_at': datetime.now()
-                }
-                
-                doc = self.clean_for_mongodb(doc)
-                documents.append(doc)
+            # Descartar duplicados de customer_id (índice único en build_indexes)
+            df = df.drop_duplicates(subset='customer_id')
+            
+            documents = self.build_customers_documents(df)
             
             # Insertar documentos
             try:
@@ -208,7 +275,7 @@ class MongoDBDataLoader:
                 }
                 
             except BulkWriteError as e:
-                inserted = len(e.details['insertedIds'])
+                inserted = e.details['nInserted']
                 print(f"⚠️ {inserted:,} clientes insertados (algunos duplicados)")
                 
                 self.load_report['collections_loaded']['customers'] = {
@@ -216,6 +283,31 @@ class MongoDBDataLoader:
                     'collection_size': collection.count_documents({})
                 }
     
+    def build_sellers_documents(self, df):
+        """Documentos de la colección sellers a partir del DataFrame procesado"""
+        if 'seller_city_key' not in df.columns:
+            df = df.assign(seller_city_key=city_key_series(df['seller_city']))
+        
+        documents = []
+        for _, row in df.iterrows():
+            doc = {
+                'seller_id': row['seller_id'],
+                'seller_zip_code_prefix': row['seller_zip_code_prefix'],
+                'seller_city': row['seller_city'],
+                'seller_state': row['seller_state'],
+                'seller_city_normalized': row['seller_city_normalized'],
+                'seller_city_key': row['seller_city_key'],
+                'seller_state_normalized': row['seller_state_normalized'],
+                'seller_region': row['seller_region'],
+                'created_at': datetime.now(),
+                'updated_at': datetime.now()
+            }
+            
+            doc = self.clean_for_mongodb(doc)
+            documents.append(doc)
+        
+        return documents
+    
     def load_sellers_collection(self):
         """Cargar colección de vendedores"""
         print("\n🏪 CARGANDO COLECCIÓN SELLERS...")
@@ -225,25 +317,10 @@ class MongoDBDataLoader:
             df = self.datasets['sellers']
             collection = self.db['sellers']
             
-            # Crear índice único en seller_id
-            collection.create_index("seller_id", unique=True)
-            
-            documents = []
-            for _, row in df.iterrows():
-                doc = {
-                    'seller_id': row['seller_id'],
-                    'seller_zip_code_prefix': row['seller_zip_code_prefix'],
-                    'seller_city': row['seller_city'],
-                    'seller_state': row['seller_state'],
-                    'seller_city_normalized': row['seller_city_normalized'],
-                    'seller_state_normalized': row['seller_state_normalized'],
-                    'seller_region': row['seller_region'],
-                    'created_at': datetime.now(),
-                    'updated_at': datetime.now()
-                }
-                
-                doc = self.clean_for_mongodb(doc)
-                documents.append(doc)
+            # Descartar duplicados de seller_id (índice único en build_indexes)
+            df = df.drop_duplicates(subset='seller_id')
+            
+            documents = self.build_sellers_documents(df)
             
             # Insertar documentos
             try:
@@ -256,7 +333,7 @@ class MongoDBDataLoader:
                 }
                 
             except BulkWriteError as e:
-                inserted = len(e.details['insertedIds'])
+                inserted = e.details['nInserted']
                 print(f"⚠️ {inserted:,} vendedores insertados (algunos duplicados)")
                 
                 self.load_report['collections_loaded']['sellers'] = {
@@ -277,180 +354,58 @@ class MongoDBDataLoader:
             
             collection = self.db['orders']
             
-            # OPTIMIZACIÓN 1: Crear índices después de la carga para mayor velocidad
-            # collection.create_index("order_id", unique=True)
-            # collection.create_index("customer.customer_id")
-            # collection.create_index("order_info.order_purchase_timestamp")
-            # collection.create_index("customer.customer_state")
-            # collection.create_index("customer.customer_region")
-            # collection.create_index("order_info.order_status")
-            # collection.create_index("time_dimensions.order_year")
-            # collection.create_index("time_dimensions.order_month")
-            # collection.create_index("order_summary.total_value")
-            # collection.create_index("review.review_score")
-            
-            # OPTIMIZACIÓN 2: Pre-procesar DataFrames para evitar búsquedas repetitivas
+            # OPTIMIZACIÓN 1: Sin índices durante la carga (se construyen en build_indexes)
+            
+            # OPTIMIZACIÓN 2: Ensamblado columnar (fechas convertidas una vez, agrupación por offsets)
             print("🔄 Pre-procesando datos para optimización...")
             
-            # Crear diccionarios para acceso O(1) en lugar de filtros O(n)
-            items_dict = {}
-            for _, item in items_df.iterrows():
-                order_id = item['order_id']
-                if order_id not in items_dict:
-                    items_dict[order_id] = []
-                items_dict[order_id].append(item.to_dict())
-            
-            payments_dict = {}
-            for _, payment in payments_df.iterrows():
-                order_id = payment['order_id']
-                if order_id not in payments_dict:
-                    payments_dict[order_id] = []
-                payments_dict[order_id].append(payment.to_dict())
-            
-            reviews_dict = {}
-            for _, review in reviews_df.iterrows():
-                order_id = review['order_id']
-                if order_id not in reviews_dict:
-                    reviews_dict[order_id] = review.to_dict()
-            
-            print(f"✅ Datos pre-procesados: {len(items_dict):,} órdenes con items, {len(payments_dict):,} con pagos, {len(reviews_dict):,} con reviews")
+            builder = OrderDocumentBuilder(orders_df, items_df, payments_df, reviews_df).prepare()
+            
+            print(f"✅ Datos pre-procesados: {int((builder.item_counts > 0).sum()):,} órdenes con items, "
+                  f"{int((builder.payment_ends > builder.payment_starts).sum()):,} con pagos, "
+                  f"{int((builder.review_ends > builder.review_starts).sum()):,} con reviews")
             
             # OPTIMIZACIÓN 3: Procesar en lotes más grandes y usar bulk operations
-            batch_size = 5000  # Aumentar tamaño de lote
-            documents = []
-            processed = 0
+            batch_size = self.batch_size
             start_time = time.time()
+            pipeline_stats = {}
             
-            print(f"🚀 Iniciando procesamiento optimizado...")
-            
-            for _, order in orders_df.iterrows():
-                order_id = order['order_id']
-                
-                # Obtener datos pre-procesados (acceso O(1))
-                order_items = items_dict.get(order_id, [])
-                order_payments = payments_dict.get(order_id, [])
-                order_review = reviews_dict.get(order_id, None)
-                
-                # Crear documento de orden (simplificado)
-                doc = {
-                    'order_id': order_id,
-                    'customer': {
-                        'customer_id': order['customer_id'],
-                        'customer_city': order['customer_city_normalized'],
-                        'customer_state': order['customer_state_normalized'],
-                        'customer_region': order['customer_region']
-                    },
-                    'order_info': {
-                        'order_status': order['order_status'],
-                        'delivery_status': order['delivery_status'],
-                        'order_purchase_timestamp': pd.to_datetime(order['order_purchase_timestamp']),
-                        'order_approved_at': pd.to_datetime(order['order_approved_at']) if pd.notna(order['order_approved_at']) else None,
-                        'order_delivered_carrier_date': pd.to_datetime(order['order_delivered_carrier_date']) if pd.notna(order['order_delivered_carrier_date']) else None,
-                        'order_delivered_customer_date': pd.to_datetime(order['order_delivered_customer_date']) if pd.notna(order['order_delivered_customer_date']) else None,
-                        'order_estimated_delivery_date': pd.to_datetime(order['order_estimated_delivery_date']) if pd.notna(order['order_estimated_delivery_date']) else None,
-                        'delivery_time_days': order['delivery_time_days']
-                    },
-                    'time_dimensions': {
-                        'order_year': order['order_year'],
-                        'order_month': order['order_month'],
-                        'order_day': order['order_day'],
-                        'order_weekday': order['order_weekday'],
-                        'order_quarter': order['order_quarter']
-                    },
-                    'items': [],
-                    'payments': [],
-                    'review': {},
-                    'order_summary': {
-                        'total_items': len(order_items),
-                        'total_value': sum(item['total_item_value'] for item in order_items) if order_items else 0,
-                        'total_freight': sum(item['freight_value'] for item in order_items) if order_items else 0,
-                        'payment_methods_count': len(order_payments),
-                        'average_review_score': order_review['review_score'] if order_review else None
-                    },
-                    'created_at': datetime.now(),
-                    'updated_at': datetime.now()
-                }
-                
-                # Agregar items (optimizado)
-                for item in order_items:
-                    item_doc = {
-                        'order_item_id': item['order_item_id'],
-                        'product_id': item['product_id'],
-                        'seller_id': item['seller_id'],
-                        'product_info': {
-                            'product_category_name': item['product_category_name'],
-                            'product_category_name_normalized': item['product_category_name_normalized'],
-                            'weight_category': item['weight_category'],
-                            'size_category': item['size_category']
-                        },
-                        'price': item['price'],
-                        'freight_value': item['freight_value'],
-                        'total_item_value': item['total_item_value'],
-                        'freight_percentage': item['freight_percentage'],
-                        'value_category': item['value_category'],
-                        'freight_category': item['freight_category'],
-                        'shipping_limit_date': pd.to_datetime(item['shipping_limit_date']) if pd.notna(item['shipping_limit_date']) else None
-                    }
-                    doc['items'].append(self.clean_for_mongodb(item_doc))
-                
-                # Agregar pagos (optimizado)
-                for payment in order_payments:
-                    payment_doc = {
-                        'payment_sequential': payment['payment_sequential'],
-                        'payment_type': payment['payment_type'],
-                        'payment_type_normalized': payment['payment_type_normalized'],
-                        'payment_installments': payment['payment_installments'],
-                        'payment_value': payment['payment_value'],
-                        'payment_value_category': payment['payment_value_category'],
-                        'installments_category': payment['installments_category']
-                    }
-                    doc['payments'].append(self.clean_for_mongodb(payment_doc))
-                
-                # Agregar review (optimizado)
-                if order_review is not None:
-                    doc['review'] = {
-                        'review_id': order_review['review_id'],
-                        'review_score': order_review['review_score'],
-                        'review_score_category': order_review['review_score_category'],
-                        'review_comment_title': order_review['review_comment_title'],
-                        'review_comment_message': order_review['review_comment_message'],
-                        'review_creation_date': pd.to_datetime(order_review['review_creation_date']) if pd.notna(order_review['review_creation_date']) else None,
-                        'review_answer_timestamp': pd.to_datetime(order_review['review_answer_timestamp']) if pd.notna(order_review['review_answer_timestamp']) else None,
-                        'has_comment_title': order_review['has_comment_title'],
-                        'has_comment_message': order_review['has_comment_message'],
-                        'response_time_hours': order_review['response_time_hours']
-                    }
+            if self.streaming:
+                # OPTIMIZACIÓN 4 (streaming): construir e insertar en paralelo con memoria acotada
+                total_inserted, pipeline_stats = self.insert_orders_streaming(collection, builder)
+                pipeline_stats['build_processes'] = self.build_processes
+            else:
+                documents = []
                 
-                doc = self.clean_for_mongodb(doc)
-                documents.append(doc)
+                print(f"🚀 Iniciando procesamiento optimizado...")
                 
-                processed += 1
-                if processed % 5000 == 0:
+                for chunk in builder.iter_document_chunks(batch_size, processes=self.build_processes):
+                    documents.extend(chunk)
                     elapsed = time.time() - start_time
-                    rate = processed / elapsed
-                    print(f"📊 Procesadas {processed:,} órdenes... ({rate:.0f} órdenes/seg)")
-            
-            # OPTIMIZACIÓN 4: Insertar en lotes más grandes
-            print(f"\n💾 Insertando {len(documents):,} documentos en MongoDB...")
-            total_inserted = 0
-            insert_start_time = time.time()
-            
-            for i in range(0, len(documents), batch_size):
-                batch = documents[i:i + batch_size]
+                    rate = len(documents) / elapsed if elapsed > 0 else 0
+                    print(f"📊 Procesadas {len(documents):,} órdenes... ({rate:.0f} órdenes/seg)")
                 
-                try:
-                    result = collection.insert_many(batch, ordered=False)
-                    total_inserted += len(result.inserted_ids)
-                    elapsed = time.time() - insert_start_time
-                    rate = total_inserted / elapsed
-                    print(f"✅ Lote {i//batch_size + 1}: {len(result.inserted_ids):,} órdenes insertadas ({rate:.0f} docs/seg)")
+                # OPTIMIZACIÓN 4: Insertar en lotes más grandes
+                print(f"\n💾 Insertando {len(documents):,} documentos en MongoDB...")
+                total_inserted = 0
+                insert_start_time = time.time()
+                
+                for i in range(0, len(documents), batch_size):
+                    batch = documents[i:i + batch_size]
                     
-                except BulkWriteError as e:
-                    inserted = len(e.details['insertedIds'])
-                    total_inserted += inserted
-                    elapsed = time.time() - insert_start_time
-                    rate = total_inserted / elapsed
-                    print(f"⚠️ Lote {i//batch_size + 1}: {inserted:,} órdenes insertadas (algunos duplicados) ({rate:.0f} docs/seg)")
+                    try:
+                        result = collection.insert_many(batch, ordered=False)
+                        total_inserted += len(result.inserted_ids)
+                        elapsed = time.time() - insert_start_time
+                        rate = total_inserted / elapsed
+                        print(f"✅ Lote {i//batch_size + 1}: {len(result.inserted_ids):,} órdenes insertadas ({rate:.0f} docs/seg)")
+                        
+                    except BulkWriteError as e:
+                        inserted = e.details['nInserted']
+                        total_inserted += inserted
+                        elapsed = time.time() - insert_start_time
+                        rate = total_inserted / elapsed
+                        print(f"⚠️ Lote {i//batch_size + 1}: {inserted:,} órdenes insertadas (algunos duplicados) ({rate:.0f} docs/seg)")
             
             total_time = time.time() - start_time
             final_rate = total_inserted / total_time
@@ -461,57 +416,336 @@ class MongoDBDataLoader:
                 'documents_inserted': total_inserted,
                 'collection_size': collection.count_documents({}),
                 'processing_time_seconds': total_time,
-                'insertion_rate_docs_per_sec': final_rate
+                'insertion_rate_docs_per_sec': final_rate,
+                **pipeline_stats
+            }
+    
+    def insert_orders_streaming(self, collection, builder):
+        """Pipeline productor/consumidor: el generador construye bloques y un pool de hilos los inserta"""
+        print(f"🚀 Iniciando carga en streaming ({self.insert_workers} hilos de inserción, "
+              f"cola de {self.max_pending_batches} lotes de {self.batch_size:,})...")
+        
+        # Cola acotada: si el primario va lento, put() bloquea al productor (back-pressure)
+        pending = queue.Queue(maxsize=self.max_pending_batches)
+        lock = threading.Lock()
+        stats = {'inserted': 0, 'batches': 0, 'errors': 0, 'failure': None}
+        insert_start_time = time.time()
+        
+        def insert_worker():
+            while True:
+                batch = pending.get()
+                try:
+                    if batch is None:
+                        return
+                    if stats['failure'] is not None:
+                        continue  # Seguir vaciando la cola para no bloquear al productor
+                    try:
+                        result = collection.insert_many(batch, ordered=False)
+                        inserted = len(result.inserted_ids)
+                    except BulkWriteError as e:
+                        inserted = e.details['nInserted']
+                        with lock:
+                            stats['errors'] += 1
+                    
+                    with lock:
+                        stats['inserted'] += inserted
+                        stats['batches'] += 1
+                        elapsed = time.time() - insert_start_time
+                        rate = stats['inserted'] / elapsed if elapsed > 0 else 0
+                        print(f"✅ Lote {stats['batches']}: {inserted:,} órdenes insertadas ({rate:.0f} docs/seg)")
+                except Exception as e:
+                    with lock:
+                        stats['failure'] = stats['failure'] or e
+                finally:
+                    pending.task_done()
+        
+        workers = [threading.Thread(target=insert_worker, daemon=True) for _ in range(self.insert_workers)]
+        for worker in workers:
+            worker.start()
+        
+        # Suscripción al monitor de replicación: la puerta se cierra mientras el lag supere el umbral
+        replication_ok = threading.Event()
+        replication_ok.set()
+        lag_gate = None
+        if self.lag_monitor is not None and self.max_replication_lag_seconds is not None:
+            def lag_gate(sample):
+                if sample['max_lag_seconds'] > self.max_replication_lag_seconds:
+                    replication_ok.clear()
+                else:
+                    replication_ok.set()
+            self.lag_monitor.subscribe(lag_gate)
+        
+        producer_wait = 0.0
+        replication_wait = 0.0
+        gate_disabled = False
+        max_queue_depth = 0
+        try:
+            for chunk in builder.iter_document_chunks(self.batch_size, processes=self.build_processes):
+                if stats['failure'] is not None:
+                    break
+                if not replication_ok.is_set():
+                    wait_start = time.time()
+                    print(f"⏸️ Lag de replicación > {self.max_replication_lag_seconds}s: pausando la carga de orders...")
+                    # Espera por intervalos: sin muestras recientes la puerta no se volvería a abrir
+                    while not replication_ok.wait(self.lag_sample_seconds):
+                        if not self.lag_monitor.is_fresh():
+                            print("⚠️ Monitor de replicación detenido o sin muestras recientes: "
+                                  "se reanuda la carga sin regulación por lag")
+                            self.lag_monitor.unsubscribe(lag_gate)
+                            gate_disabled = True
+                            replication_ok.set()
+                        elif time.time() - wait_start > self.max_replication_wait_seconds:
+                            raise TimeoutError(
+                                f"Lag de replicación > {self.max_replication_lag_seconds}s durante más de "
+                                f"{self.max_replication_wait_seconds}s: carga de orders detenida"
+                            )
+                    replication_wait += time.time() - wait_start
+                wait_start = time.time()
+                pending.put(chunk)
+                producer_wait += time.time() - wait_start
+                max_queue_depth = max(max_queue_depth, pending.qsize())
+        finally:
+            if lag_gate is not None:
+                self.lag_monitor.unsubscribe(lag_gate)
+            for _ in workers:
+                pending.put(None)
+            for worker in workers:
+                worker.join()
+        
+        if stats['failure'] is not None:
+            print(f"❌ Error insertando lotes de órdenes: {stats['failure']}")
+            raise stats['failure']
+        
+        print(f"⏳ Tiempo bloqueado por back-pressure: {producer_wait:.1f}s (cola máxima: {max_queue_depth} lotes)")
+        if lag_gate is not None:
+            print(f"⏳ Tiempo en pausa por lag de replicación: {replication_wait:.1f}s")
+        
+        return stats['inserted'], {
+            'streaming': True,
+            'insert_workers': self.insert_workers,
+            'batches_inserted': stats['batches'],
+            'batches_with_errors': stats['errors'],
+            'producer_backpressure_seconds': producer_wait,
+            'replication_throttle_seconds': replication_wait,
+            'replication_gate_disabled': gate_disabled,
+            'max_queue_depth': max_queue_depth,
+            'max_documents_in_flight': (self.max_pending_batches + self.insert_workers + 1) * self.batch_size
+        }
+    
+    def durability_barrier(self, load_seconds):
+        """
+        Cierre del perfil de escritura: con 'fast', escritura w: "majority", j: true en _metadata
+        y verificación de los conteos con read concern majority; docs/seg de la carga en ambos perfiles
+        """
+        profile = WRITE_PROFILES[self.write_profile]
+        print(f"\n🛡️ PERFIL DE ESCRITURA '{self.write_profile}'...")
+        print("="*60)
+        
+        loaded = self.load_report['collections_loaded']
+        # En la carga incremental cuentan los documentos nuevos y los modificados por los upserts
+        documents = sum(report.get('documents_written', report['documents_inserted']) for report in loaded.values())
+        summary = {
+            'profile': self.write_profile,
+            'batch_write_concern': profile['write_concern'].document,
+            'documents': documents,
+            'load_seconds': load_seconds,
+            'barrier_seconds': 0.0
+        }
+        
+        if profile['barrier']:
+            start_time = time.time()
+            try:
+                self.db.get_collection(METADATA_COLLECTION, write_concern=BARRIER_WRITE_CONCERN).update_one(
+                    {'_id': LOAD_BARRIER_ID},
+                    {'$set': {'profile': self.write_profile, 'documents': documents, 'barrier_at': datetime.now()}},
+                    upsert=True
+                )
+                print(f"✅ Barrera w: majority, j: true en {time.time() - start_time:.2f}s")
+            except WTimeoutError as e:
+                print(f"❌ La barrera majority no se confirmó a tiempo: {e}")
+                self.load_report['errors'].append(f"barrera majority: {e}")
+            summary['barrier_seconds'] = time.time() - start_time
+            
+            # Lo leído con majority ya no se pierde en un failover: debe coincidir con lo insertado
+            counts = {}
+            for collection_name, report in loaded.items():
+                majority = self.db.get_collection(collection_name, read_concern=ReadConcern('majority'))
+                counts[collection_name] = {'expected': report['collection_size'], 'majority': majority.count_documents({})}
+                if counts[collection_name]['majority'] != report['collection_size']:
+                    message = (f"{collection_name}: {counts[collection_name]['majority']:,} documentos confirmados "
+                               f"por mayoría de {report['collection_size']:,}")
+                    print(f"❌ {message}")
+                    self.load_report['errors'].append(f"verificación majority {message}")
+            summary['verified_counts'] = counts
+            summary['verified'] = all(count['expected'] == count['majority'] for count in counts.values())
+            if summary['verified']:
+                print(f"✅ Conteos verificados con read concern majority ({len(counts)} colecciones)")
+        
+        total_seconds = load_seconds + summary['barrier_seconds']
+        summary['docs_per_sec'] = documents / total_seconds if total_seconds > 0 else 0
+        print(f"⚡ {documents:,} documentos en {total_seconds:.1f}s con '{self.write_profile}' "
+              f"({summary['docs_per_sec']:.0f} docs/seg, barrera incluida)")
+        self.load_report['write_profile'] = summary
+    
+    def _timed_load(self, collection_name, load_function):
+        """Ejecutar un cargador y registrar su tiempo y docs/seg en load_report"""
+        start_time = time.time()
+        load_function()
+        elapsed = time.time() - start_time
+        
+        report = self.load_report['collections_loaded'].get(collection_name)
+        if report is not None:
+            report['load_time_seconds'] = elapsed
+            report['docs_per_sec'] = report['documents_inserted'] / elapsed if elapsed > 0 else 0
+            print(f"⏱️ {collection_name}: {report['documents_inserted']:,} documentos en {elapsed:.1f}s "
+                  f"({report['docs_per_sec']:.0f} docs/seg)")
+    
+    def load_all_collections(self):
+        """Cargar products, customers, sellers y orders (en un pool de hilos si parallel_load)"""
+        loaders = {
+            'products': self.load_products_collection,
+            'customers': self.load_customers_collection,
+            'sellers': self.load_sellers_collection,
+            'orders': self.load_orders_collection
+        }
+        
+        if not self.parallel_load:
+            for collection_name, load_function in loaders.items():
+                self._timed_load(collection_name, load_function)
+            return
+        
+        print(f"\n⚡ CARGA PARALELA DE {len(loaders)} COLECCIONES...")
+        print("="*60)
+        
+        start_time = time.time()
+        with ThreadPoolExecutor(max_workers=len(loaders)) as executor:
+            futures = {
+                executor.submit(self._timed_load, collection_name, load_function): collection_name
+                for collection_name, load_function in loaders.items()
             }
+            for future in as_completed(futures):
+                collection_name = futures[future]
+                try:
+                    future.result()
+                except Exception as e:
+                    print(f"❌ Error cargando {collection_name}: {e}")
+                    self.load_report['errors'].append(f"{collection_name}: {e}")
+        
+        elapsed = time.time() - start_time
+        print(f"✅ Carga paralela completada en {elapsed:.1f}s")
+        self.load_report['parallel_load_time_seconds'] = elapsed
+    
+    @staticmethod
+    def index_models_from_design(index_design):
+        """Convertir los índices de MongoDBStructureDesigner.design_indexes en IndexModel"""
+        models = []
+        for index in index_design:
+            if index['type'] == 'compound':
+                models.append(IndexModel([tuple(field) for field in index['fields']]))
+            else:
+                models.append(IndexModel([(index['field'], ASCENDING)], unique=index['type'] == 'unique'))
+        return models
+    
+    def _monitor_index_builds(self, stop_event, interval=2.0):
+        """Reportar el progreso de las construcciones de índices en curso (currentOp)"""
+        while not stop_event.wait(interval):
+            try:
+                operations = self.client.admin.command(
+                    'currentOp', {'command.createIndexes': {'$exists': True}}
+                )['inprog']
+            except Exception:
+                return  # currentOp no disponible (permisos o servidor sin soporte)
+            
+            for operation in operations:
+                progress = operation.get('progress')
+                if progress and progress.get('total'):
+                    print(f"   ⏳ {operation['command']['createIndexes']}: {operation.get('msg', 'construyendo índices')} "
+                          f"({progress['done']:,}/{progress['total']:,})")
     
-    def create_additional_indexes(self):
-        """Crear índices adicionales para optimizar consultas"""
-        print("\n🔍 CREANDO ÍNDICES ADICIONALES...")
+    @staticmethod
+    def _index_entry(model):
+        """Claves y unicidad de un IndexModel para el reporte de carga"""
+        return {'keys': dict(model.document['key']), 'unique': model.document.get('unique', False)}
+    
+    def create_collection_indexes(self, collection, models):
+        """
+        Un createIndexes con todos los índices (un único recorrido de la colección). Si el comando
+        falla (p. ej. un índice unique con duplicados) se reintenta índice a índice, de modo que el
+        error solo afecta al suyo; entonces cada índice lleva su propio build_time_seconds
+        """
+        try:
+            index_names = collection.create_indexes(models)
+            return {name: self._index_entry(model) for name, model in zip(index_names, models)}
+        except Exception as e:
+            print(f"⚠️ {collection.name}: createIndexes falló ({e}), reintentando índice a índice...")
+        
+        indexes = {}
+        for model in models:
+            options = {key: value for key, value in model.document.items() if key != 'key'}
+            entry = self._index_entry(model)
+            start_time = time.time()
+            try:
+                collection.create_index(list(model.document['key'].items()), **options)
+            except Exception as e:
+                print(f"❌ Error construyendo el índice {options['name']} de {collection.name}: {e}")
+                self.load_report['errors'].append(f"index {collection.name}.{options['name']}: {e}")
+                entry['error'] = str(e)
+            entry['build_time_seconds'] = time.time() - start_time
+            indexes[options['name']] = entry
+        return indexes
+    
+    def build_indexes(self):
+        """Construir tras la carga todos los índices del diseño: un comando createIndexes por colección"""
+        print("\n🔍 CONSTRUYENDO ÍNDICES (FASE POSTERIOR A LA CARGA)...")
         print("="*60)
         
-        # Crear índices básicos para orders (que se comentaron durante la carga)
-        orders_collection = self.db['orders']
-        
-        print("📋 Creando índices básicos para orders...")
-        orders_collection.create_index("order_id", unique=True)
-        orders_collection.create_index("customer.customer_id")
-        orders_collection.create_index("order_info.order_purchase_timestamp")
-        orders_collection.create_index("customer.customer_state")
-        orders_collection.create_index("customer.customer_region")
-        orders_collection.create_index("order_info.order_status")
-        orders_collection.create_index("time_dimensions.order_year")
-        orders_collection.create_index("time_dimensions.order_month")
-        orders_collection.create_index("order_summary.total_value")
-        orders_collection.create_index("review.review_score")
-        
-        # Índices compuestos para consultas frecuentes
-        print("🔗 Creando índices compuestos...")
-        
-        # Índice compuesto para consultas por cliente y fecha
-        orders_collection.create_index([
-            ("customer.customer_id", 1),
-            ("order_info.order_purchase_timestamp", -1)
-        ])
-        
-        # Índice compuesto para consultas por región y estado
-        orders_collection.create_index([
-            ("customer.customer_region", 1),
-            ("customer.customer_state", 1)
-        ])
-        
-        # Índice compuesto para consultas por estado de orden y fecha
-        orders_collection.create_index([
-            ("order_info.order_status", 1),
-            ("order_info.order_purchase_timestamp", -1)
-        ])
-        
-        # Índice compuesto para consultas por valor y fecha
-        orders_collection.create_index([
-            ("order_summary.total_value", -1),
-            ("order_info.order_purchase_timestamp", -1)
-        ])
-        
-        print("✅ Índices adicionales creados")
+        designer = MongoDBStructureDesigner(self.processed_data_path)
+        designer.design_indexes()
+        index_design = designer.mongodb_structure['indexes']
+        
+        stop_event = threading.Event()
+        monitor = threading.Thread(target=self._monitor_index_builds, args=(stop_event,), daemon=True)
+        monitor.start()
+        
+        index_report = {}
+        try:
+            for collection_name, indexes in index_design.items():
+                collection = self.db[collection_name]
+                models = self.index_models_from_design(indexes)
+                
+                print(f"📋 {collection_name}: construyendo {len(models)} índices...")
+                start_time = time.time()
+                built_indexes = self.create_collection_indexes(collection, models)
+                build_time = time.time() - start_time
+                
+                # Con un único createIndexes los índices se construyen en el mismo recorrido:
+                # el tiempo es el del comando (por índice solo si hubo que reintentarlos uno a uno)
+                index_sizes = self.db.command("collStats", collection_name).get('indexSizes', {})
+                for name, entry in built_indexes.items():
+                    entry['size_bytes'] = index_sizes.get(name)
+                index_report[collection_name] = {'build_time_seconds': build_time, 'indexes': built_indexes}
+                
+                built = sum(1 for entry in built_indexes.values() if 'error' not in entry)
+                total_size_mb = sum(size or 0 for size in index_sizes.values()) / (1024 * 1024)
+                print(f"✅ {collection_name}: {built}/{len(models)} índices en {build_time:.2f}s ({total_size_mb:.2f} MB en índices)")
+        finally:
+            stop_event.set()
+            monitor.join()
+        
+        self.load_report['indexes'] = index_report
+    
+    def refresh_rollups(self, days=None):
+        """Recalcular los rollups de ventas desde orders: completos o solo los días afectados"""
+        try:
+            self.load_report['rollups'] = SalesRollups(self.db).refresh(days)
+        except Exception as e:
+            print(f"❌ Error actualizando rollups: {e}")
+            self.load_report['errors'].append(f"rollups: {e}")
+    
+    def publish_data_version(self):
+        """Incrementar la versión de datos en _metadata: invalida la caché de resultados de las consultas"""
+        self.load_report['data_version'] = bump_data_version(self.db)
+        print(f"🏷️ Versión de datos publicada: {self.load_report['data_version']}")
     
     def generate_collection_statistics(self):
         """Generar estadísticas de las colecciones"""
@@ -538,7 +772,7 @@ class MongoDBDataLoader:
         self.load_report['collection_statistics'] = stats
         self.load_report['total_documents'] = sum(stats[col]['documents'] for col in stats)
     
-    def save_load_report(self):
+    def save_load_report(self, filename='mongodb_load_report.json'):
         """Guardar reporte de carga"""
         print("\n💾 GUARDANDO REPORTE DE CARGA...")
         print("="*60)
@@ -548,8 +782,11 @@ class MongoDBDataLoader:
             datetime.fromisoformat(self.load_report['end_time']) - 
             datetime.fromisoformat(self.load_report['start_time'])
         ).total_seconds())
+        if self.lag_monitor is not None:
+            self.lag_monitor.print_summary()
+            self.load_report['replication'] = self.lag_monitor.report()
         
-        report_path = self.processed_data_path / 'mongodb_load_report.json'
+        report_path = self.processed_data_path / filename
         
         # Convertir datetime objects para JSON
         def datetime_converter(obj):
@@ -593,20 +830,26 @@ class MongoDBDataLoader:
         # Conectar a MongoDB
         self.connect_to_mongodb()
         
-        # Limpiar colecciones existentes
+        # Limpiar colecciones existentes (los resultados en caché dejan de ser válidos)
         self.clean_existing_collections()
+        self.publish_data_version()
         
         # Cargar datasets procesados
         self.load_processed_datasets()
         
-        # Cargar colecciones
-        self.load_products_collection()
-        self.load_customers_collection()
-        self.load_sellers_collection()
-        self.load_orders_collection()
+        # Cargar colecciones (independientes entre sí) y cerrar el perfil de escritura
+        load_start = time.time()
+        self.load_all_collections()
+        self.durability_barrier(time.time() - load_start)
+        
+        # Construir índices después de la carga
+        self.build_indexes()
         
-        # Crear índices adicionales
-        self.create_additional_indexes()
+        # Materializar los rollups de ventas sobre orders ya cargada
+        self.refresh_rollups()
+        
+        # Nueva versión de datos con todas las colecciones cargadas
+        self.publish_data_version()
         
         # Generar estadísticas
         self.generate_collection_statistics()
@@ -618,10 +861,132 @@ class MongoDBDataLoader:
         self.print_final_summary()
         
         # Cerrar conexión
+        if self.lag_monitor:
+            self.lag_monitor.stop()
+        if self.client:
+            self.client.close()
+            print("\n🔌 Conexión a MongoDB cerrada")
+    
+    def upsert_documents(self, collection, documents, key):
+        """Upsert en bloque por clave de negocio: $set del documento y $setOnInsert de created_at"""
+        operations = []
+        for doc in documents:
+            created_at = doc.pop('created_at', datetime.now())
+            operations.append(UpdateOne(
+                {key: doc[key]},
+                {'$set': doc, '$setOnInsert': {'created_at': created_at}},
+                upsert=True
+            ))
+        
+        if not operations:
+            return 0, 0
+        
+        result = collection.bulk_write(operations, ordered=False)
+        return result.upserted_count, result.modified_count
+    
+    def upsert_collection(self, collection_name, key, document_batches):
+        """Aplicar upserts por lotes y registrar insertados/modificados en load_report"""
+        collection = self.db[collection_name]
+        start_time = time.time()
+        total_upserted = total_modified = 0
+        
+        for documents in document_batches:
+            upserted, modified = self.upsert_documents(collection, documents, key)
+            total_upserted += upserted
+            total_modified += modified
+        
+        elapsed = time.time() - start_time
+        written = total_upserted + total_modified
+        print(f"✅ {collection_name}: {total_upserted:,} nuevos, {total_modified:,} actualizados en {elapsed:.1f}s")
+        
+        self.load_report['collections_loaded'][collection_name] = {
+            'documents_upserted': total_upserted,
+            'documents_modified': total_modified,
+            'documents_inserted': total_upserted,
+            'documents_written': written,
+            'docs_per_sec': written / elapsed if elapsed > 0 else 0,
+            'collection_size': collection.count_documents({}),
+            'processing_time_seconds': elapsed
+        }
+    
+    def run_incremental_load(self, delta_path=None):
+        """
+        Carga incremental: aplica con UpdateOne(upsert=True) los documentos afectados
+        del delta generado por ETLProcessor.run_incremental_etl, sin vaciar colecciones
+        """
+        print("🎯 CARGA INCREMENTAL A MONGODB")
+        print("="*80)
+        
+        # El delta solo se lee: índices y reporte siguen usando la ruta base de datos procesados
+        delta_path = Path(delta_path) if delta_path else self.processed_data_path / 'delta'
+        
+        self.connect_to_mongodb()
+        self.load_processed_datasets(delta_path)
+        
+        # Índices por clave (no-op si ya existen) para que los upserts no recorran la colección
+        self.build_indexes()
+        
+        print("\n🔄 APLICANDO UPSERTS...")
+        print("="*60)
+        load_start = time.time()
+        
+        dimensions = [
+            ('products', 'product_id', self.build_products_documents),
+            ('customers', 'customer_id', self.build_customers_documents),
+            ('sellers', 'seller_id', self.build_sellers_documents)
+        ]
+        for collection_name, key, build_documents in dimensions:
+            if collection_name in self.datasets:
+                df = self.datasets[collection_name].drop_duplicates(subset=key)
+                self.upsert_collection(collection_name, key, [build_documents(df)])
+        
+        if all(key in self.datasets for key in ['orders_with_customers', 'items_with_products', 'payments', 'reviews']):
+            builder = OrderDocumentBuilder(
+                self.datasets['orders_with_customers'],
+                self.datasets['items_with_products'],
+                self.datasets['payments'],
+                self.datasets['reviews']
+            )
+            
+            # Días a recalcular en los rollups: los de las órdenes antes y después del upsert
+            rollups = SalesRollups(self.db)
+            order_ids = self.datasets['orders_with_customers']['order_id'].unique().tolist()
+            affected_days = rollups.order_days(order_ids)
+            self.upsert_collection('orders', 'order_id', builder.iter_document_chunks(self.batch_size))
+            affected_days |= rollups.order_days(order_ids)
+            
+            rollups_built = self.db[METADATA_COLLECTION].find_one({'_id': ROLLUP_STATUS_ID}) is not None
+            self.refresh_rollups(affected_days if rollups_built else None)
+        
+        self.durability_barrier(time.time() - load_start)
+        self.publish_data_version()
+        self.generate_collection_statistics()
+        self.save_load_report('mongodb_incremental_load_report.json')
+        
+        if self.lag_monitor:
+            self.lag_monitor.stop()
         if self.client:
             self.client.close()
             print("\n🔌 Conexión a MongoDB cerrada")
 
 if __name__ == "__main__":
-    loader = MongoDBDataLoader()
-    loader.run_full_load()
+    parser = argparse.ArgumentParser(description='Carga de datos procesados a MongoDB')
+    parser.add_argument('--incremental', action='store_true', help='Aplicar solo el delta del ETL incremental (upserts)')
+    parser.add_argument('--processed-data-path', default='data/processed')
+    parser.add_argument('--database-name', default=DATABASE_NAME, help='Base de destino (p. ej. una base para datos sintéticos)')
+    parser.add_argument('--max-lag-seconds', type=float, help='Pausar la carga de orders mientras algún secundario supere este lag')
+    parser.add_argument('--max-lag-wait-seconds', type=float, default=600,
+                        help='Pausa máxima seguida por lag antes de detener la carga')
+    parser.add_argument('--lag-sample-seconds', type=float, default=5.0, help='Intervalo de muestreo de replSetGetStatus')
+    parser.add_argument('--write-profile', choices=sorted(WRITE_PROFILES), default='safe',
+                        help='fast: w:1 sin journal por lote y barrera majority final; safe: w:"majority" por lote')
+    args = parser.parse_args()
+    
+    loader = MongoDBDataLoader(args.processed_data_path, database_name=args.database_name,
+                               max_replication_lag_seconds=args.max_lag_seconds, lag_sample_seconds=args.lag_sample_seconds,
+                               max_replication_wait_seconds=args.max_lag_wait_seconds,
+                               write_profile=args.write_profile)
+    if args.incremental:
+        loader.run_incremental_load()
+    else:
+        loader.run_full_load()
@@ -9,6 +9,7 @@ import numpy as np
 import json
 from pathlib import Path
 from datetime import datetime
+from processed_storage import list_processed_files, read_processed_frame
 import warnings
 warnings.filterwarnings('ignore')
 
@@ -23,15 +24,14 @@ class MongoDBStructureDesigner:
         print("📥 CARGANDO DATASETS PROCESADOS...")
         print("="*60)
         
-        csv_files = list(self.processed_data_path.glob('*.csv'))
+        processed_files = list_processed_files(self.processed_data_path)
         
-        for file_path in csv_files:
-            if file_path.name != 'geolocation.csv':  # No necesitamos geolocation como colección separada
-                filename = file_path.name.replace('.csv', '')
-                print(f"📥 Cargando {filename}...")
+        for filename, file_path in processed_files.items():
+            if filename != 'geolocation':  # No necesitamos geolocation como colección separada
+                print(f"📥 Cargando {file_path.name}...")
                 
                 try:
-                    df = pd.read_csv(file_path, low_memory=False)
+                    df = read_processed_frame(file_path)
                     self.datasets[filename] = df
                     print(f"✅ {filename}: {len(df):,} filas")
                     
@@ -62,6 +62,7 @@ class MongoDBStructureDesigner:
                         'customer_id': 'String',
                         'customer_unique_id': 'String',
                         'customer_city': 'String',
+                        'city_key': 'String (ciudad sin acentos, minúsculas)',
                         'customer_state': 'String',
                         'customer_region': 'String',
                         'customer_zip_code_prefix': 'Number'
@@ -171,6 +172,7 @@ class MongoDBStructureDesigner:
                     'product_volume_cm3': 'Number',
                     'weight_category': 'String',
                     'size_category': 'String',
+                    'last_sale_date': 'Date (última venta, mantenida por el loader)',
                     'created_at': 'Date',
                     'updated_at': 'Date'
                 },
@@ -200,6 +202,7 @@ class MongoDBStructureDesigner:
                     'customer_city': 'String',
                     'customer_state': 'String',
                     'customer_city_normalized': 'String',
+                    'customer_city_key': 'String',
                     'customer_state_normalized': 'String',
                     'customer_region': 'String',
                     'created_at': 'Date',
@@ -228,6 +231,7 @@ class MongoDBStructureDesigner:
                     'seller_id': 'String (único)',
                     'seller_zip_code_prefix': 'Number',
                     'seller_city': 'String',
+                    'seller_city_key': 'String',
                     'seller_state': 'String',
                     'created_at': 'Date',
                     'updated_at': 'Date'
@@ -255,24 +259,36 @@ class MongoDBStructureDesigner:
                 {'field': 'time_dimensions.order_year', 'type': 'index'},
                 {'field': 'time_dimensions.order_month', 'type': 'index'},
                 {'field': 'order_summary.total_value', 'type': 'index'},
-                {'field': 'review.review_score', 'type': 'index'}
+                {'field': 'review.review_score', 'type': 'index'},
+                {'field': 'items.product_id', 'type': 'index'},
+                # Índices compuestos para consultas frecuentes
+                {'fields': [('customer.customer_id', 1), ('order_info.order_purchase_timestamp', -1)], 'type': 'compound'},
+                {'fields': [('customer.customer_region', 1), ('customer.customer_state', 1)], 'type': 'compound'},
+                {'fields': [('order_info.order_status', 1), ('order_info.order_purchase_timestamp', -1)], 'type': 'compound'},
+                {'fields': [('order_summary.total_value', -1), ('order_info.order_purchase_timestamp', -1)], 'type': 'compound'},
+                # Búsqueda de ciudad por clave normalizada (igualdad o prefijo) acotada por fecha
+                {'fields': [('customer.city_key', 1), ('order_info.order_purchase_timestamp', -1)], 'type': 'compound'}
             ],
             'products': [
                 {'field': 'product_id', 'type': 'unique'},
                 {'field': 'product_category_name', 'type': 'index'},
                 {'field': 'weight_category', 'type': 'index'},
-                {'field': 'size_category', 'type': 'index'}
+                {'field': 'size_category', 'type': 'index'},
+                # Anti-join "sin ventas desde fecha" como rango del índice (consulta 8)
+                {'field': 'last_sale_date', 'type': 'index'}
             ],
             'customers': [
                 {'field': 'customer_id', 'type': 'unique'},
                 {'field': 'customer_state', 'type': 'index'},
                 {'field': 'customer_region', 'type': 'index'},
-                {'field': 'customer_city', 'type': 'index'}
+                {'field': 'customer_city', 'type': 'index'},
+                {'field': 'customer_city_key', 'type': 'index'}
             ],
             'sellers': [
                 {'field': 'seller_id', 'type': 'unique'},
                 {'field': 'seller_state', 'type': 'index'},
-                {'field': 'seller_city', 'type': 'index'}
+                {'field': 'seller_city', 'type': 'index'},
+                {'field': 'seller_city_key', 'type': 'index'}
             ]
         }
         
@@ -307,6 +323,7 @@ class MongoDBStructureDesigner:
                 'customer': {
                     'customer_id': sample_order['customer_id'],
                     'customer_city': sample_order['customer_city_normalized'],
+                    'city_key': sample_order.get('customer_city_key'),
                     'customer_state': sample_order['customer_state_normalized'],
                     'customer_region': sample_order['customer_region']
                 },
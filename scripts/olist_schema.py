@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+"""
+Registro de Esquemas de los CSV Originales de Olist
+Dataset: Brazilian E-Commerce Public Dataset by Olist
+Tipos explícitos, categorías y fechas parseadas en la lectura (completa o por bloques),
+desde cada CSV o desde su equivalente <nombre>.parquet (archivo o directorio de partes)
+"""
+
+import pandas as pd
+from pathlib import Path
+
+try:
+    import pyarrow.dataset as pa_dataset
+    PYARROW_AVAILABLE = True
+except ImportError:
+    PYARROW_AVAILABLE = False
+
+DEFAULT_CHUNK_SIZE = 200_000
+
+# Por archivo: dtype explícito de cada columna y columnas de fecha a parsear al leer.
+# Las columnas de baja cardinalidad (estados, estatus, tipos de pago) se leen como category
+OLIST_SCHEMAS = {
+    'olist_customers_dataset.csv': {
+        'dtype': {
+            'customer_id': 'str',
+            'customer_unique_id': 'str',
+            'customer_zip_code_prefix': 'int32',
+            'customer_city': 'str',
+            'customer_state': 'category'
+        },
+        'parse_dates': []
+    },
+    'olist_geolocation_dataset.csv': {
+        'dtype': {
+            'geolocation_zip_code_prefix': 'int32',
+            'geolocation_lat': 'float64',
+            'geolocation_lng': 'float64',
+            'geolocation_city': 'str',
+            'geolocation_state': 'category'
+        },
+        'parse_dates': []
+    },
+    'olist_order_items_dataset.csv': {
+        'dtype': {
+            'order_id': 'str',
+            'order_item_id': 'int16',
+            'product_id': 'str',
+            'seller_id': 'str',
+            'price': 'float64',
+            'freight_value': 'float64'
+        },
+        'parse_dates': ['shipping_limit_date']
+    },
+    'olist_order_payments_dataset.csv': {
+        'dtype': {
+            'order_id': 'str',
+            'payment_sequential': 'int16',
+            'payment_type': 'category',
+            'payment_installments': 'int16',
+            'payment_value': 'float64'
+        },
+        'parse_dates': []
+    },
+    'olist_order_reviews_dataset.csv': {
+        'dtype': {
+            'review_id': 'str',
+            'order_id': 'str',
+            'review_score': 'int8',
+            'review_comment_title': 'str',
+            'review_comment_message': 'str'
+        },
+        'parse_dates': ['review_creation_date', 'review_answer_timestamp']
+    },
+    'olist_orders_dataset.csv': {
+        'dtype': {
+            'order_id': 'str',
+            'customer_id': 'str',
+            'order_status': 'category'
+        },
+        'parse_dates': [
+            'order_purchase_timestamp',
+            'order_approved_at',
+            'order_delivered_carrier_date',
+            'order_delivered_customer_date',
+            'order_estimated_delivery_date'
+        ]
+    },
+    'olist_products_dataset.csv': {
+        'dtype': {
+            'product_id': 'str',
+            'product_category_name': 'str',
+            'product_name_lenght': 'float64',
+            'product_description_lenght': 'float64',
+            'product_photos_qty': 'float64',
+            'product_weight_g': 'float64',
+            'product_length_cm': 'float64',
+            'product_height_cm': 'float64',
+            'product_width_cm': 'float64'
+        },
+        'parse_dates': []
+    },
+    'olist_sellers_dataset.csv': {
+        'dtype': {
+            'seller_id': 'str',
+            'seller_zip_code_prefix': 'int32',
+            'seller_city': 'str',
+            'seller_state': 'category'
+        },
+        'parse_dates': []
+    },
+    'product_category_name_translation.csv': {
+        'dtype': {
+            'product_category_name': 'str',
+            'product_category_name_english': 'str'
+        },
+        'parse_dates': []
+    }
+}
+
+def schema_read_options(filename):
+    """Argumentos de read_csv (dtype, parse_dates) para un archivo del registro"""
+    schema = OLIST_SCHEMAS.get(filename)
+    if schema is None:
+        return {'low_memory': False}
+    
+    return {'dtype': schema['dtype'], 'parse_dates': schema['parse_dates']}
+
+def schema_filename(file_path):
+    """Nombre del CSV original con el que se registra un archivo (<nombre>.parquet -> <nombre>.csv)"""
+    return f"{Path(file_path).stem}.csv"
+
+def find_olist_files(directory):
+    """{nombre CSV: ruta} de los archivos de un directorio; si hay CSV y Parquet del mismo archivo, el CSV"""
+    files = {}
+    for pattern in ('*.csv', '*.parquet'):
+        for file_path in sorted(Path(directory).glob(pattern)):
+            files.setdefault(schema_filename(file_path), file_path)
+    return files
+
+def apply_olist_schema(df, filename):
+    """Tipos del esquema sobre un DataFrame ya leído (Parquet): las fechas ya vienen tipadas"""
+    schema = OLIST_SCHEMAS.get(filename)
+    if schema is None:
+        return df
+    dtypes = {column: dtype for column, dtype in schema['dtype'].items() if column in df.columns}
+    try:
+        return df.astype(dtypes)
+    except (ValueError, TypeError) as e:
+        print(f"⚠️ {filename} no cumple el esquema ({e}): se conservan los tipos del Parquet")
+        return df
+
+def read_olist_csv(file_path):
+    """
+    Leer un archivo de Olist completo con su esquema (sin esquema si el archivo no lo cumple);
+    las rutas .parquet se leen con pd.read_parquet
+    """
+    file_path = Path(file_path)
+    if file_path.suffix == '.parquet':
+        return apply_olist_schema(pd.read_parquet(file_path), schema_filename(file_path))
+    try:
+        return pd.read_csv(file_path, **schema_read_options(file_path.name))
+    except (ValueError, TypeError) as e:
+        print(f"⚠️ {file_path.name} no cumple el esquema ({e}): lectura sin tipos")
+        return pd.read_csv(file_path, low_memory=False)
+
+def iter_olist_csv(file_path, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Leer un archivo de Olist por bloques de chunk_size filas, cada bloque ya tipado"""
+    file_path = Path(file_path)
+    if file_path.suffix == '.parquet':
+        if not PYARROW_AVAILABLE:
+            raise ImportError("pyarrow es necesario para leer Parquet por bloques")
+        for batch in pa_dataset.dataset(file_path, format='parquet').to_batches(batch_size=chunk_size):
+            yield apply_olist_schema(batch.to_pandas(), schema_filename(file_path))
+        return
+    with pd.read_csv(file_path, chunksize=chunk_size, **schema_read_options(file_path.name)) as reader:
+        for chunk in reader:
+            yield chunk
+
+def restore_categories(df, filename):
+    """Volver a category las columnas del esquema tras concatenar bloques con categorías distintas"""
+    schema = OLIST_SCHEMAS.get(filename, {'dtype': {}})
+    for column, dtype in schema['dtype'].items():
+        if dtype == 'category' and column in df.columns and df[column].dtype != 'category':
+            df[column] = df[column].astype('category')
+    return df
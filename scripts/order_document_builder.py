@@ -0,0 +1,342 @@
+#!/usr/bin/env python3
+"""
+Ensamblador Columnar de Documentos de Órdenes
+Dataset: Brazilian E-Commerce (datos procesados)
+Construye los documentos anidados de la colección orders sin iterrows
+"""
+
+import pandas as pd
+import numpy as np
+from datetime import datetime
+from concurrent.futures import ProcessPoolExecutor
+from city_keys import city_key_series
+import warnings
+warnings.filterwarnings('ignore')
+
+class OrderDocumentBuilder:
+    """Construir documentos de orders a partir de columnas ya convertidas"""
+    
+    ORDER_DATE_COLUMNS = [
+        'order_purchase_timestamp',
+        'order_approved_at',
+        'order_delivered_carrier_date',
+        'order_delivered_customer_date',
+        'order_estimated_delivery_date'
+    ]
+    ITEM_DATE_COLUMNS = ['shipping_limit_date']
+    REVIEW_DATE_COLUMNS = ['review_creation_date', 'review_answer_timestamp']
+    
+    ORDER_COLUMNS = [
+        'order_id', 'customer_id', 'customer_city_normalized', 'customer_city_key', 'customer_state_normalized',
+        'customer_region', 'order_status', 'delivery_status', 'delivery_time_days',
+        'order_year', 'order_month', 'order_day', 'order_weekday', 'order_quarter'
+    ]
+    ITEM_COLUMNS = [
+        'order_item_id', 'product_id', 'seller_id', 'product_category_name',
+        'product_category_name_normalized', 'weight_category', 'size_category',
+        'price', 'freight_value', 'total_item_value', 'freight_percentage',
+        'value_category', 'freight_category'
+    ]
+    PAYMENT_COLUMNS = [
+        'payment_sequential', 'payment_type', 'payment_type_normalized',
+        'payment_installments', 'payment_value', 'payment_value_category',
+        'installments_category'
+    ]
+    REVIEW_COLUMNS = [
+        'review_id', 'review_score', 'review_score_category', 'review_comment_title',
+        'review_comment_message', 'has_comment_title', 'has_comment_message',
+        'response_time_hours'
+    ]
+    
+    @classmethod
+    def required_columns(cls):
+        """Columnas que el ensamblador lee de cada dataset procesado (para lecturas proyectadas)"""
+        return {
+            'orders_with_customers': cls.ORDER_COLUMNS + cls.ORDER_DATE_COLUMNS,
+            'items_with_products': ['order_id'] + cls.ITEM_COLUMNS + cls.ITEM_DATE_COLUMNS,
+            'payments': ['order_id'] + cls.PAYMENT_COLUMNS,
+            'reviews': ['order_id'] + cls.REVIEW_COLUMNS + cls.REVIEW_DATE_COLUMNS
+        }
+    
+    def __init__(self, orders_df, items_df, payments_df, reviews_df):
+        self.orders_df = orders_df
+        self.items_df = items_df
+        self.payments_df = payments_df
+        self.reviews_df = reviews_df
+        self.prepared = False
+    
+    @staticmethod
+    def column_values(series):
+        """Convertir una columna a lista de tipos Python (NaN y '' -> None)"""
+        values = series.tolist()
+        mask = series.isna().to_numpy()
+        if not pd.api.types.is_numeric_dtype(series.dtype) and not pd.api.types.is_bool_dtype(series.dtype):
+            mask = mask | series.astype(object).eq('').to_numpy()
+        for position in np.flatnonzero(mask):
+            values[position] = None
+        return values
+    
+    @staticmethod
+    def date_values(series):
+        """Convertir una columna de fechas una sola vez (NaT -> None)"""
+        dates = pd.to_datetime(series, errors='coerce')
+        values = list(np.asarray(dates.dt.to_pydatetime(), dtype=object))
+        for position in np.flatnonzero(dates.isna().to_numpy()):
+            values[position] = None
+        return values
+    
+    def _convert_dates(self, df, date_columns):
+        """Convertir las columnas de fecha del DataFrame completo una sola vez (datetime64)"""
+        return {col: pd.to_datetime(df[col], errors='coerce') for col in date_columns if col in df.columns}
+    
+    def _chunk_columns(self, df, rows, columns, dates):
+        """Extraer como listas limpias solo las filas indicadas de las columnas del bloque"""
+        present = [col for col in columns if col in df.columns]
+        chunk = df[present].take(rows)
+        extracted = {col: self.column_values(chunk[col]) for col in present}
+        for col in columns:
+            if col not in extracted:
+                extracted[col] = [None] * len(rows)
+        for col, series in dates.items():
+            extracted[col] = self.date_values(series.take(rows))
+        return extracted
+    
+    def _group_offsets(self, order_ids):
+        """Agrupar filas por order_id usando offsets (posiciones ordenadas + inicio/fin por grupo)"""
+        codes = self.order_index.get_indexer(order_ids)
+        rows = np.flatnonzero(codes >= 0)
+        codes = codes[rows]
+        
+        sort_order = np.argsort(codes, kind='stable')
+        positions = rows[sort_order]
+        counts = np.bincount(codes, minlength=len(self.order_index))
+        ends = np.cumsum(counts)
+        starts = ends - counts
+        return positions, starts, ends, codes, rows
+    
+    @staticmethod
+    def _gather(positions, starts, ends, codes):
+        """Filas hijas de los grupos indicados, con offsets locales por grupo dentro del bloque"""
+        group_starts = starts[codes]
+        counts = ends[codes] - group_starts
+        local_ends = np.cumsum(counts)
+        local_starts = local_ends - counts
+        total = int(local_ends[-1]) if len(counts) else 0
+        index = np.repeat(group_starts - local_starts, counts) + np.arange(total)
+        return positions[index], local_starts, local_ends
+    
+    def prepare(self):
+        """Convertir fechas y agrupar items, pagos y reviews por order_id (una sola pasada)"""
+        # Datos procesados anteriores a customer_city_key: derivarla de la ciudad normalizada
+        if 'customer_city_key' not in self.orders_df.columns and 'customer_city_normalized' in self.orders_df.columns:
+            self.orders_df = self.orders_df.assign(
+                customer_city_key=city_key_series(self.orders_df['customer_city_normalized'])
+            )
+        
+        # Códigos de grupo por orden (tolera order_id duplicados en orders)
+        order_codes, uniques = pd.factorize(self.orders_df['order_id'])
+        self.order_codes = order_codes
+        self.order_index = pd.Index(uniques)
+        
+        self.order_dates = self._convert_dates(self.orders_df, self.ORDER_DATE_COLUMNS)
+        self.item_dates = self._convert_dates(self.items_df, self.ITEM_DATE_COLUMNS)
+        self.review_dates = self._convert_dates(self.reviews_df, self.REVIEW_DATE_COLUMNS)
+        
+        self.item_positions, self.item_starts, self.item_ends, item_codes, item_rows = self._group_offsets(self.items_df['order_id'])
+        self.payment_positions, self.payment_starts, self.payment_ends, _, _ = self._group_offsets(self.payments_df['order_id'])
+        self.review_positions, self.review_starts, self.review_ends, _, _ = self._group_offsets(self.reviews_df['order_id'])
+        
+        # Totales por orden con bincount (NaN se propaga igual que sum() en Python)
+        n_groups = len(self.order_index)
+        self.item_counts = self.item_ends - self.item_starts
+        self.total_values = np.bincount(
+            item_codes, weights=self.items_df['total_item_value'].to_numpy(dtype=float)[item_rows], minlength=n_groups
+        )
+        self.total_freights = np.bincount(
+            item_codes, weights=self.items_df['freight_value'].to_numpy(dtype=float)[item_rows], minlength=n_groups
+        )
+        
+        self.prepared = True
+        return self
+    
+    @staticmethod
+    def _item_document(cols, p):
+        """Subdocumento de item para la fila local p del bloque de items"""
+        return {
+            'order_item_id': cols['order_item_id'][p],
+            'product_id': cols['product_id'][p],
+            'seller_id': cols['seller_id'][p],
+            'product_info': {
+                'product_category_name': cols['product_category_name'][p],
+                'product_category_name_normalized': cols['product_category_name_normalized'][p],
+                'weight_category': cols['weight_category'][p],
+                'size_category': cols['size_category'][p]
+            },
+            'price': cols['price'][p],
+            'freight_value': cols['freight_value'][p],
+            'total_item_value': cols['total_item_value'][p],
+            'freight_percentage': cols['freight_percentage'][p],
+            'value_category': cols['value_category'][p],
+            'freight_category': cols['freight_category'][p],
+            'shipping_limit_date': cols['shipping_limit_date'][p]
+        }
+    
+    @staticmethod
+    def _payment_document(cols, p):
+        """Subdocumento de pago para la fila local p del bloque de payments"""
+        return {
+            'payment_sequential': cols['payment_sequential'][p],
+            'payment_type': cols['payment_type'][p],
+            'payment_type_normalized': cols['payment_type_normalized'][p],
+            'payment_installments': cols['payment_installments'][p],
+            'payment_value': cols['payment_value'][p],
+            'payment_value_category': cols['payment_value_category'][p],
+            'installments_category': cols['installments_category'][p]
+        }
+    
+    @staticmethod
+    def _review_document(cols, p):
+        """Subdocumento de review para la fila local p del bloque de reviews"""
+        return {
+            'review_id': cols['review_id'][p],
+            'review_score': cols['review_score'][p],
+            'review_score_category': cols['review_score_category'][p],
+            'review_comment_title': cols['review_comment_title'][p],
+            'review_comment_message': cols['review_comment_message'][p],
+            'review_creation_date': cols['review_creation_date'][p],
+            'review_answer_timestamp': cols['review_answer_timestamp'][p],
+            'has_comment_title': cols['has_comment_title'][p],
+            'has_comment_message': cols['has_comment_message'][p],
+            'response_time_hours': cols['response_time_hours'][p]
+        }
+    
+    @staticmethod
+    def _total(value, count):
+        """Total de la orden: 0 sin items, None si la suma es NaN"""
+        if count == 0:
+            return 0
+        return None if np.isnan(value) else float(value)
+    
+    def build_documents(self, start=0, stop=None):
+        """Construir los documentos de las órdenes en el rango [start, stop)"""
+        if not self.prepared:
+            self.prepare()
+        
+        stop = len(self.orders_df) if stop is None else min(stop, len(self.orders_df))
+        if start >= stop:
+            return []
+        
+        codes = self.order_codes[start:stop]
+        cols = self._chunk_columns(self.orders_df, np.arange(start, stop), self.ORDER_COLUMNS, self.order_dates)
+        
+        # Solo se extraen las filas hijas de las órdenes de este bloque
+        item_rows, item_starts, item_ends = self._gather(self.item_positions, self.item_starts, self.item_ends, codes)
+        item_cols = self._chunk_columns(self.items_df, item_rows, self.ITEM_COLUMNS, self.item_dates)
+        
+        payment_rows, payment_starts, payment_ends = self._gather(self.payment_positions, self.payment_starts, self.payment_ends, codes)
+        payment_cols = self._chunk_columns(self.payments_df, payment_rows, self.PAYMENT_COLUMNS, {})
+        
+        # Primera review de cada orden (igual que la carga original)
+        has_review = self.review_ends[codes] > self.review_starts[codes]
+        review_rows = self.review_positions[self.review_starts[codes][has_review]]
+        review_local = np.cumsum(has_review) - 1
+        review_cols = self._chunk_columns(self.reviews_df, review_rows, self.REVIEW_COLUMNS, self.review_dates)
+        
+        now = datetime.now()
+        documents = []
+        
+        for k in range(stop - start):
+            g = codes[k]
+            
+            items = [self._item_document(item_cols, p) for p in range(item_starts[k], item_ends[k])]
+            payments = [self._payment_document(payment_cols, p) for p in range(payment_starts[k], payment_ends[k])]
+            review = self._review_document(review_cols, review_local[k]) if has_review[k] else {}
+            
+            item_count = int(self.item_counts[g])
+            documents.append({
+                'order_id': cols['order_id'][k],
+                'customer': {
+                    'customer_id': cols['customer_id'][k],
+                    'customer_city': cols['customer_city_normalized'][k],
+                    'city_key': cols['customer_city_key'][k],
+                    'customer_state': cols['customer_state_normalized'][k],
+                    'customer_region': cols['customer_region'][k]
+                },
+                'order_info': {
+                    'order_status': cols['order_status'][k],
+                    'delivery_status': cols['delivery_status'][k],
+                    'order_purchase_timestamp': cols['order_purchase_timestamp'][k],
+                    'order_approved_at': cols['order_approved_at'][k],
+                    'order_delivered_carrier_date': cols['order_delivered_carrier_date'][k],
+                    'order_delivered_customer_date': cols['order_delivered_customer_date'][k],
+                    'order_estimated_delivery_date': cols['order_estimated_delivery_date'][k],
+                    'delivery_time_days': cols['delivery_time_days'][k]
+                },
+                'time_dimensions': {
+                    'order_year': cols['order_year'][k],
+                    'order_month': cols['order_month'][k],
+                    'order_day': cols['order_day'][k],
+                    'order_weekday': cols['order_weekday'][k],
+                    'order_quarter': cols['order_quarter'][k]
+                },
+                'items': items,
+                'payments': payments,
+                'review': review,
+                'order_summary': {
+                    'total_items': item_count,
+                    'total_value': self._total(self.total_values[g], item_count),
+                    'total_freight': self._total(self.total_freights[g], item_count),
+                    'payment_methods_count': len(payments),
+                    'average_review_score': review['review_score'] if review else None
+                },
+                'created_at': now,
+                'updated_at': now
+            })
+        
+        return documents
+    
+    def chunk_frames(self, start, stop):
+        """Sub-DataFrames (orders, items, payments, reviews) autocontenidos para un bloque de órdenes"""
+        if not self.prepared:
+            self.prepare()
+        
+        codes = np.unique(self.order_codes[start:stop])
+        item_rows, _, _ = self._gather(self.item_positions, self.item_starts, self.item_ends, codes)
+        payment_rows, _, _ = self._gather(self.payment_positions, self.payment_starts, self.payment_ends, codes)
+        review_rows, _, _ = self._gather(self.review_positions, self.review_starts, self.review_ends, codes)
+        
+        return (
+            self.orders_df.iloc[start:stop],
+            self.items_df.take(item_rows),
+            self.payments_df.take(payment_rows),
+            self.reviews_df.take(review_rows)
+        )
+    
+    def iter_document_chunks(self, chunk_size=5000, processes=0):
+        """
+        Generar los documentos en bloques de chunk_size órdenes (memoria acotada por bloque).
+        Con processes > 0 cada bloque se construye en un pool de procesos, manteniendo
+        como máximo 2 bloques en vuelo por proceso y entregándolos en orden.
+        """
+        if not self.prepared:
+            self.prepare()
+        
+        starts = range(0, len(self.orders_df), chunk_size)
+        
+        if processes <= 0:
+            for start in starts:
+                yield self.build_documents(start, start + chunk_size)
+            return
+        
+        with ProcessPoolExecutor(max_workers=processes) as executor:
+            in_flight = []
+            for start in starts:
+                in_flight.append(executor.submit(build_chunk_documents, self.chunk_frames(start, start + chunk_size)))
+                if len(in_flight) >= processes * 2:
+                    yield in_flight.pop(0).result()
+            for future in in_flight:
+                yield future.result()
+
+def build_chunk_documents(frames):
+    """Construir en un proceso del pool los documentos de un bloque (orders, items, payments, reviews)"""
+    return OrderDocumentBuilder(*frames).build_documents()
@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+"""
+Almacenamiento de Datasets Procesados
+Dataset: Brazilian E-Commerce (datos procesados)
+Formato columnar Parquet (tipos conservados) con CSV como alternativa sin pyarrow
+"""
+
+import pandas as pd
+from pathlib import Path
+
+try:
+    import pyarrow.parquet as pq
+    PYARROW_AVAILABLE = True
+except ImportError:
+    PYARROW_AVAILABLE = False
+
+# Parquet conserva datetime64 y categorías: las etapas siguientes no vuelven a parsear
+PROCESSED_FORMAT = 'parquet' if PYARROW_AVAILABLE else 'csv'
+PROCESSED_EXTENSIONS = ('.parquet', '.csv')
+
+def save_processed_frame(df, output_dir, name, file_format=None):
+    """Guardar un dataset procesado como <name>.parquet (o .csv sin pyarrow) y devolver la ruta"""
+    file_format = file_format or PROCESSED_FORMAT
+    output_path = Path(output_dir) / f"{name}.{file_format}"
+    
+    if file_format == 'parquet':
+        df.to_parquet(output_path, index=False)
+    else:
+        df.to_csv(output_path, index=False)
+    
+    return output_path
+
+def read_processed_frame(file_path, columns=None):
+    """
+    Leer un dataset procesado; columns limita la lectura a esas columnas (proyección).
+    Las columnas pedidas que el archivo no tiene (datos de una versión anterior del ETL) se omiten
+    """
+    file_path = Path(file_path)
+    
+    if file_path.suffix == '.parquet':
+        if not PYARROW_AVAILABLE:
+            raise ImportError(f"pyarrow es necesario para leer {file_path.name}")
+        if columns is not None:
+            available = set(pq.read_schema(file_path).names)
+            columns = [column for column in columns if column in available]
+        return pd.read_parquet(file_path, columns=columns, memory_map=True)
+    
+    usecols = None if columns is None else set(columns).__contains__
+    return pd.read_csv(file_path, usecols=usecols, low_memory=False)
+
+def list_processed_files(directory):
+    """Archivos procesados por nombre de dataset (si hay .parquet y .csv, el más reciente)"""
+    files = {}
+    for file_path in sorted(Path(directory).iterdir()):
+        if file_path.suffix not in PROCESSED_EXTENSIONS:
+            continue
+        if file_path.suffix == '.parquet' and not PYARROW_AVAILABLE:
+            continue
+        
+        current = files.get(file_path.stem)
+        if current is None or file_path.stat().st_mtime > current.stat().st_mtime:
+            files[file_path.stem] = file_path
+    
+    return files
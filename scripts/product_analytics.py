@@ -0,0 +1,210 @@
+#!/usr/bin/env python3
+"""
+Analítica Vectorizada de Productos (Consulta 14)
+Dataset: Brazilian E-Commerce (MongoDB)
+Métricas de todo el catálogo vendidas en streaming a arrays NumPy: correlaciones, rangos de precio y categorías
+"""
+
+import time
+import numpy as np
+from sales_rollups import PURCHASE_TIMESTAMP
+
+# Columnas numéricas de la matriz de productos (una fila por producto)
+FIELDS = ('precio_promedio', 'stock_simulado', 'total_vendido', 'total_ingresos',
+          'meses_activo', 'rotacion_mensual', 'peso_g', 'volumen_cm3')
+
+DEFAULT_PRICE_BANDS = (50, 150)
+
+def product_metrics_pipeline():
+    """Una fila plana por producto vendido con sus métricas de ventas y dimensiones (sin $limit)"""
+    return [
+        {"$unwind": "$items"},
+        {"$group": {
+            "_id": "$items.product_id",
+            "categoria": {"$first": "$items.product_info.product_category_name_normalized"},
+            "precio_promedio": {"$avg": "$items.price"},
+            "total_vendido": {"$sum": 1},
+            "total_ingresos": {"$sum": "$items.total_item_value"},
+            # Como mucho un valor por mes de actividad: el array queda acotado
+            "meses_activo": {"$addToSet": {"$dateToString": {"format": "%Y-%m", "date": f"${PURCHASE_TIMESTAMP}"}}}
+        }},
+        {"$lookup": {
+            "from": "products",
+            "localField": "_id",
+            "foreignField": "product_id",
+            "as": "product_info"
+        }},
+        {"$unwind": {"path": "$product_info", "preserveNullAndEmptyArrays": True}},
+        {"$project": {
+            "_id": 0,
+            "product_id": "$_id",
+            "categoria": 1,
+            "precio_promedio": 1,
+            "total_vendido": 1,
+            "total_ingresos": 1,
+            "meses_activo": {"$size": "$meses_activo"},
+            "peso_g": "$product_info.product_weight_g",
+            "volumen_cm3": {"$multiply": [
+                "$product_info.product_length_cm", "$product_info.product_height_cm", "$product_info.product_width_cm"
+            ]},
+            # Simular stock basado en popularidad (inversamente proporcional)
+            "stock_simulado": {"$cond": [
+                {"$gt": ["$total_vendido", 100]},
+                {"$subtract": [200, "$total_vendido"]},
+                {"$add": [50, {"$multiply": [{"$subtract": [100, "$total_vendido"]}, 2]}]}
+            ]},
+            "rotacion_mensual": {"$divide": ["$total_vendido", {"$max": [{"$size": "$meses_activo"}, 1]}]}
+        }},
+        {"$match": {"stock_simulado": {"$gt": 0}}}
+    ]
+
+def rank_average(values):
+    """Rangos (1..n) con empates promediados, vectorizado (equivalente a scipy.stats.rankdata)"""
+    n = len(values)
+    if n == 0:
+        return np.empty(0)
+    order = np.argsort(values, kind='mergesort')
+    sorted_values = values[order]
+    starts_group = np.empty(n, dtype=bool)
+    starts_group[0] = True
+    starts_group[1:] = sorted_values[1:] != sorted_values[:-1]
+    group = np.cumsum(starts_group) - 1
+    starts = np.flatnonzero(starts_group)
+    sizes = np.diff(np.append(starts, n))
+    ranks = np.empty(n)
+    ranks[order] = (starts + (sizes + 1) / 2.0)[group]
+    return ranks
+
+def pearson(x, y):
+    """Correlación de Pearson; 0 con menos de dos valores o una variable constante"""
+    if len(x) < 2:
+        return 0.0
+    dx, dy = x - x.mean(), y - y.mean()
+    denominator = np.sqrt((dx * dx).sum() * (dy * dy).sum())
+    return float((dx * dy).sum() / denominator) if denominator else 0.0
+
+class ProductAnalytics:
+    """Matriz productos x FIELDS (float64, NaN si falta) y códigos de categoría"""
+    
+    def __init__(self, values, product_ids, category_codes, categories):
+        self.values = values
+        self.product_ids = product_ids
+        self.category_codes = category_codes
+        self.categories = categories
+    
+    @classmethod
+    def from_cursor(cls, cursor, chunk_size=10000):
+        """Volcar el cursor por bloques de chunk_size filas (None -> NaN) sin materializar los documentos"""
+        chunks, product_ids, codes = [], [], []
+        categories = {}
+        rows = []
+        for document in cursor:
+            rows.append([document.get(field) for field in FIELDS])
+            product_ids.append(document.get('product_id'))
+            codes.append(categories.setdefault(document.get('categoria'), len(categories)))
+            if len(rows) == chunk_size:
+                chunks.append(np.array(rows, dtype=np.float64))
+                rows = []
+        if rows:
+            chunks.append(np.array(rows, dtype=np.float64))
+        
+        values = np.concatenate(chunks) if chunks else np.empty((0, len(FIELDS)))
+        return cls(values, np.array(product_ids, dtype=object), np.array(codes, dtype=np.int32),
+                   np.array(list(categories), dtype=object))
+    
+    def __len__(self):
+        return len(self.values)
+    
+    def column(self, field):
+        return self.values[:, FIELDS.index(field)]
+    
+    def complete_rows(self, fields):
+        """Máscara de productos con todos los campos presentes: x e y siempre alineados por producto"""
+        columns = [FIELDS.index(field) for field in fields]
+        return np.isfinite(self.values[:, columns]).all(axis=1)
+    
+    def correlation_matrix(self, fields=FIELDS, rank=False):
+        """Pearson (o Spearman con rank=True) por pares, cada par sobre los productos con ambos valores"""
+        matrix = {field: {} for field in fields}
+        counts = {field: {} for field in fields}
+        # Rangos de columna completa reutilizables en todos los pares sin huecos
+        full_ranks = {field: rank_average(self.column(field)) for field in fields
+                      if rank and np.isfinite(self.column(field)).all()}
+        for i, a in enumerate(fields):
+            for b in fields[i:]:
+                rows = self.complete_rows((a, b))
+                if rank and rows.all():
+                    x, y = full_ranks[a], full_ranks[b]
+                else:
+                    x, y = self.column(a)[rows], self.column(b)[rows]
+                    if rank:
+                        x, y = rank_average(x), rank_average(y)
+                matrix[a][b] = matrix[b][a] = pearson(x, y)
+                counts[a][b] = counts[b][a] = int(rows.sum())
+        return {'n': counts, 'matrix': matrix}
+    
+    def _grouped(self, groups, n_groups, fields, rows=None):
+        """Conteo y media por grupo de cada campo (ignorando NaN) con bincount; rows filtra productos"""
+        stats = {'productos': np.bincount(groups, minlength=n_groups)}
+        for field in fields:
+            column = self.column(field) if rows is None else self.column(field)[rows]
+            present = np.isfinite(column)
+            sums = np.bincount(groups[present], weights=column[present], minlength=n_groups)
+            counts = np.bincount(groups[present], minlength=n_groups)
+            with np.errstate(invalid='ignore', divide='ignore'):
+                stats[field] = np.where(counts > 0, sums / counts, np.nan)
+        return stats
+    
+    def price_band_stats(self, bands=DEFAULT_PRICE_BANDS):
+        """Productos, stock y rotación medios por rango de precio: bajo < bands[0] <= medio <= bands[-1] < alto"""
+        price = self.column('precio_promedio')
+        rows = np.isfinite(price)
+        # Límite inferior incluido en el rango superior y los siguientes en el inferior (50 y 150 son "medio")
+        groups = np.digitize(price[rows], bands[:1]) + np.digitize(price[rows], bands[1:], right=True)
+        labels = ([f"Bajo (< ${bands[0]})"] +
+                  [f"Medio (${low}-${high})" for low, high in zip(bands[:-1], bands[1:])] +
+                  [f"Alto (> ${bands[-1]})"])
+        
+        stats = self._grouped(groups, len(labels), ('stock_simulado', 'rotacion_mensual', 'precio_promedio'), rows)
+        return {
+            label: {
+                'productos': int(stats['productos'][i]),
+                'stock_promedio': float(stats['stock_simulado'][i]),
+                'rotacion_promedio': float(stats['rotacion_mensual'][i]),
+                'precio_promedio': float(stats['precio_promedio'][i])
+            }
+            for i, label in enumerate(labels)
+        }
+    
+    def category_stats(self, top=None):
+        """Por categoría: productos, precio/rotación/stock medios e ingresos totales, por ingresos desc."""
+        n_groups = len(self.categories)
+        stats = self._grouped(self.category_codes, n_groups, ('precio_promedio', 'rotacion_mensual', 'stock_simulado'))
+        revenue = self.column('total_ingresos')
+        present = np.isfinite(revenue)
+        ingresos = np.bincount(self.category_codes[present], weights=revenue[present], minlength=n_groups)
+        
+        order = np.argsort(-ingresos, kind='stable')[:top]
+        return {
+            self.categories[i]: {
+                'productos': int(stats['productos'][i]),
+                'precio_promedio': round(float(stats['precio_promedio'][i]), 2),
+                'rotacion_promedio': round(float(stats['rotacion_mensual'][i]), 2),
+                'stock_promedio': round(float(stats['stock_simulado'][i]), 1),
+                'ingresos_totales': float(ingresos[i])
+            }
+            for i in order
+        }
+    
+    def summary(self, bands=DEFAULT_PRICE_BANDS, top_categories=8):
+        """Todo el análisis de la consulta 14 y su tiempo de cómputo NumPy"""
+        start_time = time.perf_counter()
+        summary = {
+            'productos_analizados': len(self),
+            'pearson': self.correlation_matrix(),
+            'spearman': self.correlation_matrix(rank=True),
+            'rangos_precio': self.price_band_stats(bands),
+            'categorias': self.category_stats(top_categories)
+        }
+        summary['tiempo_numpy_segundos'] = time.perf_counter() - start_time
+        return summary
@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+Anti-join de Productos sin Ventas Recientes
+Dataset: Brazilian E-Commerce (MongoDB)
+Productos no vendidos desde una fecha sin enviar la lista de activos en un $nin
+"""
+
+from itertools import islice
+from mongodb_connection import METADATA_COLLECTION
+from sales_rollups import ROLLUP_STATUS_ID, PURCHASE_TIMESTAMP
+
+class ProductAntiJoin:
+    """
+    Dos estrategias escalables frente a {"product_id": {"$nin": [...activos...]}}:
+    - servidor: filtro indexado sobre products.last_sale_date (mantenido por SalesRollups)
+    - streaming: diferencia de dos flujos ordenados por product_id (products y vendidos)
+    """
+    
+    def __init__(self, db):
+        self.db = db
+    
+    def has_last_sale_dates(self):
+        """True si el loader ya materializó products.last_sale_date"""
+        status = self.db[METADATA_COLLECTION].find_one({'_id': ROLLUP_STATUS_ID})
+        return bool(status and status.get('last_sale_date'))
+    
+    @staticmethod
+    def without_sales_filter(fecha_limite):
+        """Sin venta desde fecha_limite: última venta anterior o ninguna (campo ausente)"""
+        return {'$or': [{'last_sale_date': {'$lt': fecha_limite}}, {'last_sale_date': None}]}
+    
+    def server_side(self, fecha_limite, limit=None, projection=None):
+        """Candidatos con last_sale_date < fecha_limite o sin ventas (dos rangos del índice, sin ordenar)"""
+        cursor = self.db.products.find(self.without_sales_filter(fecha_limite), projection)
+        if limit:
+            cursor = cursor.limit(limit)
+        return list(cursor)
+    
+    def iter_active_product_ids(self, fecha_limite):
+        """product_id vendidos desde fecha_limite, únicos y en orden ascendente (cursor del servidor)"""
+        pipeline = [
+            {"$match": {PURCHASE_TIMESTAMP: {"$gte": fecha_limite}}},
+            {"$unwind": "$items"},
+            {"$match": {"items.product_id": {"$type": "string"}}},
+            {"$group": {"_id": "$items.product_id"}},
+            {"$sort": {"_id": 1}}
+        ]
+        for document in self.db.orders.aggregate(pipeline, allowDiskUse=True):
+            yield document['_id']
+    
+    def iter_sorted_difference(self, fecha_limite, projection=None):
+        """
+        Productos del catálogo (por el índice de product_id) que no aparecen en el flujo de vendidos:
+        un solo avance por cada cursor, memoria constante. Al final, los productos sin product_id
+        de texto: nunca aparecen en una venta (mismo resultado que el $nin y que last_sale_date)
+        """
+        active = self.iter_active_product_ids(fecha_limite)
+        current = next(active, None)
+        
+        for product in self.db.products.find({'product_id': {'$type': 'string'}}, projection).sort('product_id', 1):
+            product_id = product['product_id']
+            while current is not None and current < product_id:
+                current = next(active, None)
+            if current != product_id:
+                yield product
+        
+        yield from self.db.products.find({'product_id': {'$not': {'$type': 'string'}}}, projection)
+    
+    def sorted_merge(self, fecha_limite, limit=None, projection=None):
+        """Primeros limit candidatos de la diferencia ordenada (todos si limit es None)"""
+        return list(islice(self.iter_sorted_difference(fecha_limite, projection), limit))
+    
+    def legacy_nin(self, fecha_limite, limit=None, projection=None):
+        """Implementación original: set de activos en Python y $nin con la lista completa"""
+        active_ids = list(self.iter_active_product_ids(fecha_limite))
+        cursor = self.db.products.find({'product_id': {'$nin': active_ids}}, projection)
+        if limit:
+            cursor = cursor.limit(limit)
+        return list(cursor)
+    
+    def recently_sold(self, product_ids, fecha_limite):
+        """Subconjunto de product_ids con alguna venta desde fecha_limite, consultado en orders (no en last_sale_date)"""
+        pipeline = [
+            {"$match": {"items.product_id": {"$in": list(product_ids)}, PURCHASE_TIMESTAMP: {"$gte": fecha_limite}}},
+            {"$unwind": "$items"},
+            {"$match": {"items.product_id": {"$in": list(product_ids)}}},
+            {"$group": {"_id": "$items.product_id"}}
+        ]
+        return {document['_id'] for document in self.db.orders.aggregate(pipeline)}
+    
+    def unsold_guard(self, fecha_limite):
+        """
+        chunk_guard para BulkMutationEngine.delete: justo antes de borrar cada lote de products se
+        comprueban sus ventas en orders, así un last_sale_date ausente o desfasado no borra productos vendidos
+        """
+        def guard(collection, chunk_ids):
+            products = list(collection.find({'_id': {'$in': chunk_ids}}, {'product_id': 1}))
+            # Solo product_id de texto: un $in con null casaría ítems sin product_id
+            product_ids = [p['product_id'] for p in products if isinstance(p.get('product_id'), str)]
+            sold = self.recently_sold(product_ids, fecha_limite) if product_ids else set()
+            return [p['_id'] for p in products if p.get('product_id') not in sold]
+        return guard
+    
+    def count_active(self, fecha_limite):
+        """Productos con alguna venta desde fecha_limite"""
+        if self.has_last_sale_dates():
+            return self.db.products.count_documents({'last_sale_date': {'$gte': fecha_limite}})
+        return sum(1 for _ in self.iter_active_product_ids(fecha_limite))
+    
+    def products_without_recent_sales(self, fecha_limite, limit=None, projection=None):
+        """Estrategia de servidor si last_sale_date está materializado; si no, diferencia ordenada"""
+        if self.has_last_sale_dates():
+            return 'last_sale_date indexado', self.server_side(fecha_limite, limit, projection)
+        return 'diferencia ordenada en streaming', self.sorted_merge(fecha_limite, limit, projection)
@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+"""
+Caché de Resultados de Agregaciones
+Dataset: Brazilian E-Commerce (MongoDB)
+LRU en memoria + archivos en disco, invalidados por la versión de datos que publica el loader
+"""
+
+import copy
+import hashlib
+import time
+from collections import OrderedDict
+from datetime import datetime
+from pathlib import Path
+from bson import json_util
+from bson.json_util import CANONICAL_JSON_OPTIONS
+from pymongo import ReturnDocument
+from mongodb_connection import METADATA_COLLECTION
+
+DATA_VERSION_ID = 'data_version'
+DEFAULT_CACHE_DIR = 'data/processed/query_cache'
+
+def current_data_version(db):
+    """Versión de datos vigente (0 si el loader aún no ha publicado ninguna)"""
+    document = db[METADATA_COLLECTION].find_one({'_id': DATA_VERSION_ID})
+    return document['version'] if document else 0
+
+def bump_data_version(db, source='loader'):
+    """Incrementar la versión de datos tras modificar colecciones: invalida toda la caché"""
+    document = db[METADATA_COLLECTION].find_one_and_update(
+        {'_id': DATA_VERSION_ID},
+        {'$inc': {'version': 1}, '$set': {'updated_at': datetime.now(), 'source': source}},
+        upsert=True,
+        return_document=ReturnDocument.AFTER
+    )
+    return document['version']
+
+class QueryResultCache:
+    """
+    Resultados de aggregate() por hash canónico de (base, colección, pipeline, parámetros).
+    Cada entrada guarda la versión de datos con la que se calculó y se descarta si no coincide;
+    en disco se conservan como mucho max_entries archivos de la versión vigente
+    """
+    
+    def __init__(self, db, cache_dir=DEFAULT_CACHE_DIR, max_entries=128, use_disk=True):
+        self.db = db
+        self.cache_dir = Path(cache_dir)
+        self.max_entries = max_entries
+        self.use_disk = use_disk
+        self.memory = OrderedDict()
+        self.stats = {'memory_hits': 0, 'disk_hits': 0, 'misses': 0}
+    
+    def cache_key(self, collection_name, pipeline, params=None):
+        """
+        SHA-256 del JSON extendido canónico: conserva el orden de claves de cada etapa
+        ($sort depende de él) y distingue tipos (fecha frente a texto, int frente a double)
+        """
+        payload = json_util.dumps(
+            {'database': self.db.name, 'collection': collection_name, 'pipeline': pipeline, 'params': params},
+            json_options=CANONICAL_JSON_OPTIONS
+        )
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+    
+    def _remember(self, key, version, result):
+        """Guardar en el LRU, expulsando la entrada menos usada si se supera max_entries"""
+        self.memory[key] = (version, result)
+        self.memory.move_to_end(key)
+        while len(self.memory) > self.max_entries:
+            self.memory.popitem(last=False)
+    
+    def _disk_path(self, key, version):
+        """Un archivo por (clave, versión de datos): las entradas obsoletas se reconocen por el nombre"""
+        return self.cache_dir / f"{key}.v{version}.json"
+    
+    def _read_disk(self, key, version):
+        """Resultado en disco para la versión indicada (se marca como recién usado)"""
+        path = self._disk_path(key, version)
+        if not self.use_disk or not path.exists():
+            return None
+        
+        entry = json_util.loads(path.read_text(encoding='utf-8'))
+        path.touch()
+        return entry['result']
+    
+    def _write_disk(self, key, version, result):
+        """Escribir la entrada con JSON extendido canónico (fechas y tipos BSON se recuperan)"""
+        if not self.use_disk:
+            return
+        
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        entry = {'data_version': version, 'created_at': datetime.now(), 'result': result}
+        temp_path = self.cache_dir / f"{key}.json.tmp"
+        temp_path.write_text(json_util.dumps(entry, json_options=CANONICAL_JSON_OPTIONS), encoding='utf-8')
+        temp_path.replace(self._disk_path(key, version))
+        self._sweep_disk(version)
+    
+    def _sweep_disk(self, version):
+        """
+        Borrar los archivos de otras versiones de datos (o del formato sin versión) y conservar
+        solo los max_entries usados más recientemente de la versión vigente
+        """
+        current = []
+        for path in self.cache_dir.glob('*.json'):
+            try:
+                if path.name.endswith(f".v{version}.json"):
+                    current.append((path.stat().st_mtime, path))
+                else:
+                    path.unlink()
+            except FileNotFoundError:
+                continue
+        
+        current.sort(reverse=True)
+        for _, path in current[self.max_entries:]:
+            path.unlink(missing_ok=True)
+    
+    def aggregate(self, collection_name, pipeline, params=None, db=None):
+        """
+        Resultado de db[collection_name].aggregate(pipeline): memoria, luego disco, luego MongoDB.
+        db permite ejecutar en otra conexión a la misma base (p. ej. un secundario): la versión
+        se lee en ese mismo nodo, así un resultado nunca queda marcado con datos que no vio
+        """
+        db = self.db if db is None else db
+        version = current_data_version(db)
+        key = self.cache_key(collection_name, pipeline, params)
+        
+        cached = self.memory.get(key)
+        if cached is not None and cached[0] == version:
+            self.memory.move_to_end(key)
+            self.stats['memory_hits'] += 1
+            print(f"⚡ Caché en memoria (versión de datos {version})")
+            return copy.deepcopy(cached[1])
+        
+        result = self._read_disk(key, version)
+        if result is not None:
+            self.stats['disk_hits'] += 1
+            print(f"⚡ Caché en disco (versión de datos {version})")
+            self._remember(key, version, result)
+            return copy.deepcopy(result)
+        
+        self.stats['misses'] += 1
+        start_time = time.time()
+        result = list(db[collection_name].aggregate(pipeline))
+        print(f"🔎 Agregación ejecutada en {time.time() - start_time:.3f}s (guardada en caché)")
+        
+        self._remember(key, version, result)
+        self._write_disk(key, version, result)
+        return copy.deepcopy(result)
+    
+    def print_stats(self):
+        """Resumen de aciertos y fallos de la caché"""
+        total = sum(self.stats.values())
+        hits = self.stats['memory_hits'] + self.stats['disk_hits']
+        hit_rate = hits / total * 100 if total else 0
+        print(f"🗄️ Caché de agregaciones: {self.stats['memory_hits']} en memoria, "
+              f"{self.stats['disk_hits']} en disco, {self.stats['misses']} ejecutadas ({hit_rate:.0f}% aciertos)")
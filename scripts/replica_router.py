@@ -0,0 +1,317 @@
+#!/usr/bin/env python3
+"""
+Enrutador de Lecturas del Replica Set rs0
+Dataset: Brazilian E-Commerce (MongoDB)
+Cada clase de consulta se envía a primary, secondaryPreferred o nearest con maxStalenessSeconds
+"""
+
+import functools
+import threading
+import time
+from collections import defaultdict
+from pymongo import monitoring
+from pymongo.errors import PyMongoError
+from pymongo.read_preferences import Primary, SecondaryPreferred, Nearest
+from mongodb_connection import create_mongo_client, DATABASE_NAME, REPLICA_SET_NAME, REPLICA_SET_SEEDS, WIRE_COMPRESSORS
+
+# Clase de consulta -> modo de lectura
+QUERY_CLASSES = {
+    'transaccional': 'primary',          # lecturas que deciden una escritura: siempre datos confirmados
+    'analitica': 'secondaryPreferred',   # agregaciones pesadas: descargar al primario
+    'interactiva': 'nearest'             # búsquedas puntuales: menor latencia
+}
+
+# Mínimo que admiten los drivers: heartbeat (10s) + periodo de escritura inactiva (10s) con margen
+DEFAULT_MAX_STALENESS_SECONDS = 90
+# Vigencia del estado de los miembros en conexión directa (heartbeatFrequencyMS por defecto del driver)
+DEFAULT_HEARTBEAT_SECONDS = 10
+
+class MemberStats:
+    """Latencia y carga por miembro (host:puerto), alimentadas por los listeners del driver"""
+    
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.members = {}
+    
+    def _member(self, address):
+        host = f"{address[0]}:{address[1]}" if isinstance(address, tuple) else str(address)
+        if host not in self.members:
+            self.members[host] = {
+                'operations': 0, 'failures': 0, 'in_flight': 0, 'max_in_flight': 0,
+                'total_command_ms': 0.0, 'rtt_ms': None, 'routed_queries': defaultdict(int)
+            }
+        return self.members[host]
+    
+    def command_started(self, address):
+        with self.lock:
+            member = self._member(address)
+            member['in_flight'] += 1
+            member['max_in_flight'] = max(member['max_in_flight'], member['in_flight'])
+    
+    def command_finished(self, address, duration_ms, failed=False):
+        with self.lock:
+            member = self._member(address)
+            member['in_flight'] = max(0, member['in_flight'] - 1)
+            member['operations'] += 1
+            member['failures'] += int(failed)
+            member['total_command_ms'] += duration_ms
+    
+    def round_trip(self, address, rtt_ms):
+        """Media móvil exponencial del RTT (alpha 0.2, como la selección de servidores del driver)"""
+        with self.lock:
+            member = self._member(address)
+            member['rtt_ms'] = rtt_ms if member['rtt_ms'] is None else 0.2 * rtt_ms + 0.8 * member['rtt_ms']
+    
+    def routed(self, address, query_class):
+        with self.lock:
+            self._member(address)['routed_queries'][query_class] += 1
+    
+    def load(self, address):
+        """Carga actual de un miembro: operaciones en curso y total atendido"""
+        with self.lock:
+            member = self._member(address)
+            return member['in_flight'], member['operations']
+    
+    def rtt(self, address):
+        with self.lock:
+            rtt_ms = self._member(address)['rtt_ms']
+            return float('inf') if rtt_ms is None else rtt_ms
+    
+    def snapshot(self):
+        with self.lock:
+            return {
+                host: {
+                    **{key: value for key, value in member.items() if key != 'routed_queries'},
+                    'avg_command_ms': member['total_command_ms'] / member['operations'] if member['operations'] else None,
+                    'routed_queries': dict(member['routed_queries'])
+                }
+                for host, member in self.members.items()
+            }
+
+class _CommandStatsListener(monitoring.CommandListener):
+    """Duración y concurrencia de cada comando por miembro que lo atiende (on_failure tras cada fallo)"""
+    
+    def __init__(self, stats, on_failure=None):
+        self.stats = stats
+        self.on_failure = on_failure
+    
+    def started(self, event):
+        self.stats.command_started(event.connection_id)
+    
+    def succeeded(self, event):
+        self.stats.command_finished(event.connection_id, event.duration_micros / 1000)
+    
+    def failed(self, event):
+        self.stats.command_finished(event.connection_id, event.duration_micros / 1000, failed=True)
+        if self.on_failure is not None:
+            self.on_failure()
+
+class _HeartbeatStatsListener(monitoring.ServerHeartbeatListener):
+    """RTT de los heartbeats del monitor de servidores"""
+    
+    def __init__(self, stats):
+        self.stats = stats
+    
+    def started(self, event):
+        pass
+    
+    def succeeded(self, event):
+        self.stats.round_trip(event.connection_id, event.duration * 1000)
+    
+    def failed(self, event):
+        pass
+
+class ReplicaRouter:
+    """
+    Conexión con la lista semilla de rs0 y una base de datos por clase de consulta.
+    Si los nombres de host del replica set no se resuelven desde el cliente (miembros
+    registrados con nombres internos de Docker), se conecta directamente a cada semilla
+    y aplica las mismas reglas de selección con el estado que reporta hello (renovado cada
+    heartbeat_seconds o tras un comando fallido, no en cada consulta)
+    """
+    
+    def __init__(self, seed_list=REPLICA_SET_SEEDS, replica_set=REPLICA_SET_NAME, database_name=DATABASE_NAME,
+                 max_staleness_seconds=DEFAULT_MAX_STALENESS_SECONDS, compressors=WIRE_COMPRESSORS,
+                 heartbeat_seconds=DEFAULT_HEARTBEAT_SECONDS):
+        self.seed_list = list(seed_list)
+        self.replica_set = replica_set
+        self.database_name = database_name
+        self.max_staleness_seconds = max_staleness_seconds
+        self.compressors = compressors
+        self.heartbeat_seconds = heartbeat_seconds
+        self.stats = MemberStats()
+        self.listeners = [
+            _CommandStatsListener(self.stats, on_failure=self.invalidate_members),
+            _HeartbeatStatsListener(self.stats)
+        ]
+        self.client = None
+        self.members = {}
+        self.members_lock = threading.Lock()
+        self.members_refreshed_at = None
+        self.mode = None
+    
+    def connect(self):
+        """Conectar con el replica set; si no es alcanzable como tal, a cada miembro por separado"""
+        uri = f"mongodb://{','.join(self.seed_list)}/?replicaSet={self.replica_set}"
+        client = create_mongo_client(uri, event_listeners=self.listeners, compressors=self.compressors)
+        try:
+            client.admin.command('ping')
+            self.client = client
+            self.mode = 'replica_set'
+            print(f"✅ Replica set {self.replica_set}: {len(client.nodes)} miembros descubiertos")
+        except PyMongoError as e:
+            client.close()
+            print(f"⚠️ Replica set {self.replica_set} no alcanzable con la lista semilla ({type(e).__name__}): "
+                  f"conexión directa por miembro")
+            self._connect_members()
+            self.mode = 'direct_members'
+        return self
+    
+    def _connect_members(self):
+        """Un cliente directo por semilla alcanzable"""
+        for host in self.seed_list:
+            client = create_mongo_client(f"mongodb://{host}/", event_listeners=self.listeners, compressors=self.compressors)
+            try:
+                client.admin.command('ping')
+            except PyMongoError as e:
+                print(f"⚠️ {host} no disponible: {e}")
+                client.close()
+                continue
+            self.members[host] = {'client': client}
+        if not self.members:
+            raise ConnectionError(f"Ningún miembro de {self.replica_set} alcanzable: {self.seed_list}")
+        self._refresh_members()
+        roles = ', '.join(f"{host} ({member['role']})" for host, member in self.members.items())
+        print(f"✅ Miembros conectados: {roles}")
+    
+    def _refresh_members(self):
+        """Rol, última escritura y RTT de cada miembro (hello); detecta cambios de primario"""
+        for host, member in self.members.items():
+            start_time = time.perf_counter()
+            try:
+                hello = member['client'].admin.command('hello')
+            except PyMongoError:
+                member.update({'role': 'unavailable', 'last_write': None})
+                continue
+            self.stats.round_trip(host, (time.perf_counter() - start_time) * 1000)
+            if hello.get('isWritablePrimary'):
+                role = 'primary'
+            elif hello.get('secondary'):
+                role = 'secondary'
+            else:
+                role = 'other'
+            member.update({'role': role, 'last_write': hello.get('lastWrite', {}).get('lastWriteDate')})
+        self.members_refreshed_at = time.monotonic()
+    
+    def invalidate_members(self):
+        """Forzar un hello a los miembros en la próxima selección (p. ej. tras un cambio de primario)"""
+        self.members_refreshed_at = None
+    
+    def _current_members(self):
+        """Estado de los miembros, renovado solo si tiene más de heartbeat_seconds o se invalidó"""
+        with self.members_lock:
+            if (self.members_refreshed_at is None
+                    or time.monotonic() - self.members_refreshed_at > self.heartbeat_seconds):
+                self._refresh_members()
+            return self.members
+    
+    def _staleness_seconds(self, host, primary_host):
+        """Retraso del miembro respecto al primario según sus últimas escrituras"""
+        primary_write = self.members[primary_host]['last_write']
+        member_write = self.members[host]['last_write']
+        if primary_write is None or member_write is None:
+            return float('inf')
+        return max(0.0, (primary_write - member_write).total_seconds())
+    
+    def _select_member(self, read_mode):
+        """Miembro para el modo de lectura: secundarios dentro de maxStalenessSeconds, por carga o RTT"""
+        members = self._current_members()
+        primary = next((host for host, member in members.items() if member['role'] == 'primary'), None)
+        fresh_secondaries = [
+            host for host, member in members.items()
+            if member['role'] == 'secondary'
+            and (primary is None or self._staleness_seconds(host, primary) <= self.max_staleness_seconds)
+        ]
+        
+        if read_mode == 'primary' or (read_mode == 'secondaryPreferred' and not fresh_secondaries):
+            if primary is None:
+                raise ConnectionError(f"Sin primario disponible en {self.replica_set}")
+            return primary
+        if read_mode == 'secondaryPreferred':
+            return min(fresh_secondaries, key=self.stats.load)
+        
+        candidates = fresh_secondaries + ([primary] if primary else [])
+        if not candidates:
+            raise ConnectionError(f"Sin miembros elegibles en {self.replica_set}")
+        return min(candidates, key=self.stats.rtt)
+    
+    def read_preference(self, read_mode):
+        """ReadPreference del driver para el modo (maxStalenessSeconds en los modos con secundarios)"""
+        if read_mode == 'primary':
+            return Primary()
+        if read_mode == 'secondaryPreferred':
+            return SecondaryPreferred(max_staleness=self.max_staleness_seconds)
+        return Nearest(max_staleness=self.max_staleness_seconds)
+    
+    def database(self, query_class):
+        """Base de datos enrutada para una clase de QUERY_CLASSES (o un modo de lectura directamente)"""
+        read_mode = QUERY_CLASSES.get(query_class, query_class)
+        
+        if self.mode == 'replica_set':
+            database = self.client.get_database(self.database_name, read_preference=self.read_preference(read_mode))
+            self.stats.routed(f"{self.replica_set}/{read_mode}", query_class)
+            return database
+        
+        host = self._select_member(read_mode)
+        self.stats.routed(host, query_class)
+        return self.members[host]['client'][self.database_name]
+    
+    def served_by(self, database):
+        """Destino de una base devuelta por database(): miembro y rol, o preferencia de lectura"""
+        if self.mode == 'replica_set':
+            return f"{self.replica_set} ({database.read_preference.name}, maxStalenessSeconds={self.max_staleness_seconds})"
+        address = database.client.address
+        host = f"{address[0]}:{address[1]}"
+        return f"{host} ({self.members[host]['role']})"
+    
+    def report(self):
+        """Modo de conexión, reglas de enrutado y estadísticas por miembro"""
+        return {
+            'mode': self.mode,
+            'replica_set': self.replica_set,
+            'max_staleness_seconds': self.max_staleness_seconds,
+            'query_classes': dict(QUERY_CLASSES),
+            'members': self.stats.snapshot()
+        }
+    
+    def print_member_stats(self):
+        """Latencia y carga registradas por miembro"""
+        print(f"\n🛰️ ENRUTADO DE LECTURAS ({self.mode}, maxStalenessSeconds={self.max_staleness_seconds})")
+        for host, member in sorted(self.stats.snapshot().items()):
+            rtt = f"{member['rtt_ms']:.1f} ms" if member['rtt_ms'] is not None else "n/d"
+            avg = f"{member['avg_command_ms']:.1f} ms" if member['avg_command_ms'] is not None else "n/d"
+            print(f"  • {host}: RTT {rtt}, {member['operations']:,} comandos (media {avg}, "
+                  f"máx. concurrentes {member['max_in_flight']}), consultas {member['routed_queries']}")
+    
+    def close(self):
+        if self.client:
+            self.client.close()
+        for member in self.members.values():
+            member['client'].close()
+
+def routed(query_class):
+    """Decorador de consultas: durante la llamada self.db es la base enrutada para query_class"""
+    def decorator(method):
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            if getattr(self, 'router', None) is None:
+                return method(self, *args, **kwargs)
+            
+            previous_db = self.db
+            self.db = self.router.database(query_class)
+            try:
+                return method(self, *args, **kwargs)
+            finally:
+                self.db = previous_db
+        return wrapper
+    return decorator
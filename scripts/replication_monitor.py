@@ -0,0 +1,231 @@
+#!/usr/bin/env python3
+"""
+Monitor de Lag de Replicación del Replica Set rs0
+Dataset: Brazilian E-Commerce (MongoDB)
+Muestrea replSetGetStatus a intervalos: lag por secundario, ventana del oplog y ritmo de aplicación,
+con suscriptores para que la carga y las mutaciones regulen su ritmo
+"""
+
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from pymongo.errors import PyMongoError
+
+DEFAULT_INTERVAL_SECONDS = 5.0
+# Una hora de muestras con el intervalo por defecto
+DEFAULT_HISTORY = 720
+
+def secondary_lags(status):
+    """Retraso (optime) de cada secundario respecto al primario en un replSetGetStatus; {} sin primario"""
+    members = status.get('members', [])
+    primary = next((m for m in members if m.get('stateStr') == 'PRIMARY'), None)
+    if primary is None:
+        return {}
+    return {
+        m['name']: max(0.0, (primary['optimeDate'] - m['optimeDate']).total_seconds())
+        for m in members if m.get('stateStr') == 'SECONDARY'
+    }
+
+class ReplicationLagMonitor:
+    """
+    Hilo de muestreo sobre un cliente conectado al primario (o al replica set).
+    Cada muestra se guarda en una serie temporal acotada y se entrega a los suscriptores;
+    fuera de un replica set las muestras indican replica_set=False y lag 0
+    """
+    
+    def __init__(self, client, interval_seconds=DEFAULT_INTERVAL_SECONDS, history=DEFAULT_HISTORY):
+        self.client = client
+        self.interval_seconds = interval_seconds
+        self.samples = deque(maxlen=history)
+        self.subscribers = []
+        self.lock = threading.Lock()
+        self.sample_lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._thread = None
+        self._previous = None
+    
+    def _oplog_stats(self):
+        """Ventana del oplog (primera a última entrada) y su ocupación"""
+        oplog = self.client.local['oplog.rs']
+        first = next(oplog.find({}, {'ts': 1}).sort('$natural', 1).limit(1), None)
+        last = next(oplog.find({}, {'ts': 1}).sort('$natural', -1).limit(1), None)
+        stats = self.client.local.command('collStats', 'oplog.rs')
+        return {
+            'oplog_window_seconds': float(last['ts'].time - first['ts'].time) if first and last else None,
+            'oplog_used_mb': stats.get('size', 0) / 1024**2,
+            'oplog_max_mb': stats.get('maxSize', 0) / 1024**2
+        }
+    
+    def sample(self):
+        """Tomar una muestra ahora (también la usa lag_probe si la última es antigua)"""
+        with self.sample_lock:
+            now = time.time()
+            sample = {'time': datetime.now(), 'replica_set': False, 'primary': None, 'members': {},
+                      'max_lag_seconds': 0.0, 'oplog_window_seconds': None, 'writes_per_second': None}
+            try:
+                status = self.client.admin.command('replSetGetStatus')
+            except (PyMongoError, NotImplementedError):
+                status = None
+            
+            if status is not None:
+                lags = secondary_lags(status)
+                optimes = {m['name']: m.get('optimeDate') for m in status.get('members', [])}
+                try:
+                    server_status = self.client.admin.command('serverStatus')
+                    writes = sum(server_status.get('opcounters', {}).get(op, 0) for op in ('insert', 'update', 'delete'))
+                except (PyMongoError, NotImplementedError):
+                    writes = None  # sin permiso para serverStatus: el lag sigue siendo válido
+                previous = self._previous
+                elapsed = now - previous['now'] if previous else None
+                
+                members = {}
+                for member in status.get('members', []):
+                    name = member['name']
+                    apply_rate = None
+                    # Segundos de oplog aplicados por segundo: ~1 al día, >1 recuperando, <1 retrasándose
+                    if elapsed and optimes.get(name) and previous['optimes'].get(name):
+                        apply_rate = (optimes[name] - previous['optimes'][name]).total_seconds() / elapsed
+                    members[name] = {
+                        'state': member.get('stateStr'),
+                        'health': member.get('health'),
+                        'lag_seconds': lags.get(name),
+                        'apply_rate': apply_rate
+                    }
+                    if member.get('stateStr') == 'PRIMARY':
+                        sample['primary'] = name
+                
+                sample.update({
+                    'replica_set': status.get('set'),
+                    'members': members,
+                    'max_lag_seconds': max(lags.values(), default=0.0),
+                    'writes_per_second': ((writes - previous['writes']) / elapsed
+                                          if elapsed and writes is not None and previous['writes'] is not None else None)
+                })
+                try:
+                    sample.update(self._oplog_stats())
+                except PyMongoError:
+                    pass
+                self._previous = {'now': now, 'optimes': optimes, 'writes': writes}
+            
+            with self.lock:
+                self.samples.append(sample)
+                subscribers = list(self.subscribers)
+        
+        for callback in subscribers:
+            try:
+                callback(sample)
+            except Exception as e:
+                print(f"⚠️ Suscriptor del monitor de replicación: {e}")
+        return sample
+    
+    def _run(self):
+        while not self._stop_event.wait(self.interval_seconds):
+            try:
+                self.sample()
+            except PyMongoError as e:
+                print(f"⚠️ Monitor de replicación: {e}")
+    
+    def start(self):
+        """Primera muestra inmediata y muestreo en segundo plano cada interval_seconds"""
+        self.sample()
+        if self._thread is None:
+            self._stop_event.clear()
+            self._thread = threading.Thread(target=self._run, daemon=True)
+            self._thread.start()
+        return self
+    
+    def stop(self):
+        if self._thread is not None:
+            self._stop_event.set()
+            self._thread.join()
+            self._thread = None
+        return self
+    
+    def __enter__(self):
+        return self.start()
+    
+    def __exit__(self, *exc):
+        self.stop()
+    
+    def subscribe(self, callback):
+        """callback(sample) tras cada muestra (desde el hilo del monitor); devuelve el callback"""
+        with self.lock:
+            self.subscribers.append(callback)
+        return callback
+    
+    def unsubscribe(self, callback):
+        with self.lock:
+            if callback in self.subscribers:
+                self.subscribers.remove(callback)
+    
+    def latest(self):
+        with self.lock:
+            return self.samples[-1] if self.samples else None
+    
+    def is_running(self):
+        return self._thread is not None and self._thread.is_alive()
+    
+    def is_fresh(self, max_age_seconds=None):
+        """Hilo de muestreo vivo y última muestra más reciente que max_age_seconds (por defecto 3 intervalos)"""
+        max_age_seconds = 3 * self.interval_seconds if max_age_seconds is None else max_age_seconds
+        latest = self.latest()
+        return (self.is_running() and latest is not None
+                and (datetime.now() - latest['time']).total_seconds() <= max_age_seconds)
+    
+    def lag_probe(self, max_age_seconds=1.0):
+        """Mayor lag actual de los secundarios, muestreando si la última muestra es más antigua que max_age_seconds"""
+        latest = self.latest()
+        if latest is None or (datetime.now() - latest['time']).total_seconds() > max_age_seconds:
+            latest = self.sample()
+        return latest['max_lag_seconds']
+    
+    def time_series(self, since=None):
+        """Serie temporal compacta (lag por miembro, ventana del oplog, escrituras/s) desde since"""
+        with self.lock:
+            samples = [s for s in self.samples if since is None or s['time'] >= since]
+        return [
+            {
+                'time': s['time'].isoformat(),
+                'max_lag_seconds': s['max_lag_seconds'],
+                'lag_seconds': {name: m['lag_seconds'] for name, m in s['members'].items() if m['lag_seconds'] is not None},
+                'apply_rate': {name: m['apply_rate'] for name, m in s['members'].items() if m['apply_rate'] is not None},
+                'oplog_window_seconds': s['oplog_window_seconds'],
+                'writes_per_second': s['writes_per_second']
+            }
+            for s in samples
+        ]
+    
+    def report(self, since=None):
+        """Resumen por secundario y serie temporal para los reportes de carga y consultas"""
+        series = self.time_series(since)
+        members = {}
+        for point in series:
+            for name, lag in point['lag_seconds'].items():
+                members.setdefault(name, []).append(lag)
+        windows = [point['oplog_window_seconds'] for point in series if point['oplog_window_seconds'] is not None]
+        latest = self.latest()
+        return {
+            'replica_set': latest['replica_set'] if latest else None,
+            'interval_seconds': self.interval_seconds,
+            'samples': len(series),
+            'max_lag_seconds': max((point['max_lag_seconds'] for point in series), default=0.0),
+            'secondaries': {
+                name: {'max_lag_seconds': max(lags), 'avg_lag_seconds': sum(lags) / len(lags)}
+                for name, lags in members.items()
+            },
+            'min_oplog_window_seconds': min(windows, default=None),
+            'time_series': series
+        }
+    
+    def print_summary(self, since=None):
+        """Lag máximo y medio por secundario y ventana mínima del oplog"""
+        report = self.report(since)
+        if not report['replica_set']:
+            print(f"\n📡 REPLICACIÓN: sin replica set ({report['samples']} muestras)")
+            return
+        print(f"\n📡 REPLICACIÓN {report['replica_set']} ({report['samples']} muestras cada {self.interval_seconds:g}s)")
+        for name, lag in sorted(report['secondaries'].items()):
+            print(f"  • {name}: lag máx. {lag['max_lag_seconds']:.1f}s, medio {lag['avg_lag_seconds']:.2f}s")
+        if report['min_oplog_window_seconds'] is not None:
+            print(f"  • Ventana mínima del oplog: {report['min_oplog_window_seconds'] / 3600:.1f} h")
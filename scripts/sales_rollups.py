@@ -0,0 +1,358 @@
+#!/usr/bin/env python3
+"""
+Colecciones de Resumen Materializadas (Rollups) de Ventas
+Dataset: Brazilian E-Commerce (MongoDB)
+Agregados diarios por producto, cliente y ciudad mantenidos con $merge desde orders
+"""
+
+from datetime import datetime, timedelta
+import time
+from mongodb_connection import METADATA_COLLECTION
+
+PURCHASE_TIMESTAMP = 'order_info.order_purchase_timestamp'
+ROLLUP_STATUS_ID = 'sales_rollups'
+
+SALES_BY_PRODUCT_DAY = 'sales_by_product_day'
+SALES_BY_CUSTOMER_DAY = 'sales_by_customer_day'
+SALES_BY_CITY_DAY = 'sales_by_city_day'
+
+def _is_number(field):
+    """1 si el campo es numérico, 0 si no: contador equivalente a los valores que usa $avg"""
+    return {"$cond": [{"$isNumber": field}, 1, 0]}
+
+def _average(sum_field, count_field):
+    """Promedio a partir de suma y contador (null sin valores, como $avg)"""
+    return {"$cond": [{"$gt": [count_field, 0]}, {"$divide": [sum_field, count_field]}, None]}
+
+def _is_string(field):
+    """1 si el campo es un texto (id presente), 0 si no: cuenta claves deduplicadas por $group"""
+    return {"$cond": [{"$eq": [{"$type": field}, "string"]}, 1, 0]}
+
+def _union(arrays_field):
+    """Unión de los arrays acumulados con $push (distintos a través de varios días)"""
+    return {"$reduce": {"input": arrays_field, "initialValue": [], "in": {"$setUnion": ["$$value", "$$this"]}}}
+
+# Grano diario: cualquier rango con límites a medianoche se responde sumando días completos.
+# Por rollup: si desanida items, clave de agrupación y acumuladores de cada día
+ROLLUPS = {
+    SALES_BY_PRODUCT_DAY: {
+        'unwind_items': True,
+        'keys': {'product_id': '$items.product_id'},
+        'accumulators': {
+            'categoria': {"$first": "$items.product_info.product_category_name_normalized"},
+            'cantidad_vendida': {"$sum": 1},
+            'total_ingresos': {"$sum": "$items.total_item_value"},
+            'precio_suma': {"$sum": "$items.price"},
+            'precio_conteo': {"$sum": _is_number("$items.price")},
+            'freight_suma': {"$sum": "$items.freight_value"},
+            'freight_conteo': {"$sum": _is_number("$items.freight_value")},
+            'ordenes': {"$addToSet": "$order_id"},
+            'clientes': {"$addToSet": "$customer.customer_id"},
+            'ultima_venta': {"$max": f"${PURCHASE_TIMESTAMP}"}
+        }
+    },
+    SALES_BY_CUSTOMER_DAY: {
+        'unwind_items': False,
+        'keys': {'customer_id': '$customer.customer_id'},
+        'accumulators': {
+            'total_ventas': {"$sum": 1},
+            'total_gastado': {"$sum": "$order_summary.total_value"},
+            'valor_conteo': {"$sum": _is_number("$order_summary.total_value")},
+            'primera_compra': {"$min": f"${PURCHASE_TIMESTAMP}"},
+            'ultima_compra': {"$max": f"${PURCHASE_TIMESTAMP}"},
+            'ciudad': {"$first": "$customer.customer_city"},
+            'estado': {"$first": "$customer.customer_state"},
+            'region': {"$first": "$customer.customer_region"}
+        }
+    },
+    SALES_BY_CITY_DAY: {
+        'unwind_items': False,
+        'keys': {
+            'ciudad': '$customer.customer_city',
+            'estado': '$customer.customer_state',
+            'region': '$customer.customer_region'
+        },
+        'accumulators': {
+            'total_ventas': {"$sum": 1},
+            'total_ingresos': {"$sum": "$order_summary.total_value"},
+            'valor_conteo': {"$sum": _is_number("$order_summary.total_value")},
+            'clientes': {"$addToSet": "$customer.customer_id"},
+            'total_items': {"$sum": "$order_summary.total_items"},
+            'items_conteo': {"$sum": _is_number("$order_summary.total_items")}
+        }
+    }
+}
+
+class SalesRollups:
+    """Construye, refresca por días afectados y consulta los rollups de ventas"""
+    
+    def __init__(self, db):
+        self.db = db
+    
+    @staticmethod
+    def day_ranges(days):
+        """Agrupar días sueltos en rangos [inicio, fin) contiguos para el $match sobre orders"""
+        ranges = []
+        for day in sorted(set(days)):
+            if ranges and ranges[-1][1] == day:
+                ranges[-1][1] = day + timedelta(days=1)
+            else:
+                ranges.append([day, day + timedelta(days=1)])
+        return ranges
+    
+    def rollup_pipeline(self, rollup_name, days=None):
+        """Pipeline orders -> rollup diario con $merge (solo los días indicados si days no es None)"""
+        definition = ROLLUPS[rollup_name]
+        pipeline = []
+        
+        if days is not None:
+            pipeline.append({"$match": {"$or": [
+                {PURCHASE_TIMESTAMP: {"$gte": start, "$lt": end}}
+                for start, end in self.day_ranges(days)
+            ]}})
+        if definition['unwind_items']:
+            pipeline.append({"$unwind": "$items"})
+        
+        group_id = dict(definition['keys'])
+        group_id['day'] = {"$dateTrunc": {"date": f"${PURCHASE_TIMESTAMP}", "unit": "day"}}
+        pipeline.append({"$group": {"_id": group_id, **definition['accumulators']}})
+        
+        # Claves también como campos de primer nivel para filtrar e indexar el rollup
+        pipeline.append({"$set": {key: f"$_id.{key}" for key in group_id}})
+        pipeline.append({"$merge": {
+            "into": rollup_name,
+            "on": "_id",
+            "whenMatched": "replace",
+            "whenNotMatched": "insert"
+        }})
+        return pipeline
+    
+    def order_days(self, order_ids, batch_size=10_000):
+        """Días de compra (medianoche UTC) de las órdenes indicadas que ya existen en orders"""
+        order_ids = list(order_ids)
+        days = set()
+        for start in range(0, len(order_ids), batch_size):
+            result = self.db.orders.aggregate([
+                {"$match": {"order_id": {"$in": order_ids[start:start + batch_size]}}},
+                {"$group": {"_id": {"$dateTrunc": {"date": f"${PURCHASE_TIMESTAMP}", "unit": "day"}}}}
+            ])
+            days.update(doc['_id'] for doc in result if doc['_id'] is not None)
+        return days
+    
+    def refresh(self, days=None):
+        """
+        Recalcular los rollups: completos (days=None) o solo los días afectados.
+        Los documentos de esos días se borran antes del $merge para no dejar claves obsoletas
+        """
+        print("\n🧮 ACTUALIZANDO ROLLUPS DE VENTAS...")
+        print("="*60)
+        
+        if days is not None:
+            days = sorted(set(days))
+            if not days:
+                print("✅ Sin días afectados: rollups al día")
+                return {}
+            print(f"📅 Días afectados: {len(days):,} ({days[0].date()} a {days[-1].date()})")
+        
+        # Sin documento de estado las consultas vuelven a orders hasta que el refresco termine
+        status = self.db[METADATA_COLLECTION]
+        status.delete_one({'_id': ROLLUP_STATUS_ID})
+        
+        # Productos cuyo last_sale_date puede cambiar: los vendidos en los días afectados (antes y después)
+        product_ids = None
+        if days is not None:
+            product_ids = set(self.db[SALES_BY_PRODUCT_DAY].distinct('product_id', {'day': {'$in': days}}))
+        
+        report = {}
+        for rollup_name in ROLLUPS:
+            collection = self.db[rollup_name]
+            start_time = time.time()
+            
+            deleted = collection.delete_many({} if days is None else {'day': {'$in': days}}).deleted_count
+            self.db.orders.aggregate(self.rollup_pipeline(rollup_name, days))
+            collection.create_index([('day', 1)])
+            # Primera clave del rollup: recálculos por producto/cliente/ciudad sin recorrer la colección
+            collection.create_index([(next(iter(ROLLUPS[rollup_name]['keys'])), 1)])
+            
+            elapsed = time.time() - start_time
+            report[rollup_name] = {
+                'documents': collection.count_documents({}),
+                'documents_replaced': deleted,
+                'refresh_time_seconds': elapsed
+            }
+            print(f"✅ {rollup_name}: {report[rollup_name]['documents']:,} documentos en {elapsed:.2f}s")
+        
+        if product_ids is not None:
+            product_ids |= set(self.db[SALES_BY_PRODUCT_DAY].distinct('product_id', {'day': {'$in': days}}))
+        report['products_last_sale_date'] = self.refresh_last_sale_dates(product_ids)
+        
+        status.update_one(
+            {'_id': ROLLUP_STATUS_ID},
+            {'$set': {
+                'rollups': list(ROLLUPS),
+                'last_sale_date': True,
+                'refreshed_at': datetime.now(),
+                'last_refresh': 'full' if days is None else 'incremental',
+                'days_refreshed': None if days is None else len(days)
+            }},
+            upsert=True
+        )
+        return report
+    
+    def refresh_last_sale_dates(self, product_ids=None):
+        """
+        Mantener products.last_sale_date (última compra del producto) desde sales_by_product_day
+        con $merge por product_id: todos los productos o solo los indicados
+        """
+        start_time = time.time()
+        scope = {'product_id': {'$type': 'string'}}
+        if product_ids is not None:
+            if not product_ids:
+                return {'products': 0, 'refresh_time_seconds': 0.0}
+            scope['product_id']['$in'] = list(product_ids)
+        
+        # Sin ventas en el rollup el campo desaparece: el producto cuenta como "sin ventas"
+        unset = self.db.products.update_many(
+            {} if product_ids is None else {'product_id': scope['product_id']['$in']},
+            {'$unset': {'last_sale_date': ''}}
+        )
+        self.db[SALES_BY_PRODUCT_DAY].aggregate([
+            {"$match": scope},
+            {"$group": {"_id": "$product_id", "last_sale_date": {"$max": "$ultima_venta"}}},
+            {"$project": {"_id": 0, "product_id": "$_id", "last_sale_date": 1}},
+            {"$merge": {
+                "into": "products",
+                "on": "product_id",
+                "whenMatched": [{"$set": {"last_sale_date": "$$new.last_sale_date"}}],
+                "whenNotMatched": "discard"
+            }}
+        ])
+        
+        elapsed = time.time() - start_time
+        print(f"✅ products.last_sale_date: {unset.matched_count:,} productos recalculados en {elapsed:.2f}s")
+        return {'products': unset.matched_count, 'refresh_time_seconds': elapsed}
+    
+    def covers(self, fecha_inicio, fecha_fin):
+        """
+        True si el rango [fecha_inicio, fecha_fin] de las consultas ($gte/$lte) se responde
+        con días completos: límites a medianoche, rollups construidos y ninguna orden
+        exactamente en fecha_fin (el $lte la incluiría y el rollup no puede separarla)
+        """
+        midnight = all(
+            value.time() == datetime.min.time() for value in (fecha_inicio, fecha_fin)
+        )
+        if not midnight or fecha_fin < fecha_inicio:
+            return False
+        if self.db[METADATA_COLLECTION].find_one({'_id': ROLLUP_STATUS_ID}) is None:
+            return False
+        return self.db.orders.count_documents({PURCHASE_TIMESTAMP: fecha_fin}, limit=1) == 0
+    
+    @staticmethod
+    def day_match(fecha_inicio, fecha_fin):
+        """Días completos del rango: desde fecha_inicio hasta el día anterior a fecha_fin"""
+        return {"$match": {"day": {"$gte": fecha_inicio, "$lt": fecha_fin}}}
+    
+    def product_sales_stages(self, fecha_inicio, fecha_fin, group_id):
+        """Etapas sobre sales_by_product_day equivalentes a $unwind items + $group por producto"""
+        return [
+            self.day_match(fecha_inicio, fecha_fin),
+            {"$group": {
+                "_id": group_id,
+                "categoria": {"$first": "$categoria"},
+                "cantidad_vendida": {"$sum": "$cantidad_vendida"},
+                "total_ingresos": {"$sum": "$total_ingresos"},
+                "precio_suma": {"$sum": "$precio_suma"},
+                "precio_conteo": {"$sum": "$precio_conteo"},
+                "freight_suma": {"$sum": "$freight_suma"},
+                "freight_conteo": {"$sum": "$freight_conteo"},
+                "ordenes": {"$push": "$ordenes"},
+                "clientes": {"$push": "$clientes"}
+            }},
+            {"$set": {
+                "precio_promedio": _average("$precio_suma", "$precio_conteo"),
+                "freight_promedio": _average("$freight_suma", "$freight_conteo"),
+                "ordenes_distintas": _union("$ordenes"),
+                "clientes_distintos": _union("$clientes")
+            }}
+        ]
+    
+    def product_distinct_stages(self, fecha_inicio, fecha_fin, count_distinct=True):
+        """
+        Como product_sales_stages por product_id, pero ordenes_distintas y clientes_distintos son
+        conteos sin arrays por grupo: las órdenes de días distintos son disjuntas (se suman tamaños)
+        y los clientes se deduplican con un $group (producto, cliente). Sin count_distinct, solo sumas
+        """
+        metrics = ['cantidad_vendida', 'total_ingresos', 'precio_suma', 'precio_conteo', 'freight_suma', 'freight_conteo']
+        averages = {"$set": {
+            "precio_promedio": _average("$precio_suma", "$precio_conteo"),
+            "freight_promedio": _average("$freight_suma", "$freight_conteo")
+        }}
+        if not count_distinct:
+            return [
+                self.day_match(fecha_inicio, fecha_fin),
+                {"$group": {
+                    "_id": "$product_id",
+                    "categoria": {"$first": "$categoria"},
+                    **{metric: {"$sum": f"${metric}"} for metric in metrics}
+                }},
+                averages
+            ]
+        
+        first_row = {"$eq": [{"$ifNull": ["$cliente_idx", 0]}, 0]}
+        return [
+            self.day_match(fecha_inicio, fecha_fin),
+            {"$unwind": {"path": "$clientes", "includeArrayIndex": "cliente_idx", "preserveNullAndEmptyArrays": True}},
+            # Las métricas de cada producto-día se cuentan una vez: en la fila de su primer cliente
+            {"$group": {
+                "_id": {"product_id": "$product_id", "customer_id": "$clientes"},
+                "categoria": {"$first": "$categoria"},
+                "ordenes": {"$sum": {"$cond": [first_row, {"$size": {"$ifNull": ["$ordenes", []]}}, 0]}},
+                **{metric: {"$sum": {"$cond": [first_row, f"${metric}", 0]}} for metric in metrics}
+            }},
+            {"$group": {
+                "_id": "$_id.product_id",
+                "categoria": {"$first": "$categoria"},
+                "ordenes_distintas": {"$sum": "$ordenes"},
+                "clientes_distintos": {"$sum": _is_string("$_id.customer_id")},
+                **{metric: {"$sum": f"${metric}"} for metric in metrics}
+            }},
+            averages
+        ]
+    
+    def customer_sales_stages(self, fecha_inicio, fecha_fin):
+        """Etapas sobre sales_by_customer_day equivalentes al $group de orders por cliente"""
+        return [
+            self.day_match(fecha_inicio, fecha_fin),
+            {"$group": {
+                "_id": "$customer_id",
+                "total_ventas": {"$sum": "$total_ventas"},
+                "total_gastado": {"$sum": "$total_gastado"},
+                "valor_conteo": {"$sum": "$valor_conteo"},
+                "primera_compra": {"$min": "$primera_compra"},
+                "ultima_compra": {"$max": "$ultima_compra"},
+                "ciudad": {"$first": "$ciudad"},
+                "estado": {"$first": "$estado"},
+                "region": {"$first": "$region"}
+            }},
+            {"$set": {"promedio_precio_por_venta": _average("$total_gastado", "$valor_conteo")}}
+        ]
+    
+    def city_sales_stages(self, fecha_inicio, fecha_fin):
+        """Etapas sobre sales_by_city_day equivalentes al $group de orders por ciudad"""
+        return [
+            self.day_match(fecha_inicio, fecha_fin),
+            {"$group": {
+                "_id": {"ciudad": "$ciudad", "estado": "$estado", "region": "$region"},
+                "total_ventas": {"$sum": "$total_ventas"},
+                "total_ingresos": {"$sum": "$total_ingresos"},
+                "valor_conteo": {"$sum": "$valor_conteo"},
+                "clientes": {"$push": "$clientes"},
+                "total_items": {"$sum": "$total_items"},
+                "items_conteo": {"$sum": "$items_conteo"}
+            }},
+            {"$set": {
+                "promedio_por_venta": _average("$total_ingresos", "$valor_conteo"),
+                "clientes_unicos": _union("$clientes"),
+                "promedio_items_por_venta": _average("$total_items", "$items_conteo")
+            }}
+        ]
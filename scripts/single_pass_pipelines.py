@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+Pipelines de Una Sola Pasada (Promedio y Filtro)
+Dataset: Brazilian E-Commerce (MongoDB)
+Consultas 4, 9 y 10: el promedio se calcula en la misma agregación que filtra ($setWindowFields / $unionWith)
+"""
+
+from city_keys import city_filter
+
+def _is_below(field, threshold):
+    """field < threshold solo para valores numéricos (en $expr null es menor que cualquier número)"""
+    return {"$and": [{"$isNumber": field}, {"$lt": [field, threshold]}]}
+
+def query_4_pipeline(ciudad, prefijo=False):
+    """
+    Productos vendidos en la ciudad con precio sobre el promedio general de items:
+    el $match de la ciudad usa el índice city_key + fecha, solo se proyectan los campos de items
+    y el promedio general llega en la misma agregación con $unionWith (un $group en streaming);
+    la ventana solo reparte ese valor entre los items de la ciudad
+    """
+    return [
+        {"$match": city_filter(ciudad, prefix=prefijo)},
+        {"$unwind": "$items"},
+        {"$project": {
+            "_id": 0,
+            "precio": "$items.price",
+            "product_id": "$items.product_id",
+            "categoria": "$items.product_info.product_category_name_normalized",
+            "total_item_value": "$items.total_item_value"
+        }},
+        {"$unionWith": {
+            "coll": "orders",
+            "pipeline": [
+                {"$project": {"_id": 0, "items.price": 1}},
+                {"$unwind": "$items"},
+                {"$group": {"_id": None, "precio_promedio_general": {"$avg": "$items.price"}}}
+            ]
+        }},
+        {"$setWindowFields": {
+            "output": {"precio_promedio_general": {"$max": "$precio_promedio_general"}}
+        }},
+        # El documento del promedio no tiene precio: $gt con un campo ausente es falso
+        {"$match": {"$expr": {"$gt": ["$precio", "$precio_promedio_general"]}}},
+        {"$group": {
+            "_id": {
+                "product_id": "$product_id",
+                "product_category": "$categoria"
+            },
+            "precio_promedio_producto": {"$avg": "$precio"},
+            "total_vendido": {"$sum": "$total_item_value"},
+            "cantidad_ordenes": {"$sum": 1},
+            "precio_promedio_general": {"$first": "$precio_promedio_general"}
+        }},
+        {"$sort": {"precio_promedio_producto": -1}}
+    ]
+
+def _query_9_match(ciudad, fecha_inicio, fecha_fin, prefijo):
+    return {"$match": {
+        **city_filter(ciudad, prefix=prefijo),
+        "order_info.order_purchase_timestamp": {"$gte": fecha_inicio, "$lte": fecha_fin}
+    }}
+
+def query_9_pipeline(ciudad, fecha_inicio, fecha_fin, prefijo=False):
+    """
+    Ventas de la ciudad en el período bajo el promedio de esas mismas ventas:
+    el $match usa el índice city_key + fecha y la ventana añade promedio, ventas e ingresos
+    """
+    return [
+        _query_9_match(ciudad, fecha_inicio, fecha_fin, prefijo),
+        {"$setWindowFields": {
+            "output": {
+                "precio_promedio_ciudad": {"$avg": "$order_summary.total_value"},
+                "total_ventas_ciudad": {"$count": {}},
+                "total_ingresos_ciudad": {"$sum": "$order_summary.total_value"}
+            }
+        }},
+        {"$match": {"$expr": _is_below("$order_summary.total_value", "$precio_promedio_ciudad")}},
+        {"$project": {
+            "order_id": 1,
+            "customer.customer_city": 1,
+            "order_summary.total_value": 1,
+            "order_info.order_purchase_timestamp": 1,
+            "precio_promedio_ciudad": 1,
+            "total_ventas_ciudad": 1,
+            "total_ingresos_ciudad": 1
+        }},
+        {"$sort": {"order_summary.total_value": 1}}
+    ]
+
+def query_9_city_stats_pipeline(ciudad, fecha_inicio, fecha_fin, prefijo=False):
+    """Promedio, ventas e ingresos de la ciudad en el período (cuando ninguna venta queda bajo el promedio)"""
+    return [
+        _query_9_match(ciudad, fecha_inicio, fecha_fin, prefijo),
+        {"$group": {
+            "_id": None,
+            "precio_promedio_ciudad": {"$avg": "$order_summary.total_value"},
+            "total_ventas_ciudad": {"$sum": 1},
+            "total_ingresos_ciudad": {"$sum": "$order_summary.total_value"}
+        }}
+    ]
+
+def query_10_pipeline(fecha_inicio, fecha_fin, valor_minimo):
+    """
+    Clientes del período con total gastado < valor_minimo: el umbral se aplica en el servidor
+    y la ventana añade a cada cliente devuelto el total de clientes activos
+    """
+    return [
+        {"$match": {
+            "order_info.order_purchase_timestamp": {"$gte": fecha_inicio, "$lte": fecha_fin}
+        }},
+        {"$group": {
+            "_id": "$customer.customer_id",
+            "total_gastado": {"$sum": "$order_summary.total_value"},
+            "total_ordenes": {"$sum": 1},
+            "primera_compra": {"$min": "$order_info.order_purchase_timestamp"},
+            "ultima_compra": {"$max": "$order_info.order_purchase_timestamp"},
+            "ciudad": {"$first": "$customer.customer_city"},
+            "estado": {"$first": "$customer.customer_state"}
+        }},
+        {"$setWindowFields": {
+            "output": {"clientes_activos": {"$count": {}}}
+        }},
+        {"$match": {"total_gastado": {"$lt": valor_minimo}}},
+        {"$sort": {"total_gastado": 1}}
+    ]
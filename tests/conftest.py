@@ -0,0 +1,142 @@
+"""
+Fixtures compartidas: un dataset Olist crudo pequeño y determinista (mismas columnas que los CSV
+originales) y su salida del ETL, para reproducir las comprobaciones de equivalencia sin el dataset real
+"""
+
+import contextlib
+import io
+import sys
+import uuid
+from pathlib import Path
+import numpy as np
+import pandas as pd
+import pytest
+
+# Los scripts se importan entre sí por nombre (directorio plano scripts/)
+SCRIPTS_DIR = Path(__file__).resolve().parent.parent / 'scripts'
+sys.path.insert(0, str(SCRIPTS_DIR))
+
+CITIES = [('sao paulo', 'SP'), ('rio de janeiro', 'RJ'), ('belo horizonte', 'MG'),
+          ('curitiba', 'PR'), ('são josé', 'SC'), ('salvador', 'BA')]
+CATEGORIES = ['cama_mesa_banho', 'beleza_saude', 'esporte_lazer', 'moveis_decoracao', None]
+
+def write_raw_olist(output, n_orders=300, seed=0):
+    """Nueve CSV con el formato de Kaggle: huecos, órdenes sin items, pagos múltiples y reviews ausentes"""
+    output = Path(output)
+    output.mkdir(parents=True, exist_ok=True)
+    rng = np.random.default_rng(seed)
+    
+    def hex_ids(n):
+        return [uuid.UUID(int=int(rng.integers(0, 2**63)) << 64 | int(rng.integers(0, 2**63))).hex for _ in range(n)]
+    
+    def fmt(timestamps):
+        return pd.Series(timestamps).dt.strftime('%Y-%m-%d %H:%M:%S')
+    
+    n_customers = int(n_orders * 0.9)
+    customers = hex_ids(n_customers)
+    city = rng.integers(0, len(CITIES), n_customers)
+    pd.DataFrame({
+        'customer_id': customers, 'customer_unique_id': hex_ids(n_customers),
+        'customer_zip_code_prefix': rng.integers(1000, 99999, n_customers),
+        'customer_city': [CITIES[i][0] for i in city], 'customer_state': [CITIES[i][1] for i in city]
+    }).to_csv(output / 'olist_customers_dataset.csv', index=False)
+    
+    n_geo = n_orders
+    city = rng.integers(0, len(CITIES), n_geo)
+    pd.DataFrame({
+        'geolocation_zip_code_prefix': rng.integers(1000, 99999, n_geo) // 10 * 10,
+        'geolocation_lat': rng.normal(-20, 3, n_geo).round(2), 'geolocation_lng': rng.normal(-45, 3, n_geo).round(2),
+        'geolocation_city': [CITIES[i][0] for i in city], 'geolocation_state': [CITIES[i][1] for i in city]
+    }).to_csv(output / 'olist_geolocation_dataset.csv', index=False)
+    
+    n_products = max(50, n_orders // 3)
+    products = hex_ids(n_products)
+    category = rng.integers(0, len(CATEGORIES), n_products)
+    pd.DataFrame({
+        'product_id': products, 'product_category_name': [CATEGORIES[i] for i in category],
+        'product_name_lenght': rng.integers(10, 60, n_products), 'product_description_lenght': rng.integers(50, 2000, n_products),
+        'product_photos_qty': rng.integers(1, 6, n_products), 'product_weight_g': rng.integers(50, 20000, n_products),
+        'product_length_cm': rng.integers(5, 100, n_products), 'product_height_cm': rng.integers(2, 100, n_products),
+        'product_width_cm': rng.integers(5, 100, n_products)
+    }).to_csv(output / 'olist_products_dataset.csv', index=False)
+    
+    n_sellers = max(20, n_orders // 30)
+    sellers = hex_ids(n_sellers)
+    city = rng.integers(0, len(CITIES), n_sellers)
+    pd.DataFrame({
+        'seller_id': sellers, 'seller_zip_code_prefix': rng.integers(10000, 99999, n_sellers),
+        'seller_city': [CITIES[i][0] for i in city], 'seller_state': [CITIES[i][1] for i in city]
+    }).to_csv(output / 'olist_sellers_dataset.csv', index=False)
+    
+    orders = hex_ids(n_orders)
+    purchase = pd.to_datetime(rng.integers(pd.Timestamp('2016-10-01').value, pd.Timestamp('2018-09-01').value, n_orders))
+    statuses = np.array(['delivered'] * 8 + ['shipped', 'canceled'])
+    status = statuses[rng.integers(0, len(statuses), n_orders)]
+    delivered = fmt(purchase + pd.to_timedelta(rng.integers(2, 30, n_orders), unit='D'))
+    delivered[status != 'delivered'] = None
+    pd.DataFrame({
+        'order_id': orders, 'customer_id': np.array(customers)[rng.integers(0, n_customers, n_orders)],
+        'order_status': status, 'order_purchase_timestamp': fmt(purchase),
+        'order_approved_at': fmt(purchase + pd.Timedelta(hours=2)),
+        'order_delivered_carrier_date': fmt(purchase + pd.Timedelta(days=1)),
+        'order_delivered_customer_date': delivered,
+        'order_estimated_delivery_date': fmt(purchase + pd.Timedelta(days=20))
+    }).to_csv(output / 'olist_orders_dataset.csv', index=False)
+    
+    per_order = rng.choice([0, 1, 1, 1, 1, 2, 2, 3], n_orders)
+    item_orders = np.repeat(np.arange(n_orders), per_order)
+    n_items = len(item_orders)
+    price = rng.lognormal(4, 0.8, n_items).round(2)
+    pd.DataFrame({
+        'order_id': np.array(orders)[item_orders],
+        'order_item_id': np.concatenate([np.arange(1, k + 1) for k in per_order]),
+        'product_id': np.array(products)[rng.zipf(1.5, n_items) % n_products],
+        'seller_id': np.array(sellers)[rng.integers(0, n_sellers, n_items)],
+        'shipping_limit_date': fmt(purchase[item_orders] + pd.Timedelta(days=5)),
+        'price': price, 'freight_value': (price * rng.uniform(0.05, 0.4, n_items)).round(2)
+    }).sample(frac=1, random_state=1).to_csv(output / 'olist_order_items_dataset.csv', index=False)
+    
+    payment_orders = np.concatenate([np.arange(n_orders), rng.integers(0, n_orders, n_orders // 10)])
+    n_payments = len(payment_orders)
+    payment_types = np.array(['credit_card', 'boleto', 'voucher', 'debit_card'])
+    pd.DataFrame({
+        'order_id': np.array(orders)[payment_orders], 'payment_sequential': 1,
+        'payment_type': payment_types[rng.integers(0, 4, n_payments)],
+        'payment_installments': rng.integers(1, 10, n_payments),
+        'payment_value': rng.lognormal(4.5, 0.8, n_payments).round(2)
+    }).to_csv(output / 'olist_order_payments_dataset.csv', index=False)
+    
+    n_reviews = int(n_orders * 0.97)
+    review_orders = rng.permutation(n_orders)[:n_reviews]
+    created = purchase[review_orders] + pd.Timedelta(days=10)
+    pd.DataFrame({
+        'review_id': hex_ids(n_reviews), 'order_id': np.array(orders)[review_orders],
+        'review_score': rng.integers(1, 6, n_reviews),
+        'review_comment_title': np.where(rng.random(n_reviews) < 0.1, 'otimo', None),
+        'review_comment_message': np.where(rng.random(n_reviews) < 0.4, 'bom produto', None),
+        'review_creation_date': fmt(created.normalize()),
+        'review_answer_timestamp': fmt(created + pd.Timedelta(hours=30))
+    }).to_csv(output / 'olist_order_reviews_dataset.csv', index=False)
+    
+    pd.DataFrame({
+        'product_category_name': [c for c in CATEGORIES if c],
+        'product_category_name_english': ['bed_bath_table', 'health_beauty', 'sports_leisure', 'furniture_decor']
+    }).to_csv(output / 'product_category_name_translation.csv', index=False)
+    return output
+
+@pytest.fixture(scope='session')
+def raw_olist(tmp_path_factory):
+    return write_raw_olist(tmp_path_factory.mktemp('raw'))
+
+@pytest.fixture(scope='session')
+def processed_olist(raw_olist, tmp_path_factory):
+    """Datasets procesados por ETLProcessor (en serie) y leídos como los lee el loader"""
+    from etl_processing import ETLProcessor
+    from mongodb_data_loader import MongoDBDataLoader
+    
+    processed_path = tmp_path_factory.mktemp('processed')
+    with contextlib.redirect_stdout(io.StringIO()):
+        ETLProcessor(raw_olist, processed_path, processes=0).run_full_etl()
+        loader = MongoDBDataLoader(processed_data_path=processed_path)
+        loader.load_processed_datasets()
+    return loader
@@ -0,0 +1,139 @@
+"""Motor de mutaciones por lotes sobre mongomock: recorrido por _id, filtros por lote, guardas, lag y dry-run"""
+
+import mongomock
+import pytest
+from pymongo import UpdateMany
+import bulk_mutations
+from bulk_mutations import BulkMutationEngine
+from mongodb_connection import METADATA_COLLECTION
+
+N_PRODUCTS = 103
+
+@pytest.fixture
+def db():
+    database = mongomock.MongoClient().db
+    database.products.insert_many([
+        {'_id': i, 'product_id': f"p{i:03d}", 'category': 'a' if i % 3 else 'b'} for i in range(N_PRODUCTS)
+    ])
+    return database
+
+def _engine(db, **kwargs):
+    kwargs.setdefault('lag_probe', lambda: 0.0)
+    return BulkMutationEngine(db, **kwargs)
+
+def _recording_update(engine, collection_name, filter, update):
+    """update() guardando el filtro que recibe cada lote"""
+    chunk_filters = []
+    
+    def make_operations(chunk_filter):
+        chunk_filters.append(chunk_filter)
+        return [UpdateMany(chunk_filter, update)]
+    
+    report = engine._run(collection_name, filter, make_operations, 'update de prueba')
+    return report, chunk_filters
+
+def test_chunks_visit_every_id_exactly_once(db):
+    # Lag bajo: el lote crece entre lotes, y aun así no hay huecos ni repeticiones
+    engine = _engine(db, dry_run=False, chunk_size=7, min_chunk_size=5, max_chunk_size=40)
+    report = engine.update('products', {'category': 'a'}, {'$inc': {'visits': 1}})
+    
+    matched = [doc['_id'] for doc in db.products.find({'category': 'a'})]
+    assert {doc.get('visits') for doc in db.products.find({'category': 'a'})} == {1}
+    assert db.products.count_documents({'category': 'b', 'visits': {'$exists': True}}) == 0
+    assert report['documents_modified'] == report['documents_matched'] == len(matched)
+    assert report['chunk_size_min'] == 7 and report['chunk_size_max'] > 7
+
+def test_next_chunk_resumes_after_last_id(db):
+    engine = _engine(db, chunk_size=10)
+    seen, last_id = [], None
+    while chunk := engine._next_chunk(db.products, {}, last_id):
+        seen.extend(chunk)
+        last_id = chunk[-1]
+    assert seen == list(range(N_PRODUCTS))
+
+def test_enumerated_filter_sends_only_chunk_ids(db):
+    product_ids = [f"p{i:03d}" for i in range(0, N_PRODUCTS, 2)]
+    filter = {'$and': [{'product_id': {'$in': product_ids}}, {'category': 'a'}]}
+    engine = _engine(db, dry_run=False, chunk_size=10, max_chunk_size=10)
+    report, chunk_filters = _recording_update(engine, 'products', filter, {'$set': {'flag': True}})
+    
+    chunk_ids = []
+    for chunk_filter in chunk_filters:
+        # La lista de product_id no viaja: solo el resto de predicados y los _id del lote
+        assert chunk_filter['$and'][0] == {'category': 'a'}
+        ids = chunk_filter['$and'][1]['_id']['$in']
+        assert len(chunk_filter['$and']) == 2 and len(ids) <= 10
+        chunk_ids.extend(ids)
+    
+    expected = [doc['_id'] for doc in db.products.find(filter).sort('_id', 1)]
+    assert chunk_ids == expected
+    assert db.products.count_documents({'flag': True}) == report['documents_modified'] == len(expected)
+
+def test_range_filter_keeps_predicate_and_id_bounds(db):
+    engine = _engine(db, dry_run=False, chunk_size=50, max_chunk_size=50)
+    _, chunk_filters = _recording_update(engine, 'products', {'category': 'b'}, {'$set': {'flag': True}})
+    first = chunk_filters[0]['$and']
+    assert first[0] == {'category': 'b'}
+    assert set(first[1]['_id']) == {'$gte', '$lte'}
+
+def test_guard_rejected_ids_are_never_deleted(db):
+    guarded = []
+    
+    def keep_even(collection, chunk_ids):
+        guarded.append(list(chunk_ids))
+        return [product_id for product_id in chunk_ids if product_id % 2]
+    
+    engine = _engine(db, dry_run=False, chunk_size=8, max_chunk_size=8)
+    report = engine.delete('products', {'category': 'a'}, chunk_guard=keep_even)
+    
+    candidates = [i for i in range(N_PRODUCTS) if i % 3]
+    assert [i for chunk in guarded for i in chunk] == candidates
+    assert sorted(doc['_id'] for doc in db.products.find({'category': 'a'})) == [i for i in candidates if i % 2 == 0]
+    assert db.products.count_documents({'category': 'b'}) == len([i for i in range(N_PRODUCTS) if i % 3 == 0])
+    assert report['documents_deleted'] == len([i for i in candidates if i % 2])
+    assert report['documents_skipped'] == len([i for i in candidates if i % 2 == 0])
+
+def test_guard_rejecting_a_whole_chunk_writes_nothing(db):
+    engine = _engine(db, dry_run=False, chunk_size=20)
+    report = engine.delete('products', {}, chunk_guard=lambda collection, chunk_ids: [])
+    assert db.products.count_documents({}) == N_PRODUCTS
+    assert report['documents_deleted'] == 0 and report['documents_skipped'] == N_PRODUCTS
+    assert db[METADATA_COLLECTION].count_documents({}) == 0
+
+def test_adapt_halves_on_high_lag_and_waits(monkeypatch):
+    monkeypatch.setattr(bulk_mutations.time, 'sleep', lambda seconds: None)
+    probes = iter([4.0, 1.0])
+    engine = BulkMutationEngine(None, chunk_size=1000, min_chunk_size=300, target_lag_seconds=2.0,
+                                lag_probe=lambda: next(probes))
+    
+    engine._adapt(5.0)
+    assert engine.chunk_size == 500
+    # Esperó hasta que el lag bajó del objetivo: consumió las dos muestras
+    assert next(probes, None) is None
+    
+    engine.lag_probe = lambda: 0.0
+    engine._adapt(5.0)
+    assert engine.chunk_size == 300
+
+def test_adapt_grows_on_low_lag_up_to_max():
+    engine = BulkMutationEngine(None, chunk_size=1000, max_chunk_size=2000, target_lag_seconds=2.0)
+    assert engine._adapt(0.5) == 0.0
+    assert engine.chunk_size == 1500
+    engine._adapt(0.5)
+    assert engine.chunk_size == 2000
+    # Entre la mitad del objetivo y el objetivo el tamaño no cambia
+    engine._adapt(1.5)
+    assert engine.chunk_size == 2000
+
+def test_dry_run_writes_nothing(db):
+    before = list(db.products.find().sort('_id', 1))
+    engine = _engine(db, dry_run=True, chunk_size=10)
+    
+    update = engine.update('products', {'category': 'a'}, {'$set': {'flag': True}})
+    delete = engine.delete('products', {}, chunk_guard=lambda collection, chunk_ids: chunk_ids)
+    
+    assert list(db.products.find().sort('_id', 1)) == before
+    assert db[METADATA_COLLECTION].count_documents({}) == 0
+    assert update['documents_modified'] == delete['documents_deleted'] == 0
+    assert update['chunks'] == 7 and delete['chunks'] == 11
+    assert 'data_version' not in update and 'data_version' not in delete
@@ -0,0 +1,31 @@
+"""Clave normalizada de ciudad y filtros que la usan"""
+
+import re
+import numpy as np
+import pandas as pd
+from city_keys import city_key, city_key_series, city_filter
+
+def test_city_key_folds_accents_case_and_spaces():
+    assert city_key('São  Paulo') == 'sao paulo'
+    assert city_key('  RIO DE JANEIRO ') == 'rio de janeiro'
+    assert city_key('Florianópolis') == 'florianopolis'
+
+def test_city_key_missing_values():
+    assert city_key(None) is None
+    assert city_key(np.nan) is None
+    assert city_key('   ') is None
+
+def test_city_key_series_matches_scalar():
+    series = pd.Series(['São Paulo', 'sao paulo', None, 'Curitiba'])
+    assert city_key_series(series).tolist()[:2] == ['sao paulo', 'sao paulo']
+    assert pd.isna(city_key_series(series)[2])
+    assert city_key_series(series)[3] == 'curitiba'
+
+def test_city_filter_exact_and_prefix():
+    assert city_filter('São Paulo') == {'customer.city_key': 'sao paulo'}
+    assert city_filter('Rio', field='seller.city_key') == {'seller.city_key': 'rio'}
+    
+    prefix = city_filter('São J', prefix=True)['customer.city_key']['$regex']
+    assert prefix == '^sao\\ j'
+    assert re.match(prefix, 'sao jose') and not re.match(prefix, 'xsao jose')
+    assert city_filter('a.b', prefix=True)['customer.city_key']['$regex'] == f"^{re.escape('a.b')}"
@@ -0,0 +1,58 @@
+"""ColumnarResult: decodificación por bloques y group_by frente al bucle de acumulación en dicts"""
+
+import numpy as np
+from columnar_results import ColumnarResult
+
+SCHEMA = {'region': 'str', 'total_ventas': 'int', 'total_ingresos': 'float'}
+DOCUMENTS = [
+    {'region': 'Sudeste', 'total_ventas': 3, 'total_ingresos': 10.5},
+    {'region': 'Sul', 'total_ventas': 1, 'total_ingresos': 2.25},
+    {'region': None, 'total_ventas': 2, 'total_ingresos': 1.0},
+    {'region': 'Sudeste', 'total_ventas': 5, 'total_ingresos': 4.0},
+    {'region': None, 'total_ventas': 1, 'total_ingresos': 0.5},
+    {'region': 'Nordeste', 'total_ventas': 4},
+]
+
+def _loop_group(documents, key):
+    """Implementación anterior: acumulación fila a fila en un dict"""
+    groups = {}
+    for document in documents:
+        group = groups.setdefault(document.get(key), {'clientes': 0, 'ventas': 0, 'ingresos': 0.0})
+        group['clientes'] += 1
+        group['ventas'] += document['total_ventas']
+        group['ingresos'] += document.get('total_ingresos') or 0.0
+    return groups
+
+def test_chunked_decoding_matches_single_chunk():
+    whole = ColumnarResult.from_documents(DOCUMENTS, SCHEMA, chunk_size=100)
+    chunked = ColumnarResult.from_documents(DOCUMENTS, SCHEMA, chunk_size=2)
+    assert len(whole) == len(chunked) == len(DOCUMENTS)
+    assert whole['total_ventas'].dtype == np.int64
+    assert np.isnan(whole['total_ingresos'][-1])
+    for field in SCHEMA:
+        np.testing.assert_array_equal(whole[field], chunked[field])
+
+def test_int_column_with_gaps_stays_float():
+    result = ColumnarResult.from_documents([{'total_ventas': 1}, {}], {'total_ventas': 'int'})
+    assert result['total_ventas'].dtype == np.float64
+
+def test_group_by_matches_dict_loop():
+    complete = [d for d in DOCUMENTS if 'total_ingresos' in d]
+    result = ColumnarResult.from_documents(complete, SCHEMA)
+    groups = result.group_by('region', 'clientes', {'ventas': 'total_ventas', 'ingresos': 'total_ingresos'})
+    
+    expected = _loop_group(complete, 'region')
+    assert list(groups) == list(expected)
+    assert None in groups
+    for key, values in expected.items():
+        assert groups[key]['clientes'] == values['clientes']
+        assert groups[key]['ventas'] == values['ventas'] and isinstance(groups[key]['ventas'], int)
+        assert np.isclose(groups[key]['ingresos'], values['ingresos'])
+
+def test_records_returns_python_scalars():
+    records = ColumnarResult.from_documents(DOCUMENTS, SCHEMA).records(2)
+    assert records == [
+        {'region': 'Sudeste', 'total_ventas': 3, 'total_ingresos': 10.5},
+        {'region': 'Sul', 'total_ventas': 1, 'total_ingresos': 2.25}
+    ]
+    assert type(records[0]['total_ventas']) is int
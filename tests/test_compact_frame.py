@@ -0,0 +1,33 @@
+"""Compactación de tipos del ETL sin pérdida de valores"""
+
+import numpy as np
+import pandas as pd
+from etl_processing import ETLProcessor
+
+def test_compact_frame_is_lossless():
+    df = pd.DataFrame({
+        'small_int': np.arange(100, dtype=np.int64),
+        'exact_float': np.arange(100, dtype=np.float64) / 4,
+        'money': np.round(np.linspace(0.01, 999.99, 100), 2),
+        'with_nan': np.where(np.arange(100) % 7 == 0, np.nan, 1.5),
+        'repeated': ['sao paulo', 'rio de janeiro'] * 50,
+        'unique': [f"id-{i:04d}" for i in range(100)],
+        'when': pd.date_range('2018-01-01', periods=100, freq='h'),
+        'flag': [True, False] * 50
+    })
+    compacted, converted = ETLProcessor.compact_frame(df)
+    
+    assert compacted['small_int'].dtype == np.int8
+    assert compacted['exact_float'].dtype == np.float32
+    # 12.34 no es representable en float32: se conserva float64
+    assert compacted['money'].dtype == np.float64
+    assert isinstance(compacted['repeated'].dtype, pd.CategoricalDtype)
+    assert set(converted) == {'small_int', 'exact_float', 'with_nan', 'repeated'}
+    
+    for column in df.columns:
+        original, new = df[column], compacted[column]
+        if isinstance(new.dtype, pd.CategoricalDtype):
+            new = new.astype(original.dtype)
+        elif pd.api.types.is_numeric_dtype(new.dtype) and not pd.api.types.is_bool_dtype(new.dtype):
+            new = new.astype(original.dtype)
+        pd.testing.assert_series_equal(new, original, check_dtype=False)
@@ -0,0 +1,29 @@
+"""HyperLogLog: exacto en modo disperso y dentro de su error estándar con registros"""
+
+from distinct_counts import HyperLogLog
+
+def test_sparse_mode_is_exact():
+    sketch = HyperLogLog(precision=12)
+    for value in list(range(300)) * 3 + [None]:
+        sketch.add(value)
+    assert sketch.registers is None
+    assert sketch.count() == 300
+
+def test_dense_estimate_within_error_bounds():
+    for n in (2_000, 50_000):
+        sketch = HyperLogLog(precision=12)
+        for value in range(n):
+            sketch.add(f"order-{value}")
+        assert sketch.registers is not None
+        # 4 errores estándar: el fallo por azar es prácticamente imposible y el hash es determinista
+        assert abs(sketch.count() - n) / n < 4 * sketch.standard_error
+
+def test_memory_is_bounded_by_registers():
+    sketch = HyperLogLog(precision=10)
+    for value in range(100_000):
+        sketch.add(value)
+    assert sketch.memory_bytes() == sketch.m
+
+def test_hash_is_stable():
+    assert HyperLogLog.hash_value('abc') == HyperLogLog.hash_value('abc')
+    assert HyperLogLog.hash_value(1) == HyperLogLog.hash_value('1')
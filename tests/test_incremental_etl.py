@@ -0,0 +1,42 @@
+"""Selección incremental de filas del ETL por watermark"""
+
+import contextlib
+import io
+import pytest
+from etl_processing import ETLProcessor
+
+@pytest.fixture
+def incremental_processor(raw_olist, tmp_path):
+    processor = ETLProcessor(raw_olist, tmp_path, processes=0)
+    with contextlib.redirect_stdout(io.StringIO()):
+        processor.load_raw_datasets()
+    return processor
+
+def test_select_incremental_rows_after_watermark(incremental_processor):
+    processor = incremental_processor
+    orders = processor.datasets['olist_orders_dataset.csv']
+    reviews = processor.datasets['olist_order_reviews_dataset.csv']
+    purchase_mark = orders['order_purchase_timestamp'].sort_values().iloc[len(orders) * 3 // 4]
+    answer_mark = reviews['review_answer_timestamp'].sort_values().iloc[len(reviews) * 9 // 10]
+    watermark = {'order_purchase_timestamp': purchase_mark.isoformat(), 'review_answer_timestamp': answer_mark.isoformat()}
+    
+    expected = set(orders.loc[orders['order_purchase_timestamp'] > purchase_mark, 'order_id'])
+    expected |= set(reviews.loc[reviews['review_answer_timestamp'] > answer_mark, 'order_id'])
+    
+    with contextlib.redirect_stdout(io.StringIO()):
+        affected = processor.select_incremental_rows(watermark)
+    
+    assert set(affected) == expected
+    datasets = processor.datasets
+    for filename in ETLProcessor.ORDER_KEYED_DATASETS:
+        assert set(datasets[filename]['order_id']) <= expected
+    assert set(datasets['olist_orders_dataset.csv']['order_id']) == expected
+    assert set(datasets['olist_customers_dataset.csv']['customer_id']) == set(datasets['olist_orders_dataset.csv']['customer_id'])
+    assert set(datasets['olist_products_dataset.csv']['product_id']) == set(datasets['olist_order_items_dataset.csv']['product_id'])
+    assert 'olist_geolocation_dataset.csv' not in datasets
+
+def test_select_incremental_rows_without_watermark_keeps_everything(incremental_processor):
+    orders = incremental_processor.datasets['olist_orders_dataset.csv']
+    with contextlib.redirect_stdout(io.StringIO()):
+        affected = incremental_processor.select_incremental_rows({})
+    assert set(affected) == set(orders['order_id'])
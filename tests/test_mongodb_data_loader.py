@@ -0,0 +1,62 @@
+"""Construcción de índices del loader sobre mongomock"""
+
+import mongomock
+import pandas as pd
+import pytest
+from pymongo import ASCENDING, IndexModel
+from mongodb_data_loader import MongoDBDataLoader
+
+@pytest.fixture
+def loader():
+    loader = MongoDBDataLoader()
+    loader.db = mongomock.MongoClient().db
+    return loader
+
+def _models():
+    return [
+        IndexModel([('order_id', ASCENDING)], unique=True),
+        IndexModel([('customer_id', ASCENDING)]),
+        IndexModel([('customer_id', ASCENDING), ('order_status', ASCENDING)])
+    ]
+
+def test_indexes_built_together_share_the_command(loader):
+    loader.db.orders.insert_many([{'order_id': i, 'customer_id': i % 3} for i in range(10)])
+    indexes = loader.create_collection_indexes(loader.db.orders, _models())
+    
+    assert list(indexes) == ['order_id_1', 'customer_id_1', 'customer_id_1_order_status_1']
+    assert indexes['order_id_1'] == {'keys': {'order_id': 1}, 'unique': True}
+    assert all('build_time_seconds' not in entry for entry in indexes.values())
+    assert loader.load_report['errors'] == []
+
+def test_failed_index_does_not_skip_the_others(loader):
+    # order_id duplicado: el unique falla, los demás índices de la colección se construyen igual
+    loader.db.orders.insert_many([{'order_id': 1, 'customer_id': 1}, {'order_id': 1, 'customer_id': 2}])
+    indexes = loader.create_collection_indexes(loader.db.orders, _models())
+    
+    assert 'error' in indexes['order_id_1']
+    assert [name for name, entry in indexes.items() if 'error' not in entry] == ['customer_id_1', 'customer_id_1_order_status_1']
+    assert all(entry['build_time_seconds'] >= 0 for entry in indexes.values())
+    assert set(loader.db.orders.index_information()) == {'_id_', 'customer_id_1', 'customer_id_1_order_status_1'}
+    assert len(loader.load_report['errors']) == 1 and 'order_id_1' in loader.load_report['errors'][0]
+
+def test_delta_is_read_without_moving_the_base_path(loader, tmp_path):
+    delta = tmp_path / 'delta'
+    delta.mkdir()
+    pd.DataFrame({'product_id': ['a', 'b']}).to_csv(delta / 'products.csv', index=False)
+    loader.processed_data_path = tmp_path
+    
+    loader.load_processed_datasets(delta)
+    assert loader.processed_data_path == tmp_path
+    assert loader.datasets['products']['product_id'].tolist() == ['a', 'b']
+
+def test_upsert_throughput_counts_modified_documents(loader):
+    # mongomock no admite UpdateOne en bulk_write con pymongo 4.x: el lote devuelve (nuevos, modificados)
+    loader.upsert_documents = lambda collection, documents, key: (1, 4)
+    loader.upsert_collection('products', 'product_id', [[{'product_id': 'p1'}]])
+    
+    report = loader.load_report['collections_loaded']['products']
+    assert (report['documents_upserted'], report['documents_modified'], report['documents_written']) == (1, 4, 5)
+    
+    loader.durability_barrier(load_seconds=1.0)
+    assert loader.load_report['write_profile']['documents'] == 5
+    assert loader.load_report['write_profile']['docs_per_sec'] == 5.0
@@ -0,0 +1,30 @@
+"""OrderDocumentBuilder frente al recorrido con iterrows al que sustituyó"""
+
+from benchmark_order_builder import build_orders_iterrows, normalize_document
+from order_document_builder import OrderDocumentBuilder
+
+ORDER_DATASETS = ('orders_with_customers', 'items_with_products', 'payments', 'reviews')
+
+def _frames(loader):
+    return [loader.datasets[name] for name in ORDER_DATASETS]
+
+def test_columnar_documents_match_iterrows(processed_olist):
+    frames = _frames(processed_olist)
+    legacy = build_orders_iterrows(processed_olist, *frames)
+    columnar = OrderDocumentBuilder(*frames).build_documents()
+    
+    assert len(columnar) == len(legacy) == len(frames[0])
+    for old, new in zip(legacy, columnar):
+        assert normalize_document(new) == normalize_document(old), old['order_id']
+
+def test_fixture_covers_edge_cases(processed_olist):
+    documents = OrderDocumentBuilder(*_frames(processed_olist)).build_documents()
+    assert any(not document['items'] for document in documents)
+    assert any(not document['review'] for document in documents)
+    assert any(len(document['payments']) > 1 for document in documents)
+
+def test_chunked_build_matches_single_pass(processed_olist):
+    builder = OrderDocumentBuilder(*_frames(processed_olist))
+    whole = builder.build_documents()
+    chunks = [document for start in range(0, len(whole), 37) for document in builder.build_documents(start, start + 37)]
+    assert [normalize_document(d) for d in chunks] == [normalize_document(d) for d in whole]
@@ -0,0 +1,40 @@
+"""Rangos promediados y correlaciones por pares de ProductAnalytics"""
+
+import numpy as np
+import pandas as pd
+from product_analytics import ProductAnalytics, FIELDS, rank_average, pearson
+
+def test_rank_average_matches_pandas():
+    rng = np.random.default_rng(7)
+    values = rng.integers(0, 20, 500).astype(float)
+    np.testing.assert_allclose(rank_average(values), pd.Series(values).rank(method='average').to_numpy())
+    np.testing.assert_allclose(rank_average(np.array([3.0, 1.0, 3.0, 2.0])), [3.5, 1.0, 3.5, 2.0])
+    assert len(rank_average(np.array([]))) == 0
+
+def test_pearson_matches_numpy_and_degenerate_cases():
+    rng = np.random.default_rng(3)
+    x = rng.normal(size=200)
+    y = 0.5 * x + rng.normal(size=200)
+    assert np.isclose(pearson(x, y), np.corrcoef(x, y)[0, 1])
+    assert pearson(np.array([1.0]), np.array([2.0])) == 0.0
+    assert pearson(np.ones(5), np.arange(5.0)) == 0.0
+
+def _analytics(n=300, seed=11):
+    rng = np.random.default_rng(seed)
+    values = rng.normal(size=(n, len(FIELDS)))
+    values[:, 1] += values[:, 0]
+    # Huecos distintos por columna: cada par usa sus propios productos completos
+    values[rng.random((n, len(FIELDS))) < 0.1] = np.nan
+    values[:, 2] = np.round(values[:, 2], 1)
+    return ProductAnalytics(values, np.arange(n).astype(object), np.zeros(n, dtype=np.int32), np.array(['x'], dtype=object))
+
+def test_pairwise_correlations_match_pandas():
+    analytics = _analytics()
+    frame = pd.DataFrame(analytics.values, columns=FIELDS)
+    for method, rank in (('pearson', False), ('spearman', True)):
+        result = analytics.correlation_matrix(rank=rank)
+        expected = frame.corr(method=method)
+        for a in FIELDS:
+            for b in FIELDS:
+                assert np.isclose(result['matrix'][a][b], expected.loc[a, b]), (method, a, b)
+                assert result['n'][a][b] == int((frame[a].notna() & frame[b].notna()).sum())
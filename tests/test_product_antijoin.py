@@ -0,0 +1,85 @@
+"""Anti-join de productos sin ventas recientes: las tres estrategias y la guarda del borrado por lotes"""
+
+from datetime import datetime, timedelta
+import mongomock
+import pytest
+from bulk_mutations import BulkMutationEngine
+from product_antijoin import ProductAntiJoin
+
+FECHA_LIMITE = datetime(2018, 6, 1)
+SOLD_AFTER = {'p01', 'p03', 'p09'}
+SOLD_ON_LIMIT = 'p05'
+SOLD_BEFORE = {'p07', 'p09'}
+
+def _order(product_ids, purchase):
+    return {'order_info': {'order_purchase_timestamp': purchase},
+            'items': [{'product_id': product_id} for product_id in product_ids]}
+
+@pytest.fixture
+def db():
+    database = mongomock.MongoClient().db
+    database.products.insert_many(
+        [{'product_id': f"p{i:02d}"} for i in range(12)] + [{'name': 'sin product_id'}, {'product_id': None}]
+    )
+    database.orders.insert_many([
+        _order(['p01', 'p03'], FECHA_LIMITE + timedelta(days=3)),
+        _order(['p09', 'p03'], FECHA_LIMITE + timedelta(hours=1)),
+        _order([SOLD_ON_LIMIT], FECHA_LIMITE),
+        _order(sorted(SOLD_BEFORE), FECHA_LIMITE - timedelta(seconds=1)),
+        {'order_info': {'order_purchase_timestamp': FECHA_LIMITE}, 'items': [{'price': 1.0}]}
+    ])
+    # Lo que materializa SalesRollups.refresh_last_sale_dates ($merge no existe en mongomock)
+    last_sales = {}
+    for order in database.orders.find():
+        for item in order['items']:
+            if 'product_id' in item:
+                purchase = order['order_info']['order_purchase_timestamp']
+                last_sales[item['product_id']] = max(purchase, last_sales.get(item['product_id'], purchase))
+    for product_id, last_sale_date in last_sales.items():
+        database.products.update_one({'product_id': product_id}, {'$set': {'last_sale_date': last_sale_date}})
+    return database
+
+def _ids(products):
+    return sorted(str(product['_id']) for product in products)
+
+def test_strategies_agree(db):
+    antijoin = ProductAntiJoin(db)
+    sold = SOLD_AFTER | {SOLD_ON_LIMIT}
+    expected = _ids(db.products.find({'product_id': {'$nin': sorted(sold)}}))
+    
+    assert _ids(antijoin.sorted_merge(FECHA_LIMITE)) == expected
+    assert _ids(antijoin.server_side(FECHA_LIMITE)) == expected
+    assert _ids(antijoin.legacy_nin(FECHA_LIMITE)) == expected
+    # Los dos productos sin product_id de texto cuentan como no vendidos; p07 solo se vendió antes del límite
+    assert len(expected) == 12 - len(sold) + 2
+    assert 'p07' in {product.get('product_id') for product in antijoin.sorted_merge(FECHA_LIMITE)}
+
+def test_sorted_merge_is_ordered_and_limited(db):
+    product_ids = [product.get('product_id') for product in ProductAntiJoin(db).sorted_merge(FECHA_LIMITE, limit=3)]
+    assert product_ids == ['p00', 'p02', 'p04']
+
+def test_active_ids_include_sale_on_limit(db):
+    active = list(ProductAntiJoin(db).iter_active_product_ids(FECHA_LIMITE))
+    assert active == sorted(SOLD_AFTER | {SOLD_ON_LIMIT})
+
+def test_unsold_guard_drops_recently_sold(db):
+    guard = ProductAntiJoin(db).unsold_guard(FECHA_LIMITE)
+    products = list(db.products.find())
+    
+    allowed = set(guard(db.products, [product['_id'] for product in products]))
+    dropped = [product.get('product_id') for product in products if product['_id'] not in allowed]
+    # Los vendidos desde el límite (incluido el vendido justo en él); los productos sin product_id se borran
+    assert sorted(dropped) == sorted(SOLD_AFTER | {SOLD_ON_LIMIT})
+    assert len(allowed) == len(products) - len(dropped)
+
+def test_guarded_delete_keeps_products_with_stale_last_sale_date(db):
+    # last_sale_date desfasado: p01 figura sin ventas recientes, pero orders dice lo contrario
+    db.products.update_one({'product_id': 'p01'}, {'$set': {'last_sale_date': FECHA_LIMITE - timedelta(days=90)}})
+    antijoin = ProductAntiJoin(db)
+    engine = BulkMutationEngine(db, dry_run=False, chunk_size=4, lag_probe=lambda: 0.0)
+    report = engine.delete('products', antijoin.without_sales_filter(FECHA_LIMITE),
+                           chunk_guard=antijoin.unsold_guard(FECHA_LIMITE))
+    
+    remaining = {product.get('product_id') for product in db.products.find()}
+    assert remaining == SOLD_AFTER | {SOLD_ON_LIMIT}
+    assert report['documents_skipped'] == 1
@@ -0,0 +1,90 @@
+"""Caché de agregaciones: invalidación por versión de datos, copias defensivas, claves y limpieza del disco"""
+
+import os
+from datetime import datetime
+import mongomock
+import pytest
+from query_cache import QueryResultCache, bump_data_version
+
+PIPELINE = [{'$match': {'state': 'SP'}}, {'$sort': {'_id': 1}}]
+
+@pytest.fixture
+def db():
+    database = mongomock.MongoClient().db
+    database.customers.insert_many([
+        {'_id': i, 'state': 'SP' if i % 2 else 'RJ', 'orders': [{'n': i}]} for i in range(10)
+    ])
+    return database
+
+def _pipeline(n):
+    return [{'$match': {'_id': {'$gte': n}}}]
+
+def test_hits_until_data_version_changes(db, tmp_path):
+    cache = QueryResultCache(db, cache_dir=tmp_path)
+    first = cache.aggregate('customers', PIPELINE)
+    assert cache.aggregate('customers', PIPELINE) == first
+    assert cache.stats == {'memory_hits': 1, 'disk_hits': 0, 'misses': 1}
+    
+    # Otra instancia (otro proceso) encuentra la entrada en disco
+    other = QueryResultCache(db, cache_dir=tmp_path)
+    assert other.aggregate('customers', PIPELINE) == first
+    assert other.stats['disk_hits'] == 1
+    
+    db.customers.insert_one({'_id': 99, 'state': 'SP'})
+    bump_data_version(db, source='test')
+    assert len(cache.aggregate('customers', PIPELINE)) == len(first) + 1
+    assert cache.stats['misses'] == 2
+    # La entrada de la versión nueva que escribió la primera instancia, no la de la versión 0
+    assert len(other.aggregate('customers', PIPELINE)) == len(first) + 1
+    assert other.stats == {'memory_hits': 0, 'disk_hits': 2, 'misses': 0}
+
+def test_hits_return_deep_copies(db, tmp_path):
+    cache = QueryResultCache(db, cache_dir=tmp_path)
+    result = cache.aggregate('customers', PIPELINE)
+    expected = [dict(document, orders=[dict(order) for order in document['orders']]) for document in result]
+    
+    # Como el modo aproximado de la consulta 15: modificar el resultado recibido
+    result[0]['state'] = 'XX'
+    result[0]['orders'][0]['n'] = -1
+    result.append({'_id': 'extra'})
+    hit = cache.aggregate('customers', PIPELINE)
+    assert hit == expected
+    
+    hit[1]['orders'].clear()
+    assert cache.aggregate('customers', PIPELINE) == expected
+    assert QueryResultCache(db, cache_dir=tmp_path).aggregate('customers', PIPELINE) == expected
+
+def test_key_distinguishes_order_and_types(db, tmp_path):
+    cache = QueryResultCache(db, cache_dir=tmp_path)
+    
+    def key(pipeline, params=None, collection='orders'):
+        return cache.cache_key(collection, pipeline, params)
+    
+    sort = [{'$sort': {'a': 1, 'b': -1}}]
+    assert key(sort) == key([{'$sort': {'a': 1, 'b': -1}}])
+    assert key(sort) != key([{'$sort': {'b': -1, 'a': 1}}])
+    assert key([{'$match': {'d': datetime(2018, 1, 1)}}]) != key([{'$match': {'d': '2018-01-01T00:00:00'}}])
+    assert key([{'$match': {'n': 1}}]) != key([{'$match': {'n': 1.0}}])
+    assert key(sort, {'limit': 5}) != key(sort, {'limit': 6})
+    assert key(sort, collection='orders') != key(sort, collection='products')
+
+def test_disk_sweep_keeps_recent_entries_of_current_version(db, tmp_path):
+    cache = QueryResultCache(db, cache_dir=tmp_path, max_entries=3)
+    stale = tmp_path / 'sin_version.json'
+    stale.write_text('{}')
+    for n in range(3):
+        cache.aggregate('customers', _pipeline(n))
+    paths = {n: cache._disk_path(cache.cache_key('customers', _pipeline(n)), 0) for n in range(3)}
+    # Orden de uso explícito: 0 el más antiguo; luego se lee 0 en disco (se marca como recién usado)
+    for n, path in paths.items():
+        os.utime(path, (1000 + n, 1000 + n))
+    QueryResultCache(db, cache_dir=tmp_path).aggregate('customers', _pipeline(0))
+    
+    cache.aggregate('customers', _pipeline(3))
+    remaining = sorted(path.name for path in tmp_path.glob('*.json'))
+    assert len(remaining) == 3 and not stale.exists()
+    assert paths[0].exists() and not paths[1].exists()
+    
+    bump_data_version(db, source='test')
+    cache.aggregate('customers', _pipeline(4))
+    assert [path.name.endswith('.v1.json') for path in tmp_path.glob('*.json')] == [True]
@@ -0,0 +1,79 @@
+"""Muestras del monitor de replicación con comandos fallidos y cierre de las clases de consultas"""
+
+from datetime import datetime, timedelta
+import pytest
+from pymongo.errors import OperationFailure
+from mongodb_connection import close_query_session
+from replication_monitor import ReplicationLagMonitor
+
+PRIMARY_OPTIME = datetime(2024, 1, 1, 12, 0, 0)
+
+class FakeAdmin:
+    def __init__(self, fail=()):
+        self.fail = set(fail)
+        self.writes = 0
+    
+    def command(self, name, *args):
+        if name in self.fail:
+            raise OperationFailure(f"not authorized on admin to execute command {{ {name}: 1 }}")
+        if name == 'replSetGetStatus':
+            return {'set': 'rs0', 'members': [
+                {'name': 'a:1', 'stateStr': 'PRIMARY', 'optimeDate': PRIMARY_OPTIME, 'health': 1},
+                {'name': 'b:1', 'stateStr': 'SECONDARY', 'optimeDate': PRIMARY_OPTIME - timedelta(seconds=3), 'health': 1}
+            ]}
+        self.writes += 10
+        return {'opcounters': {'insert': self.writes}}
+
+class FakeClient:
+    def __init__(self, fail=()):
+        self.admin = FakeAdmin(fail)
+        self.closed = False
+    
+    def __getattr__(self, name):
+        raise OperationFailure('sin acceso a local')
+    
+    def close(self):
+        self.closed = True
+
+def test_sample_survives_server_status_failure():
+    monitor = ReplicationLagMonitor(FakeClient(fail={'serverStatus'}))
+    first, second = monitor.sample(), monitor.sample()
+    assert first['max_lag_seconds'] == second['max_lag_seconds'] == 3.0
+    assert second['writes_per_second'] is None and second['members']['b:1']['lag_seconds'] == 3.0
+
+def test_sample_outside_replica_set():
+    sample = ReplicationLagMonitor(FakeClient(fail={'replSetGetStatus'})).sample()
+    assert sample['replica_set'] is False and sample['max_lag_seconds'] == 0.0
+
+class FakeQueries:
+    """Atributos que comparten las tres clases de consultas CRUD"""
+    
+    def __init__(self, client):
+        self.client = client
+        self.router = None
+        self.cache = None
+        self.lag_monitor = None
+        self.replication_report = None
+        self.routing_report = None
+
+def test_close_after_failed_monitor_start():
+    client = FakeClient()
+    queries = FakeQueries(client)
+    queries.lag_monitor = ReplicationLagMonitor(client)
+    
+    def failing_sample():
+        raise OperationFailure('serverStatus')
+    
+    # Un error en la primera muestra de start(): el cierre común debe cerrar igualmente la conexión
+    queries.lag_monitor.sample = failing_sample
+    with pytest.raises(OperationFailure):
+        queries.lag_monitor.start()
+    
+    close_query_session(queries)
+    assert client.closed
+    assert queries.replication_report['samples'] == 0
+
+def test_close_without_monitor():
+    queries = FakeQueries(FakeClient())
+    close_query_session(queries)
+    assert queries.client.closed and queries.replication_report is None
@@ -0,0 +1,43 @@
+"""Rangos de días de los refrescos incrementales y condiciones en que los rollups responden una consulta"""
+
+from datetime import datetime, timedelta
+import mongomock
+import pytest
+from mongodb_connection import METADATA_COLLECTION
+from sales_rollups import SalesRollups, ROLLUP_STATUS_ID
+
+def day(n):
+    return datetime(2018, 1, 1) + timedelta(days=n)
+
+def test_day_ranges_merges_contiguous_days():
+    assert SalesRollups.day_ranges([day(3), day(0), day(1), day(1), day(5), day(4)]) == [
+        [day(0), day(2)], [day(3), day(6)]
+    ]
+    assert SalesRollups.day_ranges([]) == []
+    assert SalesRollups.day_ranges([day(9)]) == [[day(9), day(10)]]
+
+@pytest.fixture
+def db():
+    database = mongomock.MongoClient().db
+    database.orders.insert_many([
+        {'order_info': {'order_purchase_timestamp': datetime(2018, 1, 10, 15, 30)}},
+        {'order_info': {'order_purchase_timestamp': datetime(2018, 2, 1)}}
+    ])
+    return database
+
+def test_covers_requires_built_rollups(db):
+    assert not SalesRollups(db).covers(datetime(2018, 1, 1), datetime(2018, 1, 31))
+    db[METADATA_COLLECTION].insert_one({'_id': ROLLUP_STATUS_ID, 'rollups': []})
+    assert SalesRollups(db).covers(datetime(2018, 1, 1), datetime(2018, 1, 31))
+
+def test_covers_requires_whole_days(db):
+    db[METADATA_COLLECTION].insert_one({'_id': ROLLUP_STATUS_ID, 'rollups': []})
+    rollups = SalesRollups(db)
+    assert not rollups.covers(datetime(2018, 1, 1, 12), datetime(2018, 1, 31))
+    assert not rollups.covers(datetime(2018, 1, 1), datetime(2018, 1, 31, 23, 59))
+    assert not rollups.covers(datetime(2018, 1, 31), datetime(2018, 1, 1))
+
+def test_covers_rejects_order_on_inclusive_end(db):
+    db[METADATA_COLLECTION].insert_one({'_id': ROLLUP_STATUS_ID, 'rollups': []})
+    # $lte incluiría la orden de las 00:00 del 1 de febrero, que el rollup diario no puede separar
+    assert not SalesRollups(db).covers(datetime(2018, 1, 1), datetime(2018, 2, 1))
@@ -0,0 +1,56 @@
+"""Consulta 9 en una pasada: totales de la ciudad también cuando ninguna venta queda bajo el promedio"""
+
+from datetime import datetime
+import mongomock
+import pytest
+from crud_consultas_mongodb_part2 import MongoDBCRUDQueriesPart2
+from single_pass_pipelines import query_9_city_stats_pipeline
+
+TRIMESTRE = (datetime(2018, 6, 1), datetime(2018, 8, 31))
+
+def _order(city_key, total_value, day=10):
+    return {'customer': {'city_key': city_key}, 'order_summary': {'total_value': total_value},
+            'order_info': {'order_purchase_timestamp': datetime(2018, 7, day)}}
+
+@pytest.fixture
+def db():
+    database = mongomock.MongoClient().db
+    database.orders.insert_many([
+        _order('rio de janeiro', 50.0), _order('rio de janeiro', 50.0), _order('curitiba', 10.0),
+        {**_order('rio de janeiro', 1.0), 'order_info': {'order_purchase_timestamp': datetime(2018, 1, 1)}}
+    ])
+    return database
+
+def test_city_stats_pipeline(db):
+    stats = list(db.orders.aggregate(query_9_city_stats_pipeline('Rio de Janeiro', *TRIMESTRE)))
+    assert len(stats) == 1
+    assert (stats[0]['precio_promedio_ciudad'], stats[0]['total_ventas_ciudad'], stats[0]['total_ingresos_ciudad']) == (50.0, 2, 100.0)
+
+def _queries(db, window_rows):
+    """Part2 con el resultado de la ventana simulado ($setWindowFields no existe en mongomock)"""
+    queries = MongoDBCRUDQueriesPart2(use_cache=False, use_replicas=False)
+    queries.db = db
+    
+    def aggregate(collection_name, pipeline):
+        if any('$setWindowFields' in stage for stage in pipeline):
+            return window_rows
+        return list(db[collection_name].aggregate(pipeline))
+    
+    queries._aggregate = aggregate
+    return queries
+
+def test_query_9_records_city_without_sales_below_average(db):
+    # Todas las ventas de la ciudad valen lo mismo: ninguna queda bajo el promedio
+    queries = _queries(db, [])
+    assert queries.query_9_eliminar_ventas_ciudad_bajo_promedio() == []
+    
+    result = queries.results['query_9']
+    assert result['precio_promedio_ciudad'] == 50.0 and result['total_ventas_ciudad'] == 2
+    assert result['ventas_bajo_promedio'] == 0 and result['valor_total_eliminar'] == 0.0
+    assert result['mutacion'] is None
+    assert db.orders.count_documents({}) == 4
+
+def test_query_9_city_without_sales(db):
+    queries = _queries(db, [])
+    assert queries.query_9_eliminar_ventas_ciudad_bajo_promedio(ciudad='manaus') == []
+    assert 'query_9' not in queries.results
@@ -0,0 +1,50 @@
+"""Ids hexadecimales y generación reproducible del dataset sintético"""
+
+import contextlib
+import io
+import numpy as np
+import pandas as pd
+import pytest
+from synthetic_olist import SyntheticOlistGenerator, hex_ids, ID_KINDS, ORDERS_FILE, ITEMS_FILE, CUSTOMERS_FILE
+
+def test_hex_ids_layout():
+    ids = hex_ids('order', 42, 3, np.arange(5))
+    assert all(len(value) == 32 and int(value, 16) >= 0 for value in ids)
+    assert {value[0] for value in ids} == {format(ID_KINDS['order'], 'x')}
+    assert ids[0][1:8] == format(42, '07x')
+    assert ids[0][8:16] == format(3, '08x')
+    assert [value[16:] for value in ids] == [format(i, '016x') for i in range(5)]
+
+def test_hex_ids_are_unique_and_deterministic():
+    first = hex_ids('customer', 7, np.arange(4).repeat(1000), np.tile(np.arange(1000), 4))
+    assert len(set(first)) == len(first)
+    assert list(first) == list(hex_ids('customer', 7, np.arange(4).repeat(1000), np.tile(np.arange(1000), 4)))
+    assert set(first).isdisjoint(hex_ids('order', 7, np.arange(4).repeat(1000), np.tile(np.arange(1000), 4)))
+
+def _generate(raw, output, seed, processes=0, chunk_customers=100):
+    with contextlib.redirect_stdout(io.StringIO()):
+        SyntheticOlistGenerator(raw, output, scale=1.5, seed=seed, chunk_customers=chunk_customers,
+                                processes=processes).generate()
+    return {path.name: path.read_bytes() for path in sorted(output.glob('*.csv'))}
+
+def test_generation_is_deterministic(raw_olist, tmp_path):
+    first = _generate(raw_olist, tmp_path / 'a', seed=1)
+    # Mismos bytes al repetir la semilla, en serie o con procesos (cada bloque deriva su propio generador)
+    assert _generate(raw_olist, tmp_path / 'b', seed=1) == first
+    assert _generate(raw_olist, tmp_path / 'c', seed=1, processes=2) == first
+    assert _generate(raw_olist, tmp_path / 'd', seed=2)[ORDERS_FILE] != first[ORDERS_FILE]
+
+def test_generated_referential_integrity(raw_olist, tmp_path):
+    _generate(raw_olist, tmp_path / 'out', seed=3)
+    orders = pd.read_csv(tmp_path / 'out' / ORDERS_FILE)
+    items = pd.read_csv(tmp_path / 'out' / ITEMS_FILE)
+    customers = pd.read_csv(tmp_path / 'out' / CUSTOMERS_FILE)
+    assert orders['order_id'].is_unique
+    assert set(items['order_id']) <= set(orders['order_id'])
+    assert set(orders['customer_id']) <= set(customers['customer_id'])
+
+def test_refuses_to_replace_raw_data(raw_olist):
+    with pytest.raises(ValueError):
+        SyntheticOlistGenerator(raw_olist, raw_olist.parent).check_output_path()
+    with pytest.raises(ValueError):
+        SyntheticOlistGenerator(raw_olist, raw_olist).check_output_path()